@@ -4,8 +4,6 @@ Provides a web interface for interacting with the AI assistant
 """
 from flask import Flask, render_template, request, jsonify, session
 from flask_cors import CORS
-import uuid
-from datetime import datetime
 from pathlib import Path
 import sys
 
@@ -13,17 +11,51 @@ import sys
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.utils import config
-from src.agents import medical_crew
+from src.utils import (
+    config,
+    AdmissionController,
+    RateLimiter,
+    render_metrics,
+    METRICS_CONTENT_TYPE
+)
+from src.utils.secret_key import load_secret_key
+from src.agents.warmup import warm_up
+from src.web import ChatHandlers, Reply, session_id_of, client_ip_of
 
 
 # Initialize Flask app
 app = Flask(__name__)
-app.secret_key = str(uuid.uuid4())
+app.secret_key = load_secret_key(config)
 CORS(app)
 
-# Store conversation history in memory
-conversations = {}
+# Backpressure: bounded concurrency + queue for chats, token buckets per session and address
+handlers = ChatHandlers(
+    admission=AdmissionController(
+        max_concurrent=config.ADMISSION_MAX_CONCURRENT,
+        max_queue=config.ADMISSION_MAX_QUEUE,
+        queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+        max_high_queue=config.ADMISSION_MAX_HIGH_QUEUE
+    ),
+    rate_limiter=RateLimiter(
+        rate=config.RATE_LIMIT_PER_MINUTE / 60.0,
+        burst=config.RATE_LIMIT_BURST
+    ),
+    ip_rate_limiter=RateLimiter(
+        rate=config.RATE_LIMIT_IP_PER_MINUTE / 60.0,
+        burst=config.RATE_LIMIT_IP_BURST
+    )
+)
+
+
+def respond(result: Reply):
+    """Turn a handler reply into a Flask response"""
+    body, status, headers = result
+    return jsonify(body), status, headers
+
+
+def client_ip() -> str:
+    """Address of the client of the current request"""
+    return client_ip_of(request.remote_addr, request.headers.get('X-Forwarded-For'), config.TRUSTED_PROXY_HOPS)
 
 
 @app.route('/')
@@ -34,111 +66,63 @@ def index():
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    """Handle chat messages"""
-    try:
-        # Get user message
-        data = request.json
-        user_message = data.get('message', '').strip()
-        
-        if not user_message:
-            return jsonify({'error': 'Message cannot be empty'}), 400
-        
-        # Get or create session ID
-        if 'session_id' not in session:
-            session['session_id'] = str(uuid.uuid4())
-        
-        session_id = session['session_id']
-        
-        # Initialize conversation history for this session
-        if session_id not in conversations:
-            conversations[session_id] = []
-        
-        # Add user message to history
-        conversations[session_id].append({
-            'role': 'user',
-            'content': user_message,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Process message with crew
-        response = medical_crew.handle_query(user_message)
-        
-        # Add assistant response to history
-        conversations[session_id].append({
-            'role': 'assistant',
-            'content': response,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Return response
-        return jsonify({
-            'response': response,
-            'session_id': session_id,
-            'timestamp': datetime.now().isoformat()
-        })
-    
-    except Exception as e:
-        print(f"Error in chat endpoint: {e}")
-        return jsonify({
-            'error': f'An error occurred: {str(e)}'
-        }), 500
+    """Handle chat messages (traced; the trace id is returned in X-Trace-Id)"""
+    data = request.get_json(silent=True)
+    return respond(handlers.chat(data, session_id_of(session, create=True), client_ip()))
 
 
 @app.route('/api/history', methods=['GET'])
 def history():
     """Get conversation history"""
-    try:
-        session_id = session.get('session_id')
-        
-        if not session_id or session_id not in conversations:
-            return jsonify({'history': []})
-        
-        return jsonify({
-            'history': conversations[session_id],
-            'session_id': session_id
-        })
-    
-    except Exception as e:
-        print(f"Error in history endpoint: {e}")
-        return jsonify({'error': str(e)}), 500
+    return respond(handlers.history(session_id_of(session)))
 
 
 @app.route('/api/clear', methods=['POST'])
 def clear():
     """Clear conversation history"""
-    try:
-        session_id = session.get('session_id')
-        
-        if session_id and session_id in conversations:
-            conversations[session_id] = []
-        
-        return jsonify({'message': 'Conversation cleared'})
-    
-    except Exception as e:
-        print(f"Error in clear endpoint: {e}")
-        return jsonify({'error': str(e)}), 500
+    return respond(handlers.clear(session_id_of(session)))
+
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def session_stats():
+    """Get session store metrics (live sessions, size, evictions)"""
+    return respond(handlers.session_stats())
+
+
+@app.route('/api/stats/admission', methods=['GET'])
+def admission_stats():
+    """Get admission control and rate limiting counters"""
+    return respond(handlers.admission_stats())
+
+
+@app.route('/api/stats/coalescing', methods=['GET'])
+def coalescing_stats():
+    """Get single-flight counters (calls, executions, coalesced) per upstream"""
+    return respond(handlers.coalescing_stats())
+
+
+@app.route('/api/waitlist', methods=['GET'])
+def waitlist():
+    """Staff view of the waitlist (?doctor=...&status=waiting,offered), oldest first; needs STAFF_API_TOKEN"""
+    return respond(handlers.waitlist(request.args, request.headers))
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint (metrics of this process)"""
+    return render_metrics(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Readiness probe: 503 until this process has finished warming up"""
+    return respond(handlers.health())
 
 
 @app.route('/api/info', methods=['GET'])
 def info():
     """Get medical center information"""
-    try:
-        return jsonify({
-            'center_name': config.CENTER_NAME,
-            'phone': config.CENTER_PHONE,
-            'pt_phone': config.PT_PHONE,
-            'pt_email': config.PT_EMAIL,
-            'location': config.CENTER_LOCATION,
-            'hours': {
-                'weekday': config.WEEKDAY_HOURS,
-                'saturday': config.SATURDAY_HOURS,
-                'sunday': config.SUNDAY_HOURS
-            }
-        })
-    
-    except Exception as e:
-        print(f"Error in info endpoint: {e}")
-        return jsonify({'error': str(e)}), 500
+    return respond(handlers.info())
 
 
 def run_app():
@@ -151,11 +135,17 @@ def run_app():
     🏥 Center: {config.CENTER_NAME}
     📞 Phone: {config.CENTER_PHONE}
     🌐 Server: http://{config.FLASK_HOST}:{config.FLASK_PORT}
+    🤖 LLM Provider: {config.LLM_PROVIDER}
+    🗂️  Sessions: {config.SESSION_BACKEND}
     🤖 Model: {config.GEMINI_MODEL}
     💾 Vector DB: {config.COLLECTION_NAME}
     
+    For production use: gunicorn -c gunicorn.conf.py app:app
     """)
     
+    status = warm_up()
+    print(f"🔥 Warm-up done: {status['timings']}")
+    
     app.run(
         host=config.FLASK_HOST,
         port=config.FLASK_PORT,
@@ -0,0 +1,176 @@
+"""
+ASGI Web Application for Medical Center AI Chatbot
+Async counterpart of app.py: LLM, embedding and vector search calls never hold a thread
+
+Run with:
+    hypercorn asgi:app --bind 0.0.0.0:5000
+"""
+from quart import Quart, render_template, request, jsonify, session
+import asyncio
+from pathlib import Path
+import sys
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from src.utils import (
+    config,
+    AsyncAdmissionController,
+    RateLimiter,
+    render_metrics,
+    METRICS_CONTENT_TYPE
+)
+from src.utils.secret_key import load_secret_key
+from src.agents import aclose_clients
+from src.agents.warmup import warm_up, is_ready
+from src.web import ChatHandlers, Reply, session_id_of, client_ip_of
+
+
+# Initialize Quart app
+app = Quart(__name__)
+app.secret_key = load_secret_key(config)
+
+# Backpressure: bounded concurrency + queue for chats, token buckets per session and address
+handlers = ChatHandlers(
+    admission=AsyncAdmissionController(
+        max_concurrent=config.ADMISSION_ASYNC_MAX_CONCURRENT,
+        max_queue=config.ADMISSION_MAX_QUEUE,
+        queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+        max_high_queue=config.ADMISSION_MAX_HIGH_QUEUE
+    ),
+    rate_limiter=RateLimiter(
+        rate=config.RATE_LIMIT_PER_MINUTE / 60.0,
+        burst=config.RATE_LIMIT_BURST
+    ),
+    ip_rate_limiter=RateLimiter(
+        rate=config.RATE_LIMIT_IP_PER_MINUTE / 60.0,
+        burst=config.RATE_LIMIT_IP_BURST
+    )
+)
+
+
+def respond(result: Reply):
+    """Turn a handler reply into a Quart response"""
+    body, status, headers = result
+    return jsonify(body), status, headers
+
+
+def client_ip() -> str:
+    """Address of the client of the current request"""
+    return client_ip_of(request.remote_addr, request.headers.get('X-Forwarded-For'), config.TRUSTED_PROXY_HOPS)
+
+
+@app.after_request
+async def add_cors_headers(response):
+    """Allow cross-origin requests, like flask_cors' defaults in app.py"""
+    response.headers.setdefault('Access-Control-Allow-Origin', '*')
+    return response
+
+
+@app.before_serving
+async def warm_up_process():
+    """Warm up before serving unless a pre-fork master already did (gunicorn)"""
+    if not is_ready():
+        await asyncio.to_thread(warm_up)
+
+
+@app.after_serving
+async def close_clients():
+    """Close pooled async HTTP connections on shutdown"""
+    await aclose_clients()
+
+
+@app.route('/')
+async def index():
+    """Render the main chat interface"""
+    return await render_template('index.html')
+
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    """Handle chat messages (traced; the trace id is returned in X-Trace-Id)"""
+    data = await request.get_json(silent=True)
+    return respond(await handlers.achat(data, session_id_of(session, create=True), client_ip()))
+
+
+# Session store and workbook calls block (Redis, file I/O), so they run off the event loop
+
+@app.route('/api/history', methods=['GET'])
+async def history():
+    """Get conversation history"""
+    return respond(await asyncio.to_thread(handlers.history, session_id_of(session)))
+
+
+@app.route('/api/clear', methods=['POST'])
+async def clear():
+    """Clear conversation history"""
+    return respond(await asyncio.to_thread(handlers.clear, session_id_of(session)))
+
+
+@app.route('/api/sessions/stats', methods=['GET'])
+async def session_stats():
+    """Get session store metrics"""
+    return respond(await asyncio.to_thread(handlers.session_stats))
+
+
+@app.route('/api/stats/admission', methods=['GET'])
+async def admission_stats():
+    """Get admission control and rate limiting counters"""
+    return respond(handlers.admission_stats())
+
+
+@app.route('/api/stats/coalescing', methods=['GET'])
+async def coalescing_stats():
+    """Get single-flight counters (calls, executions, coalesced) per upstream"""
+    return respond(handlers.coalescing_stats())
+
+
+@app.route('/api/waitlist', methods=['GET'])
+async def waitlist():
+    """Staff view of the waitlist (?doctor=...&status=waiting,offered), oldest first; needs STAFF_API_TOKEN"""
+    return respond(await asyncio.to_thread(handlers.waitlist, request.args, request.headers))
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus scrape endpoint (metrics of this process)"""
+    return render_metrics(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+
+@app.route('/api/health', methods=['GET'])
+async def health():
+    """Readiness probe: 503 until this process has finished warming up"""
+    return respond(handlers.health())
+
+
+@app.route('/api/info', methods=['GET'])
+async def info():
+    """Get medical center information"""
+    return respond(handlers.info())
+
+
+def run_app():
+    """Run the ASGI application with Hypercorn"""
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config as HypercornConfig
+    
+    print(f"""
+    ╔══════════════════════════════════════════════════════════════╗
+    ║   Medical Center AI Chatbot - Starting ASGI Server...       ║
+    ╚══════════════════════════════════════════════════════════════╝
+    
+    🏥 Center: {config.CENTER_NAME}
+    🌐 Server: http://{config.FLASK_HOST}:{config.FLASK_PORT}
+    🤖 LLM Provider: {config.LLM_PROVIDER}
+    🗂️  Sessions: {config.SESSION_BACKEND}
+    
+    """)
+    
+    hypercorn_config = HypercornConfig()
+    hypercorn_config.bind = [f"{config.FLASK_HOST}:{config.FLASK_PORT}"]
+    asyncio.run(serve(app, hypercorn_config))
+
+
+if __name__ == '__main__':
+    run_app()
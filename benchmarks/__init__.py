@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Load tests and micro-benchmarks for the chatbot, run from the project root with python -m benchmarks.<module>
+"""
@@ -0,0 +1,253 @@
+"""
+Excel Micro-benchmarks
+Times ExcelDBManager operations and their peak memory on synthetic workbooks from 1k to 1M rows
+
+Examples:
+    python -m benchmarks.excel_bench
+    python -m benchmarks.excel_bench --sizes 1000,10000 --repeat 10
+    python -m benchmarks.excel_bench --sizes 1000000 --ops load_snapshot,get_available_slots
+"""
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.excel_manager import ExcelDBManager
+
+from .load_test import git_commit
+from .workbook import build_workbook, days_for_rows, patient_names, slot_times
+
+
+BENCHMARK_DIR = Path(__file__).parent
+
+READ_OPS = ["load_snapshot", "get_available_slots", "search_appointments", "get_patient_info", "recommend_slots"]
+WRITE_OPS = ["book_appointment", "cancel_appointment"]
+ALL_OPS = READ_OPS + WRITE_OPS
+
+BENCH_PATIENT = "Benchmark Patient"
+
+
+def measure(calls: List[Callable[[], Any]], memory: bool) -> Dict[str, Any]:
+    """
+    Time each call, then run one more with tracemalloc for the peak allocation
+    
+    Timings are taken without tracemalloc, which slows allocation-heavy code
+    several times over. The last call is used only for the memory reading.
+    """
+    timed, traced_call = (calls[:-1], calls[-1]) if memory else (calls, None)
+    durations = []
+    for call in timed:
+        started = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - started)
+    
+    result = {
+        "runs": len(durations),
+        "min_ms": round(min(durations) * 1000, 3),
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "max_ms": round(max(durations) * 1000, 3),
+        "peak_mb": None
+    }
+    if traced_call is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            traced_call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_mb"] = round(peak / 2 ** 20, 2)
+    return result
+
+
+def prepare_workbook(
+    workdir: Path,
+    rows: int,
+    doctors: int,
+    times: List[str],
+    reserved_ratio: float,
+    patients: int,
+    seed: int
+) -> Dict[str, Any]:
+    """Generate (or reuse) the workbook for one size; half of its days lie in the past"""
+    days = days_for_rows(rows, doctors, len(times))
+    start = date.today() - timedelta(days=days // 2)
+    path = workdir / f"excel-bench-{rows}-{doctors}d-{len(times)}s-{reserved_ratio}r-{patients}p-{seed}-{start}.xlsx"
+    
+    generated_s = None
+    if not path.exists():
+        started = time.perf_counter()
+        build_workbook(
+            str(path),
+            doctors=doctors,
+            days=days,
+            start=start,
+            times=times,
+            reserved_ratio=reserved_ratio,
+            patients=patients,
+            seed=seed
+        )
+        generated_s = round(time.perf_counter() - started, 2)
+    
+    return {
+        "path": path,
+        "rows": doctors * days * len(times),
+        "days": days,
+        "start": start,
+        "file_mb": round(path.stat().st_size / 2 ** 20, 2),
+        "generated_s": generated_s
+    }
+
+
+def bench_size(workbook: Dict[str, Any], ops: List[str], repeat: int, write_repeat: int, memory: bool) -> Dict[str, Dict]:
+    """Run the selected operations against one workbook"""
+    extra = 1 if memory else 0
+    manager = ExcelDBManager(str(workbook["path"]))
+    doctors = manager.doctor_sheets
+    patients = patient_names(1)
+    results = {}
+    
+    def cold_load():
+        manager._invalidate_snapshot()
+        manager.load_snapshot()
+    
+    read_calls = {
+        "load_snapshot": cold_load,
+        # As the check_availability tool calls it
+        "get_available_slots": lambda: manager.get_available_slots(doctors[0], None, limit=50),
+        # Reserved patients are drawn at random, so the first one has bookings with most doctors
+        "search_appointments": lambda: manager.search_appointments(patient_name=patients[0]),
+        "get_patient_info": lambda: manager.get_patient_info(patients[0]),
+        # "Any doctor, weekday afternoons": the slot index is built once per snapshot
+        "recommend_slots": lambda: manager.recommend_slots(weekdays=[0, 1, 2, 3, 4], earliest="02:00 PM", limit=5)
+    }
+    for op in READ_OPS:
+        if op in ops:
+            manager.load_snapshot()
+            results[op] = measure([read_calls[op]] * (repeat + extra), memory)
+            print(f"   {op:<22} {format_result(results[op])}")
+    
+    if any(op in ops for op in WRITE_OPS):
+        # Book free slots on a future day of the last sheet, then cancel the same bookings
+        doctor = doctors[-1]
+        target_day = workbook["start"] + timedelta(days=workbook["days"] - 1)
+        slots = manager.get_available_slots(doctor, target_day.isoformat(), limit=write_repeat + extra)
+        if len(slots) < write_repeat + extra:
+            print(f"   ⚠️  Only {len(slots)} free slots on {target_day}; skipping writes")
+            return results
+        
+        booked = []
+        
+        def book(slot: Dict[str, Any]):
+            def call():
+                success, message = manager.book_appointment(doctor, slot['date'], slot['time'], BENCH_PATIENT, "01099999999")
+                if not success:
+                    raise RuntimeError(message)
+                booked.append(slot)
+            return call
+        
+        def cancel(slot: Dict[str, Any]):
+            def call():
+                success, message = manager.cancel_appointment(doctor, BENCH_PATIENT, slot['date'], slot['time'])
+                if not success:
+                    raise RuntimeError(message)
+            return call
+        
+        book_result = measure([book(slot) for slot in slots], memory)
+        cancel_result = measure([cancel(slot) for slot in booked], memory)
+        for op, result in (("book_appointment", book_result), ("cancel_appointment", cancel_result)):
+            if op in ops:
+                results[op] = result
+                print(f"   {op:<22} {format_result(result)}")
+    
+    return results
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    peak = f"{result['peak_mb']:>9.2f} MB peak" if result['peak_mb'] is not None else ""
+    return f"median {result['median_ms']:>11.2f} ms  min {result['min_ms']:>11.2f} ms  {peak}"
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of ExcelDBManager on synthetic workbooks")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000",
+                        help="Comma-separated total slot rows per workbook")
+    parser.add_argument("--ops", default=",".join(ALL_OPS), help=f"Comma-separated subset of: {', '.join(ALL_OPS)}")
+    parser.add_argument("--doctors", type=int, default=10)
+    parser.add_argument("--slot-minutes", type=int, default=30, help="Slot length (density)")
+    parser.add_argument("--hours", default="9-17", help="Working hours, e.g. 8-20")
+    parser.add_argument("--reserved-ratio", type=float, default=0.3)
+    parser.add_argument("--patients", type=int, default=None, help="Patients sheet rows (default: rows / 20)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs of each read")
+    parser.add_argument("--write-repeat", type=int, default=2, help="Timed bookings (and cancellations)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=str(BENCHMARK_DIR / "results" / "workbooks"),
+                        help="Where generated workbooks are kept and reused")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/excel-<timestamp>.json)")
+    args = parser.parse_args(argv)
+    
+    args.sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    args.ops = [op.strip() for op in args.ops.split(',') if op.strip()]
+    unknown = set(args.ops) - set(ALL_OPS)
+    if unknown:
+        parser.error(f"unknown ops: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    start_hour, end_hour = (int(hour) for hour in args.hours.split('-'))
+    times = slot_times(start_hour, end_hour, args.slot_minutes)
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "commit": git_commit(),
+            "doctors": args.doctors,
+            "slots_per_day": len(times),
+            "reserved_ratio": args.reserved_ratio,
+            "repeat": args.repeat,
+            "write_repeat": args.write_repeat,
+            "memory": not args.no_memory,
+            "seed": args.seed,
+            "python": sys.version.split()[0]
+        },
+        "sizes": []
+    }
+    
+    for rows in args.sizes:
+        patients = args.patients or max(100, rows // 20)
+        print(f"\n📦 {rows:,} rows ({args.doctors} doctors, {patients:,} patients)")
+        workbook = prepare_workbook(workdir, rows, args.doctors, times, args.reserved_ratio, patients, args.seed)
+        generated = f"generated in {workbook['generated_s']}s" if workbook['generated_s'] is not None else "reused"
+        print(f"   {workbook['path'].name}: {workbook['rows']:,} rows, {workbook['file_mb']} MB, {generated}")
+        
+        results = bench_size(workbook, args.ops, args.repeat, args.write_repeat, not args.no_memory)
+        report["sizes"].append({
+            "rows": workbook["rows"],
+            "target_rows": rows,
+            "days": workbook["days"],
+            "patients": patients,
+            "file_mb": workbook["file_mb"],
+            "generated_s": workbook["generated_s"],
+            "ops": results
+        })
+    
+    output = Path(args.output) if args.output else BENCHMARK_DIR / "results" / f"excel-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+"""
+Load Test
+Replays scripted multi-turn conversations against /api/chat and reports latency percentiles, throughput and per-stage timings
+
+Examples:
+    python -m benchmarks.load_test --server wsgi --concurrency 20 --duration 60
+    python -m benchmarks.load_test --server asgi --conversations 200 --llm-latency fixed:300
+    python -m benchmarks.load_test --target http://localhost:5000 --concurrency 5 --duration 30
+    python -m benchmarks.load_test --server wsgi --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from .stand_ins import StandIns
+from .workbook import build_workbook
+
+
+BENCHMARK_DIR = Path(__file__).parent
+PROJECT_ROOT = BENCHMARK_DIR.parent
+
+# Histograms scraped from /metrics for the per-stage breakdown
+STAGE_HISTOGRAMS = {"stages": "chatbot_stage_seconds", "tools": "chatbot_tool_seconds"}
+
+METRIC_LINE = re.compile(r'^(\w+)\{([^}]*)\}\s+(\S+)$')
+METRIC_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def load_scenarios(path: str) -> Dict[str, Dict[str, Any]]:
+    """Load {name: {"weight": int, "turns": [message, ...]}} from a JSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        scenarios = json.load(f)
+    for name, scenario in scenarios.items():
+        if not scenario.get('turns'):
+            raise ValueError(f"Scenario '{name}' has no turns")
+        scenario.setdefault('weight', 1)
+    return scenarios
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of a sorted list (0 when empty)"""
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max in milliseconds"""
+    values = sorted(latencies)
+    return {
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "mean": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "max": round(values[-1] * 1000, 2) if values else 0.0
+    }
+
+
+class Recorder:
+    """Thread-safe store of request outcomes"""
+    
+    def __init__(self):
+        self.samples = []  # (scenario, latency seconds, status code, ok)
+        self.conversations = defaultdict(int)
+        self.failures = defaultdict(int)
+        self._lock = threading.Lock()
+    
+    def record(self, scenario: str, latency: float, status: int, ok: bool, failure: str = ""):
+        with self._lock:
+            self.samples.append((scenario, latency, status, ok))
+            if failure:
+                self.failures[failure] += 1
+    
+    def conversation_done(self, scenario: str):
+        with self._lock:
+            self.conversations[scenario] += 1
+
+
+class VirtualUser(threading.Thread):
+    """Runs conversations back to back, each with its own cookie session"""
+    
+    def __init__(
+        self,
+        index: int,
+        base_url: str,
+        scenarios: Dict[str, Dict[str, Any]],
+        recorder: Recorder,
+        deadline: float,
+        budget: "ConversationBudget",
+        think_time: float,
+        timeout: float,
+        seed: Optional[int]
+    ):
+        super().__init__(name=f"vu-{index}", daemon=True)
+        self.index = index
+        self.base_url = base_url
+        self.scenarios = scenarios
+        self.names = list(scenarios)
+        self.weights = [scenarios[name]['weight'] for name in self.names]
+        self.recorder = recorder
+        self.deadline = deadline
+        self.budget = budget
+        self.think_time = think_time
+        self.timeout = timeout
+        self.rng = random.Random(None if seed is None else seed + index)
+    
+    def run(self):
+        number = 0
+        while time.monotonic() < self.deadline and self.budget.take():
+            name = self.rng.choices(self.names, self.weights)[0]
+            self._converse(name, number)
+            number += 1
+    
+    def _converse(self, name: str, number: int):
+        # Unique per conversation so concurrent bookings never share a patient
+        values = {
+            "patient": f"Bench Patient V{self.index}N{number}",
+            "phone": f"0100{self.index:03d}{number:04d}"
+        }
+        with requests.Session() as http:
+            for turn in self.scenarios[name]['turns']:
+                if time.monotonic() >= self.deadline:
+                    return
+                self._send(http, name, turn.format(**values))
+                if self.think_time:
+                    time.sleep(self.rng.uniform(0, 2 * self.think_time))
+        self.recorder.conversation_done(name)
+    
+    def _send(self, http: requests.Session, name: str, message: str):
+        started = time.perf_counter()
+        try:
+            response = http.post(f"{self.base_url}/api/chat", json={"message": message}, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.recorder.record(name, time.perf_counter() - started, 0, False, type(e).__name__)
+            return
+        latency = time.perf_counter() - started
+        
+        failure = ""
+        if response.status_code != 200:
+            failure = f"HTTP {response.status_code}"
+        else:
+            try:
+                body = response.json()
+                if 'error' in body or not body.get('response'):
+                    failure = "error body"
+            except ValueError:
+                failure = "invalid JSON"
+        self.recorder.record(name, latency, response.status_code, not failure, failure)
+
+
+class ConversationBudget:
+    """Shared cap on conversations started (None = unlimited)"""
+    
+    def __init__(self, limit: Optional[int]):
+        self.remaining = limit
+        self._lock = threading.Lock()
+    
+    def take(self) -> bool:
+        if self.remaining is None:
+            return True
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+def scrape_histograms(base_url: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Read the stage and tool histograms from /metrics
+    
+    Returns:
+        {"stages": {stage: {"buckets": {le: count}, "sum": s, "count": n}}, "tools": {...}}
+    """
+    result = {group: {} for group in STAGE_HISTOGRAMS}
+    try:
+        text = requests.get(f"{base_url}/metrics", timeout=10).text
+    except requests.RequestException as e:
+        print(f"⚠️  Could not scrape /metrics: {e}")
+        return result
+    
+    families = {name: group for group, name in STAGE_HISTOGRAMS.items()}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        metric, labels, value = match.groups()
+        family, _, kind = metric.rpartition('_')
+        if family not in families:
+            continue
+        labels = dict(METRIC_LABEL.findall(labels))
+        key = labels.get('stage') or labels.get('tool', '')
+        series = result[families[family]].setdefault(key, {"buckets": {}, "sum": 0.0, "count": 0})
+        if kind == 'bucket':
+            series["buckets"][labels['le']] = float(value)
+        elif kind == 'sum':
+            series["sum"] = float(value)
+        elif kind == 'count':
+            series["count"] = int(float(value))
+    return result
+
+
+def diff_histograms(before: Dict[str, Dict], after: Dict[str, Dict]) -> Dict[str, Dict[str, Any]]:
+    """Per-series count, mean and bucket-estimated p95 of the observations made between two scrapes"""
+    summary = {}
+    for key, series in after.items():
+        previous = before.get(key, {"buckets": {}, "sum": 0.0, "count": 0})
+        count = series["count"] - previous["count"]
+        if count <= 0:
+            continue
+        total = series["sum"] - previous["sum"]
+        
+        # Upper bound of the first bucket holding the 95th percentile
+        p95 = None
+        bounds = sorted(series["buckets"], key=lambda le: float("inf") if le == "+Inf" else float(le))
+        for le in bounds:
+            if series["buckets"][le] - previous["buckets"].get(le, 0) >= 0.95 * count:
+                p95 = le
+                break
+        
+        summary[key] = {
+            "count": count,
+            "mean_ms": round(total / count * 1000, 2),
+            "total_s": round(total, 3),
+            "p95_le_ms": None if p95 in (None, "+Inf") else round(float(p95) * 1000, 1)
+        }
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["total_s"]))
+
+
+def free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+class AppServer:
+    """The chatbot under test in a subprocess (gunicorn for WSGI, hypercorn for ASGI)"""
+    
+    def __init__(self, kind: str, env: Dict[str, str], workdir: Path, host: str = "127.0.0.1"):
+        self.kind = kind
+        self.host = host
+        self.port = free_port(host)
+        self.env = {**os.environ, **env, "FLASK_HOST": host, "FLASK_PORT": str(self.port)}
+        self.log_path = workdir / f"{kind}-server.log"
+        self.process = None
+    
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    def start(self, timeout: float = 120.0) -> "AppServer":
+        if self.kind == "wsgi":
+            command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+        else:
+            command = [sys.executable, "-m", "hypercorn", "asgi:app", "--bind", f"{self.host}:{self.port}"]
+        
+        log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+        log.close()
+        
+        # Ready once the app reports its warm-up finished
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.kind} server exited early; see {self.log_path}")
+            try:
+                if requests.get(f"{self.url}/api/health", timeout=2).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.25)
+        self.stop()
+        raise RuntimeError(f"{self.kind} server not ready after {timeout:.0f}s; see {self.log_path}")
+    
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def run_load(args, base_url: str) -> Tuple[Recorder, float, Dict[str, Dict]]:
+    """Drive the virtual users; returns the recorder, elapsed seconds and /metrics deltas"""
+    scenarios = load_scenarios(args.scenarios)
+    recorder = Recorder()
+    budget = ConversationBudget(args.conversations)
+    duration = args.duration if args.duration else float("inf")
+    
+    before = scrape_histograms(base_url)
+    started = time.monotonic()
+    users = [
+        VirtualUser(
+            index, base_url, scenarios, recorder, started + duration, budget,
+            args.think_time, args.timeout, args.seed
+        )
+        for index in range(args.concurrency)
+    ]
+    for user in users:
+        user.start()
+        if args.ramp_up:
+            time.sleep(args.ramp_up / args.concurrency)
+    for user in users:
+        user.join()
+    elapsed = time.monotonic() - started
+    after = scrape_histograms(base_url)
+    
+    breakdown = {group: diff_histograms(before[group], after[group]) for group in STAGE_HISTOGRAMS}
+    return recorder, elapsed, breakdown
+
+
+def build_report(
+    args,
+    recorder: Recorder,
+    elapsed: float,
+    breakdown: Dict[str, Dict],
+    target: str,
+    tool_errors: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """Machine-readable results"""
+    samples = recorder.samples
+    errors = sum(1 for sample in samples if not sample[3])
+    status_codes = defaultdict(int)
+    by_scenario = defaultdict(list)
+    for scenario, latency, status, ok in samples:
+        status_codes[str(status)] += 1
+        by_scenario[scenario].append((latency, ok))
+    
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "commit": git_commit(),
+            "target": target,
+            "server": None if args.target else args.server,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "conversations_limit": args.conversations,
+            "think_time_s": args.think_time,
+            "llm_latency": args.llm_latency,
+            "embed_latency": args.embed_latency,
+            "vector_latency": args.vector_latency,
+            "seed": args.seed,
+            "python": sys.version.split()[0]
+        },
+        "summary": {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            "conversations": sum(recorder.conversations.values()),
+            "latency_ms": latency_summary([sample[1] for sample in samples])
+        },
+        "by_scenario": {
+            name: {
+                "requests": len(items),
+                "errors": sum(1 for _, ok in items if not ok),
+                "conversations": recorder.conversations.get(name, 0),
+                "latency_ms": latency_summary([latency for latency, _ in items])
+            }
+            for name, items in sorted(by_scenario.items())
+        },
+        "status_codes": dict(sorted(status_codes.items())),
+        "failures": dict(recorder.failures),
+        # Tool failures inside 200 responses, seen by the stand-in LLM (None against --target)
+        "tool_errors": tool_errors,
+        **breakdown
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    summary = report["summary"]
+    latency = summary["latency_ms"]
+    print("\n📊 Results")
+    print(f"   Requests:    {summary['requests']} in {summary['elapsed_s']}s "
+          f"({summary['throughput_rps']} req/s, {summary['conversations']} conversations)")
+    print(f"   Errors:      {summary['errors']} ({summary['error_rate']:.2%}) {report['failures'] or ''}")
+    if report["tool_errors"]:
+        print(f"   Tool errors: {sum(report['tool_errors'].values())} {report['tool_errors']}")
+    print(f"   Latency ms:  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    
+    print("\n   By scenario:")
+    for name, item in report["by_scenario"].items():
+        print(f"   - {name:<14} {item['requests']:>6} req  {item['errors']:>4} err  "
+              f"p50 {item['latency_ms']['p50']:>9}  p95 {item['latency_ms']['p95']:>9}")
+    
+    for group, title in (("stages", "Stage"), ("tools", "Tool")):
+        if not report.get(group):
+            continue
+        print(f"\n   {title} timings (server /metrics):")
+        for key, item in report[group].items():
+            p95 = f"≤{item['p95_le_ms']}" if item['p95_le_ms'] is not None else "n/a"
+            print(f"   - {key:<22} {item['count']:>6}x  mean {item['mean_ms']:>9} ms  p95 {p95} ms")
+
+
+def print_comparison(report: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print changes against an earlier results file"""
+    def delta(new: float, old: float) -> str:
+        if not old:
+            return f"{new}"
+        return f"{old} → {new} ({(new - old) / old:+.1%})"
+    
+    print(f"\n🔁 Compared with {baseline['meta'].get('timestamp')} ({baseline['meta'].get('commit') or 'unknown commit'})")
+    new, old = report["summary"], baseline["summary"]
+    print(f"   Throughput req/s: {delta(new['throughput_rps'], old['throughput_rps'])}")
+    print(f"   Error rate:       {old['error_rate']:.2%} → {new['error_rate']:.2%}")
+    for key in ("p50", "p95", "p99"):
+        print(f"   Latency {key} ms:  {delta(new['latency_ms'][key], old['latency_ms'][key])}")
+    for key, item in report.get("stages", {}).items():
+        previous = baseline.get("stages", {}).get(key)
+        if previous:
+            print(f"   Stage {key} mean ms: {delta(item['mean_ms'], previous['mean_ms'])}")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="End-to-end load test of /api/chat")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi",
+                        help="Spawn the app with gunicorn (wsgi) or hypercorn (asgi) against local stand-ins")
+    target.add_argument("--target", help="Base URL of an already running app (no stand-ins are started)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run (0 = until --conversations)")
+    parser.add_argument("--conversations", type=int, default=None, help="Stop after this many conversations")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=0, help="Mean pause between turns, seconds")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout, seconds")
+    parser.add_argument("--scenarios", default=str(BENCHMARK_DIR / "scenarios.json"))
+    parser.add_argument("--workbook", help="Schedule workbook to copy (default: a generated one)")
+    parser.add_argument("--llm-latency", default="lognormal:600,0.35", help="Stand-in Gemini latency spec")
+    parser.add_argument("--embed-latency", default="lognormal:25,0.3", help="Stand-in Ollama latency spec")
+    parser.add_argument("--vector-latency", default="lognormal:15,0.3", help="Stand-in Qdrant latency spec")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+    
+    if not args.duration and not args.conversations:
+        parser.error("--duration 0 needs --conversations")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    stand_ins = None
+    server = None
+    workdir = Path(tempfile.mkdtemp(prefix="chatbot-bench-"))
+    
+    try:
+        if args.target:
+            base_url = args.target.rstrip('/')
+        else:
+            stand_ins = StandIns(
+                llm_latency=args.llm_latency,
+                embed_latency=args.embed_latency,
+                vector_latency=args.vector_latency,
+                seed=args.seed
+            ).start()
+            
+            # Bookings mutate the workbook, so every run gets a fresh copy
+            workbook = workdir / "schedule.xlsx"
+            if args.workbook:
+                shutil.copyfile(args.workbook, workbook)
+            else:
+                build_workbook(str(workbook))
+            
+            env = {
+                **stand_ins.env(),
+                "EXCEL_DB_PATH": str(workbook),
+                "SESSION_BACKEND": "memory",
+                "RATE_LIMIT_PER_MINUTE": "0",
+                "FLASK_SECRET_KEY": "benchmark",
+                "FLASK_DEBUG": "False"
+            }
+            print(f"🚀 Starting {args.server} server (log: {workdir / (args.server + '-server.log')})")
+            server = AppServer(args.server, env, workdir).start()
+            base_url = server.url
+        
+        limit = f"{args.duration:.0f}s" if args.duration else f"{args.conversations} conversations"
+        print(f"🏃 {args.concurrency} users against {base_url} for {limit}")
+        recorder, elapsed, breakdown = run_load(args, base_url)
+    finally:
+        if server:
+            server.stop()
+        if stand_ins:
+            stand_ins.stop()
+    
+    tool_errors = dict(stand_ins.llm.tool_errors) if stand_ins else None
+    report = build_report(args, recorder, elapsed, breakdown, base_url, tool_errors)
+    print_report(report)
+    if not args.target and report["stages"]:
+        print("\n   Stage timings come from the worker(s) that answered the /metrics scrapes.")
+    
+    output = Path(args.output) if args.output else BENCHMARK_DIR / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(report, json.load(f))
+    
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
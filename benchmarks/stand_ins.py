@@ -0,0 +1,371 @@
+"""
+Benchmark Stand-in Servers
+Local Gemini, Ollama and Qdrant look-alikes with tunable latency, so load tests measure our code, not the network
+
+Run standalone (then point the app at the printed URLs):
+    python -m benchmarks.stand_ins --llm-latency lognormal:600,0.35
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from src.providers.mock import MockProvider, MockLLMServer, LatencyModel
+
+
+# Answers returned by the Qdrant stand-in (payload 'text' of each point)
+KNOWLEDGE_PASSAGES = [
+    "The clinic is open Monday to Friday from 7:00 AM to 7:00 PM and Saturday from 8:00 AM to 2:00 PM.",
+    "Physical therapy sessions last 45 minutes and include an assessment, manual therapy and a home exercise plan.",
+    "Dr. Sarah Martinez specializes in sports injuries and post-surgical rehabilitation.",
+    "Dr. Ahmed Hassan specializes in back and neck pain, posture correction and spinal rehabilitation.",
+    "Dr. Emily Roberts specializes in pediatric physical therapy and developmental delays.",
+    "Cancellations must be made at least 24 hours before the appointment.",
+    "Please bring your ID, insurance card and any imaging reports to your first visit.",
+    "Most insurance plans are accepted; self-pay patients receive a 10% discount."
+]
+
+# Patterns the scripted LLM uses to act like the real model on benchmark conversations
+DOCTOR_IN_MESSAGE = re.compile(r"\bDr\.?\s+([A-Z][a-z]+)")
+PATIENT_IN_MESSAGE = re.compile(r"\bfor ([A-Z][A-Za-z0-9]*(?: [A-Z][A-Za-z0-9]*)*)")
+PHONE_IN_MESSAGE = re.compile(r"\bphone (\+?\d{6,})")
+NAME_IN_MESSAGE = re.compile(r"\bI am ([A-Z][A-Za-z0-9]*(?: [A-Z][A-Za-z0-9]*)*)")
+AVAILABILITY_HEADER = re.compile(r"Available appointments for ([^:\n]+):")
+AVAILABILITY_DAY = re.compile(r"📅 (\d{4}-\d{2}-\d{2}):\s*\n\s*Times: ([^\n]+)")
+ERROR_IN_RESULT = re.compile(r"(Error [^:\n\]]*)")
+
+
+class BenchmarkLLM(MockProvider):
+    """
+    Scripted model that drives full booking flows
+    
+    Beyond the mock's keyword rules it reads function results from the
+    conversation: a booking request first checks availability, then books a
+    random listed slot (random so concurrent users rarely collide).
+    
+    Tool failures seen in function results are counted in tool_errors: the
+    app answers those turns with HTTP 200, so this is where they show up.
+    """
+    
+    def __init__(self, latency: str = "fixed:0", seed: Optional[int] = None):
+        super().__init__(latency=latency, seed=seed)
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.tool_errors = {}
+    
+    def _respond(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        user_messages = [m['content'] for m in messages if m['role'] == 'user']
+        last_user = user_messages[-1] if user_messages else ""
+        request = next((m for m in reversed(user_messages) if not m.startswith("Based on the function result")), "")
+        
+        if last_user.startswith("Based on the function result"):
+            results = next((m['content'] for m in reversed(messages) if m['role'] == 'assistant'), "")
+            self._count_errors(results)
+            may_call = "If you still need more information" in last_user
+            if may_call and re.search(r"\bbook\b", request, re.IGNORECASE):
+                booking = self._book_from_results(request, results)
+                if booking:
+                    return self._text(booking)
+            return self._text("Here is what I found for you based on our records. Is there anything else I can help with?")
+        
+        doctor = DOCTOR_IN_MESSAGE.search(request)
+        doctor = doctor.group(1).lower() if doctor else "sarah"
+        
+        if re.search(r"\bcancel\b", request, re.IGNORECASE):
+            patient = PATIENT_IN_MESSAGE.search(request)
+            return self._text(f"cancel_appointment: {doctor} {patient.group(1) if patient else 'John Doe'}")
+        if re.search(r"\b(book|available|availability|slots?)\b", request, re.IGNORECASE):
+            return self._text(f"check_availability: {doctor}")
+        if re.search(r"\bmy appointments?\b", request, re.IGNORECASE):
+            name = NAME_IN_MESSAGE.search(request)
+            return self._text(f"search_appointments: {name.group(1) if name else 'John Doe'}")
+        
+        return super()._respond(messages)
+    
+    def _book_from_results(self, request: str, results: str) -> Optional[str]:
+        """book_appointment call for a random slot listed in an availability result"""
+        header = AVAILABILITY_HEADER.search(results)
+        patient = PATIENT_IN_MESSAGE.search(request)
+        phone = PHONE_IN_MESSAGE.search(request)
+        slots = [
+            (day, slot_time.strip())
+            for day, times in AVAILABILITY_DAY.findall(results)
+            for slot_time in times.split(',')
+        ]
+        if not (header and patient and phone and slots):
+            return None
+        with self._rng_lock:
+            day, slot_time = self.rng.choice(slots)
+        return f"book_appointment: {header.group(1)} {day} {slot_time} {patient.group(1)} {phone.group(1)}"
+    
+    def _count_errors(self, results: str):
+        for error in ERROR_IN_RESULT.findall(results):
+            with self._rng_lock:
+                self.tool_errors[error] = self.tool_errors.get(error, 0) + 1
+    
+    def _text(self, text: str) -> Dict[str, Any]:
+        self.calls += 1
+        return {"text": text, "function_calls": []}
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Shared plumbing for the stand-in handlers"""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            return json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return {}
+    
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_gemini_handler(model: BenchmarkLLM):
+    """Handler serving generateContent and streamGenerateContent (alt=sse)"""
+    
+    class GeminiHandler(_JSONHandler):
+        def do_POST(self):
+            path = urlparse(self.path).path
+            body = self._read_json()
+            messages = self._to_messages(body)
+            
+            if path.endswith(':streamGenerateContent'):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in model.stream(messages):
+                    event = {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.close_connection = True
+            elif path.endswith(':generateContent'):
+                response = model.chat(messages)
+                self._send_json(200, {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": [{"text": response["text"]}]},
+                        "finishReason": "STOP"
+                    }]
+                })
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+        
+        @staticmethod
+        def _to_messages(body: Dict[str, Any]) -> List[Dict[str, str]]:
+            messages = []
+            system = body.get('systemInstruction', {}).get('parts', [])
+            if system:
+                messages.append({"role": "system", "content": "".join(p.get('text', '') for p in system)})
+            for content in body.get('contents', []):
+                role = 'assistant' if content.get('role') == 'model' else 'user'
+                messages.append({"role": role, "content": "".join(p.get('text', '') for p in content.get('parts', []))})
+            return messages
+    
+    return GeminiHandler
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector derived from the text"""
+    values = []
+    counter = 0
+    while len(values) < dimensions:
+        digest = hashlib.sha256(f"{counter}:{text}".encode('utf-8')).digest()
+        values.extend(v / 2 ** 31 - 1.0 for v in struct.unpack("<8I", digest))
+        counter += 1
+    values = values[:dimensions]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def make_ollama_handler(latency: LatencyModel, dimensions: int):
+    """Handler serving /api/embeddings"""
+    
+    class OllamaHandler(_JSONHandler):
+        def do_GET(self):
+            self._send_json(200, {"models": [{"name": "nomic-embed-text:latest"}]})
+        
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip('/') != '/api/embeddings':
+                self._send_json(404, {"error": "not found"})
+                return
+            body = self._read_json()
+            time.sleep(latency.sample())
+            self._send_json(200, {"embedding": fake_embedding(body.get('prompt', ''), dimensions)})
+    
+    return OllamaHandler
+
+
+def make_qdrant_handler(latency: LatencyModel, dimensions: int):
+    """Handler serving the Qdrant REST calls the app makes (collection info, search)"""
+    
+    class QdrantHandler(_JSONHandler):
+        def _ok(self, result: Any):
+            self._send_json(200, {"result": result, "status": "ok", "time": 0.0})
+        
+        def do_GET(self):
+            path = urlparse(self.path).path.rstrip('/')
+            if path == '':
+                self._send_json(200, {"title": "qdrant - vector search engine", "version": "1.11.0"})
+            elif path.startswith('/collections/'):
+                self._ok(self._collection_info())
+            elif path == '/collections':
+                self._ok({"collections": []})
+            else:
+                self._send_json(404, {"status": {"error": "Not found"}})
+        
+        def do_POST(self):
+            path = urlparse(self.path).path.rstrip('/')
+            if not path.endswith('/points/search'):
+                self._send_json(404, {"status": {"error": "Not found"}})
+                return
+            body = self._read_json()
+            time.sleep(latency.sample())
+            
+            # Stable pseudo-relevance: rotate passages by a hash of the query vector
+            vector = body.get('vector') or []
+            start = int(abs(sum(vector[:8])) * 1000) % len(KNOWLEDGE_PASSAGES) if vector else 0
+            limit = min(int(body.get('limit', 5)), len(KNOWLEDGE_PASSAGES))
+            points = []
+            for rank in range(limit):
+                index = (start + rank) % len(KNOWLEDGE_PASSAGES)
+                points.append({
+                    "id": index + 1,
+                    "version": 0,
+                    "score": round(0.9 - rank * 0.05, 3),
+                    "payload": {"text": KNOWLEDGE_PASSAGES[index], "source": "benchmark", "type": "pdf"}
+                })
+            self._ok(points)
+        
+        def _collection_info(self) -> Dict[str, Any]:
+            return {
+                "status": "green",
+                "optimizer_status": "ok",
+                "vectors_count": len(KNOWLEDGE_PASSAGES),
+                "indexed_vectors_count": 0,
+                "points_count": len(KNOWLEDGE_PASSAGES),
+                "segments_count": 1,
+                "config": {
+                    "params": {
+                        "vectors": {"size": dimensions, "distance": "Cosine"},
+                        "shard_number": 1,
+                        "replication_factor": 1,
+                        "write_consistency_factor": 1,
+                        "on_disk_payload": True
+                    },
+                    "hnsw_config": {"m": 16, "ef_construct": 100, "full_scan_threshold": 10000,
+                                    "max_indexing_threads": 0, "on_disk": False},
+                    "optimizer_config": {"deleted_threshold": 0.2, "vacuum_min_vector_number": 1000,
+                                         "default_segment_number": 0, "max_segment_size": None,
+                                         "memmap_threshold": None, "indexing_threshold": 20000,
+                                         "flush_interval_sec": 5, "max_optimization_threads": None},
+                    "wal_config": {"wal_capacity_mb": 32, "wal_segments_ahead": 0},
+                    "quantization_config": None
+                },
+                "payload_schema": {}
+            }
+    
+    return QdrantHandler
+
+
+class StandIns:
+    """Gemini, Ollama and Qdrant stand-ins running in background threads"""
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        llm_latency: str = "lognormal:600,0.35",
+        embed_latency: str = "lognormal:25,0.3",
+        vector_latency: str = "lognormal:15,0.3",
+        seed: Optional[int] = None,
+        dimensions: int = 768
+    ):
+        """
+        Args:
+            host: Interface to bind (ports are picked automatically)
+            llm_latency: Latency spec of one Gemini response (see LatencyModel)
+            embed_latency: Latency spec of one embedding
+            vector_latency: Latency spec of one Qdrant search
+            seed: Seed for latencies and slot choices
+            dimensions: Embedding size
+        """
+        self.host = host
+        self.llm = BenchmarkLLM(latency=llm_latency, seed=seed)
+        self.servers = {
+            "gemini": MockLLMServer((host, 0), make_gemini_handler(self.llm)),
+            "ollama": MockLLMServer((host, 0), make_ollama_handler(LatencyModel(embed_latency, seed), dimensions)),
+            "qdrant": MockLLMServer((host, 0), make_qdrant_handler(LatencyModel(vector_latency, seed), dimensions))
+        }
+        self._threads = []
+    
+    def url(self, name: str) -> str:
+        return f"http://{self.host}:{self.servers[name].server_address[1]}"
+    
+    def start(self) -> "StandIns":
+        for name, server in self.servers.items():
+            thread = threading.Thread(target=server.serve_forever, name=f"stand-in-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+    
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+    
+    def env(self) -> Dict[str, str]:
+        """Environment pointing the app at the stand-ins"""
+        return {
+            "LLM_PROVIDER": "gemini",
+            "GEMINI_BASE_URL": self.url("gemini") + "/v1beta",
+            "GEMINI_API_KEY": "benchmark",
+            "OLLAMA_BASE_URL": self.url("ollama"),
+            "QDRANT_URL": self.url("qdrant"),
+            "QDRANT_API_KEY": "benchmark"
+        }
+
+
+def main():
+    """Run the stand-ins until interrupted"""
+    parser = argparse.ArgumentParser(description="Local Gemini/Ollama/Qdrant stand-ins for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--llm-latency", default="lognormal:600,0.35")
+    parser.add_argument("--embed-latency", default="lognormal:25,0.3")
+    parser.add_argument("--vector-latency", default="lognormal:15,0.3")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    stand_ins = StandIns(args.host, args.llm_latency, args.embed_latency, args.vector_latency, args.seed).start()
+    print("🧪 Stand-ins running; start the app with:\n")
+    for key, value in stand_ins.env().items():
+        print(f"   export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_ins.stop()
+
+
+if __name__ == "__main__":
+    main()
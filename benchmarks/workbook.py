@@ -0,0 +1,184 @@
+"""
+Benchmark Workbook
+Generates clinic schedule workbooks in the layout ExcelDBManager expects, at any size
+
+Run standalone:
+    python -m benchmarks.workbook data/bench.xlsx --doctors 10 --days 90 --reserved-ratio 0.4
+    python -m benchmarks.workbook data/bench-1m.xlsx --rows 1000000 --doctors 20
+"""
+import argparse
+import math
+import random
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+import openpyxl
+
+
+DOCTOR_NAMES = [
+    "Dr. Sarah Martinez",
+    "Dr. Ahmed Hassan",
+    "Dr. Emily Roberts",
+    "Dr. Omar Khaled",
+    "Dr. Laura Chen",
+    "Dr. Youssef Nabil"
+]
+
+FIRST_NAMES = [
+    "John", "Mona", "Karim", "Nour", "David", "Salma", "Mark", "Hana", "Ali", "Maria",
+    "Omar", "Laila", "James", "Yara", "Peter", "Dina", "Hassan", "Sara", "Adam", "Farah"
+]
+LAST_NAMES = [
+    "Doe", "Ibrahim", "Smith", "Mostafa", "Brown", "Fathy", "Wilson", "Saleh", "Taylor", "Adel",
+    "Lee", "Mahmoud", "Walker", "Samir", "Young", "Nasser", "King", "Hamdy", "Wright", "Fouad"
+]
+CITIES = ["Cairo", "Giza", "Alexandria", "New Cairo", "6th of October", "Nasr City"]
+
+SCHEDULE_COLUMNS = ["Date", "Time", "Patient_Name", "Phone", "Status"]
+PATIENT_COLUMNS = ["Patient_ID", "Full_Name", "Date_of_Birth", "Gender", "Phone", "Address", "Doctor"]
+
+
+def slot_times(start_hour: int = 9, end_hour: int = 17, minutes: int = 30) -> List[str]:
+    """Slot labels in the workbook's 'HH:MM AM' format"""
+    times = []
+    current = datetime(2000, 1, 1, start_hour)
+    end = datetime(2000, 1, 1, end_hour)
+    while current < end:
+        times.append(current.strftime("%I:%M %p"))
+        current += timedelta(minutes=minutes)
+    return times
+
+
+def doctor_names(count: int) -> List[str]:
+    """Unique sheet names, reusing DOCTOR_NAMES with a numeric suffix past the list"""
+    names = []
+    for index in range(count):
+        name = DOCTOR_NAMES[index % len(DOCTOR_NAMES)]
+        if index >= len(DOCTOR_NAMES):
+            name = f"{name} {index // len(DOCTOR_NAMES) + 1}"
+        names.append(name)
+    return names
+
+
+def patient_names(count: int) -> List[str]:
+    """Unique patient names ('John Doe', 'Mona Doe', ..., then 'John Doe 2', ...)"""
+    names = []
+    combinations = len(FIRST_NAMES) * len(LAST_NAMES)
+    for index in range(count):
+        first = FIRST_NAMES[index % len(FIRST_NAMES)]
+        last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+        name = f"{first} {last}"
+        if index >= combinations:
+            name = f"{name} {index // combinations + 1}"
+        names.append(name)
+    return names
+
+
+def days_for_rows(rows: int, doctors: int, slots_per_day: int) -> int:
+    """Days of schedule giving at least `rows` slot rows across all doctor sheets"""
+    return max(1, math.ceil(rows / (doctors * slots_per_day)))
+
+
+def build_workbook(
+    path: str,
+    doctors: int = 3,
+    days: int = 14,
+    start: Optional[date] = None,
+    times: Optional[List[str]] = None,
+    reserved_ratio: float = 0.0,
+    patients: int = 1,
+    seed: Optional[int] = None
+) -> Path:
+    """
+    Write a workbook with one schedule sheet per doctor and a Patients sheet
+    
+    Args:
+        path: Output .xlsx path
+        doctors: Number of doctor sheets (names from DOCTOR_NAMES)
+        days: Days of slots, starting at start
+        start: First schedule day (default: today)
+        times: Slot labels per day, i.e. the slot density (default: every 30 minutes, 9 AM to 5 PM)
+        reserved_ratio: Fraction of slots reserved by a random registered patient
+        patients: Rows in the Patients sheet
+        seed: Seed for which slots are reserved and by whom
+    
+    Returns:
+        Path of the written workbook
+    """
+    start = start or date.today()
+    times = times or slot_times()
+    rng = random.Random(seed)
+    doctor_list = doctor_names(doctors)
+    names = patient_names(max(1, patients))
+    phones = [f"010{index:08d}" for index in range(len(names))]
+    
+    wb = openpyxl.Workbook(write_only=True)
+    for doctor in doctor_list:
+        ws = wb.create_sheet(doctor)
+        ws.append(SCHEDULE_COLUMNS)
+        for offset in range(days):
+            day = datetime.combine(start + timedelta(days=offset), datetime.min.time())
+            for slot_time in times:
+                if reserved_ratio and rng.random() < reserved_ratio:
+                    patient = rng.randrange(len(names))
+                    ws.append([day, slot_time, names[patient], phones[patient], "Reserved"])
+                else:
+                    ws.append([day, slot_time, "-", "-", "Available"])
+    
+    ws = wb.create_sheet("Patients")
+    ws.append(PATIENT_COLUMNS)
+    for index, name in enumerate(names):
+        birth = date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 60))
+        ws.append([
+            index + 1,
+            name,
+            birth.isoformat(),
+            "Female" if index % 2 else "Male",
+            phones[index],
+            rng.choice(CITIES),
+            doctor_list[index % len(doctor_list)]
+        ])
+    
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def main():
+    """Generate a workbook from the command line"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic clinic schedule workbook")
+    parser.add_argument("output", help="Path of the .xlsx to write")
+    parser.add_argument("--doctors", type=int, default=3)
+    parser.add_argument("--days", type=int, default=14, help="Days of schedule (ignored with --rows)")
+    parser.add_argument("--rows", type=int, default=None, help="Target total slot rows across doctor sheets")
+    parser.add_argument("--start", default=None, help="First day, YYYY-MM-DD (default: today)")
+    parser.add_argument("--slot-minutes", type=int, default=30, help="Slot length (density)")
+    parser.add_argument("--hours", default="9-17", help="Working hours, e.g. 8-20")
+    parser.add_argument("--reserved-ratio", type=float, default=0.0)
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    start_hour, end_hour = (int(hour) for hour in args.hours.split('-'))
+    times = slot_times(start_hour, end_hour, args.slot_minutes)
+    days = days_for_rows(args.rows, args.doctors, len(times)) if args.rows else args.days
+    start = datetime.strptime(args.start, '%Y-%m-%d').date() if args.start else None
+    
+    path = build_workbook(
+        args.output,
+        doctors=args.doctors,
+        days=days,
+        start=start,
+        times=times,
+        reserved_ratio=args.reserved_ratio,
+        patients=args.patients,
+        seed=args.seed
+    )
+    print(f"✅ Wrote {path}: {args.doctors} doctors x {days} days x {len(times)} slots "
+          f"= {args.doctors * days * len(times):,} rows, {args.patients} patients")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Gunicorn Configuration for Medical Center AI Chatbot
+Production launcher: preloaded app, warm-up before ready, tunable workers and threads
+
+Run with:
+    gunicorn -c gunicorn.conf.py app:app
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+"""
+import multiprocessing
+
+from src.utils import config as app_config
+
+
+bind = f"{app_config.FLASK_HOST}:{app_config.FLASK_PORT}"
+
+# 0 = auto: one worker per core (x2 + 1) when sessions are shared through Redis;
+# with in-process sessions every worker would hold different conversations
+if app_config.GUNICORN_WORKERS > 0:
+    workers = app_config.GUNICORN_WORKERS
+elif app_config.SESSION_BACKEND == "redis":
+    workers = multiprocessing.cpu_count() * 2 + 1
+else:
+    workers = 1
+
+worker_class = app_config.GUNICORN_WORKER_CLASS
+threads = app_config.GUNICORN_THREADS
+timeout = app_config.GUNICORN_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app once in the master; workers share its memory copy-on-write
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Load shared data in the master, after the app is preloaded and before forking"""
+    from src.agents.warmup import warm_data
+    
+    if workers > 1 and app_config.SESSION_BACKEND != "redis":
+        server.log.warning(
+            "SESSION_BACKEND=memory with %d workers: conversations and slot holds are not shared between workers",
+            workers
+        )
+    
+    status = warm_data()
+    server.log.info("Master warm-up done: %s", status["timings"])
+
+
+def post_worker_init(worker):
+    """Open this worker's own connections before it accepts requests"""
+    from src.agents.warmup import warm_connections
+    
+    status = warm_connections()
+    worker.log.info("Worker %s ready: %s", worker.pid, status["timings"])
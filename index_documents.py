@@ -27,7 +27,10 @@ def main():
         qdrant_api_key=config.QDRANT_API_KEY,
         collection_name=config.COLLECTION_NAME,
         ollama_base_url=config.OLLAMA_BASE_URL,
-        embedding_model=config.EMBEDDING_MODEL
+        embedding_model=config.EMBEDDING_MODEL,
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP,
+        text_cache_dir=config.PDF_TEXT_CACHE_DIR or None
     )
     print(f"✅ Connected to Qdrant: {config.COLLECTION_NAME}")
     print(f"✅ Using Ollama embeddings: {config.EMBEDDING_MODEL}")
@@ -4,6 +4,8 @@ Agents package for Medical Center AI Chatbot
 from .medical_agents import (
     medical_chatbot,
     handle_query,
+    ahandle_query,
+    aclose_clients,
     get_all_agents,
     get_agent_by_role
 )
@@ -17,6 +19,8 @@ from .crew import (
 __all__ = [
     'medical_chatbot',
     'handle_query',
+    'ahandle_query',
+    'aclose_clients',
     'get_all_agents',
     'get_agent_by_role',
     'medical_crew',
@@ -2,7 +2,8 @@
 Simple Medical Center Crew
 Delegates to the medical chatbot for handling patient requests
 """
-from src.agents.medical_agents import medical_chatbot, handle_query
+from typing import Optional
+from src.agents.medical_agents import medical_chatbot, handle_query, ahandle_query
 from src.utils import config
 
 
@@ -29,18 +30,26 @@ class MedicalCenterCrew:
         """Initialize the crew"""
         self.chatbot = medical_chatbot
     
-    def handle_query(self, user_query: str) -> str:
+    def handle_query(self, user_query: str, session_id: Optional[str] = None) -> str:
         """
         Handle a user query using the medical chatbot
         
         Args:
             user_query: The user's question or request
+            session_id: Conversation to continue (each session has its own memory)
         
         Returns:
             str: The chatbot's response
         """
         try:
-            return handle_query(user_query)
+            return handle_query(user_query, session_id)
+        except Exception as e:
+            return f"I apologize, but I encountered an error processing your request: {str(e)}"
+    
+    async def ahandle_query(self, user_query: str, session_id: Optional[str] = None) -> str:
+        """Async variant of handle_query for the ASGI app"""
+        try:
+            return await ahandle_query(user_query, session_id)
         except Exception as e:
             return f"I apologize, but I encountered an error processing your request: {str(e)}"
 
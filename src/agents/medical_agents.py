@@ -2,91 +2,197 @@
 Simple Medical Center Chatbot
 Direct LLM calls with conversation memory
 """
+import asyncio
+import contextvars
 import requests
 import json
-from typing import List, Dict, Any, Optional
-from src.utils import config, ExcelDBManager, VectorDBManager
-
-
-# Initialize managers
-excel_manager = ExcelDBManager(config.EXCEL_DB_PATH)
-vector_manager = VectorDBManager(
-    qdrant_url=config.QDRANT_URL,
-    qdrant_api_key=config.QDRANT_API_KEY,
-    collection_name=config.COLLECTION_NAME,
-    ollama_base_url=config.OLLAMA_BASE_URL,
-    embedding_model=config.EMBEDDING_MODEL
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from src.utils import (
+    config,
+    services,
+    ResilientLLMClient,
+    AsyncResilientLLMClient,
+    LLMUnavailableError,
+    LLMHTTPError
 )
+from src.utils.metrics import STAGE_SECONDS, TOOL_SECONDS, FUNCTION_CALLS, CallbackMetric, record_error
+from src.utils.tracing import span, set_attribute, bind
+from src.providers import create_provider
+from src.agents.memory import ConversationMemory, estimate_tokens
+from src.agents.stream_parser import StreamingFunctionCallParser
+from src.agents.session_store import create_session_store
 
 
-class ConversationMemory:
-    """Simple conversation memory with window=10"""
-    
-    def __init__(self, max_messages: int = 10):
-        self.max_messages = max_messages
-        self.messages = []
-    
-    def add_user_message(self, message: str):
-        """Add user message to memory"""
-        self.messages.append({"role": "user", "content": message})
-        if len(self.messages) > self.max_messages:
-            self.messages.pop(0)
-    
-    def add_ai_message(self, message: str):
-        """Add AI message to memory"""
-        self.messages.append({"role": "assistant", "content": message})
-        if len(self.messages) > self.max_messages:
-            self.messages.pop(0)
-    
-    def get_context(self) -> List[Dict[str, str]]:
-        """Get conversation context"""
-        return self.messages[-self.max_messages:]
-    
-    def clear(self):
-        """Clear memory"""
-        self.messages = []
+# Shared managers (built on first use by the service registry)
+excel_manager = services.lazy("excel")
+vector_manager = services.lazy("vector")
+
+
+def _create_llm_client() -> ResilientLLMClient:
+    return ResilientLLMClient(
+        timeout=config.LLM_TIMEOUT,
+        deadline=config.LLM_DEADLINE,
+        max_retries=config.LLM_MAX_RETRIES,
+        backoff_base=config.LLM_BACKOFF_BASE,
+        backoff_max=config.LLM_BACKOFF_MAX,
+        hedge_enabled=config.LLM_HEDGE_ENABLED,
+        hedge_percentile=config.LLM_HEDGE_PERCENTILE,
+        max_concurrency=config.LLM_MAX_CONCURRENCY,
+        queue_timeout=config.LLM_QUEUE_TIMEOUT,
+        breaker_failures=config.LLM_BREAKER_FAILURES,
+        breaker_reset=config.LLM_BREAKER_RESET
+    )
+
+
+def _create_llm_async_client() -> AsyncResilientLLMClient:
+    # Used by the ASGI app; same policy, but calls are coroutines instead of threads
+    return AsyncResilientLLMClient(
+        timeout=config.LLM_TIMEOUT,
+        deadline=config.LLM_DEADLINE,
+        max_retries=config.LLM_MAX_RETRIES,
+        backoff_base=config.LLM_BACKOFF_BASE,
+        backoff_max=config.LLM_BACKOFF_MAX,
+        hedge_enabled=config.LLM_HEDGE_ENABLED,
+        hedge_percentile=config.LLM_HEDGE_PERCENTILE,
+        max_concurrency=config.LLM_ASYNC_MAX_CONCURRENCY,
+        queue_timeout=config.LLM_QUEUE_TIMEOUT,
+        breaker_failures=config.LLM_BREAKER_FAILURES,
+        breaker_reset=config.LLM_BREAKER_RESET
+    )
+
+
+services.register("llm_client", _create_llm_client)
+services.register("llm_async_client", _create_llm_async_client)
+services.register(
+    "llm_provider",
+    lambda: create_provider(config, services.get("llm_client"), services.get("llm_async_client"))
+)
+llm_client = services.lazy("llm_client")
+llm_async_client = services.lazy("llm_async_client")
+llm_provider = services.lazy("llm_provider")
+
+
+def llm_fallback_message() -> str:
+    """Canned reply used when the LLM provider is degraded"""
+    return (
+        "I'm sorry, I'm having trouble reaching our assistant service right now. "
+        f"Please try again in a moment, or call us at {config.CENTER_PHONE}."
+    )
+
+
+# Functions that modify the schedule; these act as ordering barriers
+# and are never run concurrently with other calls
+WRITE_FUNCTIONS = {
+    "book_appointment",
+    "cancel_appointment",
+    "book_series",
+    "join_waitlist",
+    "accept_offer",
+    "leave_waitlist"
+}
+
+# Session used by callers that do not track sessions (CLI, legacy callers)
+DEFAULT_SESSION_ID = "default"
+
+# Conversation whose turn is running, and its memory; bind() carries them into tool threads
+_current_session = contextvars.ContextVar("chat_session", default=None)
+_current_memory = contextvars.ContextVar("chat_memory", default=None)
 
 
 class MedicalCenterChatbot:
     """Simple medical center chatbot with direct function calls"""
     
     def __init__(self):
-        self.memory = ConversationMemory(max_messages=10)
+        # Built on first use, so creating the chatbot reads no configuration
+        self._sessions = None
+        self._tool_executor = None
+        self._session_executor = None
+        self._turn_locks = weakref.WeakValueDictionary()  # session_id -> asyncio.Lock (async turns)
+        self._init_lock = threading.Lock()
+    
+    @property
+    def sessions(self):
+        """Session store selected by SESSION_BACKEND"""
+        if self._sessions is None:
+            with self._init_lock:
+                if self._sessions is None:
+                    self._sessions = create_session_store(
+                        config,
+                        memory_factory=lambda: ConversationMemory(
+                            max_tokens=config.MEMORY_MAX_TOKENS,
+                            max_message_tokens=config.MEMORY_MAX_MESSAGE_TOKENS,
+                            summary_tokens=config.MEMORY_SUMMARY_TOKENS
+                        ),
+                        on_remove=self._release_hold
+                    )
+        return self._sessions
+    
+    @staticmethod
+    def _release_hold(session_id: str):
+        """Free the slot a cleared or evicted conversation was holding"""
+        if services.is_created("excel"):
+            excel_manager.release_hold(session_id)
+    
+    @property
+    def tool_executor(self) -> ThreadPoolExecutor:
+        """Thread pool running function calls"""
+        if self._tool_executor is None:
+            with self._init_lock:
+                if self._tool_executor is None:
+                    self._tool_executor = ThreadPoolExecutor(
+                        max_workers=config.TOOL_MAX_WORKERS,
+                        thread_name_prefix="chatbot-tool"
+                    )
+        return self._tool_executor
+    
+    @property
+    def session_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for the blocking session store calls of async turns (Redis I/O, lock waits)"""
+        if self._session_executor is None:
+            with self._init_lock:
+                if self._session_executor is None:
+                    self._session_executor = ThreadPoolExecutor(
+                        max_workers=config.SESSION_IO_WORKERS,
+                        thread_name_prefix="chatbot-session"
+                    )
+        return self._session_executor
+    
+    def _turn_lock(self, session_id: str) -> asyncio.Lock:
+        """Event-loop lock serializing the async turns of one conversation in this process"""
+        lock = self._turn_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._turn_locks[session_id] = lock
+        return lock
     
     def _match_doctor_name(self, partial_name: str) -> Optional[str]:
         """
         Match a partial doctor name to a full doctor name
         
         Args:
-            partial_name: Partial name like "sarah", "dr sarah", "martinez"
-            
+            partial_name: Partial, misspelled or transliterated name like "sarah", "dr sarah", "ahmad hasan"
+        
         Returns:
-            Full doctor name or None if no match found
+            Full doctor name, or None if no doctor or several doctors match (see _doctor_not_found)
         """
-        if not partial_name:
+        if not partial_name or not partial_name.strip():
             return None
-        
-        # Get all doctors
-        all_doctors = excel_manager.get_all_doctors()
-        
-        # Clean up the partial name
-        search_name = partial_name.lower().strip()
-        search_name = search_name.replace("dr.", "").replace("dr", "").strip()
-        
-        # Try exact match first
-        for doctor in all_doctors:
-            if doctor.lower() == search_name or doctor.lower() == f"dr. {search_name}":
-                return doctor
-        
-        # Try partial match (any word in the search matches any word in doctor name)
-        search_words = search_name.split()
-        for doctor in all_doctors:
-            doctor_lower = doctor.lower()
-            # Check if any search word is in the doctor name
-            if any(word in doctor_lower for word in search_words):
-                return doctor
-        
-        return None
+        return excel_manager.find_doctor(partial_name)["doctor"]
+    
+    def _doctor_not_found(self, partial_name: str) -> str:
+        """Explain why a name matched no single doctor: list the close candidates or suggestions"""
+        partial_name = (partial_name or "").strip()
+        lookup = excel_manager.doctor_index.resolve(partial_name)
+        names = [doctor for doctor, _ in lookup["candidates"][:3]]
+        if lookup["status"] == "ambiguous":
+            return f"'{partial_name}' matches several doctors: {', '.join(names)}. Which one do you mean?"
+        if names:
+            return f"I couldn't find a doctor matching '{partial_name}'. Did you mean {' or '.join(names)}?"
+        return f"I couldn't find a doctor matching '{partial_name}'. Please check the name and try again."
     
     def _normalize_time_for_comparison(self, time_str: str) -> Optional[str]:
         """
@@ -95,7 +201,7 @@ class MedicalCenterChatbot:
         
         Args:
             time_str: Time in various formats like "10", "10:00", "10 AM", "10:00 AM"
-            
+        
         Returns:
             Normalized time in 24-hour format like "10:00" or "14:30"
         """
@@ -151,7 +257,7 @@ class MedicalCenterChatbot:
         
         Args:
             time_str: Time in various formats like "10", "10:00", "10 AM", "10:00 AM"
-            
+        
         Returns:
             Normalized time like "10:00" or "14:30" in 24-hour format
         """
@@ -211,7 +317,7 @@ class MedicalCenterChatbot:
         
         Args:
             date_str: Date in various formats like "November 12, 2025", "12 November 2025", "2025-11-12"
-            
+        
         Returns:
             Normalized date like "2025-11-12" or None if invalid
         """
@@ -262,82 +368,98 @@ class MedicalCenterChatbot:
         
         return None
     
-    def _call_gemini_llm(self, messages: List[Dict[str, str]]) -> str:
-        """Call Google Gemini LLM directly"""
+    def _call_llm(self, messages: List[Dict[str, str]], stage: str = "llm_first") -> str:
+        """Call the configured LLM provider (stage: llm_first or llm_followup, for metrics)"""
         try:
-            # Convert messages to Gemini format
-            # Gemini uses 'contents' with 'role' (user/model) and 'parts' structure
-            gemini_contents = []
-            system_instruction = None
-            
-            for msg in messages:
-                role = msg['role']
-                content = msg['content']
-                
-                # Extract system message separately
-                if role == 'system':
-                    system_instruction = content
-                    continue
-                
-                # Convert role names (assistant -> model for Gemini)
-                gemini_role = 'model' if role == 'assistant' else 'user'
-                
-                gemini_contents.append({
-                    'role': gemini_role,
-                    'parts': [{'text': content}]
+            with STAGE_SECONDS.time(stage), span("MedicalCenterChatbot._call_llm", self._llm_span_attributes(messages, stage)) as llm_span:
+                response = llm_provider.chat(messages)
+                llm_span.set_attributes({
+                    "llm.completion_tokens_estimate": estimate_tokens(response['text']),
+                    "llm.native_function_calls": len(response['function_calls'])
                 })
-            
-            # Build the API payload
-            payload = {
-                'contents': gemini_contents,
-                'generationConfig': {
-                    'temperature': config.LLM_TEMPERATURE,
-                    'maxOutputTokens': 4096,
-                }
-            }
-            
-            # Add system instruction if present
-            if system_instruction:
-                payload['systemInstruction'] = {
-                    'parts': [{'text': system_instruction}]
-                }
-            
-            # Make API call
-            url = f"{config.GEMINI_BASE_URL}/models/{config.GEMINI_MODEL}:generateContent"
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(
-                f"{url}?key={config.GEMINI_API_KEY}",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Extract text from Gemini response
-                if 'candidates' in data and len(data['candidates']) > 0:
-                    candidate = data['candidates'][0]
-                    if 'content' in candidate and 'parts' in candidate['content']:
-                        text_parts = [part.get('text', '') for part in candidate['content']['parts']]
-                        return ''.join(text_parts)
-                return "Sorry, I couldn't generate a response."
-            else:
-                error_msg = response.text
-                try:
-                    error_data = response.json()
-                    if 'error' in error_data:
-                        error_msg = error_data['error'].get('message', error_msg)
-                except:
-                    pass
-                return f"Error: {response.status_code} - {error_msg}"
+            return self._render_llm_response(response)
+        except LLMUnavailableError as e:
+            # Provider degraded: never surface raw provider errors as an answer
+            print(f"LLM unavailable: {e}")
+            record_error(stage, e)
+            return llm_fallback_message()
+        except LLMHTTPError as e:
+            print(f"LLM request rejected: {e}")
+            record_error(stage, e)
+            return llm_fallback_message()
         except Exception as e:
+            record_error(stage, e)
             return f"Sorry, I encountered an error: {str(e)}"
     
+    async def _acall_llm(self, messages: List[Dict[str, str]], stage: str = "llm_first") -> str:
+        """Call the configured LLM provider without blocking the event loop"""
+        try:
+            with STAGE_SECONDS.time(stage), span("MedicalCenterChatbot._call_llm", self._llm_span_attributes(messages, stage)) as llm_span:
+                response = await llm_provider.achat(messages)
+                llm_span.set_attributes({
+                    "llm.completion_tokens_estimate": estimate_tokens(response['text']),
+                    "llm.native_function_calls": len(response['function_calls'])
+                })
+            return self._render_llm_response(response)
+        except LLMUnavailableError as e:
+            print(f"LLM unavailable: {e}")
+            record_error(stage, e)
+            return llm_fallback_message()
+        except LLMHTTPError as e:
+            print(f"LLM request rejected: {e}")
+            record_error(stage, e)
+            return llm_fallback_message()
+        except Exception as e:
+            record_error(stage, e)
+            return f"Sorry, I encountered an error: {str(e)}"
+    
+    @staticmethod
+    def _llm_span_attributes(messages: List[Dict[str, str]], stage: str) -> Dict[str, Any]:
+        """Trace attributes of an LLM call (token counts are estimates)"""
+        return {
+            "llm.stage": stage,
+            "llm.provider": llm_provider.name,
+            "llm.messages": len(messages),
+            "llm.prompt_tokens_estimate": sum(estimate_tokens(message['content']) for message in messages)
+        }
+    
+    @staticmethod
+    def _render_llm_response(response: Dict[str, Any]) -> str:
+        """Render a provider response as text, including any native function calls"""
+        text = response['text']
+        
+        # Native function calls are rendered in the text protocol
+        # so the regular parser handles them
+        for call in response['function_calls']:
+            args = " ".join(str(value) for value in call['args'].values())
+            text += f"\n{call['name']}: {args}".rstrip()
+        
+        if not text.strip():
+            return "Sorry, I couldn't generate a response."
+        return text
+    
+    def _call_gemini_llm(self, messages: List[Dict[str, str]]) -> str:
+        """Backwards-compatible alias for _call_llm"""
+        return self._call_llm(messages)
+    
     def _extract_function_call(self, message: str) -> Dict[str, Any]:
-        """Extract function call from LLM response"""
+        """Extract the first function call from LLM response"""
+        function_calls = self._extract_function_calls(message)
+        return function_calls[0] if function_calls else None
+    
+    def _extract_function_calls(self, message: str) -> List[Dict[str, Any]]:
+        """
+        Extract every function call from LLM response
+        
+        The model may request several independent calls at once, one per line
+        (or one XML block each). Calls are returned in the order they appear.
+        
+        Args:
+            message: Raw LLM response text
+        
+        Returns:
+            List of {"function": name, "args": args} dicts (empty if none)
+        """
         import re
         
         # First, try to extract XML-like tags with various formats
@@ -365,34 +487,42 @@ class MedicalCenterChatbot:
             "search_appointments": [
                 r"<search_appointments>.*?<patient_name>(.*?)</patient_name>.*?</search_appointments>",
                 r"<search_appointments>(.*?)</search_appointments>"
+            ],
+            "recommend_slots": [
+                r"<recommend_slots>(.*?)</recommend_slots>"
+            ],
+            "plan_series": [
+                r"<plan_series>(.*?)</plan_series>"
+            ],
+            "book_series": [
+                r"<book_series>(.*?)</book_series>"
+            ],
+            "hold_slot": [
+                r"<hold_slot>(.*?)</hold_slot>"
+            ],
+            "join_waitlist": [
+                r"<join_waitlist>(.*?)</join_waitlist>"
+            ],
+            "accept_offer": [
+                r"<accept_offer>(.*?)</accept_offer>"
+            ],
+            "leave_waitlist": [
+                r"<leave_waitlist>(.*?)</leave_waitlist>"
             ]
         }
         
+        found = []  # (start, end, call)
+        
+        def overlaps(start: int, end: int) -> bool:
+            return any(start < f_end and f_start < end for f_start, f_end, _ in found)
+        
         for function_name, patterns in xml_patterns.items():
             for pattern in patterns:
-                match = re.search(pattern, message, re.IGNORECASE | re.DOTALL)
-                if match:
-                    if function_name == "search_knowledge":
-                        args = match.group(1).strip()
-                    elif function_name == "get_doctors":
-                        args = ""
-                    elif function_name == "check_availability":
-                        if "doctor_name:" in pattern:
-                            # Format: doctor_name: sarah
-                            args = match.group(1).strip()
-                        elif len(match.groups()) >= 2:
-                            # Format with doctor and date tags
-                            doctor = match.group(1).strip() if match.group(1) else ""
-                            date = match.group(2).strip() if match.group(2) else ""
-                            args = f"{doctor} {date}".strip()
-                        else:
-                            # Simple format
-                            args = match.group(1).strip() if match.group(1) else ""
-                    elif function_name == "search_appointments":
-                        args = match.group(1).strip()
-                    else:
-                        args = match.group(1).strip() if match.group(1) else ""
-                    return {"function": function_name, "args": args}
+                for match in re.finditer(pattern, message, re.IGNORECASE | re.DOTALL):
+                    if overlaps(match.start(), match.end()):
+                        continue
+                    args = self._xml_match_args(function_name, pattern, match)
+                    found.append((match.start(), match.end(), {"function": function_name, "args": args}))
         
         # Fallback: Look for simple patterns like "search_knowledge: doctor information"
         # These patterns will match even if there's text before/after
@@ -402,19 +532,69 @@ class MedicalCenterChatbot:
             "check_availability": r"check_availability:\s*(.+?)(?:\n|$)",
             "book_appointment": r"book_appointment:\s*(.+?)(?:\n|$)",
             "cancel_appointment": r"cancel_appointment:\s*(.+?)(?:\n|$)",
-            "search_appointments": r"search_appointments:\s*(.+?)(?:\n|$)"
+            "search_appointments": r"search_appointments:\s*(.+?)(?:\n|$)",
+            "recommend_slots": r"recommend_slots:\s*(.+?)(?:\n|$)",
+            "plan_series": r"plan_series:\s*(.+?)(?:\n|$)",
+            "book_series": r"book_series:\s*(.+?)(?:\n|$)",
+            "hold_slot": r"hold_slot:\s*(.+?)(?:\n|$)",
+            "join_waitlist": r"join_waitlist:\s*(.+?)(?:\n|$)",
+            "accept_offer": r"accept_offer:\s*(.+?)(?:\n|$)",
+            "leave_waitlist": r"leave_waitlist:\s*(.+?)(?:\n|$)"
         }
         
         for function_name, pattern in simple_patterns.items():
-            match = re.search(pattern, message, re.IGNORECASE | re.MULTILINE)
-            if match:
+            for match in re.finditer(pattern, message, re.IGNORECASE | re.MULTILINE):
+                if overlaps(match.start(), match.end()):
+                    continue
                 args = match.group(1).strip() if len(match.groups()) > 0 and match.group(1) else ""
-                return {"function": function_name, "args": args}
+                found.append((match.start(), match.end(), {"function": function_name, "args": args}))
         
-        return None
+        # Keep model order and drop exact duplicates
+        function_calls = []
+        for _, _, call in sorted(found, key=lambda item: item[0]):
+            if call not in function_calls:
+                function_calls.append(call)
+        
+        return function_calls
+    
+    def _xml_match_args(self, function_name: str, pattern: str, match) -> str:
+        """Turn an XML-style function call match into a plain argument string"""
+        if function_name == "search_knowledge":
+            return match.group(1).strip()
+        elif function_name == "get_doctors":
+            return ""
+        elif function_name == "check_availability":
+            if "doctor_name:" in pattern:
+                # Format: doctor_name: sarah
+                return match.group(1).strip()
+            elif len(match.groups()) >= 2:
+                # Format with doctor and date tags
+                doctor = match.group(1).strip() if match.group(1) else ""
+                date = match.group(2).strip() if match.group(2) else ""
+                return f"{doctor} {date}".strip()
+            else:
+                # Simple format
+                return match.group(1).strip() if match.group(1) else ""
+        elif function_name == "search_appointments":
+            return match.group(1).strip()
+        else:
+            return match.group(1).strip() if match.group(1) else ""
     
     def _execute_function(self, function_name: str, args: str) -> str:
-        """Execute function based on extracted call"""
+        """Execute function based on extracted call (counted and timed per function)"""
+        FUNCTION_CALLS.inc(function_name)
+        with TOOL_SECONDS.time(function_name), span("MedicalCenterChatbot._execute_function", self._tool_span_attributes(function_name, args)) as tool_span:
+            result = self._run_function(function_name, args)
+            tool_span.set_attribute("function.result_chars", len(result))
+            return result
+    
+    @staticmethod
+    def _tool_span_attributes(function_name: str, args: str) -> Dict[str, Any]:
+        """Trace attributes of a function call (arguments may hold patient details, so only their size)"""
+        return {"function.name": function_name, "function.args_chars": len(args)}
+    
+    def _run_function(self, function_name: str, args: str) -> str:
+        """Run one function call and return its result text"""
         try:
             if function_name == "search_knowledge":
                 query = args.strip()
@@ -426,15 +606,7 @@ class MedicalCenterChatbot:
                     limit=config.RAG_RETRIEVAL_K,
                     score_threshold=config.RAG_SCORE_THRESHOLD
                 )
-                
-                if not results:
-                    return f"I couldn't find information about '{query}'. Please try asking about our doctors, services, or policies."
-                
-                formatted_info = []
-                for i, result in enumerate(results, 1):
-                    formatted_info.append(f"📋 Information {i}: {result['text']}")
-                
-                return "\n".join(formatted_info)
+                return self._format_knowledge_results(query, results)
             
             elif function_name == "get_doctors":
                 doctors = excel_manager.get_all_doctors()
@@ -455,7 +627,7 @@ class MedicalCenterChatbot:
                 doctor_name = self._match_doctor_name(partial_name)
                 
                 if not doctor_name:
-                    return f"I couldn't find a doctor matching '{partial_name}'. Please check the name and try again."
+                    return self._doctor_not_found(partial_name)
                 
                 # Check if last part is a date
                 date = None
@@ -463,12 +635,12 @@ class MedicalCenterChatbot:
                     date = parts[-1]
                 
                 # Get ALL available slots (increased limit to 50)
-                slots = excel_manager.get_available_slots(doctor_name, date, limit=50)
+                slots = excel_manager.get_available_slots(doctor_name, date, limit=50, session_id=_current_session.get())
                 if not slots:
                     if date:
-                        return f"No available appointments for {doctor_name} on {date}."
+                        return f"No available appointments for {doctor_name} on {date}. The patient can join the waitlist."
                     else:
-                        return f"No available appointments for {doctor_name}."
+                        return f"No available appointments for {doctor_name}. The patient can join the waitlist."
                 
                 # Group slots by date for better presentation
                 from collections import defaultdict
@@ -509,7 +681,7 @@ class MedicalCenterChatbot:
                 doctor_name = self._match_doctor_name(partial_doctor_name)
                 
                 if not doctor_name:
-                    return f"I couldn't find a doctor matching '{partial_doctor_name}'."
+                    return self._doctor_not_found(partial_doctor_name)
                 
                 # Extract date
                 date = parts[date_idx]
@@ -546,7 +718,7 @@ class MedicalCenterChatbot:
                 
                 # CRITICAL FIX: Verify slot is actually available BEFORE attempting to book
                 # This prevents booking errors when conversation context is lost
-                available_slots = excel_manager.get_available_slots(doctor_name, date, limit=100)
+                available_slots = excel_manager.get_available_slots(doctor_name, date, limit=100, session_id=_current_session.get())
                 
                 # Normalize the time format for comparison
                 time_normalized = self._normalize_time_for_comparison(time_raw)
@@ -586,27 +758,66 @@ class MedicalCenterChatbot:
                     date=date,
                     time=matching_time_in_excel,  # Use exact format from Excel
                     patient_name=patient_name,
-                    phone=phone
+                    phone=phone,
+                    session_id=_current_session.get()
                 )
                 return message
             
+            elif function_name == "hold_slot":
+                return self._hold_slot(args)
+            
             elif function_name == "search_appointments":
-                # Simple extraction - look for patient name
-                patient_name = args.strip()
+                # Simple extraction - patient name, optionally followed by "; history=yes"
+                patient_name, _, options = args.partition(';')
+                patient_name = patient_name.strip()
                 if not patient_name:
                     return "Please provide a patient name to search."
+                include_history = options.replace(' ', '').lower() in ("history=yes", "history=true", "history")
                 
-                appointments = excel_manager.search_appointments(patient_name=patient_name)
-                if not appointments:
+                appointments = excel_manager.search_appointments(patient_name=patient_name, include_history=include_history)
+                waiting = [
+                    entry for entry in excel_manager.waitlist_entries(statuses=("waiting", "offered"))
+                    if entry['patient_name'].lower() == patient_name.lower()
+                ]
+                if not appointments and not waiting:
                     return f"I didn't find any appointments for {patient_name}."
                 
-                result = f"Found {len(appointments)} appointment(s) for {patient_name}:\n\n"
+                result = f"Found {len(appointments)} appointment(s) for {patient_name}:\n\n" if appointments else ""
                 for appt in appointments:
                     result += f"👨‍⚕️ Doctor: {appt['doctor']}\n"
-                    result += f"📅 Date: {appt['date']} at {appt['time']}\n"
+                    result += f"📅 Date: {appt['date']} at {appt['time']}{' (past visit)' if appt.get('archived') else ''}\n"
                     result += f"📞 Phone: {appt['phone']}\n\n"
                 
-                return result
+                for entry in waiting:
+                    result += f"📝 Waitlist: {entry['doctor']} ({entry['start_date']} to {entry['end_date']})\n"
+                    if entry['status'] == "offered":
+                        result += (f"   🎉 Offered slot: {entry['offer']['date']} at {entry['offer']['time']}, "
+                                   f"held until {entry['offer']['expires'].replace('T', ' ')} - accept with accept_offer\n")
+                
+                return result.strip()
+            
+            elif function_name == "join_waitlist":
+                return self._join_waitlist(args)
+            
+            elif function_name == "accept_offer":
+                phone, refusal = self._waitlist_phone(args)
+                if not phone:
+                    return refusal
+                success, message = excel_manager.accept_waitlist_offer(phone)
+                return message
+            
+            elif function_name == "leave_waitlist":
+                phone, refusal = self._waitlist_phone(args)
+                if not phone:
+                    return refusal
+                success, message = excel_manager.leave_waitlist(phone)
+                return message
+            
+            elif function_name == "recommend_slots":
+                return self._recommend_slots(args)
+            
+            elif function_name in ("plan_series", "book_series"):
+                return self._book_series(args, dry_run=function_name == "plan_series")
             
             elif function_name == "cancel_appointment":
                 # Parse arguments: doctor_name patient_name optional_date optional_time
@@ -729,7 +940,7 @@ class MedicalCenterChatbot:
                 # Match doctor name to full name
                 doctor_name = self._match_doctor_name(partial_doctor_name)
                 if not doctor_name:
-                    return f"I couldn't find a doctor matching '{partial_doctor_name}'."
+                    return self._doctor_not_found(partial_doctor_name)
                 
                 # Normalize date if provided
                 date = None
@@ -757,12 +968,687 @@ class MedicalCenterChatbot:
                 return f"I don't know how to execute: {function_name}"
         
         except Exception as e:
+            record_error("tool", e)
             return f"Error executing {function_name}: {str(e)}"
     
-    def chat(self, user_message: str) -> str:
+    @staticmethod
+    def _parse_key_values(args: str) -> Dict[str, str]:
+        """Parse "key=value; key=value" function arguments (keys lowercased)"""
+        values = {}
+        for part in args.split(';'):
+            key, _, value = part.partition('=')
+            if value.strip():
+                values[key.strip().lower()] = value.strip()
+        return values
+    
+    def _book_series(self, args: str, dry_run: bool) -> str:
+        """
+        Plan (dry_run) or book a recurring course of sessions with one doctor
+        
+        Args:
+            args: "key=value" pairs separated by ';', e.g.
+                "doctor=sarah; patient=Shady Abdelaziz; phone=01067110557; days=mon,thu; time=17:00; sessions=12"
+                Optional keys: from (first day), fallback (comma-separated rules)
+            dry_run: Only propose the sessions
+        
+        Returns:
+            The planned or booked sessions, one per line
+        """
+        from src.utils.slot_index import parse_weekdays
+        
+        values = self._parse_key_values(args)
+        doctor_name = self._match_doctor_name(values.get("doctor", ""))
+        if not doctor_name:
+            return self._doctor_not_found(values.get("doctor", ""))
+        
+        weekdays = parse_weekdays(values.get("days"))
+        sessions = int(values["sessions"]) if values.get("sessions", "").isdigit() else 0
+        if not weekdays or not sessions:
+            return "To plan a series, I need: doctor, days of the week (e.g. mon,thu) and number of sessions."
+        
+        patient_name = values.get("patient", "")
+        phone = values.get("phone", "")
+        if not dry_run and not (patient_name and phone):
+            return "To book a series, I need the patient's full name and phone number."
+        
+        time = None
+        if values.get("time"):
+            time = self._normalize_time(values["time"])
+            if not time:
+                return f"Invalid time format: '{values['time']}'. Please use format like '17:00' or '05:00 PM'."
+        start_date = self._normalize_date(values["from"]) if values.get("from") else None
+        fallbacks = [rule.strip() for rule in values["fallback"].split(',')] if values.get("fallback") else config.SERIES_FALLBACK
+        
+        success, message, _ = excel_manager.book_series(
+            doctor_name=doctor_name,
+            patient_name=patient_name or "the patient",
+            phone=phone,
+            weekdays=sorted(weekdays),
+            sessions=sessions,
+            time=time,
+            start_date=start_date,
+            fallbacks=fallbacks,
+            max_time_shift=config.SERIES_MAX_TIME_SHIFT,
+            max_weeks=config.SERIES_MAX_WEEKS,
+            dry_run=dry_run,
+            session_id=_current_session.get()
+        )
+        return message
+    
+    def _join_waitlist(self, args: str) -> str:
+        """
+        Put a patient on a doctor's waitlist for a date and time window
+        
+        Args:
+            args: "key=value" pairs separated by ';', e.g.
+                "doctor=sarah; patient=Shady Abdelaziz; phone=01067110557; within=14; after=17:00"
+                Optional keys: from, to, within (days), days, after, before
+        
+        Returns:
+            Confirmation of the waitlist entry
+        """
+        from datetime import date, timedelta
+        from src.utils.slot_index import parse_weekdays
+        
+        values = self._parse_key_values(args)
+        doctor_name = self._match_doctor_name(values.get("doctor", ""))
+        if not doctor_name:
+            return self._doctor_not_found(values.get("doctor", ""))
+        patient_name = values.get("patient", "")
+        phone = values.get("phone", "")
+        if not (patient_name and phone):
+            return "To join the waitlist, I need the patient's full name and phone number."
+        
+        start_date = self._normalize_date(values["from"]) if values.get("from") else None
+        end_date = self._normalize_date(values["to"]) if values.get("to") else None
+        if not end_date and values.get("within", "").isdigit():
+            start_day = date.fromisoformat(start_date) if start_date else date.today()
+            end_date = (start_day + timedelta(days=int(values["within"]))).isoformat()
+        weekdays = parse_weekdays(values.get("days"))
+        
+        success, message = excel_manager.join_waitlist(
+            doctor_name=doctor_name,
+            patient_name=patient_name,
+            phone=phone,
+            start_date=start_date,
+            end_date=end_date,
+            earliest=self._normalize_time(values["after"]) if values.get("after") else None,
+            latest=self._normalize_time(values["before"]) if values.get("before") else None,
+            weekdays=sorted(weekdays) if weekdays else None
+        )
+        return message
+    
+    @staticmethod
+    def _same_phone(a: str, b: str) -> bool:
+        return a.replace(' ', '').replace('-', '') == b.replace(' ', '').replace('-', '')
+    
+    def _waitlist_phone(self, args: str) -> Tuple[Optional[str], str]:
+        """
+        Phone whose waitlist entries this conversation may act on
+        
+        A phone is verified once a booking or waitlist join in this conversation
+        confirmed it. Otherwise the patient must give the full name and phone of
+        an open waitlist entry, which then verifies that phone for the rest of
+        the conversation. Any other phone is refused.
+        
+        Args:
+            args: "phone" or "phone; patient=Full Name"
+        
+        Returns:
+            Tuple of (verified phone or None, message explaining the refusal)
+        """
+        values = self._parse_key_values(args)
+        head = args.partition(';')[0]
+        phone = values.get("phone") or (head.strip() if '=' not in head else "")
+        patient_name = values.get("patient", "")
+        
+        memory = _current_memory.get()
+        verified = memory.facts.get("verified_phone") if memory is not None else None
+        if verified:
+            if phone and not self._same_phone(phone, verified):
+                return None, f"For the patient's privacy, I can only manage the waitlist entry of the phone number confirmed in this conversation ({verified})."
+            return verified, ""
+        
+        if not (phone and patient_name):
+            return None, "Please provide the full name and phone number the patient joined the waitlist with."
+        entry = next((
+            entry for entry in excel_manager.waitlist_entries(statuses=("waiting", "offered"))
+            if self._same_phone(entry['phone'], phone) and entry['patient_name'].lower() == patient_name.lower()
+        ), None)
+        if entry is None:
+            return None, f"I couldn't find a waitlist entry for {patient_name} with that phone number."
+        if memory is not None:
+            memory.facts["verified_phone"] = entry['phone']
+        return entry['phone'], ""
+    
+    def _hold_slot(self, args: str) -> str:
+        """
+        Hold the slot the patient picked while their name and phone are collected
+        
+        Args:
+            args: "doctor_name YYYY-MM-DD time", e.g. "sarah 2025-11-13 10:00 AM"
+        
+        Returns:
+            Confirmation with the hold's expiry, or why the slot cannot be held
+        """
+        parts = args.split()
+        date_idx = next((i for i, part in enumerate(parts) if part.count('-') == 2), None)
+        if date_idx is None or date_idx == 0 or date_idx + 1 >= len(parts):
+            return "To hold a slot, I need: doctor name, date (YYYY-MM-DD) and time."
+        
+        partial_doctor_name = " ".join(parts[:date_idx])
+        doctor_name = self._match_doctor_name(partial_doctor_name)
+        if not doctor_name:
+            return self._doctor_not_found(partial_doctor_name)
+        
+        time_raw = " ".join(parts[date_idx + 1:])
+        time_normalized = self._normalize_time(time_raw)
+        if not time_normalized:
+            return f"Invalid time format: '{time_raw}'. Please use format like '10:00 AM' or '02:30 PM'."
+        
+        _, message = excel_manager.hold_slot(
+            doctor_name,
+            parts[date_idx],
+            time_normalized,
+            _current_session.get() or DEFAULT_SESSION_ID
+        )
+        return message
+    
+    def _recommend_slots(self, args: str) -> str:
+        """
+        Best slots across doctors for a set of constraints
+        
+        Args:
+            args: "key=value" pairs separated by ';', e.g.
+                "specialty=physical therapy; days=mon-fri; after=17:00; within=14"
+                Keys: doctor (comma-separated), specialty, prefer, from, to,
+                within (days), days, after, before, limit
+        
+        Returns:
+            Ranked slots, one per line
+        """
+        from datetime import date, timedelta
+        from src.utils.slot_index import parse_weekdays
+        
+        constraints = self._parse_key_values(args)
+        
+        # Doctors: named ones, else the specialty's, else everyone
+        doctors = None
+        notes = []
+        if constraints.get("doctor"):
+            doctors = []
+            for partial_name in constraints["doctor"].split(','):
+                doctor_name = self._match_doctor_name(partial_name)
+                if not doctor_name:
+                    return self._doctor_not_found(partial_name)
+                doctors.append(doctor_name)
+        elif constraints.get("specialty"):
+            specialty = constraints["specialty"].lower()
+            if config.DOCTOR_SPECIALTIES:
+                doctors = [
+                    doctor for doctor, names in config.DOCTOR_SPECIALTIES.items()
+                    if any(specialty in name.lower() or name.lower() in specialty for name in names)
+                ]
+                if not doctors:
+                    known = sorted({name for names in config.DOCTOR_SPECIALTIES.values() for name in names})
+                    return f"No doctor is listed for '{constraints['specialty']}'. Our specialties: {', '.join(known)}."
+            else:
+                notes.append("all doctors considered (no specialty list configured)")
+        
+        preferred_doctor = self._match_doctor_name(constraints["prefer"]) if constraints.get("prefer") else None
+        
+        # Date range: from/to, or within N days; never past the booking horizon
+        start_date = self._normalize_date(constraints["from"]) if constraints.get("from") else None
+        start_day = date.fromisoformat(start_date) if start_date else date.today()
+        horizon = date.today() + timedelta(days=config.MAX_ADVANCE_BOOKING_DAYS)
+        end_date = self._normalize_date(constraints["to"]) if constraints.get("to") else None
+        if not end_date and constraints.get("within", "").isdigit():
+            end_date = (start_day + timedelta(days=int(constraints["within"]))).isoformat()
+        end_date = min(end_date, horizon.isoformat()) if end_date else horizon.isoformat()
+        
+        weekdays = parse_weekdays(constraints.get("days"))
+        earliest = self._normalize_time(constraints["after"]) if constraints.get("after") else None
+        latest = self._normalize_time(constraints["before"]) if constraints.get("before") else None
+        limit = int(constraints["limit"]) if constraints.get("limit", "").isdigit() else config.RECOMMEND_SLOTS_LIMIT
+        
+        slots = excel_manager.recommend_slots(
+            doctors=doctors,
+            start_date=start_date,
+            end_date=end_date,
+            weekdays=sorted(weekdays) if weekdays else None,
+            earliest=earliest,
+            latest=latest,
+            preferred_doctor=preferred_doctor,
+            limit=limit,
+            session_id=_current_session.get()
+        )
+        
+        # Echo the constraints as understood, so the reply can state them
+        applied = [f"{start_day.isoformat()} to {end_date}"]
+        if doctors is not None:
+            applied.append(", ".join(doctors))
+        if weekdays:
+            applied.append("/".join(date(2024, 1, 1 + day).strftime('%a') for day in sorted(weekdays)))
+        if earliest:
+            applied.append(f"from {earliest}")
+        if latest:
+            applied.append(f"until {latest}")
+        if preferred_doctor:
+            applied.append(f"preferring {preferred_doctor}")
+        applied.extend(notes)
+        
+        if not slots:
+            return f"No available slots match ({'; '.join(applied)}). Try a wider time window or date range."
+        
+        result = f"Best available slots ({'; '.join(applied)}):\n\n"
+        for i, slot in enumerate(slots, 1):
+            result += f"{i}. 👨‍⚕️ {slot['doctor']} - {slot['weekday']} {slot['date']} at {slot['time']}\n"
+        return result.strip()
+    
+    def _format_knowledge_results(self, query: str, results: List[Dict]) -> str:
+        """Format knowledge base search results for the LLM"""
+        if not results:
+            return f"I couldn't find information about '{query}'. Please try asking about our doctors, services, or policies."
+        
+        formatted_info = []
+        for i, result in enumerate(results, 1):
+            formatted_info.append(f"📋 Information {i}: {result['text']}")
+        
+        return "\n".join(formatted_info)
+    
+    async def _aexecute_function(self, function_name: str, args: str) -> str:
+        """
+        Async variant of _execute_function
+        
+        Knowledge search uses the async embedding and Qdrant clients; the Excel
+        functions are blocking and run on the bounded tool thread pool.
+        """
+        if function_name == "search_knowledge":
+            FUNCTION_CALLS.inc(function_name)
+            query = args.strip()
+            if not query:
+                return "Please provide a search query."
+            try:
+                with TOOL_SECONDS.time(function_name), span("MedicalCenterChatbot._execute_function", self._tool_span_attributes(function_name, args)) as tool_span:
+                    results = await vector_manager.asearch(
+                        query=query,
+                        limit=config.RAG_RETRIEVAL_K,
+                        score_threshold=config.RAG_SCORE_THRESHOLD
+                    )
+                    tool_span.set_attribute("vector.results", len(results))
+            except Exception as e:
+                record_error("tool", e)
+                return f"Error executing {function_name}: {str(e)}"
+            return self._format_knowledge_results(query, results)
+        
+        # bind() carries the current trace into the pool thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.tool_executor, bind(self._execute_function), function_name, args)
+    
+    async def _aexecute_function_calls(self, function_calls: List[Dict[str, Any]]) -> List[str]:
+        """Async variant of _execute_function_calls (reads overlap, writes are barriers)"""
+        results = [None] * len(function_calls)
+        pending = []  # (index, task) for the current batch of reads
+        
+        for index, call in enumerate(function_calls):
+            if call["function"] in WRITE_FUNCTIONS:
+                for read_index, task in pending:
+                    results[read_index] = await task
+                pending.clear()
+                results[index] = await self._aexecute_function(call["function"], call["args"])
+            else:
+                task = asyncio.ensure_future(self._aexecute_function(call["function"], call["args"]))
+                pending.append((index, task))
+        
+        for index, task in pending:
+            results[index] = await task
+        return results
+    
+    def _execute_function_calls(self, function_calls: List[Dict[str, Any]]) -> List[str]:
+        """
+        Execute several function calls, running independent reads concurrently
+        
+        Consecutive read-only calls are submitted to the tool thread pool together.
+        Booking and cancellation act as barriers: they run on their own, in the
+        order the model requested them, so a read after a write sees its effect.
+        
+        Args:
+            function_calls: List of {"function": name, "args": args} dicts
+        
+        Returns:
+            Function results, in the same order as the calls
+        """
+        results = [None] * len(function_calls)
+        pending = []  # (index, future) for the current batch of reads
+        
+        def drain():
+            for index, future in pending:
+                results[index] = future.result()
+            pending.clear()
+        
+        for index, call in enumerate(function_calls):
+            if call["function"] in WRITE_FUNCTIONS:
+                drain()
+                results[index] = self._execute_function(call["function"], call["args"])
+            elif len(function_calls) == 1:
+                # Nothing to overlap with, skip the thread hop
+                results[index] = self._execute_function(call["function"], call["args"])
+            else:
+                future = self.tool_executor.submit(bind(self._execute_function), call["function"], call["args"])
+                pending.append((index, future))
+        
+        drain()
+        return results
+    
+    def _llm_step(self, messages: List[Dict[str, str]], execute_tools: bool = True, stage: str = "llm_first"):
+        """
+        Run one LLM call and execute the functions it requests
+        
+        With streaming enabled, each read-only function call is started as soon
+        as its arguments are complete in the token stream, so tool latency
+        overlaps with the rest of the generation. Writes (and every call after
+        one) wait for the stream to end, so a generation that fails midway
+        never books or cancels anything.
+        
+        Args:
+            messages: Conversation sent to the LLM
+            execute_tools: Whether requested functions are run
+            stage: Metrics stage of the LLM call (llm_first or llm_followup)
+        
+        Returns:
+            Tuple of (response text, function calls, function results)
+        """
+        if config.LLM_STREAMING:
+            return self._stream_llm_step(messages, execute_tools, stage)
+        
+        llm_response = self._call_llm(messages, stage)
+        function_calls = self._parse_function_calls(llm_response) if execute_tools else []
+        function_results = self._execute_function_calls(function_calls) if function_calls else []
+        return llm_response, function_calls, function_results
+    
+    def _parse_function_calls(self, llm_response: str) -> List[Dict[str, Any]]:
+        """Extract function calls from a complete response (timed as function_parse)"""
+        with STAGE_SECONDS.time("function_parse"):
+            return self._extract_function_calls(llm_response)
+    
+    def _stream_llm_step(self, messages: List[Dict[str, str]], execute_tools: bool = True, stage: str = "llm_first"):
+        """Streaming variant of _llm_step that starts tools before generation ends"""
+        parser = StreamingFunctionCallParser(self._extract_function_calls)
+        function_calls = []
+        futures = []
+        barrier = []  # futures a newly started call must wait for
+        deferred = []  # writes, and every call after one, start once the stream has ended
+        parse_seconds = 0.0  # parser time spread over the stream
+        
+        def start(call):
+            if deferred or call["function"] in WRITE_FUNCTIONS:
+                deferred.append(call)
+            else:
+                submit(call)
+        
+        def submit(call):
+            # Reads may overlap each other; a write waits for everything before it,
+            # and everything after a write waits for the write
+            after = list(barrier)
+            is_write = call["function"] in WRITE_FUNCTIONS
+            if is_write:
+                after = list(futures)
+            
+            def run():
+                for future in after:
+                    future.result()
+                return self._execute_function(call["function"], call["args"])
+            
+            future = self.tool_executor.submit(bind(run))
+            function_calls.append(call)
+            futures.append(future)
+            if is_write:
+                barrier[:] = [future]
+        
+        started = time.perf_counter()
+        try:
+            with span("MedicalCenterChatbot._stream_llm_step", self._llm_span_attributes(messages, stage)) as llm_span:
+                for chunk in llm_provider.stream(messages):
+                    parse_started = time.perf_counter()
+                    calls = parser.feed(chunk)
+                    parse_seconds += time.perf_counter() - parse_started
+                    for call in calls:
+                        if execute_tools:
+                            start(call)
+                parse_started = time.perf_counter()
+                calls = parser.finish()
+                parse_seconds += time.perf_counter() - parse_started
+                for call in calls:
+                    if execute_tools:
+                        start(call)
+                llm_span.set_attributes({
+                    "llm.completion_tokens_estimate": estimate_tokens(parser.text),
+                    "llm.function_calls": len(function_calls)
+                })
+        except (LLMUnavailableError, LLMHTTPError) as e:
+            print(f"LLM streaming failed: {e}")
+            record_error(stage, e)
+            return llm_fallback_message(), [], []
+        except Exception as e:
+            record_error(stage, e)
+            return f"Sorry, I encountered an error: {str(e)}", [], []
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+        STAGE_SECONDS.observe(parse_seconds, "function_parse")
+        
+        llm_response = parser.text
+        if not llm_response.strip():
+            llm_response = "Sorry, I couldn't generate a response."
+        
+        for call in deferred:
+            submit(call)
+        function_results = [future.result() for future in futures]
+        return llm_response, function_calls, function_results
+    
+    async def _allm_step(self, messages: List[Dict[str, str]], execute_tools: bool = True, stage: str = "llm_first"):
+        """Async variant of _llm_step"""
+        if config.LLM_STREAMING:
+            return await self._astream_llm_step(messages, execute_tools, stage)
+        
+        llm_response = await self._acall_llm(messages, stage)
+        function_calls = self._parse_function_calls(llm_response) if execute_tools else []
+        function_results = await self._aexecute_function_calls(function_calls) if function_calls else []
+        return llm_response, function_calls, function_results
+    
+    async def _astream_llm_step(self, messages: List[Dict[str, str]], execute_tools: bool = True, stage: str = "llm_first"):
+        """Async variant of _stream_llm_step; tools start as tasks while tokens arrive"""
+        parser = StreamingFunctionCallParser(self._extract_function_calls)
+        function_calls = []
+        tasks = []
+        barrier = []
+        deferred = []
+        parse_seconds = 0.0
+        
+        def start(call):
+            if deferred or call["function"] in WRITE_FUNCTIONS:
+                deferred.append(call)
+            else:
+                submit(call)
+        
+        def submit(call):
+            after = list(barrier)
+            is_write = call["function"] in WRITE_FUNCTIONS
+            if is_write:
+                after = list(tasks)
+            
+            async def run():
+                for task in after:
+                    await asyncio.shield(task)
+                return await self._aexecute_function(call["function"], call["args"])
+            
+            task = asyncio.ensure_future(run())
+            function_calls.append(call)
+            tasks.append(task)
+            if is_write:
+                barrier[:] = [task]
+        
+        started = time.perf_counter()
+        try:
+            with span("MedicalCenterChatbot._stream_llm_step", self._llm_span_attributes(messages, stage)) as llm_span:
+                async for chunk in llm_provider.astream(messages):
+                    parse_started = time.perf_counter()
+                    calls = parser.feed(chunk)
+                    parse_seconds += time.perf_counter() - parse_started
+                    for call in calls:
+                        if execute_tools:
+                            start(call)
+                parse_started = time.perf_counter()
+                calls = parser.finish()
+                parse_seconds += time.perf_counter() - parse_started
+                for call in calls:
+                    if execute_tools:
+                        start(call)
+                llm_span.set_attributes({
+                    "llm.completion_tokens_estimate": estimate_tokens(parser.text),
+                    "llm.function_calls": len(function_calls)
+                })
+        except (LLMUnavailableError, LLMHTTPError) as e:
+            print(f"LLM streaming failed: {e}")
+            record_error(stage, e)
+            return llm_fallback_message(), [], []
+        except Exception as e:
+            record_error(stage, e)
+            return f"Sorry, I encountered an error: {str(e)}", [], []
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+        STAGE_SECONDS.observe(parse_seconds, "function_parse")
+        
+        llm_response = parser.text
+        if not llm_response.strip():
+            llm_response = "Sorry, I couldn't generate a response."
+        
+        for call in deferred:
+            submit(call)
+        function_results = list(await asyncio.gather(*tasks))
+        return llm_response, function_calls, function_results
+    
+    def _format_function_results(self, function_calls: List[Dict[str, Any]], results: List[str]) -> str:
+        """Format function results as a single message to feed back to the LLM"""
+        if len(function_calls) == 1:
+            return f"[Function Result: {results[0]}]"
+        
+        formatted = []
+        for i, (call, result) in enumerate(zip(function_calls, results), 1):
+            formatted.append(f"{i}. {call['function']}: {call['args']}\n{result}")
+        
+        return "[Function Results:\n\n" + "\n\n".join(formatted) + "\n]"
+    
+    @property
+    def memory(self) -> ConversationMemory:
+        """Memory of the default session (used when no session_id is given)"""
+        return self.sessions.get(DEFAULT_SESSION_ID)
+    
+    def is_completing_booking(self, session_id: Optional[str]) -> bool:
+        """True if the session holds a slot it has not booked yet (used to prioritize its requests)"""
+        if not session_id or not services.is_created("excel"):
+            return False
+        return excel_manager.holds.held_by(session_id) is not None
+    
+    def chat(self, user_message: str, session_id: Optional[str] = None) -> str:
         """Process user message and return response"""
+        session_id = session_id or DEFAULT_SESSION_ID
+        
+        # One turn at a time per conversation; other sessions run freely
+        token = _current_session.set(session_id)
+        memory_token = _current_memory.set(None)
+        try:
+            with STAGE_SECONDS.time("chat"), span("MedicalCenterChatbot.chat"), self.sessions.turn(session_id) as memory:
+                _current_memory.set(memory)
+                response = self._chat_turn(memory, user_message)
+                self.sessions.save(session_id, memory)
+        finally:
+            _current_memory.reset(memory_token)
+            _current_session.reset(token)
+        
+        return response
+    
+    async def achat(self, user_message: str, session_id: Optional[str] = None) -> str:
+        """Async variant of chat() for the ASGI app"""
+        session_id = session_id or DEFAULT_SESSION_ID
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        
+        with span("MedicalCenterChatbot.achat"):
+            # Turns of one conversation wait here without holding a thread; the store
+            # lock below then only serializes against other processes
+            async with self._turn_lock(session_id):
+                # Session store calls may block (Redis, lock waits), so they run on their own bounded pool
+                executor = self.session_executor
+                turn = await loop.run_in_executor(executor, self.sessions.turn, session_id)
+                memory = await loop.run_in_executor(executor, turn.__enter__)
+                token = _current_session.set(session_id)
+                memory_token = _current_memory.set(memory)
+                try:
+                    response = await self._achat_turn(memory, user_message)
+                    await loop.run_in_executor(executor, self.sessions.save, session_id, memory)
+                finally:
+                    await loop.run_in_executor(executor, turn.__exit__, None, None, None)
+                    _current_memory.reset(memory_token)
+                    _current_session.reset(token)
+        
+        STAGE_SECONDS.observe(time.perf_counter() - started, "chat")
+        return response
+    
+    def _chat_turn(self, memory: ConversationMemory, user_message: str) -> str:
+        """Run one conversation turn against a session's memory"""
+        messages = self._start_turn(memory, user_message)
+        
+        # Call LLM and execute any functions it requests
+        llm_response, function_calls, function_results = self._llm_step(
+            messages,
+            execute_tools=config.AGENT_MAX_STEPS > 0
+        )
+        llm_calls = 1
+        
+        # Agent loop: keep executing requested functions until the model answers
+        # directly or the step budget is used up
+        for step in range(1, config.AGENT_MAX_STEPS + 1):
+            if not function_calls:
+                break
+            
+            self._remember_results(memory, function_calls, function_results)
+            self._append_function_results(messages, step, function_calls, function_results)
+            llm_response, function_calls, function_results = self._llm_step(
+                messages,
+                execute_tools=step < config.AGENT_MAX_STEPS,
+                stage="llm_followup"
+            )
+            llm_calls += 1
+        
+        return self._finish_turn(memory, llm_response, llm_calls)
+    
+    async def _achat_turn(self, memory: ConversationMemory, user_message: str) -> str:
+        """Async variant of _chat_turn"""
+        messages = self._start_turn(memory, user_message)
+        
+        llm_response, function_calls, function_results = await self._allm_step(
+            messages,
+            execute_tools=config.AGENT_MAX_STEPS > 0
+        )
+        llm_calls = 1
+        
+        for step in range(1, config.AGENT_MAX_STEPS + 1):
+            if not function_calls:
+                break
+            
+            self._remember_results(memory, function_calls, function_results)
+            self._append_function_results(messages, step, function_calls, function_results)
+            llm_response, function_calls, function_results = await self._allm_step(
+                messages,
+                execute_tools=step < config.AGENT_MAX_STEPS,
+                stage="llm_followup"
+            )
+            llm_calls += 1
+        
+        return self._finish_turn(memory, llm_response, llm_calls)
+    
+    def _start_turn(self, memory: ConversationMemory, user_message: str) -> List[Dict[str, str]]:
+        """Record the user message and build the messages for the first LLM call"""
         # Add user message to memory
-        self.memory.add_user_message(user_message)
+        memory.add_user_message(user_message)
         
         # Create system message
         system_message = f"""You are a helpful medical center chatbot assistant.
@@ -779,7 +1665,9 @@ Available information:
 - Physical Therapy: {config.PT_PHONE} / {config.PT_EMAIL}
 - Location: {config.CENTER_LOCATION}
 
-IMPORTANT: When you need to look up specific information, use ONLY ONE of these function formats:
+IMPORTANT: When you need to look up specific information, use these function formats.
+If you need several independent pieces of information (e.g. a doctor's specialty AND their availability),
+request all of them at once by putting each function call on its own line:
 
 1. To search for information about doctors, services, or policies:
    search_knowledge: your search query here
@@ -792,6 +1680,7 @@ IMPORTANT: When you need to look up specific information, use ONLY ONE of these
 
 4. To search for appointments:
    search_appointments: patient_name
+   (add "; history=yes" to include past visits, e.g. search_appointments: John Doe; history=yes)
 
 5. To book an appointment:
    book_appointment: doctor_name date time patient_name phone
@@ -799,6 +1688,32 @@ IMPORTANT: When you need to look up specific information, use ONLY ONE of these
 6. To cancel an appointment:
    cancel_appointment: doctor_name patient_name date time
 
+7. To find the best slots when the patient gives preferences instead of one doctor and date
+   (e.g. "any PT doctor, weekday evenings after 5, within two weeks"):
+   recommend_slots: specialty=physical therapy; days=mon-fri; after=17:00; within=14
+   Optional keys (separated by ';'): doctor=sarah,ahmed  prefer=sarah  from=YYYY-MM-DD
+   to=YYYY-MM-DD  within=days  days=mon-fri|weekends|tue,thu  after=HH:MM  before=HH:MM  limit=5
+
+8. To propose a recurring course of care (e.g. physical therapy 2x/week for 6 weeks = 12 sessions):
+   plan_series: doctor=sarah; patient=Shady Abdelaziz; days=mon,thu; time=17:00; sessions=12
+
+9. To book the whole course at once after the patient accepts the proposal:
+   book_series: doctor=sarah; patient=Shady Abdelaziz; phone=01067110557; days=mon,thu; time=17:00; sessions=12
+   Optional keys: from=YYYY-MM-DD  fallback=nearest_time,next_day,skip (when a slot is taken)
+
+10. To hold the slot the patient picked while you collect their name and phone (it is kept for a few minutes):
+   hold_slot: doctor_name YYYY-MM-DD HH:MM AM/PM
+
+11. To put the patient on a doctor's waitlist when nothing suitable is free:
+   join_waitlist: doctor=sarah; patient=Shady Abdelaziz; phone=01067110557; within=14; after=17:00
+   Optional keys: from=YYYY-MM-DD  to=YYYY-MM-DD  days=mon-fri  before=HH:MM
+   A freed slot is then held for the patient; search_appointments shows it as an offered slot.
+
+12. To book the slot offered to a waitlisted patient, or to leave the waitlist:
+   accept_offer: phone; patient=Full Name
+   leave_waitlist: phone; patient=Full Name
+   Only the phone confirmed in this conversation (or the exact name and phone of the waitlist entry) is accepted.
+
 IMPORTANT FOR BOOKING:
 - Store the COMPLETE patient name as ONE field: "Shady Abdelaziz" (not "Shady")
 - Store the COMPLETE phone number as ONE field: "01067110557" (not split)
@@ -817,8 +1732,11 @@ IMPORTANT FOR CANCELLATION:
 
 BOOKING WORKFLOW:
 - When a user wants to book an appointment, FIRST check availability using check_availability
+  (or recommend_slots when they describe preferences rather than a specific doctor or date)
+- For a course of several sessions, use plan_series, show the proposed sessions, and call
+  book_series with the same arguments once the patient agrees - never one book_appointment per session
 - Show them available slots
-- When user provides date and time, collect their name and phone number
+- When user picks a date and time, call hold_slot for it so nobody else takes it, then collect their name and phone number
 - Once you have ALL information (doctor, date, time, name, phone), immediately call the booking function
 - Then book using: book_appointment: doctor_name YYYY-MM-DD HH:MM AM/PM patient_name phone
 - IMPORTANT: Always use full time format like "10:00 AM" not just "10"
@@ -826,7 +1744,8 @@ BOOKING WORKFLOW:
 
 CRITICAL RULES FOR FUNCTION CALLS:
 IMPORTANT: When you need to call a function, output ONLY the function call on a single line
-- Do NOT add any text before or after the function call
+- Do NOT add any text before or after the function call(s)
+- Put each function call on its own line when you need more than one
 - Do NOT explain what you're doing
 - Do NOT say "Let me book this for you" or similar phrases
 - JUST output: function_name: arguments
@@ -841,70 +1760,100 @@ CRITICAL BOOKING VALIDATION:
 RULES:
 - Use ONLY the simple format shown above (function_name: arguments)
 - Do NOT use XML tags or other formats
-- When you call a function, ONLY output the function call, nothing else
+- When you call functions, ONLY output the function calls (one per line), nothing else
 - After getting function results, provide a friendly response to the user
 - For doctor names, you can use partial names (e.g., "sarah" instead of "Dr. Sarah Martinez")
 - REMEMBER the conversation history - don't ask for information the user already provided
 - When booking, use the EXACT time format from available slots (e.g., "10:00 AM")
 
 Always be helpful and provide accurate information."""
-        
+
         # Get conversation context
-        context = self.memory.get_context()
+        context = memory.get_context()
         
         # Prepare messages for LLM
         messages = [{"role": "system", "content": system_message}]
         messages.extend(context)
+        return messages
+    
+    @staticmethod
+    def _remember_results(memory: ConversationMemory, function_calls: List[Dict[str, Any]], function_results: List[str]):
+        """Pin the booking facts confirmed by this step's function results"""
+        for call, result in zip(function_calls, function_results):
+            memory.add_tool_result(call["function"], result)
+    
+    def _append_function_results(
+        self,
+        messages: List[Dict[str, str]],
+        step: int,
+        function_calls: List[Dict[str, Any]],
+        function_results: List[str]
+    ):
+        """Feed every function result back together, with the follow-up instruction"""
+        # IMPORTANT: messages already hold the full conversation history
+        messages.append({
+            "role": "assistant", 
+            "content": self._format_function_results(function_calls, function_results)
+        })
         
-        # Call LLM
-        llm_response = self._call_gemini_llm(messages)
-        
-        # Check if LLM wants to call a function
-        function_call = self._extract_function_call(llm_response)
-        
-        if function_call:
-            # Execute the function
-            function_result = self._execute_function(
-                function_call["function"], 
-                function_call["args"]
-            )
-            
-            # Now ask LLM to format the result nicely for the user
-            # IMPORTANT: Include full conversation history
-            follow_up_messages = [{"role": "system", "content": system_message}]
-            follow_up_messages.extend(context)  # Add conversation history
-            follow_up_messages.append({
-                "role": "assistant", 
-                "content": f"[Function Result: {function_result}]"
-            })
-            follow_up_messages.append({
-                "role": "user", 
-                "content": "Based on the function result above, provide a helpful response to my original question. Remember our conversation context."
-            })
-            
-            final_response = self._call_gemini_llm(follow_up_messages)
-            
-            # Add to memory
-            self.memory.add_ai_message(final_response)
-            return final_response
-        
+        if step < config.AGENT_MAX_STEPS:
+            follow_up = ("Based on the function results above, provide a helpful response to my original question. "
+                         "Remember our conversation context. If you still need more information, output ONLY the "
+                         "additional function call(s), one per line.")
         else:
-            # No function call, just return the response
-            self.memory.add_ai_message(llm_response)
-            return llm_response
+            follow_up = ("Based on the function results above, provide a helpful response to my original question. "
+                         "Remember our conversation context. Do not call any more functions.")
+        messages.append({"role": "user", "content": follow_up})
+    
+    def _finish_turn(self, memory: ConversationMemory, llm_response: str, llm_calls: int) -> str:
+        """Record the final answer of a turn"""
+        # Every LLM call this turn carried the (compacted) context
+        memory.record_prompt_usage(llm_calls)
+        set_attribute("chat.llm_calls", llm_calls)
+        set_attribute("memory.context_tokens_estimate", memory.last_context_tokens)
+        set_attribute("memory.tokens_saved_estimate", memory.last_tokens_saved)
+        
+        # Add to memory
+        memory.add_ai_message(llm_response)
+        return llm_response
 
 
 # Global chatbot instance
 medical_chatbot = MedicalCenterChatbot()
 
+CallbackMetric(
+    "chatbot_active_sessions",
+    "Conversations currently held by the session store",
+    lambda: medical_chatbot.sessions.active_count()
+)
+CallbackMetric(
+    "chatbot_slot_holds_active",
+    "Slots currently held for conversations that are still booking",
+    lambda: len(excel_manager.holds) if services.is_created("excel") else 0
+)
+
 
 # ============================================================================
 # Export functions
 # ============================================================================
 
-def handle_query(user_query: str) -> str:
+def handle_query(user_query: str, session_id: Optional[str] = None) -> str:
     """Main function to handle user queries"""
-    return medical_chatbot.chat(user_query)
+    return medical_chatbot.chat(user_query, session_id)
+
+
+async def ahandle_query(user_query: str, session_id: Optional[str] = None) -> str:
+    """Async variant of handle_query for the ASGI app"""
+    return await medical_chatbot.achat(user_query, session_id)
+
+
+async def aclose_clients():
+    """Close the async HTTP pools (call when the ASGI app shuts down)"""
+    # Closing must not build a client that was never used
+    if services.is_created("llm_async_client"):
+        await llm_async_client.aclose()
+    if services.is_created("vector"):
+        await vector_manager.aclose()
 
 
 def get_all_agents():
@@ -0,0 +1,373 @@
+"""
+Conversation Memory
+Token-budgeted chat history with a rolling summary of older turns
+"""
+import re
+import time
+from typing import List, Dict, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+# Patterns used to pin key booking facts when older turns are compacted
+PHONE_PATTERN = re.compile(r'(\+?\d[\d\s-]{6,}\d)')
+# Only an explicit cue names the patient ("I am looking for..." must not)
+NAME_PATTERNS = [
+    re.compile(r"\b(?:my name is|my name's|name is)\s+([A-Za-z][A-Za-z'-]+(?:\s+[A-Za-z][A-Za-z'-]+){0,2})", re.IGNORECASE),
+    re.compile(r"\bpatient name:\s*([A-Za-z][A-Za-z'-]+(?:\s+[A-Za-z][A-Za-z'-]+){0,2})", re.IGNORECASE),
+]
+# A message that is just a full name and a phone number ("John Doe, 1234567890")
+NAME_AND_PHONE_PATTERN = re.compile(r"\s*([A-Za-z][A-Za-z'-]+(?:\s+[A-Za-z][A-Za-z'-]+){1,2})[\s,]+(\+?\d[\d\s-]{6,}\d)\s*[.!]?\s*")
+DOCTOR_PATTERN = re.compile(r"\b(?i:dr)\.?\s+([A-Za-z]+(?:\s+[A-Z][a-z]+)?)")
+DATE_PATTERN = re.compile(r'\b\d{4}-\d{2}-\d{2}\b')
+TIME_PATTERN = re.compile(r'\b\d{1,2}:\d{2}(?:\s*[AP]M)?\b', re.IGNORECASE)
+
+# Words that precede a phone number but are not part of a name
+NAME_STOPWORDS = {
+    'my', 'phone', 'number', 'is', 'and', 'call', 'me', 'at', 'mobile', 'the', 'on',
+    'whatsapp', 'contact', 'tel', 'yes', 'ok', 'okay', 'please', 'book', 'it', 'for', 'i'
+}
+
+# Successful function results that confirm booking facts
+HELD_SLOT_PATTERN = re.compile(
+    r"(?:Slot held for you:|The slot with) (.+?) on (\d{4}-\d{2}-\d{2}) at (\d{1,2}:\d{2}(?:\s*[AP]M)?)(?: \(until| is available\.)",
+    re.IGNORECASE
+)
+RESULT_FIELD_PATTERN = re.compile(r"^(Doctor|Date|Time|Patient|Phone): (.+)$", re.MULTILINE)
+SERIES_BOOKED_PATTERN = re.compile(r"✅ Booked \d+ sessions with (.+?) for (.+?):")
+WAITLIST_JOINED_PATTERN = re.compile(r"📝 (.+?) \((.+?)\) is on the waitlist for (.+?) \(")
+
+
+class Message:
+    """Compact chat message record"""
+    
+    __slots__ = ("role", "content", "ts")
+    
+    def __init__(self, role: str, content: str, ts: Optional[float] = None):
+        self.role = role
+        self.content = content
+        self.ts = ts if ts is not None else time.time()
+    
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+
+class ConversationMemory:
+    """
+    Conversation memory bounded by an estimated token budget
+    
+    Recent messages are kept verbatim (older long messages are clipped). When the
+    budget is exceeded, the oldest turns are folded into a rolling summary that
+    pins key facts (patient name, phone, chosen doctor, pending slot) so booking
+    flows keep their context.
+    """
+    
+    __slots__ = (
+        "max_tokens", "max_message_tokens", "summary_tokens", "max_messages",
+        "messages", "summary_notes", "facts", "last_active",
+        "raw_tokens", "last_context_tokens", "last_tokens_saved", "total_tokens_saved"
+    )
+    
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        max_message_tokens: int = 500,
+        summary_tokens: int = 300,
+        max_messages: Optional[int] = None
+    ):
+        """
+        Initialize conversation memory
+        
+        Args:
+            max_tokens: Budget for the context returned by get_context()
+            max_message_tokens: Older messages longer than this are clipped
+            summary_tokens: Budget for the rolling summary notes
+            max_messages: Optional hard cap on verbatim messages
+        """
+        self.max_tokens = max_tokens
+        self.max_message_tokens = max_message_tokens
+        self.summary_tokens = summary_tokens
+        self.max_messages = max_messages
+        self.messages = []
+        self.summary_notes = []
+        self.facts = {}
+        self.last_active = time.time()
+        
+        # Instrumentation
+        self.raw_tokens = 0
+        self.last_context_tokens = 0
+        self.last_tokens_saved = 0
+        self.total_tokens_saved = 0
+    
+    def add_user_message(self, message: str):
+        """Add user message to memory"""
+        self._add("user", message)
+    
+    def add_ai_message(self, message: str):
+        """Add AI message to memory"""
+        self._add("assistant", message)
+    
+    def add_tool_result(self, function_name: str, result: str):
+        """
+        Pin the facts a successful function result confirms
+        
+        Results are not kept as messages; only held, booked and cancelled
+        slots (with the doctor, patient and phone they were booked for) are
+        taken from them. Availability listings are never read, so a slot the
+        assistant merely offered does not become the pending slot. A phone a
+        booking or waitlist join went through with becomes the conversation's
+        verified phone, the only one its waitlist entries are managed for.
+        
+        Args:
+            function_name: Function that ran (e.g. "hold_slot")
+            result: Its result text
+        """
+        if function_name == "hold_slot":
+            match = HELD_SLOT_PATTERN.search(result)
+            if match:
+                self.facts["doctor"] = match.group(1)
+                self.facts["slot_date"] = match.group(2)
+                self.facts["slot_time"] = match.group(3).upper()
+        
+        elif function_name in ("book_appointment", "accept_offer") and "booked successfully" in result.lower():
+            fields = dict(RESULT_FIELD_PATTERN.findall(result))
+            if "Patient" in fields:
+                self.facts["patient_name"] = fields["Patient"].strip()
+            if "Phone" in fields:
+                self.facts["phone"] = fields["Phone"].strip()
+                self.facts["verified_phone"] = self.facts["phone"]
+            if "Doctor" in fields:
+                self.facts["doctor"] = fields["Doctor"].strip()
+            if "Date" in fields and "Time" in fields:
+                self.facts["booked_slot"] = f"{fields['Date'].strip()} {fields['Time'].strip()}"
+            self.facts.pop("slot_date", None)
+            self.facts.pop("slot_time", None)
+        
+        elif function_name == "book_series":
+            match = SERIES_BOOKED_PATTERN.search(result)
+            if match:
+                self.facts["doctor"] = match.group(1)
+                self.facts["patient_name"] = match.group(2)
+        
+        elif function_name == "join_waitlist":
+            match = WAITLIST_JOINED_PATTERN.search(result)
+            if match:
+                self.facts["patient_name"] = match.group(1)
+                self.facts["phone"] = match.group(2)
+                self.facts["verified_phone"] = match.group(2)
+                self.facts["doctor"] = match.group(3)
+        
+        elif function_name == "cancel_appointment" and result.startswith("✅"):
+            self.facts.pop("booked_slot", None)
+    
+    def _add(self, role: str, content: str):
+        if role == "user":
+            self._extract_facts(content)
+        self.messages.append(Message(role, content))
+        self.last_active = time.time()
+        self.raw_tokens += estimate_tokens(content)
+        self._compact()
+    
+    def _clip(self, content: str) -> str:
+        """Clip a long message to the per-message budget"""
+        max_chars = self.max_message_tokens * 4
+        if len(content) <= max_chars:
+            return content
+        return content[:max_chars].rstrip() + " …[truncated]"
+    
+    def _message_tokens(self, index: int) -> int:
+        content = self.messages[index].content
+        # The newest message is always sent in full
+        if index < len(self.messages) - 1:
+            content = self._clip(content)
+        return estimate_tokens(content)
+    
+    def _compact(self):
+        """
+        Fold the oldest messages into the summary until the context fits the budget
+        
+        Totals are measured once and then kept up to date as messages and
+        notes are popped, so compacting is linear in the conversation length.
+        """
+        if len(self.messages) <= 2:
+            return
+        message_tokens = sum(self._message_tokens(i) for i in range(len(self.messages)))
+        summary_chars = len(self._summary_text())
+        note_tokens = sum(estimate_tokens(n) for n in self.summary_notes)
+        
+        def over_budget() -> bool:
+            if self.max_messages and len(self.messages) > self.max_messages:
+                return True
+            # estimate_tokens() of a summary_chars long summary
+            return message_tokens + max(1, (summary_chars + 3) // 4) > self.max_tokens
+        
+        # Always keep the latest exchange verbatim
+        while len(self.messages) > 2 and over_budget():
+            message_tokens -= self._message_tokens(0)  # Never the newest, which is not clipped
+            oldest = self.messages.pop(0)
+            speaker = "Patient" if oldest.role == "user" else "Assistant"
+            note = " ".join(oldest.content.split())
+            if len(note) > 160:
+                note = note[:160].rstrip() + "…"
+            note = f"{speaker}: {note}"
+            self.summary_notes.append(note)
+            note_tokens += estimate_tokens(note)
+            if len(self.summary_notes) == 1:
+                summary_chars = len(self._summary_text())  # Adds the header lines
+            else:
+                summary_chars += len(f"\n- {note}")
+            
+            # Keep the notes within their own budget, oldest first out
+            while len(self.summary_notes) > 1 and note_tokens > self.summary_tokens:
+                dropped = self.summary_notes.pop(0)
+                note_tokens -= estimate_tokens(dropped)
+                summary_chars -= len(f"\n- {dropped}")
+    
+    def _extract_facts(self, content: str):
+        """Pin facts the patient stated that booking and cancellation depend on"""
+        # Dates look like phone numbers to the phone pattern
+        without_dates = DATE_PATTERN.sub(" ", content)
+        
+        phone_match = PHONE_PATTERN.search(without_dates)
+        if phone_match and len(re.sub(r'\D', '', phone_match.group(1))) >= 7:
+            self.facts["phone"] = re.sub(r'[\s-]', '', phone_match.group(1))
+        
+        words = []
+        for pattern in NAME_PATTERNS:
+            match = pattern.search(content)
+            if match:
+                # "my name is John and my phone is ..." ends at "and"
+                for word in match.group(1).split():
+                    if word.lower() in NAME_STOPWORDS:
+                        break
+                    words.append(word)
+                break
+        if not words:
+            match = NAME_AND_PHONE_PATTERN.fullmatch(without_dates)
+            if match and not any(w.lower() in NAME_STOPWORDS for w in match.group(1).split()):
+                words = match.group(1).split()
+        if words:
+            self.facts["patient_name"] = " ".join(w.capitalize() for w in words)
+        
+        doctor_match = DOCTOR_PATTERN.search(content)
+        if doctor_match:
+            self.facts["doctor"] = "Dr. " + " ".join(w.capitalize() for w in doctor_match.group(1).split())
+        
+        # A slot the patient names in full (date and time) is the one being discussed
+        date_match = DATE_PATTERN.search(content)
+        time_match = TIME_PATTERN.search(content)
+        if date_match and time_match:
+            self.facts["slot_date"] = date_match.group(0)
+            self.facts["slot_time"] = time_match.group(0).upper()
+    
+    def _pending_slot(self) -> str:
+        return f"{self.facts.get('slot_date', '')} {self.facts.get('slot_time', '')}".strip()
+    
+    def has_pending_booking(self) -> bool:
+        """True when a slot (date and time) has been discussed but not booked yet"""
+        return "slot_date" in self.facts and "slot_time" in self.facts
+    
+    def _summary_text(self) -> str:
+        """Render pinned facts and rolling notes as one block"""
+        if not self.summary_notes and not self.facts:
+            return ""
+        
+        lines = ["Summary of earlier conversation (older messages were compacted):"]
+        facts = dict(self.facts)
+        if self._pending_slot():
+            facts["pending_slot"] = self._pending_slot()
+        labels = {
+            "patient_name": "Patient name",
+            "phone": "Phone",
+            "doctor": "Doctor",
+            "pending_slot": "Slot being discussed",
+            "booked_slot": "Slot booked in this conversation"
+        }
+        for key, label in labels.items():
+            if key in facts:
+                lines.append(f"- {label}: {facts[key]}")
+        if self.summary_notes:
+            lines.append("Earlier turns:")
+            lines.extend(f"- {note}" for note in self.summary_notes)
+        return "\n".join(lines)
+    
+    def get_context(self) -> List[Dict[str, str]]:
+        """Get conversation context (summary first, then recent messages)"""
+        context = []
+        
+        # Facts only need pinning once messages have been compacted
+        if self.summary_notes:
+            context.append({"role": "system", "content": self._summary_text()})
+        
+        last = len(self.messages) - 1
+        for i, message in enumerate(self.messages):
+            content = message.content if i == last else self._clip(message.content)
+            context.append({"role": message.role, "content": content})
+        
+        self.last_context_tokens = sum(estimate_tokens(m["content"]) for m in context)
+        return context
+    
+    def record_prompt_usage(self, llm_calls: int = 1):
+        """
+        Record tokens saved this turn versus sending the full history
+        
+        Args:
+            llm_calls: Number of LLM requests that carried the context this turn
+        """
+        self.last_tokens_saved = max(0, self.raw_tokens - self.last_context_tokens) * llm_calls
+        self.total_tokens_saved += self.last_tokens_saved
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get memory instrumentation counters"""
+        return {
+            "messages": len(self.messages),
+            "summary_notes": len(self.summary_notes),
+            "raw_tokens": self.raw_tokens,
+            "context_tokens": self.last_context_tokens,
+            "tokens_saved_last_turn": self.last_tokens_saved,
+            "tokens_saved_total": self.total_tokens_saved
+        }
+    
+    def get_history(self) -> List[Dict]:
+        """Get retained messages with epoch timestamps"""
+        return [{"role": m.role, "content": m.content, "timestamp": m.ts} for m in self.messages]
+    
+    def to_dict(self) -> Dict:
+        """Serialize the conversation state (limits come from the store's factory)"""
+        return {
+            "messages": [[m.role, m.content, m.ts] for m in self.messages],
+            "summary_notes": list(self.summary_notes),
+            "facts": dict(self.facts),
+            "last_active": self.last_active,
+            "raw_tokens": self.raw_tokens,
+            "total_tokens_saved": self.total_tokens_saved
+        }
+    
+    def load_dict(self, state: Dict):
+        """Restore conversation state produced by to_dict()"""
+        self.messages = [Message(role, content, ts) for role, content, ts in state.get("messages", [])]
+        self.summary_notes = list(state.get("summary_notes", []))
+        self.facts = dict(state.get("facts", {}))
+        self.last_active = state.get("last_active", time.time())
+        self.raw_tokens = state.get("raw_tokens", 0)
+        self.total_tokens_saved = state.get("total_tokens_saved", 0)
+    
+    def approx_bytes(self) -> int:
+        """Approximate memory footprint, used by the session store's byte cap"""
+        # ~56 bytes per slotted Message plus string headers
+        total = 200 + sum(len(m.content) + 120 for m in self.messages)
+        total += sum(len(note) + 50 for note in self.summary_notes)
+        total += sum(len(k) + len(str(v)) + 100 for k, v in self.facts.items())
+        return total
+    
+    def clear(self):
+        """Clear memory"""
+        self.messages = []
+        self.summary_notes = []
+        self.facts = {}
+        self.raw_tokens = 0
+        self.last_context_tokens = 0
+        self.last_tokens_saved = 0
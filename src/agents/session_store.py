@@ -0,0 +1,461 @@
+"""
+Session Store
+Per-session conversation memory: bounded in-process store or shared Redis store
+"""
+import json
+import secrets
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from src.agents.memory import ConversationMemory
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# One-byte format tags so stores written with either codec stay readable
+CODEC_MSGPACK = b"m"
+CODEC_JSON = b"j"
+
+
+def encode_memory(memory: ConversationMemory) -> bytes:
+    """Serialize a conversation compactly (msgpack + zlib, JSON + zlib without msgpack)"""
+    state = memory.to_dict()
+    if msgpack is not None:
+        return CODEC_MSGPACK + zlib.compress(msgpack.packb(state, use_bin_type=True))
+    return CODEC_JSON + zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_memory(data: bytes, memory: ConversationMemory) -> ConversationMemory:
+    """Load a payload produced by encode_memory() into a fresh memory"""
+    tag, body = data[:1], zlib.decompress(data[1:])
+    if tag == CODEC_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Session was stored with msgpack, which is not installed")
+        state = msgpack.unpackb(body, raw=False)
+    else:
+        state = json.loads(body.decode("utf-8"))
+    memory.load_dict(state)
+    return memory
+
+
+class SessionStore:
+    """
+    In-process store mapping session_id -> ConversationMemory
+    
+    Sessions are kept in LRU order. A session is evicted when it has been idle
+    longer than idle_ttl, or (least recently used first) when the number of
+    sessions or their approximate total size exceeds the configured caps.
+    """
+    
+    def __init__(
+        self,
+        memory_factory: Callable[[], ConversationMemory],
+        max_sessions: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_ttl: float = 1800.0,
+        sweep_interval: float = 30.0,
+        on_remove: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Initialize session store
+        
+        Args:
+            memory_factory: Creates a fresh ConversationMemory for a new session
+            max_sessions: Hard cap on live sessions
+            max_bytes: Hard cap on the approximate size of all sessions
+            idle_ttl: Seconds of inactivity before a session expires
+            sweep_interval: Minimum seconds between expiry sweeps
+            on_remove: Called with the id of each session removed or evicted
+                (under the store's lock, so it must be quick)
+        """
+        self.memory_factory = memory_factory
+        self.on_remove = on_remove
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        
+        self._sessions = OrderedDict()  # session_id -> ConversationMemory
+        self._turn_locks = {}  # session_id -> [lock, turns running or waiting]
+        self._sizes = {}  # session_id -> approx bytes
+        self._total_bytes = 0
+        self._last_sweep = time.time()
+        self._lock = threading.Lock()
+        
+        # Metrics
+        self.created = 0
+        self.evictions = {"ttl": 0, "lru": 0, "bytes": 0}
+    
+    def get(self, session_id: str) -> ConversationMemory:
+        """Get the memory for a session, creating it if needed"""
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            
+            memory = self._sessions.get(session_id)
+            if memory is not None and now - memory.last_active > self.idle_ttl:
+                self._evict(session_id, "ttl")
+                memory = None
+            
+            if memory is None:
+                memory = self.memory_factory()
+                self._sessions[session_id] = memory
+                self._sizes[session_id] = memory.approx_bytes()
+                self._total_bytes += self._sizes[session_id]
+                self.created += 1
+                self._enforce_caps(keep=session_id)
+            else:
+                self._sessions.move_to_end(session_id)
+            
+            memory.last_active = now
+            return memory
+    
+    def peek(self, session_id: str) -> Optional[ConversationMemory]:
+        """Get a session's memory without creating it or refreshing its LRU position"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is not None and time.time() - memory.last_active > self.idle_ttl:
+                self._evict(session_id, "ttl")
+                return None
+            return memory
+    
+    def turn(self, session_id: str) -> "_Turn":
+        """
+        One turn of a conversation: `with store.turn(session_id) as memory:`
+        
+        Turns are serialized by a lock kept per session id rather than on the
+        memory, so evicting the memory cannot let two turns of a conversation
+        run at once; the memory is looked up once that lock is held.
+        """
+        return _Turn(self, session_id)
+    
+    def save(self, session_id: str, memory: ConversationMemory):
+        """Store a session's memory after a turn (again, if it was evicted meanwhile), re-measure it and enforce the byte cap"""
+        with self._lock:
+            if self._sessions.get(session_id) is not memory:
+                self._total_bytes -= self._sizes.pop(session_id, 0)
+                self._sessions[session_id] = memory
+            size = memory.approx_bytes()
+            self._total_bytes += size - self._sizes.get(session_id, 0)
+            self._sizes[session_id] = size
+            self._enforce_caps(keep=session_id)
+    
+    def remove(self, session_id: str):
+        """Drop a session"""
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def active_count(self) -> int:
+        """Number of live sessions (cheap enough for every metrics scrape)"""
+        return len(self._sessions)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get store metrics"""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "live_sessions": len(self._sessions),
+                "approx_bytes": self._total_bytes,
+                "sessions_created": self.created,
+                "evictions_ttl": self.evictions["ttl"],
+                "evictions_lru": self.evictions["lru"],
+                "evictions_bytes": self.evictions["bytes"]
+            }
+    
+    def _maybe_sweep(self, now: float):
+        """Expire idle sessions; oldest-used sessions sit at the front of the LRU"""
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        while self._sessions:
+            session_id, memory = next(iter(self._sessions.items()))
+            if now - memory.last_active <= self.idle_ttl:
+                break
+            self._evict(session_id, "ttl")
+    
+    def _enforce_caps(self, keep: str):
+        """Evict least recently used sessions (never `keep`) until within caps"""
+        while len(self._sessions) > self.max_sessions:
+            if not self._evict_oldest(keep, "lru"):
+                break
+        while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+            if not self._evict_oldest(keep, "bytes"):
+                break
+    
+    def _evict_oldest(self, keep: str, reason: str) -> bool:
+        for session_id in self._sessions:
+            if session_id != keep:
+                self._evict(session_id, reason)
+                return True
+        return False
+    
+    def _evict(self, session_id: str, reason: str):
+        self._drop(session_id)
+        self.evictions[reason] += 1
+    
+    def _drop(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+        _notify_removed(self.on_remove, session_id)
+
+
+def _notify_removed(on_remove: Optional[Callable[[str], None]], session_id: str):
+    """Run a store's on_remove callback; its errors never fail the store"""
+    if on_remove is None:
+        return
+    try:
+        on_remove(session_id)
+    except Exception as e:
+        print(f"Error cleaning up session {session_id}: {e}")
+
+
+class _Turn:
+    """Holds an in-process session's turn lock for one turn and yields the memory looked up under it"""
+    
+    def __init__(self, store: SessionStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+        self.entry = None
+    
+    def __enter__(self) -> ConversationMemory:
+        store = self.store
+        with store._lock:
+            self.entry = store._turn_locks.setdefault(self.session_id, [threading.Lock(), 0])
+            self.entry[1] += 1
+        self.entry[0].acquire()
+        try:
+            return store.get(self.session_id)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+    
+    def __exit__(self, exc_type, exc, tb):
+        store = self.store
+        self.entry[0].release()
+        with store._lock:
+            self.entry[1] -= 1
+            if self.entry[1] == 0 and store._turn_locks.get(self.session_id) is self.entry:
+                del store._turn_locks[self.session_id]
+        return False
+
+
+class RedisLock:
+    """
+    Minimal Redis mutex (SET NX PX) released with a WATCH transaction
+    
+    Avoids Lua scripting so it also works against stand-ins such as fakeredis.
+    """
+    
+    def __init__(self, client, name: str, timeout: float, poll_interval: float = 0.05):
+        self.client = client
+        self.name = name
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.token = secrets.token_hex(16)
+    
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while not self.client.set(self.name, self.token, nx=True, px=int(self.timeout * 1000)):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Could not acquire {self.name} within {self.timeout:.0f}s")
+            time.sleep(self.poll_interval)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        # Only delete the lock if it is still ours (it may have expired and been re-taken)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self.name)
+                current = pipe.get(self.name)
+                if isinstance(current, bytes):
+                    current = current.decode()
+                if current == self.token:
+                    pipe.multi()
+                    pipe.delete(self.name)
+                    pipe.execute()
+            except Exception as e:
+                print(f"Error releasing {self.name}: {e}")
+        return False
+
+
+class RedisSessionStore:
+    """
+    Session store shared by every worker process and replica through Redis
+    
+    Each session is one key holding the compressed conversation, expiring after
+    idle_ttl seconds without a turn. A sorted set of session ids scored by
+    their expiry is kept next to them, so live sessions are counted without
+    scanning the keyspace. Turns of the same conversation are serialized
+    across processes with a Redis lock. Any Redis-protocol client works, so
+    tests can pass a fakeredis instance.
+    """
+    
+    def __init__(
+        self,
+        memory_factory: Callable[[], ConversationMemory],
+        url: str = "redis://localhost:6379/0",
+        idle_ttl: float = 1800.0,
+        key_prefix: str = "chatbot:",
+        lock_timeout: float = 120.0,
+        client=None,
+        on_remove: Optional[Callable[[str], None]] = None
+    ):
+        """
+        Initialize Redis session store
+        
+        Args:
+            memory_factory: Creates a fresh ConversationMemory for a new session
+            url: Redis connection URL (ignored when client is given)
+            idle_ttl: Seconds of inactivity before a session expires
+            key_prefix: Namespace for all keys written by the store
+            lock_timeout: Upper bound on one turn; a crashed worker's lock expires after this
+            client: Existing Redis client to use instead of connecting to url
+            on_remove: Called with the id of each session removed (sessions that
+                expire are left to Redis and do not call it)
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        
+        self.client = client
+        self.on_remove = on_remove
+        self.memory_factory = memory_factory
+        self.idle_ttl = idle_ttl
+        self.key_prefix = key_prefix
+        self.lock_timeout = lock_timeout
+    
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}session:{session_id}"
+    
+    @property
+    def _active_key(self) -> str:
+        return f"{self.key_prefix}active"
+    
+    def get(self, session_id: str) -> ConversationMemory:
+        """Load a session's memory, or a fresh one if it does not exist or expired"""
+        memory = self.peek(session_id)
+        if memory is None:
+            memory = self.memory_factory()
+            self.client.incr(f"{self.key_prefix}stats:created")
+        memory.last_active = time.time()
+        return memory
+    
+    def peek(self, session_id: str) -> Optional[ConversationMemory]:
+        """Load a session's memory without creating it"""
+        data = self.client.get(self._key(session_id))
+        if data is None:
+            return None
+        try:
+            return decode_memory(data, self.memory_factory())
+        except Exception as e:
+            print(f"Error decoding session {session_id}: {e}")
+            return None
+    
+    def turn(self, session_id: str) -> "_RedisTurn":
+        """One turn of a conversation: takes the cross-process lock, then loads the memory"""
+        return _RedisTurn(self, RedisLock(self.client, f"{self.key_prefix}lock:{session_id}", self.lock_timeout), session_id)
+    
+    def save(self, session_id: str, memory: ConversationMemory):
+        """Write a session back after a turn, refreshing its idle expiry"""
+        ttl = max(1, int(self.idle_ttl))
+        with self.client.pipeline() as pipe:
+            pipe.set(self._key(session_id), encode_memory(memory), ex=ttl)
+            pipe.zadd(self._active_key, {session_id: time.time() + ttl})
+            pipe.execute()
+    
+    def remove(self, session_id: str):
+        """Drop a session"""
+        with self.client.pipeline() as pipe:
+            pipe.delete(self._key(session_id))
+            pipe.zrem(self._active_key, session_id)
+            pipe.execute()
+        _notify_removed(self.on_remove, session_id)
+    
+    def __len__(self) -> int:
+        return self.active_count()
+    
+    def active_count(self) -> int:
+        """Number of live sessions: prunes expired ids from the sorted set, then counts it"""
+        with self.client.pipeline() as pipe:
+            pipe.zremrangebyscore(self._active_key, "-inf", time.time())
+            pipe.zcard(self._active_key)
+            _, count = pipe.execute()
+        return int(count)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get store metrics (expiry and memory limits are enforced by Redis itself)"""
+        created = self.client.get(f"{self.key_prefix}stats:created")
+        return {
+            "backend": "redis",
+            "live_sessions": self.active_count(),
+            "sessions_created": int(created or 0)
+        }
+
+
+class _RedisTurn:
+    """Holds a Redis session's lock for one turn and yields the memory loaded under it"""
+    
+    def __init__(self, store: RedisSessionStore, lock: RedisLock, session_id: str):
+        self.store = store
+        self.lock = lock
+        self.session_id = session_id
+    
+    def __enter__(self) -> ConversationMemory:
+        self.lock.__enter__()
+        try:
+            return self.store.get(self.session_id)
+        except BaseException:
+            self.lock.__exit__(None, None, None)
+            raise
+    
+    def __exit__(self, exc_type, exc, tb):
+        return self.lock.__exit__(exc_type, exc, tb)
+
+
+def create_session_store(
+    config,
+    memory_factory: Callable[[], ConversationMemory],
+    on_remove: Optional[Callable[[str], None]] = None
+):
+    """
+    Create the session store selected by config.SESSION_BACKEND
+    
+    Args:
+        config: Application config
+        memory_factory: Creates a fresh ConversationMemory for a new session
+        on_remove: Called with the id of each session the store drops
+    
+    Returns:
+        SessionStore or RedisSessionStore
+    """
+    backend = config.SESSION_BACKEND.lower()
+    
+    if backend == "redis":
+        return RedisSessionStore(
+            memory_factory=memory_factory,
+            url=config.REDIS_URL,
+            idle_ttl=config.SESSION_IDLE_TTL,
+            key_prefix=config.SESSION_KEY_PREFIX,
+            on_remove=on_remove
+        )
+    
+    if backend == "memory":
+        return SessionStore(
+            memory_factory=memory_factory,
+            max_sessions=config.SESSION_MAX_COUNT,
+            max_bytes=config.SESSION_MAX_BYTES,
+            idle_ttl=config.SESSION_IDLE_TTL,
+            on_remove=on_remove
+        )
+    
+    raise ValueError(f"Unknown SESSION_BACKEND: {config.SESSION_BACKEND}")
@@ -0,0 +1,98 @@
+"""
+Streaming Function Call Parser
+Detects tool invocations in a token stream as soon as their arguments are complete
+"""
+import re
+from typing import Callable, List, Dict, Any
+
+
+FUNCTION_NAMES = (
+    "search_knowledge",
+    "get_doctors",
+    "check_availability",
+    "book_appointment",
+    "cancel_appointment",
+    "search_appointments",
+    "recommend_slots",
+    "plan_series",
+    "book_series",
+    "hold_slot",
+    "join_waitlist",
+    "accept_offer",
+    "leave_waitlist"
+)
+
+XML_OPEN_PATTERN = re.compile(r"<(" + "|".join(FUNCTION_NAMES) + r")\b(\s*/>)?", re.IGNORECASE)
+
+
+class StreamingFunctionCallParser:
+    """
+    Incremental parser over LLM output chunks
+
+    A call is complete when:
+    - simple syntax ("check_availability: sarah"): its line ends
+    - XML syntax ("<search_knowledge>...</search_knowledge>"): the closing tag arrives
+    - self-closing XML ("<get_doctors/>"): immediately
+
+    Each completed segment is handed to the same extractor the chatbot uses for
+    full responses, so every accepted syntax is recognised identically.
+    """
+    
+    def __init__(self, extractor: Callable[[str], List[Dict[str, Any]]]):
+        """
+        Args:
+            extractor: Function returning [{"function", "args"}, ...] for a piece of text
+        """
+        self.extractor = extractor
+        self.buffer = ""
+        self.consumed = 0
+        self.emitted = []
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add a chunk of streamed text and return any newly completed calls"""
+        self.buffer += chunk
+        completed = []
+        
+        while True:
+            remaining = self.buffer[self.consumed:]
+            newline = remaining.find("\n")
+            xml_open = XML_OPEN_PATTERN.search(remaining)
+            
+            if xml_open and (newline == -1 or xml_open.start() < newline):
+                if xml_open.group(2):
+                    # Self-closing tag, e.g. <get_doctors/>
+                    end = xml_open.end()
+                else:
+                    closing = re.search(rf"</{xml_open.group(1)}\s*>", remaining[xml_open.end():], re.IGNORECASE)
+                    if not closing:
+                        # Arguments still streaming
+                        break
+                    end = xml_open.end() + closing.end()
+            elif newline != -1:
+                end = newline + 1
+            else:
+                break
+            
+            completed.extend(self._extract(remaining[:end]))
+            self.consumed += end
+        
+        return completed
+    
+    def finish(self) -> List[Dict[str, Any]]:
+        """Flush the trailing partial line once the stream has ended"""
+        remaining = self.buffer[self.consumed:]
+        self.consumed = len(self.buffer)
+        return self._extract(remaining) if remaining.strip() else []
+    
+    @property
+    def text(self) -> str:
+        """Full text received so far"""
+        return self.buffer
+    
+    def _extract(self, segment: str) -> List[Dict[str, Any]]:
+        calls = []
+        for call in self.extractor(segment):
+            if call not in self.emitted:
+                self.emitted.append(call)
+                calls.append(call)
+        return calls
@@ -0,0 +1,99 @@
+"""
+Warm-up
+Loads data and opens connections before a process reports ready, so the first request is not slow
+"""
+import time
+from typing import Dict, Any
+
+from src.utils import config
+
+
+# Warm-up progress of this process
+_status = {
+    "data": False,
+    "connections": False,
+    "timings": {},
+    "errors": []
+}
+
+# Periodic archival of past schedule rows in this process (ARCHIVE_INTERVAL_HOURS > 0)
+_archive_scheduler = None
+
+
+def _step(name: str, fn):
+    """Run one warm-up step, recording its duration and any error"""
+    started = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        print(f"⚠️  Warm-up step '{name}' failed: {e}")
+        _status["errors"].append(f"{name}: {e}")
+    _status["timings"][name] = round(time.perf_counter() - started, 3)
+
+
+def warm_data() -> Dict[str, Any]:
+    """
+    Load read-only data (safe to run in a pre-fork master process)
+
+    Everything loaded here is shared copy-on-write by forked workers. No
+    pooled connections are opened, since sockets must not be shared across forks.
+    """
+    from src.utils.services import excel_manager, vector_manager
+    
+    # Open and parse every schedule sheet into the workbook snapshot
+    _step("workbook_snapshot", lambda: excel_manager.load_snapshot())
+    
+    # Make the embedding server load its model (workers open their own sessions)
+    _step("embedding_model", lambda: vector_manager.embeddings.embed_query("warm-up"))
+    
+    _status["data"] = True
+    return warmup_status()
+
+
+def warm_connections() -> Dict[str, Any]:
+    """Open this process's pooled connections (run in every worker after fork)"""
+    from src.utils.services import services, vector_manager
+    import src.agents.medical_agents  # registers the LLM services
+    
+    # LLM clients hold thread pools, so they are built after the fork
+    _step("llm_clients", lambda: services.warm("llm_provider"))
+    _step("qdrant_connection", lambda: vector_manager.qdrant_client.get_collection(config.COLLECTION_NAME))
+    _step("embedding_connection", lambda: vector_manager.embeddings.embed_query("warm-up"))
+    
+    # Threads do not survive a fork, so the archival timer starts here too
+    if config.ARCHIVE_INTERVAL_HOURS > 0:
+        _step("archive_schedule", start_archive_schedule)
+    
+    _status["connections"] = True
+    return warmup_status()
+
+
+def warm_up() -> Dict[str, Any]:
+    """Run every warm-up step in the current process (single-process servers)"""
+    warm_data()
+    return warm_connections()
+
+
+def start_archive_schedule():
+    """Archive past schedule rows every ARCHIVE_INTERVAL_HOURS on a background thread"""
+    global _archive_scheduler
+    from src.utils.schedule_archive import ArchiveScheduler
+    from src.utils.services import excel_manager
+    
+    if _archive_scheduler is None:
+        _archive_scheduler = ArchiveScheduler(excel_manager.archive_past_rows, config.ARCHIVE_INTERVAL_HOURS * 3600)
+    _archive_scheduler.start()
+
+
+def is_ready() -> bool:
+    """True once this process has finished warming up"""
+    return _status["data"] and _status["connections"]
+
+
+def warmup_status() -> Dict[str, Any]:
+    """Get warm-up progress and step timings (seconds)"""
+    return {
+        "ready": is_ready(),
+        "timings": dict(_status["timings"]),
+        "errors": list(_status["errors"])
+    }
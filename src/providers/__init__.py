@@ -0,0 +1,58 @@
+"""
+LLM providers package for Medical Center AI Chatbot
+"""
+from .base import LLMProvider
+from .gemini import GeminiProvider
+from .openai_compat import OpenAICompatibleProvider
+from .mock import MockProvider, LatencyModel
+
+
+def create_provider(config, client, async_client=None) -> LLMProvider:
+    """
+    Create the LLM provider selected by config.LLM_PROVIDER
+    
+    Args:
+        config: Application configuration
+        client: ResilientLLMClient shared by HTTP-based providers
+        async_client: AsyncResilientLLMClient for the asyncio serving path
+    """
+    provider_name = config.LLM_PROVIDER
+    
+    if provider_name == "gemini":
+        return GeminiProvider(
+            api_key=config.GEMINI_API_KEY,
+            model=config.GEMINI_MODEL,
+            base_url=config.GEMINI_BASE_URL,
+            client=client,
+            temperature=config.LLM_TEMPERATURE,
+            async_client=async_client
+        )
+    
+    if provider_name == "openai":
+        return OpenAICompatibleProvider(
+            base_url=config.OPENAI_BASE_URL,
+            model=config.OPENAI_MODEL,
+            client=client,
+            api_key=config.OPENAI_API_KEY,
+            temperature=config.LLM_TEMPERATURE,
+            async_client=async_client
+        )
+    
+    if provider_name == "mock":
+        return MockProvider.from_file(
+            config.MOCK_LLM_SCRIPT,
+            latency=config.MOCK_LLM_LATENCY,
+            seed=config.MOCK_LLM_SEED
+        )
+    
+    raise ValueError(f"Unknown LLM_PROVIDER: {provider_name} (expected gemini, openai or mock)")
+
+
+__all__ = [
+    'LLMProvider',
+    'GeminiProvider',
+    'OpenAICompatibleProvider',
+    'MockProvider',
+    'LatencyModel',
+    'create_provider'
+]
@@ -0,0 +1,63 @@
+"""
+LLM Provider Interface
+Common contract for chat, streaming and function calling across LLM backends
+"""
+import asyncio
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+
+
+class LLMProvider:
+    """
+    Base class for LLM providers
+    
+    Messages use the OpenAI-style shape {"role": "system"|"user"|"assistant", "content": str}.
+    Tools are plain JSON-schema function declarations:
+        {"name": str, "description": str, "parameters": {...json schema...}}
+    
+    chat() returns a dict:
+        {"text": str, "function_calls": [{"name": str, "args": dict}, ...]}
+    
+    achat()/astream() are the asyncio variants used by the ASGI app; the defaults
+    run the blocking methods in a worker thread.
+    """
+    
+    name = "base"
+    
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Generate a complete response"""
+        raise NotImplementedError
+    
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield response text incrementally (default: one chunk from chat())"""
+        yield self.chat(messages)["text"]
+    
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Generate a complete response without blocking the event loop"""
+        return await asyncio.to_thread(self.chat, messages, tools)
+    
+    async def astream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Yield response text incrementally without blocking the event loop"""
+        yield (await self.achat(messages))["text"]
+    
+    @staticmethod
+    def split_system(messages: List[Dict[str, str]]):
+        """
+        Split system messages from the conversation
+        
+        Several system messages (e.g. instructions plus a conversation summary)
+        are joined in order rather than the last one winning.
+        
+        Returns:
+            Tuple of (system_text or None, non-system messages)
+        """
+        system_parts = [msg['content'] for msg in messages if msg['role'] == 'system']
+        conversation = [msg for msg in messages if msg['role'] != 'system']
+        return ("\n\n".join(system_parts) if system_parts else None), conversation
@@ -0,0 +1,168 @@
+"""
+Google Gemini Provider
+REST generateContent / streamGenerateContent with native function calling
+"""
+import json
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+
+from .base import LLMProvider
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini REST API provider"""
+    
+    name = "gemini"
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str,
+        client,
+        temperature: float = 0.3,
+        max_output_tokens: int = 4096,
+        async_client=None
+    ):
+        """
+        Initialize Gemini provider
+        
+        Args:
+            client: ResilientLLMClient used for all HTTP calls
+            async_client: AsyncResilientLLMClient used by achat()/astream()
+        """
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.client = client
+        self.async_client = async_client
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+    
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Convert messages to Gemini's 'contents' format"""
+        system_instruction, conversation = self.split_system(messages)
+        
+        # Gemini uses 'contents' with 'role' (user/model) and 'parts' structure
+        gemini_contents = []
+        for msg in conversation:
+            # Convert role names (assistant -> model for Gemini)
+            gemini_role = 'model' if msg['role'] == 'assistant' else 'user'
+            gemini_contents.append({
+                'role': gemini_role,
+                'parts': [{'text': msg['content']}]
+            })
+        
+        payload = {
+            'contents': gemini_contents,
+            'generationConfig': {
+                'temperature': self.temperature,
+                'maxOutputTokens': self.max_output_tokens,
+            }
+        }
+        
+        if system_instruction:
+            payload['systemInstruction'] = {
+                'parts': [{'text': system_instruction}]
+            }
+        
+        if tools:
+            payload['tools'] = [{'functionDeclarations': tools}]
+        
+        return payload
+    
+    def _url(self, method: str) -> str:
+        return f"{self.base_url}/models/{self.model}:{method}?key={self.api_key}"
+    
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Generate a complete response"""
+        data = self.client.post_json(
+            self._url("generateContent"),
+            self._build_payload(messages, tools),
+            headers={"Content-Type": "application/json"}
+        )
+        return self._parse_response(data)
+    
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Generate a complete response without blocking the event loop"""
+        if self.async_client is None:
+            return await super().achat(messages, tools)
+        data = await self.async_client.post_json(
+            self._url("generateContent"),
+            self._build_payload(messages, tools),
+            headers={"Content-Type": "application/json"}
+        )
+        return self._parse_response(data)
+    
+    @staticmethod
+    def _parse_response(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Split a generateContent response into text and function calls"""
+        text_parts = []
+        function_calls = []
+        if 'candidates' in data and len(data['candidates']) > 0:
+            candidate = data['candidates'][0]
+            for part in candidate.get('content', {}).get('parts', []):
+                if 'functionCall' in part:
+                    function_calls.append({
+                        'name': part['functionCall'].get('name', ''),
+                        'args': part['functionCall'].get('args', {}) or {}
+                    })
+                else:
+                    text_parts.append(part.get('text', ''))
+        
+        return {'text': ''.join(text_parts), 'function_calls': function_calls}
+    
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield response text as Gemini streams it (server-sent events)"""
+        url = self._url("streamGenerateContent") + "&alt=sse"
+        for line in self.client.post_stream(
+            url,
+            self._build_payload(messages),
+            headers={"Content-Type": "application/json"}
+        ):
+            text = self._parse_event(line)
+            if text:
+                yield text
+    
+    async def astream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Yield response text as Gemini streams it, without blocking the event loop"""
+        if self.async_client is None:
+            async for text in super().astream(messages):
+                yield text
+            return
+        url = self._url("streamGenerateContent") + "&alt=sse"
+        async for line in self.async_client.post_stream(
+            url,
+            self._build_payload(messages),
+            headers={"Content-Type": "application/json"}
+        ):
+            text = self._parse_event(line)
+            if text:
+                yield text
+    
+    @staticmethod
+    def _parse_event(line: str) -> str:
+        """Extract the text carried by one server-sent event line"""
+        if not line.startswith('data:'):
+            return ""
+        try:
+            data = json.loads(line[len('data:'):].strip())
+        except ValueError:
+            return ""
+        texts = []
+        for candidate in data.get('candidates', [])[:1]:
+            for part in candidate.get('content', {}).get('parts', []):
+                if part.get('text'):
+                    texts.append(part['text'])
+        return "".join(texts)
@@ -0,0 +1,274 @@
+"""
+Mock LLM Provider and Server
+Deterministic, scriptable stand-in for load tests, with configurable latency distributions
+
+Run as an OpenAI-compatible server:
+    python -m src.providers.mock --port 8089 --latency lognormal:800,0.4 --seed 42
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+
+from .base import LLMProvider
+
+
+# Default script: enough to drive the chatbot's text function-call protocol.
+# Rules are tried in order against the last user message; the first match wins.
+DEFAULT_SCRIPT = [
+    {"match": r"^Based on the function result", "response": "Here is what I found for you based on our records."},
+    {"match": r"\b(cancel)\b", "response": "cancel_appointment: sarah John Doe"},
+    {"match": r"\b(book|reserve)\b", "response": "check_availability: sarah"},
+    {"match": r"\b(any doctor|evenings?|mornings?|weekdays|weekends?|earliest)\b", "response": "recommend_slots: days=mon-fri; after=17:00; within=14"},
+    {"match": r"\b(available|availability|free|slots?|schedule)\b", "response": "check_availability: sarah"},
+    {"match": r"\b(my appointments?|appointments for)\b", "response": "search_appointments: John Doe"},
+    {"match": r"\b(doctors|who works)\b", "response": "get_doctors"},
+    {"match": r"\b(doctor|dr\.?|specialt\w*|therapy|service|hours|policy)\b", "response": "search_knowledge: {message}"},
+    {"match": r".*", "response": "Hello! How can I help you with our medical center today?"}
+]
+
+
+class LatencyModel:
+    """
+    Latency distribution parsed from a compact spec (all values in milliseconds)
+
+    fixed:MS | uniform:LO,HI | normal:MEAN,STD | lognormal:MEDIAN,SIGMA | exponential:MEAN
+    """
+    
+    def __init__(self, spec: str = "fixed:0", seed: Optional[int] = None):
+        self.spec = spec
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        
+        kind, _, params = spec.partition(':')
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(',') if p.strip()] or [0.0]
+        
+        if self.kind not in ('fixed', 'uniform', 'normal', 'lognormal', 'exponential'):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+    
+    def sample(self) -> float:
+        """Return one latency sample in seconds"""
+        p = self.params
+        with self._lock:
+            if self.kind == 'fixed':
+                ms = p[0]
+            elif self.kind == 'uniform':
+                ms = self.rng.uniform(p[0], p[1])
+            elif self.kind == 'normal':
+                ms = self.rng.gauss(p[0], p[1])
+            elif self.kind == 'lognormal':
+                ms = self.rng.lognormvariate(math.log(max(p[0], 1e-3)), p[1])
+            else:
+                ms = self.rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+        return max(ms, 0.0) / 1000.0
+
+
+class MockProvider(LLMProvider):
+    """Scriptable in-process LLM provider"""
+    
+    name = "mock"
+    
+    def __init__(
+        self,
+        script: Optional[List[Dict[str, Any]]] = None,
+        latency: str = "fixed:0",
+        seed: Optional[int] = None,
+        chunk_size: int = 8
+    ):
+        """
+        Initialize mock provider
+
+        Args:
+            script: Ordered rules {"match": regex, "response": text, "function_calls": [...]};
+                    "{message}" in a response is replaced with the last user message
+            latency: Latency distribution spec, see LatencyModel
+            seed: Seed for reproducible latency samples
+            chunk_size: Characters per chunk when streaming
+        """
+        self.rules = [
+            (re.compile(rule.get("match", ".*"), re.IGNORECASE), rule)
+            for rule in (script or DEFAULT_SCRIPT)
+        ]
+        self.latency = LatencyModel(latency, seed)
+        self.chunk_size = chunk_size
+        self.calls = 0
+    
+    @classmethod
+    def from_file(cls, script_path: Optional[str], **kwargs) -> "MockProvider":
+        """Create a provider from a JSON script file (or the default script)"""
+        script = None
+        if script_path:
+            with open(script_path, 'r', encoding='utf-8') as f:
+                script = json.load(f)
+        return cls(script=script, **kwargs)
+    
+    def _respond(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        last_user = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), "")
+        self.calls += 1
+        
+        for pattern, rule in self.rules:
+            if pattern.search(last_user):
+                text = rule.get("response", "").replace("{message}", last_user.strip()[:200])
+                return {"text": text, "function_calls": list(rule.get("function_calls", []))}
+        
+        return {"text": "", "function_calls": []}
+    
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Return the scripted response after a sampled delay"""
+        time.sleep(self.latency.sample())
+        response = self._respond(messages)
+        if not tools:
+            response["function_calls"] = []
+        return response
+    
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield the scripted response in chunks, spreading the sampled delay across them"""
+        text = self._respond(messages)["text"]
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        delay = self.latency.sample() / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+    
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Return the scripted response after a sampled (non-blocking) delay"""
+        await asyncio.sleep(self.latency.sample())
+        response = self._respond(messages)
+        if not tools:
+            response["function_calls"] = []
+        return response
+    
+    async def astream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Async variant of stream()"""
+        text = self._respond(messages)["text"]
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        delay = self.latency.sample() / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield chunk
+
+
+# ============================================================================
+# OpenAI-compatible HTTP server
+# ============================================================================
+
+def make_handler(provider: MockProvider):
+    """Build a request handler serving /v1/chat/completions from a MockProvider"""
+    
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def log_message(self, format, *args):
+            pass
+        
+        def _send_json(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            if self.path.rstrip('/') in ('/health', '/v1/models'):
+                self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "Not found"}})
+        
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {"error": {"message": "Not found"}})
+                return
+            
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                request_body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._send_json(400, {"error": {"message": "Invalid JSON"}})
+                return
+            
+            messages = request_body.get('messages', [])
+            model = request_body.get('model', 'mock')
+            
+            if request_body.get('stream'):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in provider.stream(messages):
+                    event = {"object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": chunk}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+                return
+            
+            response = provider.chat(messages, tools=request_body.get('tools'))
+            tool_calls = [
+                {"id": f"call_{i}", "type": "function",
+                 "function": {"name": call["name"], "arguments": json.dumps(call.get("args", {}))}}
+                for i, call in enumerate(response["function_calls"])
+            ]
+            message = {"role": "assistant", "content": response["text"]}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            self._send_json(200, {
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "stop"}]
+            })
+    
+    return MockLLMHandler
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog large enough for load tests"""
+    
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(host: str = "127.0.0.1", port: int = 8089, provider: Optional[MockProvider] = None) -> ThreadingHTTPServer:
+    """Create (but do not start) an OpenAI-compatible mock LLM server"""
+    return MockLLMServer((host, port), make_handler(provider or MockProvider()))
+
+
+def main():
+    """Run the mock LLM server from the command line"""
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--script", help="JSON file with ordered response rules")
+    parser.add_argument("--latency", default="fixed:0", help="e.g. fixed:500, uniform:200,900, lognormal:800,0.4")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    provider = MockProvider.from_file(args.script, latency=args.latency, seed=args.seed)
+    server = serve(args.host, args.port, provider)
+    print(f"🧪 Mock LLM listening on http://{args.host}:{args.port}/v1 (latency: {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
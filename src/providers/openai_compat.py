@@ -0,0 +1,154 @@
+"""
+OpenAI-Compatible Provider
+Works with any /v1/chat/completions server (llama.cpp, Ollama, vLLM, the local mock server)
+"""
+import json
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+
+from .base import LLMProvider
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Provider for OpenAI-compatible chat completion APIs"""
+    
+    name = "openai"
+    
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        client,
+        api_key: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 4096,
+        async_client=None
+    ):
+        """
+        Initialize OpenAI-compatible provider
+        
+        Args:
+            base_url: API root including the version, e.g. http://localhost:11434/v1
+            client: ResilientLLMClient used for all HTTP calls
+            async_client: AsyncResilientLLMClient used by achat()/astream()
+        """
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.client = client
+        self.async_client = async_client
+        self.api_key = api_key
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+    
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+    
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        system_text, conversation = self.split_system(messages)
+        chat_messages = [{"role": "system", "content": system_text}] if system_text else []
+        chat_messages.extend({"role": msg['role'], "content": msg['content']} for msg in conversation)
+        
+        payload = {
+            "model": self.model,
+            "messages": chat_messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": stream
+        }
+        if tools:
+            payload["tools"] = [{"type": "function", "function": tool} for tool in tools]
+        return payload
+    
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Generate a complete response"""
+        data = self.client.post_json(
+            f"{self.base_url}/chat/completions",
+            self._build_payload(messages, tools),
+            headers=self._headers()
+        )
+        return self._parse_response(data)
+    
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Generate a complete response without blocking the event loop"""
+        if self.async_client is None:
+            return await super().achat(messages, tools)
+        data = await self.async_client.post_json(
+            f"{self.base_url}/chat/completions",
+            self._build_payload(messages, tools),
+            headers=self._headers()
+        )
+        return self._parse_response(data)
+    
+    @staticmethod
+    def _parse_response(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Split a chat completion into text and function calls"""
+        choices = data.get('choices') or [{}]
+        message = choices[0].get('message', {}) or {}
+        
+        function_calls = []
+        for tool_call in message.get('tool_calls') or []:
+            function = tool_call.get('function', {})
+            try:
+                args = json.loads(function.get('arguments') or '{}')
+            except ValueError:
+                args = {}
+            function_calls.append({'name': function.get('name', ''), 'args': args})
+        
+        return {'text': message.get('content') or '', 'function_calls': function_calls}
+    
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield response text from a server-sent event stream"""
+        for line in self.client.post_stream(
+            f"{self.base_url}/chat/completions",
+            self._build_payload(messages, stream=True),
+            headers=self._headers()
+        ):
+            content = self._parse_event(line)
+            if content:
+                yield content
+    
+    async def astream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Yield response text from a server-sent event stream without blocking the event loop"""
+        if self.async_client is None:
+            async for content in super().astream(messages):
+                yield content
+            return
+        async for line in self.async_client.post_stream(
+            f"{self.base_url}/chat/completions",
+            self._build_payload(messages, stream=True),
+            headers=self._headers()
+        ):
+            content = self._parse_event(line)
+            if content:
+                yield content
+    
+    @staticmethod
+    def _parse_event(line: str) -> str:
+        """Extract the delta text carried by one server-sent event line ('' for [DONE])"""
+        if not line.startswith('data:'):
+            return ""
+        body = line[len('data:'):].strip()
+        if body == '[DONE]':
+            return ""
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return ""
+        for choice in data.get('choices', [])[:1]:
+            return (choice.get('delta') or {}).get('content') or ""
+        return ""
@@ -5,8 +5,10 @@ from .medical_tools import (
     knowledge_search_tool,
     available_slots_tool,
     book_appointment_tool,
+    book_series_tool,
     cancel_appointment_tool,
     search_appointments_tool,
+    recommend_slots_tool,
     get_doctors_tool
 )
 
@@ -14,7 +16,9 @@ __all__ = [
     'knowledge_search_tool',
     'available_slots_tool',
     'book_appointment_tool',
+    'book_series_tool',
     'cancel_appointment_tool',
     'search_appointments_tool',
+    'recommend_slots_tool',
     'get_doctors_tool'
 ]
@@ -1,22 +1,23 @@
 """
 Tools for CrewAI Agents
 These tools enable agents to interact with the database and knowledge base
+
+Every tool has a blocking _run and a non-blocking _arun, so crews executing
+tasks asynchronously can run tool calls concurrently. Read results are shared
+across tools and agents through the tool result cache; bookings and
+cancellations invalidate it.
 """
+import asyncio
 from crewai.tools import BaseTool
 from typing import Type, List, Dict, Any, Optional
 from pydantic import BaseModel, Field
-from src.utils import config, ExcelDBManager, VectorDBManager
+from src.utils import config, services
+from src.utils.tool_cache import tool_results, KNOWLEDGE
 
 
-# Initialize managers
-excel_manager = ExcelDBManager(config.EXCEL_DB_PATH)
-vector_manager = VectorDBManager(
-    qdrant_url=config.QDRANT_URL,
-    qdrant_api_key=config.QDRANT_API_KEY,
-    collection_name=config.COLLECTION_NAME,
-    ollama_base_url=config.OLLAMA_BASE_URL,
-    embedding_model=config.EMBEDDING_MODEL
-)
+# Same instances as the chatbot (built on first use by the service registry)
+excel_manager = services.lazy("excel")
+vector_manager = services.lazy("vector")
 
 
 # ============================================================================
@@ -44,23 +45,50 @@ class KnowledgeSearchTool(BaseTool):
     def _run(self, query: str) -> str:
         """Search the knowledge base"""
         try:
-            results = vector_manager.search(
-                query=query,
-                limit=config.RAG_RETRIEVAL_K,
-                score_threshold=config.RAG_SCORE_THRESHOLD
+            arguments = self._arguments(query)
+            results = tool_results.get_or_compute(
+                self.name,
+                arguments,
+                lambda: vector_manager.search(**arguments),
+                scope=KNOWLEDGE
             )
-            
-            if not results:
-                return "No relevant information found in the knowledge base."
-            
-            # Format results
-            formatted_results = []
-            for i, result in enumerate(results, 1):
-                formatted_results.append(f"Result {i} (Relevance: {result['score']:.2f}):\n{result['text']}\n")
-            
-            return "\n---\n".join(formatted_results)
+            return self._format(results)
         except Exception as e:
             return f"Error searching knowledge base: {str(e)}"
+    
+    async def _arun(self, query: str) -> str:
+        """Search the knowledge base with the async embedding and Qdrant clients"""
+        try:
+            arguments = self._arguments(query)
+            results = await tool_results.aget_or_compute(
+                self.name,
+                arguments,
+                lambda: vector_manager.asearch(**arguments),
+                scope=KNOWLEDGE
+            )
+            return self._format(results)
+        except Exception as e:
+            return f"Error searching knowledge base: {str(e)}"
+    
+    @staticmethod
+    def _arguments(query: str) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "limit": config.RAG_RETRIEVAL_K,
+            "score_threshold": config.RAG_SCORE_THRESHOLD
+        }
+    
+    @staticmethod
+    def _format(results: List[Dict]) -> str:
+        if not results:
+            return "No relevant information found in the knowledge base."
+        
+        # Format results
+        formatted_results = []
+        for i, result in enumerate(results, 1):
+            formatted_results.append(f"Result {i} (Relevance: {result['score']:.2f}):\n{result['text']}\n")
+        
+        return "\n---\n".join(formatted_results)
 
 
 # ============================================================================
@@ -91,22 +119,43 @@ class AvailableSlotsTool(BaseTool):
     def _run(self, doctor_name: str, date: Optional[str] = None, limit: int = 10) -> str:
         """Get available slots"""
         try:
-            slots = excel_manager.get_available_slots(doctor_name, date, limit)
-            
-            if not slots:
-                if date:
-                    return f"No available slots found for {doctor_name} on {date}."
-                else:
-                    return f"No available slots found for {doctor_name}."
-            
-            # Format results
-            result = f"Available slots for {doctor_name}:\n\n"
-            for slot in slots:
-                result += f"📅 Date: {slot['date']}\n⏰ Time: {slot['time']}\n\n"
-            
-            return result.strip()
+            slots = tool_results.get_or_compute(
+                self.name,
+                {"doctor_name": doctor_name, "date": date, "limit": limit},
+                lambda: excel_manager.get_available_slots(doctor_name, date, limit),
+                version=excel_manager.availability_version()
+            )
+            return self._format(doctor_name, date, slots)
+        except Exception as e:
+            return f"Error checking available slots: {str(e)}"
+    
+    async def _arun(self, doctor_name: str, date: Optional[str] = None, limit: int = 10) -> str:
+        """Get available slots, reading the workbook off the event loop"""
+        try:
+            slots = await tool_results.aget_or_compute(
+                self.name,
+                {"doctor_name": doctor_name, "date": date, "limit": limit},
+                lambda: asyncio.to_thread(excel_manager.get_available_slots, doctor_name, date, limit),
+                version=excel_manager.availability_version()
+            )
+            return self._format(doctor_name, date, slots)
         except Exception as e:
             return f"Error checking available slots: {str(e)}"
+    
+    @staticmethod
+    def _format(doctor_name: str, date: Optional[str], slots: List[Dict]) -> str:
+        if not slots:
+            if date:
+                return f"No available slots found for {doctor_name} on {date}."
+            else:
+                return f"No available slots found for {doctor_name}."
+        
+        # Format results
+        result = f"Available slots for {doctor_name}:\n\n"
+        for slot in slots:
+            result += f"📅 Date: {slot['date']}\n⏰ Time: {slot['time']}\n\n"
+        
+        return result.strip()
 
 
 # ============================================================================
@@ -151,6 +200,118 @@ class BookAppointmentTool(BaseTool):
             return message
         except Exception as e:
             return f"Error booking appointment: {str(e)}"
+    
+    async def _arun(self, doctor_name: str, date: str, time: str, patient_name: str, phone: str) -> str:
+        """Book an appointment without blocking the event loop (the save invalidates cached schedule results)"""
+        try:
+            success, message = await asyncio.to_thread(
+                excel_manager.book_appointment,
+                doctor_name=doctor_name,
+                date=date,
+                time=time,
+                patient_name=patient_name,
+                phone=phone
+            )
+            return message
+        except Exception as e:
+            return f"Error booking appointment: {str(e)}"
+
+
+# ============================================================================
+# Book Appointment Series Tool
+# ============================================================================
+
+class BookSeriesInput(BaseModel):
+    """Input schema for BookSeriesTool"""
+    doctor_name: str = Field(..., description="Full name of the doctor")
+    patient_name: str = Field(..., description="Patient's full name")
+    phone: str = Field(..., description="Patient's phone number")
+    weekdays: str = Field(..., description="Days of the week for the sessions, e.g. 'mon,thu'")
+    sessions: int = Field(..., description="Total number of sessions (e.g. 12 for 2x/week over 6 weeks)")
+    time: Optional[str] = Field(None, description="Preferred time, e.g. '05:00 PM' (default: earliest free slot)")
+    start_date: Optional[str] = Field(None, description="First day in YYYY-MM-DD format (default: today)")
+    dry_run: bool = Field(False, description="Only propose the sessions without booking them")
+
+
+class BookSeriesTool(BaseTool):
+    name: str = "Book Appointment Series"
+    description: str = """
+    Book a recurring course of sessions (e.g. physical therapy twice a week for 6 weeks) in one step.
+    
+    Required parameters:
+    - doctor_name: Full doctor name (e.g., 'Dr. Emily Roberts')
+    - patient_name: Patient's full name
+    - phone: Patient's phone number
+    - weekdays: Days of the week, e.g. 'mon,thu'
+    - sessions: Total number of sessions
+    
+    Optional parameters:
+    - time: Preferred time (e.g., '05:00 PM')
+    - start_date: First day in YYYY-MM-DD format
+    - dry_run: True to only propose the sessions
+    
+    Taken slots fall back to the nearest free time, a later day that week, or an extra week.
+    Either every session is booked or none is.
+    """
+    args_schema: Type[BaseModel] = BookSeriesInput
+    
+    def _run(
+        self,
+        doctor_name: str,
+        patient_name: str,
+        phone: str,
+        weekdays: str,
+        sessions: int,
+        time: Optional[str] = None,
+        start_date: Optional[str] = None,
+        dry_run: bool = False
+    ) -> str:
+        """Book an appointment series"""
+        try:
+            success, message, _ = excel_manager.book_series(**self._arguments(
+                doctor_name, patient_name, phone, weekdays, sessions, time, start_date, dry_run
+            ))
+            return message
+        except Exception as e:
+            return f"Error booking appointment series: {str(e)}"
+    
+    async def _arun(
+        self,
+        doctor_name: str,
+        patient_name: str,
+        phone: str,
+        weekdays: str,
+        sessions: int,
+        time: Optional[str] = None,
+        start_date: Optional[str] = None,
+        dry_run: bool = False
+    ) -> str:
+        """Book an appointment series without blocking the event loop"""
+        try:
+            success, message, _ = await asyncio.to_thread(excel_manager.book_series, **self._arguments(
+                doctor_name, patient_name, phone, weekdays, sessions, time, start_date, dry_run
+            ))
+            return message
+        except Exception as e:
+            return f"Error booking appointment series: {str(e)}"
+    
+    @staticmethod
+    def _arguments(doctor_name, patient_name, phone, weekdays, sessions, time, start_date, dry_run) -> Dict[str, Any]:
+        from src.utils.slot_index import parse_weekdays
+        
+        return {
+            "doctor_name": doctor_name,
+            "patient_name": patient_name,
+            "phone": phone,
+            "weekdays": sorted(parse_weekdays(weekdays) or []),
+            "sessions": sessions,
+            "time": time,
+            "start_date": start_date,
+            "fallbacks": config.SERIES_FALLBACK,
+            "max_time_shift": config.SERIES_MAX_TIME_SHIFT,
+            "max_weeks": config.SERIES_MAX_WEEKS,
+            "dry_run": dry_run
+        }
 
 
 # ============================================================================
@@ -194,6 +355,20 @@ class CancelAppointmentTool(BaseTool):
             return message
         except Exception as e:
             return f"Error cancelling appointment: {str(e)}"
+    
+    async def _arun(self, doctor_name: str, patient_name: str, date: Optional[str] = None, time: Optional[str] = None) -> str:
+        """Cancel an appointment without blocking the event loop (the save invalidates cached schedule results)"""
+        try:
+            success, message = await asyncio.to_thread(
+                excel_manager.cancel_appointment,
+                doctor_name=doctor_name,
+                patient_name=patient_name,
+                date=date,
+                time=time
+            )
+            return message
+        except Exception as e:
+            return f"Error cancelling appointment: {str(e)}"
 
 
 # ============================================================================
@@ -205,6 +380,7 @@ class SearchAppointmentsInput(BaseModel):
     patient_name: Optional[str] = Field(None, description="Patient's full name")
     doctor_name: Optional[str] = Field(None, description="Doctor's full name")
     date: Optional[str] = Field(None, description="Date in YYYY-MM-DD format")
+    include_history: bool = Field(False, description="Also search archived past appointments")
 
 
 class SearchAppointmentsTool(BaseTool):
@@ -216,36 +392,186 @@ class SearchAppointmentsTool(BaseTool):
     - patient_name: Patient's full name
     - doctor_name: Doctor's full name
     - date: Specific date in YYYY-MM-DD format
+    - include_history: True to also search archived past appointments
     
     Returns a list of matching appointments.
     """
     args_schema: Type[BaseModel] = SearchAppointmentsInput
     
-    def _run(self, patient_name: Optional[str] = None, doctor_name: Optional[str] = None, date: Optional[str] = None) -> str:
+    def _run(
+        self,
+        patient_name: Optional[str] = None,
+        doctor_name: Optional[str] = None,
+        date: Optional[str] = None,
+        include_history: bool = False
+    ) -> str:
         """Search for appointments"""
         try:
-            appointments = excel_manager.search_appointments(
-                patient_name=patient_name,
-                doctor_name=doctor_name,
-                date=date
+            arguments = {"patient_name": patient_name, "doctor_name": doctor_name, "date": date, "include_history": include_history}
+            appointments = tool_results.get_or_compute(
+                self.name,
+                arguments,
+                lambda: excel_manager.search_appointments(**arguments),
+                version=excel_manager.file_version()
+            )
+            return self._format(appointments)
+        except Exception as e:
+            return f"Error searching appointments: {str(e)}"
+    
+    async def _arun(
+        self,
+        patient_name: Optional[str] = None,
+        doctor_name: Optional[str] = None,
+        date: Optional[str] = None,
+        include_history: bool = False
+    ) -> str:
+        """Search for appointments, reading the workbook off the event loop"""
+        try:
+            arguments = {"patient_name": patient_name, "doctor_name": doctor_name, "date": date, "include_history": include_history}
+            appointments = await tool_results.aget_or_compute(
+                self.name,
+                arguments,
+                lambda: asyncio.to_thread(excel_manager.search_appointments, **arguments),
+                version=excel_manager.file_version()
             )
-            
-            if not appointments:
-                return "No appointments found matching the criteria."
-            
-            # Format results
-            result = f"Found {len(appointments)} appointment(s):\n\n"
-            for appt in appointments:
-                result += f"👨‍⚕️ Doctor: {appt['doctor']}\n"
-                result += f"👤 Patient: {appt['patient_name']}\n"
-                result += f"📅 Date: {appt['date']}\n"
-                result += f"⏰ Time: {appt['time']}\n"
-                result += f"📞 Phone: {appt['phone']}\n"
-                result += f"Status: {appt['status']}\n\n"
-            
-            return result.strip()
+            return self._format(appointments)
         except Exception as e:
             return f"Error searching appointments: {str(e)}"
+    
+    @staticmethod
+    def _format(appointments: List[Dict]) -> str:
+        if not appointments:
+            return "No appointments found matching the criteria."
+        
+        # Format results
+        result = f"Found {len(appointments)} appointment(s):\n\n"
+        for appt in appointments:
+            result += f"👨‍⚕️ Doctor: {appt['doctor']}\n"
+            result += f"👤 Patient: {appt['patient_name']}\n"
+            result += f"📅 Date: {appt['date']}\n"
+            result += f"⏰ Time: {appt['time']}\n"
+            result += f"📞 Phone: {appt['phone']}\n"
+            result += f"Status: {appt['status']}\n\n"
+        
+        return result.strip()
+
+
+# ============================================================================
+# Recommend Slots Tool
+# ============================================================================
+
+class RecommendSlotsInput(BaseModel):
+    """Input schema for RecommendSlotsTool"""
+    doctor_names: Optional[List[str]] = Field(None, description="Full doctor names to consider (default: all doctors)")
+    start_date: Optional[str] = Field(None, description="First day in YYYY-MM-DD format (default: today)")
+    end_date: Optional[str] = Field(None, description="Last day in YYYY-MM-DD format, inclusive")
+    weekdays: Optional[str] = Field(None, description="Allowed days, e.g. 'mon-fri', 'weekends' or 'tue,thu'")
+    earliest: Optional[str] = Field(None, description="Earliest start time, e.g. '17:00'")
+    latest: Optional[str] = Field(None, description="Latest start time, e.g. '19:00'")
+    preferred_doctor: Optional[str] = Field(None, description="Full name of a doctor to rank first")
+    limit: int = Field(5, description="Number of slots to return")
+
+
+class RecommendSlotsTool(BaseTool):
+    name: str = "Recommend Appointment Slots"
+    description: str = """
+    Find the best available slots across doctors in one call, ranked soonest first.
+    
+    Parameters (all optional):
+    - doctor_names: Full doctor names to consider (default: all doctors)
+    - start_date / end_date: Date range in YYYY-MM-DD format
+    - weekdays: Allowed days, e.g. 'mon-fri', 'weekends' or 'tue,thu'
+    - earliest / latest: Start time window, e.g. '17:00' and '19:00'
+    - preferred_doctor: Doctor ranked ahead of the others
+    - limit: Number of slots to return (default: 5)
+    
+    Use this when the patient describes preferences rather than one doctor and date.
+    """
+    args_schema: Type[BaseModel] = RecommendSlotsInput
+    
+    def _run(
+        self,
+        doctor_names: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        weekdays: Optional[str] = None,
+        earliest: Optional[str] = None,
+        latest: Optional[str] = None,
+        preferred_doctor: Optional[str] = None,
+        limit: int = 5
+    ) -> str:
+        """Recommend slots"""
+        try:
+            arguments = self._arguments(doctor_names, start_date, end_date, weekdays, earliest, latest, preferred_doctor, limit)
+            slots = tool_results.get_or_compute(
+                self.name,
+                arguments,
+                lambda: excel_manager.recommend_slots(**self._call_arguments(arguments)),
+                version=excel_manager.availability_version()
+            )
+            return self._format(slots)
+        except Exception as e:
+            return f"Error recommending slots: {str(e)}"
+    
+    async def _arun(
+        self,
+        doctor_names: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        weekdays: Optional[str] = None,
+        earliest: Optional[str] = None,
+        latest: Optional[str] = None,
+        preferred_doctor: Optional[str] = None,
+        limit: int = 5
+    ) -> str:
+        """Recommend slots, querying the slot index off the event loop"""
+        try:
+            arguments = self._arguments(doctor_names, start_date, end_date, weekdays, earliest, latest, preferred_doctor, limit)
+            slots = await tool_results.aget_or_compute(
+                self.name,
+                arguments,
+                lambda: asyncio.to_thread(excel_manager.recommend_slots, **self._call_arguments(arguments)),
+                version=excel_manager.availability_version()
+            )
+            return self._format(slots)
+        except Exception as e:
+            return f"Error recommending slots: {str(e)}"
+    
+    @staticmethod
+    def _arguments(doctor_names, start_date, end_date, weekdays, earliest, latest, preferred_doctor, limit) -> Dict[str, Any]:
+        """Hashable cache arguments"""
+        return {
+            "doctors": tuple(doctor_names) if doctor_names else None,
+            "start_date": start_date,
+            "end_date": end_date,
+            "weekdays": weekdays,
+            "earliest": earliest,
+            "latest": latest,
+            "preferred_doctor": preferred_doctor,
+            "limit": limit
+        }
+    
+    @staticmethod
+    def _call_arguments(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        from src.utils.slot_index import parse_weekdays
+        
+        weekdays = parse_weekdays(arguments["weekdays"])
+        return {
+            **arguments,
+            "doctors": list(arguments["doctors"]) if arguments["doctors"] else None,
+            "weekdays": sorted(weekdays) if weekdays else None
+        }
+    
+    @staticmethod
+    def _format(slots: List[Dict]) -> str:
+        if not slots:
+            return "No available slots match these preferences."
+        
+        result = "Recommended slots:\n\n"
+        for i, slot in enumerate(slots, 1):
+            result += f"{i}. 👨‍⚕️ {slot['doctor']} - 📅 {slot['weekday']} {slot['date']} ⏰ {slot['time']}\n"
+        
+        return result.strip()
 
 
 # ============================================================================
@@ -268,24 +594,47 @@ class GetDoctorsTool(BaseTool):
     def _run(self) -> str:
         """Get all doctors"""
         try:
-            doctors = excel_manager.get_all_doctors()
-            
-            if not doctors:
-                return "No doctors found in the system."
-            
-            result = "Available Doctors:\n\n"
-            for i, doctor in enumerate(doctors, 1):
-                result += f"{i}. {doctor}\n"
-            
-            return result.strip()
+            doctors = tool_results.get_or_compute(
+                self.name,
+                {},
+                excel_manager.get_all_doctors,
+                version=excel_manager.file_version()
+            )
+            return self._format(doctors)
+        except Exception as e:
+            return f"Error getting doctors list: {str(e)}"
+    
+    async def _arun(self) -> str:
+        """Get all doctors without blocking the event loop"""
+        try:
+            doctors = await tool_results.aget_or_compute(
+                self.name,
+                {},
+                lambda: asyncio.to_thread(excel_manager.get_all_doctors),
+                version=excel_manager.file_version()
+            )
+            return self._format(doctors)
         except Exception as e:
             return f"Error getting doctors list: {str(e)}"
+    
+    @staticmethod
+    def _format(doctors: List[str]) -> str:
+        if not doctors:
+            return "No doctors found in the system."
+        
+        result = "Available Doctors:\n\n"
+        for i, doctor in enumerate(doctors, 1):
+            result += f"{i}. {doctor}\n"
+        
+        return result.strip()
 
 
 # Export all tools
 knowledge_search_tool = KnowledgeSearchTool()
 available_slots_tool = AvailableSlotsTool()
 book_appointment_tool = BookAppointmentTool()
+book_series_tool = BookSeriesTool()
 cancel_appointment_tool = CancelAppointmentTool()
 search_appointments_tool = SearchAppointmentsTool()
+recommend_slots_tool = RecommendSlotsTool()
 get_doctors_tool = GetDoctorsTool()
@@ -1,8 +1,67 @@
 """
 Utilities package for Medical Center AI Chatbot
 """
+import importlib
+
 from .config import config
-from .excel_manager import ExcelDBManager
-from .vector_db_manager import VectorDBManager, OllamaEmbeddings
+from .services import services, ServiceRegistry, LazyService
+from .singleflight import SingleFlight, singleflight_stats
+from .tool_cache import ToolResultCache, tool_results
+from .metrics import render_metrics, METRICS_CONTENT_TYPE
+from .admission import (
+    AdmissionController,
+    AsyncAdmissionController,
+    AdmissionRejected,
+    RateLimiter,
+    PRIORITY_HIGH,
+    PRIORITY_NORMAL
+)
+from .llm_client import (
+    ResilientLLMClient,
+    AsyncResilientLLMClient,
+    LLMUnavailableError,
+    LLMHTTPError
+)
+
+__all__ = [
+    'config',
+    'ExcelDBManager',
+    'VectorDBManager',
+    'OllamaEmbeddings',
+    'services',
+    'ServiceRegistry',
+    'LazyService',
+    'ResilientLLMClient',
+    'AsyncResilientLLMClient',
+    'LLMUnavailableError',
+    'LLMHTTPError',
+    'SingleFlight',
+    'singleflight_stats',
+    'ToolResultCache',
+    'tool_results',
+    'AdmissionController',
+    'AsyncAdmissionController',
+    'AdmissionRejected',
+    'RateLimiter',
+    'PRIORITY_HIGH',
+    'PRIORITY_NORMAL',
+    'render_metrics',
+    'METRICS_CONTENT_TYPE'
+]
+
+
+# Heavy modules (pandas, qdrant-client) are imported on first use, keeping `import src.utils` cheap
+_LAZY_EXPORTS = {
+    'ExcelDBManager': '.excel_manager',
+    'VectorDBManager': '.vector_db_manager',
+    'OllamaEmbeddings': '.vector_db_manager'
+}
+
 
-__all__ = ['config', 'ExcelDBManager', 'VectorDBManager', 'OllamaEmbeddings']
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,259 @@
+"""
+Admission Control
+Bounded concurrency with a priority queue and deadline, plus per-key token-bucket rate limiting
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Tuple
+
+
+# Queue priorities (lower is served first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued or admitted"""
+    
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _AdmissionBase:
+    """Counters and Retry-After estimation shared by both controllers"""
+    
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float, max_high_queue: int):
+        """
+        Args:
+            max_concurrent: Requests processed at the same time
+            max_queue: Normal-priority requests allowed to wait for a slot
+            queue_timeout: Seconds a request may wait before it is shed
+            max_high_queue: High-priority requests allowed to wait (a separate, small cap)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_high_queue = max_high_queue
+        
+        self.in_flight = 0
+        self._waiters = []  # heap of (priority, seq, waiter)
+        self._seq = itertools.count()
+        self._service_time = 1.0  # EWMA of seconds per admitted request
+        
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+    
+    def _queue_full(self, priority: int) -> bool:
+        """True if the queue of this priority class has no room left"""
+        high_waiting = sum(1 for p, _, _ in self._waiters if p == PRIORITY_HIGH)
+        if priority == PRIORITY_HIGH:
+            return high_waiting >= self.max_high_queue
+        return len(self._waiters) - high_waiting >= self.max_queue
+    
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free, from queue depth and recent service time"""
+        backlog = (len(self._waiters) + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(self._service_time * backlog))
+    
+    def _record_service(self, seconds: float):
+        self._service_time = 0.8 * self._service_time + 0.2 * seconds
+    
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        return AdmissionRejected(reason, self._retry_after())
+    
+    def stats(self) -> Dict[str, float]:
+        """Get admission counters"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected["queue_full"],
+            "rejected_timeout": self.rejected["timeout"],
+            "avg_service_seconds": round(self._service_time, 3)
+        }
+
+
+class AdmissionController(_AdmissionBase):
+    """
+    Thread-based admission controller for the WSGI app
+    
+    At most max_concurrent requests run; others wait in a priority queue for at
+    most queue_timeout seconds. High-priority requests (completing a booking)
+    are served ahead of normal ones and have their own, smaller queue, so they
+    are not refused when normal traffic fills the main queue but cannot grow
+    without bound either. A request that finds its queue full is rejected
+    immediately.
+    """
+    
+    def __init__(self, max_concurrent: int = 16, max_queue: int = 64, queue_timeout: float = 5.0, max_high_queue: int = 8):
+        super().__init__(max_concurrent, max_queue, queue_timeout, max_high_queue)
+        self._cond = threading.Condition()
+    
+    @contextmanager
+    def admit(self, priority: int = PRIORITY_NORMAL):
+        """
+        Hold a processing slot for the duration of the block
+        
+        Raises:
+            AdmissionRejected: if the queue is full or the deadline passes
+        """
+        self._acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._record_service(time.monotonic() - started)
+                self._cond.notify_all()
+    
+    def _acquire(self, priority: int):
+        with self._cond:
+            if self.in_flight < self.max_concurrent and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+            
+            if self._queue_full(priority):
+                raise self._reject("queue_full")
+            
+            entry = (priority, next(self._seq), None)
+            heapq.heappush(self._waiters, entry)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                # Proceed only when a slot is free and this entry is first in line
+                while not (self.in_flight < self.max_concurrent and self._waiters[0] is entry):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("timeout")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # The next waiter may now be first in line
+                self._cond.notify_all()
+            
+            self.in_flight += 1
+            self.admitted += 1
+
+
+class AsyncAdmissionController(_AdmissionBase):
+    """asyncio counterpart of AdmissionController for the ASGI app (single event loop)"""
+    
+    def __init__(self, max_concurrent: int = 256, max_queue: int = 1024, queue_timeout: float = 5.0, max_high_queue: int = 32):
+        super().__init__(max_concurrent, max_queue, queue_timeout, max_high_queue)
+    
+    @asynccontextmanager
+    async def admit(self, priority: int = PRIORITY_NORMAL):
+        """Async variant of AdmissionController.admit()"""
+        await self._acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._record_service(time.monotonic() - started)
+            self._wake_next()
+    
+    async def _acquire(self, priority: int):
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        
+        if self._queue_full(priority):
+            raise self._reject("queue_full")
+        
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        self._wake_next()
+        try:
+            # The slot is handed over by _wake_next(), which also counts it
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Handed a slot just as we timed out or were cancelled: give it back
+                self.in_flight -= 1
+                self.admitted -= 1
+                self._wake_next()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("timeout")
+            raise
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+    
+    def _wake_next(self):
+        """Hand free slots to the first waiters in priority order"""
+        while self._waiters and self.in_flight < self.max_concurrent:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            self.admitted += 1
+            future.set_result(True)
+
+
+class RateLimiter:
+    """
+    Per-key token buckets (one per chat session or client address)
+    
+    Each key earns `rate` tokens per second up to `burst`; a request spends one.
+    Idle buckets are evicted LRU beyond max_keys, which only ever forgives.
+    """
+    
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        """
+        Args:
+            rate: Tokens refilled per second
+            burst: Bucket capacity (requests allowed back to back)
+            max_keys: Buckets kept in memory
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+        self.limited = 0
+    
+    def allow(self, key: str) -> Tuple[bool, int]:
+        """
+        Spend one token for key
+        
+        Returns:
+            Tuple of (allowed, seconds until the next token when not allowed)
+        """
+        if self.rate <= 0:
+            return True, 0
+        
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            else:
+                self.limited += 1
+            
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        
+        if allowed:
+            return True, 0
+        return False, max(1, math.ceil((1.0 - tokens) / self.rate))
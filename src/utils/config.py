@@ -3,7 +3,9 @@ Configuration loader for Medical Center AI Chatbot
 Loads and validates all environment variables
 """
 import os
+import threading
 from pathlib import Path
+from typing import Dict, List
 from dotenv import load_dotenv
 
 
@@ -16,10 +18,23 @@ class Config:
         env_path = Path(__file__).parent.parent.parent / ".env"
         load_dotenv(env_path)
         
+        # LLM Provider Selection (gemini, openai or mock)
+        self.LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+        
         # Google Gemini Configuration (for LLM)
         self.GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
         self.GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
-        self.GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+        self.GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+        
+        # OpenAI-Compatible Configuration (local llama.cpp / Ollama server)
+        self.OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "http://localhost:11434/v1")
+        self.OPENAI_MODEL = os.getenv("OPENAI_MODEL", "llama3.1:8b")
+        self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+        
+        # Mock LLM Configuration (load testing)
+        self.MOCK_LLM_SCRIPT = os.getenv("MOCK_LLM_SCRIPT")
+        self.MOCK_LLM_LATENCY = os.getenv("MOCK_LLM_LATENCY", "fixed:0")
+        self.MOCK_LLM_SEED = int(os.getenv("MOCK_LLM_SEED")) if os.getenv("MOCK_LLM_SEED") else None
         
         # Ollama Configuration (for Embeddings - Local, Free)
         self.OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
@@ -28,6 +43,20 @@ class Config:
         # Common settings
         self.LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
         
+        # LLM Resilience Settings
+        self.LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+        self.LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "60"))
+        self.LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+        self.LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+        self.LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "True").lower() == "true"
+        self.LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+        self.LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.LLM_ASYNC_MAX_CONCURRENCY = int(os.getenv("LLM_ASYNC_MAX_CONCURRENCY", "256"))
+        self.LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "2"))
+        self.LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+        self.LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+        
         # Qdrant Configuration
         self.QDRANT_URL = os.getenv("QDRANT_URL")
         self.QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
@@ -48,14 +77,67 @@ class Config:
         self.RAG_RETRIEVAL_K = int(os.getenv("RAG_RETRIEVAL_K", "5"))
         self.RAG_SCORE_THRESHOLD = float(os.getenv("RAG_SCORE_THRESHOLD", "0.3"))
         
+        # Indexing Settings
+        self.CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+        self.CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
+        self.PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", "data/.text_cache")
+        
         # Crew AI Settings
         self.CREW_VERBOSE = os.getenv("CREW_VERBOSE", "False").lower() == "true"
         self.MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "3"))
         
+        # Conversation Memory Settings (estimated tokens)
+        self.MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "2000"))
+        self.MEMORY_MAX_MESSAGE_TOKENS = int(os.getenv("MEMORY_MAX_MESSAGE_TOKENS", "500"))
+        self.MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+        
+        # Session Store Settings
+        self.SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+        self.REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.SESSION_KEY_PREFIX = os.getenv("SESSION_KEY_PREFIX", "chatbot:")
+        self.SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))
+        self.SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+        self.SESSION_IO_WORKERS = int(os.getenv("SESSION_IO_WORKERS", "8"))
+        
+        # Admission Control Settings (/api/chat)
+        self.ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+        self.ADMISSION_ASYNC_MAX_CONCURRENT = int(os.getenv("ADMISSION_ASYNC_MAX_CONCURRENT", "256"))
+        self.ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+        self.ADMISSION_MAX_HIGH_QUEUE = int(os.getenv("ADMISSION_MAX_HIGH_QUEUE", "8"))
+        self.ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+        self.RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "20"))
+        self.RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+        self.RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "120"))
+        self.RATE_LIMIT_IP_BURST = int(os.getenv("RATE_LIMIT_IP_BURST", "20"))
+        self.TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+        
+        # Tracing Settings (OTLP/JSON lines file)
+        self.TRACING_ENABLED = os.getenv("TRACING_ENABLED", "False").lower() == "true"
+        self.TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces/traces.jsonl")
+        self.TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        self.TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "medical-center-chatbot")
+        
+        # Agent Loop Settings
+        self.AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "3"))
+        self.TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "4"))
+        self.TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))
+        self.TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+        self.LLM_STREAMING = os.getenv("LLM_STREAMING", "True").lower() == "true"
+        
         # Flask Configuration
         self.FLASK_HOST = os.getenv("FLASK_HOST", "0.0.0.0")
         self.FLASK_PORT = int(os.getenv("FLASK_PORT", "5000"))
-        self.FLASK_DEBUG = os.getenv("FLASK_DEBUG", "True").lower() == "true"
+        self.FLASK_DEBUG = os.getenv("FLASK_DEBUG", "False").lower() == "true"
+        self.FLASK_SECRET_KEY = os.getenv("FLASK_SECRET_KEY", "")
+        self.FLASK_SECRET_KEY_FILE = os.getenv("FLASK_SECRET_KEY_FILE", ".flask_secret_key")
+        self.STAFF_API_TOKEN = os.getenv("STAFF_API_TOKEN", "")
+        
+        # Production Server (gunicorn.conf.py)
+        self.GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", "0"))
+        self.GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "8"))
+        self.GUNICORN_WORKER_CLASS = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+        self.GUNICORN_TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", "180"))
         
         # Business Hours
         self.WEEKDAY_HOURS = os.getenv("WEEKDAY_HOURS", "Monday-Friday: 7:00 AM - 7:00 PM")
@@ -66,6 +148,18 @@ class Config:
         self.APPOINTMENT_DURATION = int(os.getenv("APPOINTMENT_DURATION", "30"))
         self.MAX_ADVANCE_BOOKING_DAYS = int(os.getenv("MAX_ADVANCE_BOOKING_DAYS", "30"))
         self.CANCELLATION_NOTICE_HOURS = int(os.getenv("CANCELLATION_NOTICE_HOURS", "24"))
+        self.RECOMMEND_SLOTS_LIMIT = int(os.getenv("RECOMMEND_SLOTS_LIMIT", "5"))
+        self.SERIES_FALLBACK = [rule.strip() for rule in os.getenv("SERIES_FALLBACK", "nearest_time,next_day,skip").split(",") if rule.strip()]
+        self.SERIES_MAX_TIME_SHIFT = int(os.getenv("SERIES_MAX_TIME_SHIFT", "120"))
+        self.SERIES_MAX_WEEKS = int(os.getenv("SERIES_MAX_WEEKS", "26"))
+        self.SLOT_HOLD_TTL = float(os.getenv("SLOT_HOLD_TTL", "300"))
+        self.SCHEDULE_HORIZON_DAYS = int(os.getenv("SCHEDULE_HORIZON_DAYS", "200"))
+        self.ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "90"))
+        self.ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "0"))
+        self.WAITLIST_POLICY = os.getenv("WAITLIST_POLICY", "offer")
+        self.WAITLIST_OFFER_TTL = float(os.getenv("WAITLIST_OFFER_TTL", "3600"))
+        self.WAITLIST_MAX_DAYS = int(os.getenv("WAITLIST_MAX_DAYS", "30"))
+        self.DOCTOR_SPECIALTIES = self._parse_specialties(os.getenv("DOCTOR_SPECIALTIES", ""))
         
         # Validate required configurations
         self._validate()
@@ -75,9 +169,12 @@ class Config:
         required_fields = [
             ("QDRANT_URL", self.QDRANT_URL),
             ("QDRANT_API_KEY", self.QDRANT_API_KEY),
-            ("GEMINI_API_KEY", self.GEMINI_API_KEY),
         ]
         
+        # Only the selected LLM provider needs credentials
+        if self.LLM_PROVIDER == "gemini":
+            required_fields.append(("GEMINI_API_KEY", self.GEMINI_API_KEY))
+        
         missing_fields = [field for field, value in required_fields if not value]
         
         if missing_fields:
@@ -85,6 +182,16 @@ class Config:
                 f"Missing required environment variables: {', '.join(missing_fields)}"
             )
     
+    @staticmethod
+    def _parse_specialties(value: str) -> Dict[str, List[str]]:
+        """Parse 'Dr. A=Physical Therapy|Sports Injuries;Dr. B=Orthopedics' into {doctor: [specialty, ...]}"""
+        specialties = {}
+        for entry in value.split(';'):
+            doctor, _, names = entry.partition('=')
+            if doctor.strip() and names.strip():
+                specialties[doctor.strip()] = [name.strip() for name in names.split('|') if name.strip()]
+        return specialties
+    
     def get_business_hours_info(self) -> str:
         """Get formatted business hours information"""
         return f"""
@@ -100,5 +207,42 @@ Physical Therapy Department:
         """.strip()
 
 
-# Global configuration instance
-config = Config()
\ No newline at end of file
+class LazyConfig:
+    """
+    Global config that loads .env and validates on first attribute access
+    
+    Importing a module that uses config is then free of side effects, and a
+    missing variable is reported where the setting is first needed.
+    """
+    
+    def __init__(self):
+        object.__setattr__(self, "_config", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+    
+    def _load(self) -> Config:
+        loaded = self._config
+        if loaded is None:
+            with self._lock:
+                if self._config is None:
+                    object.__setattr__(self, "_config", Config())
+                loaded = self._config
+        return loaded
+    
+    def reload(self) -> Config:
+        """Re-read the environment (e.g. after a test changed os.environ)"""
+        with self._lock:
+            object.__setattr__(self, "_config", Config())
+            return self._config
+    
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+    
+    def __setattr__(self, name: str, value):
+        setattr(self._load(), name, value)
+    
+    def __repr__(self) -> str:
+        return f"<LazyConfig {'loaded' if self._config is not None else 'not loaded'}>"
+
+
+# Global configuration instance (loaded on first use)
+config = LazyConfig()
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Doctor Index
+Fuzzy lookup of doctor names by token, trigram and transliteration-aware phonetic keys, with ranked candidates
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from .metrics import Counter
+
+
+DOCTOR_LOOKUPS = Counter(
+    "chatbot_doctor_lookups_total",
+    "Doctor name lookups by outcome (matched, ambiguous, not_found)",
+    ["result"]
+)
+
+# Words that are not part of a name ("Dr. Sarah", "د. أحمد")
+TITLES = {
+    "dr", "doctor", "doc", "prof", "professor", "mr", "mrs", "ms", "miss",
+    "د", "دكتور", "دكتورة", "الدكتور", "الدكتورة", "أ", "استاذ", "أستاذ"
+}
+
+# Arabic letters spelled the way Egyptian names are usually written in English
+ARABIC_TO_LATIN = {
+    "ا": "a", "أ": "a", "إ": "i", "آ": "a", "ء": "", "ئ": "e", "ؤ": "o",
+    "ب": "b", "ت": "t", "ث": "th", "ج": "g", "ح": "h", "خ": "kh", "د": "d",
+    "ذ": "z", "ر": "r", "ز": "z", "س": "s", "ش": "sh", "ص": "s", "ض": "d",
+    "ط": "t", "ظ": "z", "ع": "a", "غ": "gh", "ف": "f", "ق": "k", "ك": "k",
+    "ل": "l", "م": "m", "ن": "n", "ه": "h", "و": "ou", "ي": "y", "ى": "a",
+    "ة": "a", "ـ": ""
+}
+
+# Spelling variants that sound the same, applied before vowels are dropped:
+# Khaled/Khalid, Qassem/Kassem, Gamal/Jamal, Shady/Chady, Youssef/Yousef
+SOUND_RULES = [
+    (re.compile(r"kh"), "K"),
+    (re.compile(r"(sh|ch)"), "S"),
+    (re.compile(r"gh"), "G"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"th"), "t"),
+    (re.compile(r"dh"), "z"),
+    (re.compile(r"(ck|q|c)"), "k"),
+    (re.compile(r"j"), "g"),
+    (re.compile(r"(?<=[aeiouy])h$"), "")  # Sarah/Sara, Fatmah/Fatma
+]
+
+# Article and "servant of" prefixes written together or apart:
+# El-Sayed/Elsayed/Al Sayed, Abdel Rahman/Abdulrahman/Abd El-Rahman
+PREFIX_RULES = [
+    (re.compile(r"\babd\s*(?:e|a|u)?l\s+"), "abdel"),
+    (re.compile(r"\babd\s+(?:e|a)l"), "abdel"),
+    (re.compile(r"\babd(?:a|u)l"), "abdel"),
+    (re.compile(r"\b(?:el|al)[\s-]+(?=\w{3})"), "el"),
+    (re.compile(r"\bal(?=\w{3})"), "el")
+]
+
+# Joined prefixes whose remainder is also indexed, so "Rahman" finds "Abdel Rahman"
+JOINED_PREFIXES = ("abdel", "el")
+
+VOWELS = set("aeiouyw")
+
+
+def _fold(text: str) -> str:
+    """Lowercase, strip accents and spell Arabic letters in Latin"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = "".join(ARABIC_TO_LATIN.get(char, char) for char in text)
+    for pattern, replacement in PREFIX_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def name_tokens(name: str) -> List[str]:
+    """Words of a name without titles, folded ('Dr. Abd El-Rahman' -> ['abdelrahman'])"""
+    words = [word for word in re.split(r"[^\w]+", name.lower()) if word and word not in TITLES]
+    return [token for token in re.split(r"[^\w]+", _fold(" ".join(words))) if token and token not in TITLES]
+
+
+def phonetic_key(token: str) -> str:
+    """
+    Transliteration-insensitive key of one word
+    
+    Sound-alike spellings are merged, a leading vowel becomes 'a' and later
+    vowels are dropped, so Ahmed/Ahmad, Mohamed/Muhammad, Hassan/Hasan,
+    Mostafa/Mustafa and Omar/Umar share a key.
+    """
+    if token.isdigit():
+        return token
+    for pattern, replacement in SOUND_RULES:
+        token = pattern.sub(replacement, token)
+    if not token:
+        return ""
+    first = "a" if token[0] in VOWELS - {"y", "w"} else token[0]
+    key = first
+    for char in token[1:]:
+        if char not in VOWELS and char != key[-1]:
+            key += char
+    return key
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def _edit_similarity(first: str, second: str) -> float:
+    """1 - (Damerau-Levenshtein distance / longer length)"""
+    if first == second:
+        return 1.0
+    previous_row = None
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        before, previous_row, row = previous_row, row, [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = 0 if first[i - 1] == second[j - 1] else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                row[j] = min(row[j], before[j - 2] + 1)
+    return 1.0 - row[-1] / max(len(first), len(second))
+
+
+class DoctorNameIndex:
+    """
+    Doctor names indexed for fuzzy lookup
+    
+    Every distinct name word is keyed three ways: the folded word, its
+    phonetic key and its trigrams, and lists the doctors whose name has it.
+    A lookup scores each query word only against the name words sharing a
+    key with it, then adds the scores up per doctor through those lists, so
+    its cost depends on how many names look alike rather than on how many
+    doctors there are.
+    
+    A query word scores 1.0 against an equal name word, 0.9 when it sounds
+    the same, 0.85 when it starts the name word and otherwise its spelling
+    similarity (trigram overlap or edit distance, at most 0.8). A doctor's
+    score is the mean over the query words of their best match in the name.
+    Doctors whose names sound like every query word are told apart by
+    spelling only, so resolve() treats them as equally likely.
+    """
+    
+    def __init__(self, doctors: Iterable[str], min_score: float = 0.6, suggest_score: float = 0.4, margin: float = 0.08):
+        """
+        Args:
+            doctors: Doctor names as used in the workbook
+            min_score: Lowest score accepted as a match
+            suggest_score: Lowest score offered as a "did you mean" suggestion
+            margin: Candidates scoring within margin of the best make a lookup ambiguous
+        """
+        self.doctors = list(dict.fromkeys(doctors))
+        self.min_score = min_score
+        self.suggest_score = suggest_score
+        self.margin = margin
+        
+        self._words = {}  # name word -> (phonetic key, trigrams, {doctor number})
+        self._word_counts = []  # doctor number -> words in the name
+        self._keys = {}  # doctor -> phonetic keys of its name words
+        self._exact = {}  # tuple of name words -> doctor number
+        self._by_phonetic = {}  # phonetic key -> {name word}
+        self._by_trigram = {}  # trigram -> {name word}
+        for number, doctor in enumerate(self.doctors):
+            tokens = name_tokens(doctor)
+            self._exact.setdefault(tuple(tokens), number)
+            self._word_counts.append(len(tokens))
+            words = list(tokens)
+            for token in tokens:
+                for prefix in JOINED_PREFIXES:
+                    if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+                        words.append(token[len(prefix):])
+            for token in words:
+                if token not in self._words:
+                    key = phonetic_key(token)
+                    grams = trigrams(token)
+                    self._words[token] = (key, grams, set())
+                    self._by_phonetic.setdefault(key, set()).add(token)
+                    for gram in grams:
+                        self._by_trigram.setdefault(gram, set()).add(token)
+                self._words[token][2].add(number)
+            self._keys.setdefault(doctor, set()).update(self._words[token][0] for token in words)
+    
+    def __len__(self) -> int:
+        return len(self.doctors)
+    
+    def _word_scores(self, token: str) -> Dict[str, float]:
+        """Name words resembling one query word, with their scores"""
+        key = phonetic_key(token)
+        grams = trigrams(token)
+        scores = {}
+        if token in self._words:
+            scores[token] = 1.0
+        for word in self._by_phonetic.get(key, ()):
+            scores.setdefault(word, 0.9)
+        
+        # Spelling similarity only for words sharing enough trigrams
+        shared = {}
+        for gram in grams:
+            for word in self._by_trigram.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        for word, count in shared.items():
+            if word in scores:
+                continue
+            if len(token) >= 3 and word.startswith(token):
+                scores[word] = 0.85
+                continue
+            word_grams = self._words[word][1]
+            similarity = 2 * count / (len(grams) + len(word_grams))
+            # Edit distance catches transposed letters, but only for close spellings
+            if similarity >= 0.3 and abs(len(token) - len(word)) <= 2:
+                similarity = max(similarity, _edit_similarity(token, word))
+            if similarity >= self.suggest_score:
+                scores[word] = min(0.8, similarity)
+        return scores
+    
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Doctors matching a partial, misspelled or transliterated name, best first
+        
+        Args:
+            query: Name as the patient wrote it ("sarah", "dr mohammed", "أحمد حسن")
+            limit: Candidates to return
+        
+        Returns:
+            List of (doctor, score) with score in [0, 1], at least suggest_score
+        """
+        tokens = name_tokens(query)
+        if not tokens:
+            return []
+        exact = self._exact.get(tuple(tokens))
+        if exact is not None:
+            return [(self.doctors[exact], 1.0)]
+        
+        best = {}  # doctor number -> [best score per query word]
+        for position, token in enumerate(tokens):
+            for word, score in self._word_scores(token).items():
+                for number in self._words[word][2]:
+                    scores = best.setdefault(number, [0.0] * len(tokens))
+                    if score > scores[position]:
+                        scores[position] = score
+        
+        scored = []
+        for number, scores in best.items():
+            score = sum(scores) / len(tokens)
+            if score >= self.suggest_score:
+                # Ties go to the name with fewer unmatched words, then alphabetically
+                scored.append((-round(score, 3), self._word_counts[number], self.doctors[number]))
+        scored.sort()
+        return [(doctor, -negative_score) for negative_score, _, doctor in scored[:limit]]
+    
+    def resolve(self, query: str, limit: int = 5) -> Dict[str, Any]:
+        """
+        The one doctor a name refers to, or why there is none
+        
+        Returns:
+            {"status": "matched" | "ambiguous" | "not_found", "doctor": name or None,
+             "candidates": [(doctor, score), ...]} - for "ambiguous" the doctors
+            within margin of the best or sounding as much like the query ("sarah"
+            for Dr. Sarah Martinez and Dr. Sara Lee), for "not_found" suggestions
+            (possibly none)
+        """
+        candidates = self.search(query, limit=limit)
+        if not candidates or candidates[0][1] < self.min_score:
+            return {"status": "not_found", "doctor": None, "candidates": candidates}
+        
+        best = candidates[0][1]
+        query_keys = {phonetic_key(token) for token in name_tokens(query)}
+        sounds_alike = query_keys <= self._keys[candidates[0][0]]
+        close = [
+            candidate for candidate in candidates
+            if best - candidate[1] < self.margin or (sounds_alike and query_keys <= self._keys[candidate[0]])
+        ]
+        if len(close) > 1:
+            return {"status": "ambiguous", "doctor": None, "candidates": close}
+        return {"status": "matched", "doctor": candidates[0][0], "candidates": candidates}
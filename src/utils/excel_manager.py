@@ -2,19 +2,73 @@
 Excel Database Manager
 Handles all appointment operations: viewing, booking, and canceling
 """
+import os
+import threading
 import pandas as pd
+from contextlib import contextmanager
+from copy import copy
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Optional, Sequence, Set, Tuple
 import openpyxl
 from openpyxl.styles import Font, PatternFill
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: writes are serialized within the process only
+
+from .singleflight import SingleFlight
+from .metrics import STAGE_SECONDS, CACHE_REQUESTS
+from .tracing import span, traced, set_attribute
+from .tool_cache import invalidate_tool_results, SCHEDULE
+from .slot_index import SlotIndex, time_to_minutes
+from .series_planner import plan_series, describe_session, FALLBACK_RULES
+from .slot_holds import SlotHolds, slot_start
+from .waitlist import Waitlist, POLICIES, POLICY_AUTO_BOOK
+from .doctor_index import DoctorNameIndex, DOCTOR_LOOKUPS
+from .schedule_archive import ScheduleArchive, ARCHIVED_ROWS, month_of
+from .schedule_rules import ScheduleTemplates, Deviations, RULES_SHEET, EXCEPTIONS_SHEET, days_between, slot_label
+
+
+# Identical concurrent reads of the same workbook version share one computation
+read_flight = SingleFlight("excel_reads")
+
+# Sheets that are not a doctor's schedule
+NON_DOCTOR_SHEETS = {'Patients', RULES_SHEET, EXCEPTIONS_SHEET}
+
 
 class ExcelDBManager:
     """Manages the Excel database for appointments"""
     
-    def __init__(self, excel_path: str):
-        """Initialize Excel DB Manager"""
+    def __init__(
+        self,
+        excel_path: str,
+        hold_ttl: float = 300.0,
+        waitlist_policy: str = "offer",
+        waitlist_offer_ttl: float = 3600.0,
+        waitlist_max_days: int = 30,
+        slot_minutes: int = 30,
+        template_horizon_days: int = 200,
+        archive_retention_days: int = 90,
+        holds=None
+    ):
+        """
+        Initialize Excel DB Manager
+        
+        Args:
+            excel_path: Path of the clinic workbook
+            hold_ttl: Seconds a conversation may hold a slot before booking it (0 disables holds)
+            waitlist_policy: What a cancellation does for the first matching waiter:
+                "offer" holds the slot for them, "auto_book" books it for them
+            waitlist_offer_ttl: Seconds an offered slot stays held for the waiter
+            waitlist_max_days: Longest date window a patient may wait for
+            slot_minutes: Slot length of schedule rules that do not set their own
+            template_horizon_days: Days ahead that slots are generated for templated doctors
+            archive_retention_days: Days past reservations stay in the workbook before archival
+            holds: Hold registry shared with other workers (e.g. RedisSlotHolds);
+                by default this process keeps its own, with hold_ttl
+        """
         self.excel_path = Path(excel_path)
         if not self.excel_path.exists():
             raise FileNotFoundError(f"Excel database not found at: {excel_path}")
@@ -23,13 +77,274 @@ class ExcelDBManager:
         self.excel_file = pd.ExcelFile(self.excel_path)
         self.sheet_names = self.excel_file.sheet_names
         
-        # Doctor names (all sheets except 'Patients')
-        self.doctor_sheets = [name for name in self.sheet_names if name != 'Patients']
+        # Doctor names (all sheets except 'Patients' and the schedule templates)
+        self.doctor_sheets = [name for name in self.sheet_names if name not in NON_DOCTOR_SHEETS]
+        
+        # Fuzzy lookup of the doctor a patient means ("dr sarah", "Ahmad Hasan", "أحمد")
+        self.doctor_index = DoctorNameIndex(self.doctor_sheets)
+        
+        # Parsed copy of every sheet, reused until the file changes
+        self._snapshot = None
+        self._snapshot_key = None
+        self._snapshot_lock = threading.Lock()
+        
+        # Free-slot index of the current snapshot, rebuilt after writes
+        self._slot_index = None
+        self._slot_index_source = None
+        self._slot_index_lock = threading.Lock()
+        
+        # Schedule rules of the current snapshot; templated doctors' sheets hold only deviations
+        self.slot_minutes = slot_minutes
+        self.template_horizon_days = template_horizon_days
+        self._templates = None
+        self._deviations = {}
+        self._templates_source = None
+        self._templates_lock = threading.Lock()
+        
+        # Writers load, modify and rewrite the whole file, so they take turns
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._lock_file = None
+        
+        # Slots kept for conversations that are still collecting patient details
+        self.holds = holds if holds is not None else SlotHolds(ttl=hold_ttl)
+        
+        # Patients waiting for a slot to free up; cancellations fill from it
+        if waitlist_policy not in POLICIES:
+            raise ValueError(f"Unknown waitlist policy: {waitlist_policy} (use one of {', '.join(POLICIES)})")
+        self.waitlist = Waitlist(f"{self.excel_path}.waitlist.json", max_days=waitlist_max_days)
+        self.waitlist_policy = waitlist_policy
+        self.waitlist_offer_ttl = waitlist_offer_ttl
+        
+        # Past rows moved out of the workbook, one partition per month
+        self.archive = ScheduleArchive(f"{self.excel_path}.archive")
+        self.archive_retention_days = archive_retention_days
+    
+    def load_snapshot(self) -> Dict[str, pd.DataFrame]:
+        """
+        Get all sheets as DataFrames, re-reading the workbook only when it changed
+        
+        The snapshot is keyed by the file's modification time and size, so edits
+        made by other processes are picked up. Returned frames are shared and
+        must be treated as read-only.
+        """
+        stat = self.excel_path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._snapshot_lock:
+            if self._snapshot is None or self._snapshot_key != key:
+                CACHE_REQUESTS.inc("workbook_snapshot", "miss")
+                set_attribute("workbook.snapshot_hit", False)
+                with STAGE_SECONDS.time("workbook_load"), span("ExcelDBManager.load_snapshot") as load_span:
+                    self._snapshot = pd.read_excel(self.excel_path, sheet_name=None)
+                    load_span.set_attribute("workbook.sheets", len(self._snapshot))
+                self._snapshot_key = key
+            else:
+                CACHE_REQUESTS.inc("workbook_snapshot", "hit")
+                set_attribute("workbook.snapshot_hit", True)
+            return self._snapshot
+    
+    def _read_sheet(self, sheet_name: str) -> pd.DataFrame:
+        """Read one sheet from the workbook snapshot (read-only)"""
+        return self.load_snapshot()[sheet_name]
+    
+    def file_version(self) -> Tuple[int, int]:
+        """Modification time and size of the workbook, which change with every save"""
+        stat = self.excel_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def availability_version(self) -> Tuple:
+        """file_version() plus the slot holds' and waitlist's versions: changes whenever the free slots shown could"""
+        return self.file_version() + (self.holds.version, self.waitlist.version())
+    
+    def _flight_key(self, method: str, *args) -> tuple:
+        """Coalescing key; includes the file version so reads never join a pre-write read"""
+        return (str(self.excel_path),) + self.file_version() + (method,) + args
+    
+    def _invalidate_snapshot(self):
+        """Drop the snapshot and cached tool results after a write (mtime resolution may hide quick edits)"""
+        with self._snapshot_lock:
+            self._snapshot = None
+        invalidate_tool_results(SCHEDULE)
+    
+    @contextmanager
+    def _writing(self):
+        """
+        Hold the workbook write lock (reentrant)
+        
+        A thread lock serializes writers in this process; an flock on a
+        sidecar '<workbook>.lock' file serializes gunicorn workers and CLI
+        scripts sharing the workbook.
+        """
+        with self._write_lock:
+            self._write_depth += 1
+            try:
+                if self._write_depth == 1 and fcntl is not None:
+                    self._lock_file = open(f"{self.excel_path}.lock", 'a')
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                yield
+            finally:
+                if self._write_depth == 1 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+                self._write_depth -= 1
+    
+    def _save_workbook(self, wb):
+        """Save to a temporary file and rename it over the workbook, so readers never see a partial file"""
+        temp_path = self.excel_path.with_name(f".{self.excel_path.name}.{os.getpid()}.tmp")
+        try:
+            with STAGE_SECONDS.time("workbook_save"), span("ExcelDBManager.save_workbook"):
+                wb.save(temp_path)
+                os.replace(temp_path, self.excel_path)
+        finally:
+            wb.close()
+            if temp_path.exists():
+                temp_path.unlink()
+        self._invalidate_snapshot()
+    
+    def slot_index(self) -> SlotIndex:
+        """Free-slot index of the current workbook snapshot, built on first use after each change"""
+        snapshot = self.load_snapshot()
+        with self._slot_index_lock:
+            if self._slot_index is None or self._slot_index_source is not snapshot:
+                CACHE_REQUESTS.inc("slot_index", "miss")
+                with STAGE_SECONDS.time("slot_index_build"), span("ExcelDBManager.build_slot_index") as build_span:
+                    self._slot_index = SlotIndex(self._materialized_sheets(snapshot), self.doctor_sheets)
+                    build_span.set_attribute("slot_index.size", self._slot_index.size)
+                self._slot_index_source = snapshot
+            else:
+                CACHE_REQUESTS.inc("slot_index", "hit")
+            return self._slot_index
+    
+    def templates(self) -> ScheduleTemplates:
+        """Schedule rules and exceptions of the current snapshot, parsed on first use after each change"""
+        return self._template_state(self.load_snapshot())[0]
+    
+    def _template_state(self, snapshot: Dict[str, pd.DataFrame]) -> Tuple[ScheduleTemplates, Dict[str, Deviations]]:
+        with self._templates_lock:
+            if self._templates is None or self._templates_source is not snapshot:
+                self._templates = ScheduleTemplates(snapshot.get(RULES_SHEET), snapshot.get(EXCEPTIONS_SHEET), self.slot_minutes)
+                self._deviations = {}
+                self._templates_source = snapshot
+            return self._templates, self._deviations
+    
+    def _deviations_of(self, doctor_name: str, snapshot: Optional[Dict[str, pd.DataFrame]] = None) -> Deviations:
+        """Parsed deviation rows of a templated doctor's sheet"""
+        snapshot = self.load_snapshot() if snapshot is None else snapshot
+        _, deviations = self._template_state(snapshot)
+        with self._templates_lock:
+            if doctor_name not in deviations:
+                deviations[doctor_name] = Deviations(snapshot[doctor_name])
+            return deviations[doctor_name]
+    
+    def _template_frame(self, doctor_name: str, date: Optional[str], limit: int) -> pd.DataFrame:
+        """
+        Free slots of a templated doctor in the sheet layout, generated only for the days needed
+        
+        With a date, that day is generated; otherwise days from today are
+        generated a fortnight at a time until at least `limit` slots exist
+        (or the horizon is reached). Extra 'Available' rows are always included.
+        """
+        templates = self.templates()
+        deviations = self._deviations_of(doctor_name)
+        if date:
+            day = datetime.strptime(date, '%Y-%m-%d').date()
+            frames = [templates.materialize(doctor_name, [day], deviations)]
+        else:
+            first = datetime.now().date()
+            horizon = first + timedelta(days=self.template_horizon_days)
+            frames = []
+            count = 0
+            while count < limit and first <= horizon:
+                last = min(first + timedelta(days=13), horizon)
+                frames.append(templates.materialize(doctor_name, days_between(first, last), deviations))
+                count += len(frames[-1])
+                first = last + timedelta(days=1)
+        return pd.concat(frames + [deviations.extra_rows], ignore_index=True)
+    
+    def _materialized_sheets(self, snapshot: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """The snapshot with each templated doctor's sheet replaced by its free slots up to the horizon"""
+        templates, _ = self._template_state(snapshot)
+        if not templates.doctors:
+            return snapshot
+        sheets = dict(snapshot)
+        today = datetime.now().date()
+        days = days_between(today, today + timedelta(days=self.template_horizon_days))
+        for doctor in templates.doctors:
+            if doctor in sheets:
+                deviations = self._deviations_of(doctor, snapshot)
+                sheets[doctor] = pd.concat([templates.materialize(doctor, days, deviations), deviations.extra_rows], ignore_index=True)
+        return sheets
+    
+    @traced("ExcelDBManager.recommend_slots")
+    def recommend_slots(
+        self,
+        doctors: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        weekdays: Optional[List[int]] = None,
+        earliest: Optional[str] = None,
+        latest: Optional[str] = None,
+        preferred_doctor: Optional[str] = None,
+        limit: int = 5,
+        max_per_day: int = 2,
+        session_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Rank free slots across doctors against a set of constraints
+        
+        Args:
+            doctors: Doctors to consider (default: all)
+            start_date: First day (YYYY-MM-DD, default: today); slots already past are skipped
+            end_date: Last day, inclusive (YYYY-MM-DD, default: no limit)
+            weekdays: Allowed weekdays, Monday = 0 (default: all)
+            earliest: Earliest start time (e.g. '17:00' or '05:00 PM')
+            latest: Latest start time, inclusive
+            preferred_doctor: Doctor whose slots rank first when close in time
+            limit: Number of slots to return
+            max_per_day: Slots per doctor and day
+            session_id: Conversation asking; slots held by other conversations are left out
+        
+        Returns:
+            Best slots first, each with doctor, date, time, weekday and status
+        """
+        now = datetime.now().replace(second=0, microsecond=0)
+        start = max(now, datetime.strptime(start_date, '%Y-%m-%d')) if start_date else now
+        end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+        index = self.slot_index()
+        held = {doctor: self._blocked(doctor, session_id) for doctor in (doctors or index.doctors)}
+        
+        slots = index.query(
+            doctors=doctors,
+            start=start,
+            end=end,
+            weekdays=weekdays,
+            earliest=time_to_minutes(earliest) if earliest else None,
+            latest=time_to_minutes(latest) if latest else None,
+            preferred_doctor=preferred_doctor,
+            limit=limit,
+            max_per_day=max_per_day,
+            exclude={doctor: starts for doctor, starts in held.items() if starts}
+        )
+        set_attribute("excel.slot_count", len(slots))
+        return slots
     
     def get_all_doctors(self) -> List[str]:
         """Get list of all doctors"""
         return self.doctor_sheets.copy()
     
+    def find_doctor(self, name: str) -> Dict[str, Any]:
+        """
+        Resolve a partial, misspelled or transliterated doctor name
+        
+        Returns:
+            {"status": "matched" | "ambiguous" | "not_found", "doctor": full name or None,
+             "candidates": [(doctor, score), ...]}
+        """
+        lookup = self.doctor_index.resolve(name)
+        DOCTOR_LOOKUPS.inc(lookup["status"])
+        return lookup
+    
     def get_doctor_info(self, doctor_name: str) -> Optional[Dict]:
         """Get detailed information about a specific doctor"""
         # This would come from the vector DB, but we can provide basic info
@@ -38,11 +353,13 @@ class ExcelDBManager:
             "available": doctor_name in self.doctor_sheets
         }
     
+    @traced("ExcelDBManager.get_available_slots")
     def get_available_slots(
         self, 
         doctor_name: str, 
         date: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        session_id: Optional[str] = None
     ) -> List[Dict]:
         """
         Get available appointment slots for a doctor
@@ -51,15 +368,31 @@ class ExcelDBManager:
             doctor_name: Name of the doctor
             date: Specific date (YYYY-MM-DD) or None for all upcoming
             limit: Maximum number of slots to return
-            
+            session_id: Conversation asking; slots held by other conversations are left out
+        
         Returns:
             List of available slots with date, time, and doctor info
         """
+        set_attribute("excel.doctor", doctor_name)
+        held = self._blocked(doctor_name, session_id)
+        
+        # Read enough extra slots to still return `limit` once held ones are dropped
+        key = self._flight_key("get_available_slots", doctor_name, date, limit + len(held))
+        slots = read_flight.do(key, self._get_available_slots, doctor_name, date, limit + len(held))
+        if held:
+            slots = [slot for slot in slots if slot_start(slot['date'], slot['time']) not in held][:limit]
+        set_attribute("excel.slot_count", len(slots))
+        return slots
+    
+    def _get_available_slots(self, doctor_name: str, date: Optional[str], limit: int) -> List[Dict]:
         if doctor_name not in self.doctor_sheets:
             return []
         
-        # Read doctor's schedule
-        df = pd.read_excel(self.excel_path, sheet_name=doctor_name)
+        # Read doctor's schedule (templated doctors: generated for the requested days)
+        if doctor_name in self.templates():
+            df = self._template_frame(doctor_name, date, limit)
+        else:
+            df = self._read_sheet(doctor_name)
         
         # Filter for available slots
         available_df = df[df['Status'] == 'Available'].copy()
@@ -94,13 +427,60 @@ class ExcelDBManager:
         
         return results
     
+    @traced("ExcelDBManager.hold_slot")
+    def hold_slot(self, doctor_name: str, date: str, time: str, session_id: str) -> Tuple[bool, str]:
+        """
+        Keep a free slot for one conversation while the patient gives their details
+        
+        The hold lives in memory only and lapses after the hold ttl; holding
+        another slot replaces it and booking the slot converts it.
+        
+        Args:
+            doctor_name: Name of the doctor
+            date: Slot date (YYYY-MM-DD)
+            time: Slot time (e.g. '10:00 AM' or '10:00')
+            session_id: Conversation holding the slot
+        
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        if doctor_name not in self.doctor_sheets:
+            return False, f"Doctor '{doctor_name}' not found in the system."
+        start = slot_start(date, time)
+        if start is None:
+            return False, f"Invalid date or time: '{date} {time}'."
+        if start < datetime.now():
+            return False, f"The slot on {date} at {time} has already passed."
+        
+        # The slot must be free in the workbook (held or not)
+        slots = self.slot_index().slots.get(doctor_name)
+        match = next(slots.window(start, timedelta(minutes=1)), None) if slots is not None else None
+        if match is None:
+            return False, f"No available slot found for {doctor_name} on {date} at {time}"
+        label = match[2]
+        
+        if start in self._offered_starts(doctor_name):
+            return False, f"The slot with {doctor_name} on {date} at {label} is being held for another patient. Please choose another time."
+        held, expires = self.holds.hold(session_id, doctor_name, start)
+        if not held:
+            return False, f"The slot with {doctor_name} on {date} at {label} is being held for another patient. Please choose another time."
+        if expires is None:
+            return True, f"The slot with {doctor_name} on {date} at {label} is available."
+        return True, f"⏳ Slot held for you: {doctor_name} on {date} at {label} (until {expires.strftime('%I:%M %p')})."
+    
+    def release_hold(self, session_id: str) -> bool:
+        """Give up a conversation's hold; returns False if it had none"""
+        return self.holds.release(session_id)
+    
+    @traced("ExcelDBManager.book_appointment")
     def book_appointment(
         self,
         doctor_name: str,
         date: str,
         time: str,
         patient_name: str,
-        phone: str
+        phone: str,
+        session_id: Optional[str] = None
     ) -> Tuple[bool, str]:
         """
         Book an appointment
@@ -111,59 +491,89 @@ class ExcelDBManager:
             time: Appointment time (HH:MM AM/PM)
             patient_name: Patient's full name
             phone: Patient's phone number
-            
+            session_id: Conversation booking; its hold on the slot is converted into the booking
+        
         Returns:
             Tuple of (success: bool, message: str)
         """
         if doctor_name not in self.doctor_sheets:
             return False, f"Doctor '{doctor_name}' not found in the system."
         
+        start = slot_start(date, time)
+        held_message = f"The slot with {doctor_name} on {date} at {time} is being held for another patient. Please choose another time."
+        
         try:
-            # Load the workbook
-            wb = openpyxl.load_workbook(self.excel_path)
-            ws = wb[doctor_name]
-            
-            # Find the matching row
-            target_date = datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
-            found = False
-            row_index = None
-            
-            for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=False), start=2):
-                cell_date = row[0].value
-                cell_time = row[1].value
-                cell_status = row[4].value
+            with self._writing():
+                # A slot held by another conversation is not bookable until its hold ends,
+                # nor one offered to a waitlisted patient, except by that patient
+                # (offers are written under this lock, by any process)
+                if start is not None:
+                    holder = self.holds.holder(doctor_name, start)
+                    if holder is not None and holder != session_id:
+                        return False, held_message
+                    if start in self._offered_starts(doctor_name, phone):
+                        return False, held_message
                 
-                # Convert cell date to string for comparison
-                if isinstance(cell_date, datetime):
-                    cell_date_str = cell_date.strftime('%Y-%m-%d')
-                else:
-                    cell_date_str = str(cell_date)
+                # Load the workbook
+                wb = openpyxl.load_workbook(self.excel_path)
+                ws = wb[doctor_name]
                 
-                if cell_date_str == target_date and str(cell_time) == time and cell_status == 'Available':
+                # Find the matching row
+                target_date = datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+                found = False
+                taken = False
+                row_index = None
+                
+                for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=False), start=2):
+                    cell_date = row[0].value
+                    cell_time = row[1].value
+                    cell_status = row[4].value
+                    
+                    # Convert cell date to string for comparison
+                    if isinstance(cell_date, datetime):
+                        cell_date_str = cell_date.strftime('%Y-%m-%d')
+                    else:
+                        cell_date_str = str(cell_date)
+                    
+                    if cell_date_str == target_date and str(cell_time) == time and cell_status == 'Available':
+                        found = True
+                        row_index = idx
+                        break
+                    if cell_date_str == target_date and cell_status != 'Available' and slot_start(cell_date_str, cell_time) == start:
+                        taken = True
+                
+                if not found and not taken and self._generated_slot(doctor_name, start):
+                    # Templated doctor: a free rule slot has no row until it is booked
+                    row_index = ws.max_row + 1
+                    ws.cell(row=row_index, column=1, value=start.replace(hour=0, minute=0))
+                    ws.cell(row=row_index, column=2, value=slot_label(start.hour * 60 + start.minute))
                     found = True
-                    row_index = idx
-                    break
-            
-            if not found:
-                return False, f"No available slot found for {doctor_name} on {date} at {time}"
-            
-            # Update the row
-            ws.cell(row=row_index, column=3, value=patient_name)  # Patient_Name
-            ws.cell(row=row_index, column=4, value=phone)  # Phone
-            ws.cell(row=row_index, column=5, value='Reserved')  # Status
-            
-            # Apply formatting
-            ws.cell(row=row_index, column=5).fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-            
-            # Save the workbook
-            wb.save(self.excel_path)
-            wb.close()
-            
-            return True, f"✅ Appointment booked successfully!\n\nDoctor: {doctor_name}\nDate: {date}\nTime: {time}\nPatient: {patient_name}\nPhone: {phone}"
-            
+                
+                if not found:
+                    return False, f"No available slot found for {doctor_name} on {date} at {time}"
+                
+                # Update the row
+                ws.cell(row=row_index, column=3, value=patient_name)  # Patient_Name
+                ws.cell(row=row_index, column=4, value=phone)  # Phone
+                ws.cell(row=row_index, column=5, value='Reserved')  # Status
+                
+                # Apply formatting
+                ws.cell(row=row_index, column=5).fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
+                
+                # Save the workbook
+                self._save_workbook(wb)
+                if start is not None:
+                    self.holds.convert(doctor_name, start, session_id)
+                for entry in self.waitlist.open_entries(doctor=doctor_name):
+                    if entry["phone"] == phone:
+                        self.waitlist.booked(entry["id"], date, time)
+                
+                return True, f"✅ Appointment booked successfully!\n\nDoctor: {doctor_name}\nDate: {date}\nTime: {time}\nPatient: {patient_name}\nPhone: {phone}"
+        
         except Exception as e:
             return False, f"Error booking appointment: {str(e)}"
     
+    @traced("ExcelDBManager.cancel_appointment")
     def cancel_appointment(
         self,
         doctor_name: str,
@@ -179,7 +589,7 @@ class ExcelDBManager:
             patient_name: Patient's name
             date: Appointment date (optional)
             time: Appointment time (optional)
-            
+        
         Returns:
             Tuple of (success: bool, message: str)
         """
@@ -187,71 +597,419 @@ class ExcelDBManager:
             return False, f"Doctor '{doctor_name}' not found in the system."
         
         try:
-            # Load the workbook
-            wb = openpyxl.load_workbook(self.excel_path)
-            ws = wb[doctor_name]
-            
-            # Find the matching row
-            found = False
-            cancelled_appointments = []
-            
-            for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=False), start=2):
-                cell_date = row[0].value
-                cell_time = row[1].value
-                cell_patient = row[2].value
-                cell_status = row[4].value
+            with self._writing():
+                # Load the workbook
+                wb = openpyxl.load_workbook(self.excel_path)
+                ws = wb[doctor_name]
                 
-                # Convert cell date to string for comparison
-                if isinstance(cell_date, datetime):
-                    cell_date_str = cell_date.strftime('%Y-%m-%d')
-                else:
-                    cell_date_str = str(cell_date)
+                # Find the matching row
+                found = False
+                cancelled_appointments = []
+                rows_to_delete = []
                 
-                # Check if this is the appointment to cancel
-                matches_patient = cell_patient == patient_name
-                matches_status = cell_status == 'Reserved'
-                matches_date = (date is None) or (cell_date_str == date)
-                matches_time = (time is None) or (str(cell_time) == time)
-                
-                if matches_patient and matches_status and matches_date and matches_time:
-                    # Cancel the appointment
-                    ws.cell(row=idx, column=3, value='-')  # Clear Patient_Name
-                    ws.cell(row=idx, column=4, value='-')  # Clear Phone
-                    ws.cell(row=idx, column=5, value='Available')  # Status
+                for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=False), start=2):
+                    cell_date = row[0].value
+                    cell_time = row[1].value
+                    cell_patient = row[2].value
+                    cell_status = row[4].value
                     
-                    # Remove formatting
-                    ws.cell(row=idx, column=5).fill = PatternFill(fill_type=None)
+                    # Convert cell date to string for comparison
+                    if isinstance(cell_date, datetime):
+                        cell_date_str = cell_date.strftime('%Y-%m-%d')
+                    else:
+                        cell_date_str = str(cell_date)
                     
-                    cancelled_appointments.append({
-                        'date': cell_date_str,
-                        'time': str(cell_time)
-                    })
-                    found = True
-            
-            if not found:
-                return False, f"No reservation found for {patient_name} with {doctor_name}"
-            
-            # Save the workbook
-            wb.save(self.excel_path)
-            wb.close()
+                    # Check if this is the appointment to cancel
+                    matches_patient = cell_patient == patient_name
+                    matches_status = cell_status == 'Reserved'
+                    matches_date = (date is None) or (cell_date_str == date)
+                    matches_time = (time is None) or (str(cell_time) == time)
+                    
+                    if matches_patient and matches_status and matches_date and matches_time:
+                        if self._generated_slot(doctor_name, slot_start(cell_date_str, cell_time)):
+                            # Templated doctor: the rules offer the slot again once its row is gone
+                            rows_to_delete.append(idx)
+                        else:
+                            # Cancel the appointment
+                            ws.cell(row=idx, column=3, value='-')  # Clear Patient_Name
+                            ws.cell(row=idx, column=4, value='-')  # Clear Phone
+                            ws.cell(row=idx, column=5, value='Available')  # Status
+                            
+                            # Remove formatting
+                            ws.cell(row=idx, column=5).fill = PatternFill(fill_type=None)
+                        
+                        cancelled_appointments.append({
+                            'date': cell_date_str,
+                            'time': str(cell_time)
+                        })
+                        found = True
+                
+                if not found:
+                    return False, f"No reservation found for {patient_name} with {doctor_name}"
+                
+                for idx in reversed(rows_to_delete):
+                    ws.delete_rows(idx)
+                
+                # Save the workbook
+                self._save_workbook(wb)
+                
+                # Freed slots go to the waitlist first
+                for appt in cancelled_appointments:
+                    self._fill_from_waitlist(doctor_name, appt['date'], appt['time'])
+                
+                # Create success message
+                if len(cancelled_appointments) == 1:
+                    appt = cancelled_appointments[0]
+                    message = f"✅ Appointment cancelled successfully!\n\nDoctor: {doctor_name}\nDate: {appt['date']}\nTime: {appt['time']}\nPatient: {patient_name}"
+                else:
+                    message = f"✅ {len(cancelled_appointments)} appointments cancelled for {patient_name} with {doctor_name}"
+                
+                return True, message
+        
+        except Exception as e:
+            return False, f"Error cancelling appointment: {str(e)}"
+    
+    def _generated_slot(self, doctor_name: str, start: Optional[datetime]) -> bool:
+        """True if the doctor's schedule rules offer a slot starting at start"""
+        if start is None:
+            return False
+        templates = self.templates()
+        return doctor_name in templates and templates.generates(doctor_name, start.date(), start.hour * 60 + start.minute)
+    
+    def _offered_starts(self, doctor_name: str, phone: Optional[str] = None) -> Set[datetime]:
+        """Starts of a doctor's slots currently offered to waitlisted patients (other than phone)"""
+        return {
+            slot_start(entry["offer"]["date"], entry["offer"]["time"])
+            for entry in self.waitlist.live_offers(doctor_name)
+            if entry["phone"] != phone
+        }
+    
+    def _blocked(self, doctor_name: str, session_id: Optional[str] = None, phone: Optional[str] = None) -> Set[datetime]:
+        """Starts of a doctor's slots held by other conversations or offered to waitlisted patients (other than phone)"""
+        return self.holds.blocked(doctor_name, session_id) | self._offered_starts(doctor_name, phone)
+    
+    def _fill_from_waitlist(self, doctor_name: str, date: str, time: str) -> Optional[Dict]:
+        """
+        Give a freed slot to the first matching waiter (caller holds the write lock)
+        
+        Returns:
+            The waitlist entry that was offered or booked the slot, or None
+        """
+        start = slot_start(date, time)
+        if start is None or start < datetime.now():
+            return None
+        
+        for entry in self.waitlist.matches(doctor_name, start):
+            if self.waitlist_policy == POLICY_AUTO_BOOK:
+                success, _ = self.book_appointment(doctor_name, date, time, entry["patient_name"], entry["phone"])
+                return entry if success else None
             
-            # Create success message
-            if len(cancelled_appointments) == 1:
-                appt = cancelled_appointments[0]
-                message = f"✅ Appointment cancelled successfully!\n\nDoctor: {doctor_name}\nDate: {appt['date']}\nTime: {appt['time']}\nPatient: {patient_name}"
-            else:
-                message = f"✅ {len(cancelled_appointments)} appointments cancelled for {patient_name} with {doctor_name}"
+            # The recorded offer itself keeps the slot for the patient, in every process
+            self.waitlist.offer(entry["id"], date, time, datetime.now() + timedelta(seconds=self.waitlist_offer_ttl))
+            return entry
+        return None
+    
+    @traced("ExcelDBManager.join_waitlist")
+    def join_waitlist(
+        self,
+        doctor_name: str,
+        patient_name: str,
+        phone: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        earliest: Optional[str] = None,
+        latest: Optional[str] = None,
+        weekdays: Optional[Sequence[int]] = None
+    ) -> Tuple[bool, str]:
+        """
+        Put a patient on a doctor's waitlist for a date and time window
+        
+        When a matching slot is cancelled, the first waiter gets it according
+        to the waitlist policy: it is held for them (offer) or booked for them
+        (auto_book).
+        
+        Args:
+            doctor_name: Name of the doctor
+            patient_name: Patient's full name
+            phone: Patient's phone number
+            start_date: First acceptable day (YYYY-MM-DD, default: today)
+            end_date: Last acceptable day (default and maximum: the waitlist's max_days later)
+            earliest: Earliest acceptable time (e.g. '17:00' or '05:00 PM')
+            latest: Latest acceptable time, inclusive
+            weekdays: Acceptable weekdays, Monday = 0 (default: all)
+        
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        if doctor_name not in self.doctor_sheets:
+            return False, f"Doctor '{doctor_name}' not found in the system."
+        earliest_minute = time_to_minutes(earliest) if earliest else None
+        latest_minute = time_to_minutes(latest) if latest else None
+        if (earliest and earliest_minute is None) or (latest and latest_minute is None):
+            return False, f"Invalid time window: '{earliest or ''}' - '{latest or ''}'."
+        
+        try:
+            today = datetime.now().date()
+            first = max(today, datetime.strptime(start_date, '%Y-%m-%d').date()) if start_date else today
+            last = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else first + timedelta(days=self.waitlist.max_days)
+            if last < first:
+                return False, "The waitlist window ends before it starts."
             
-            return True, message
+            with self._writing():
+                entry = self.waitlist.add(
+                    doctor_name, patient_name, phone, first, last,
+                    earliest=earliest_minute, latest=latest_minute, weekdays=weekdays
+                )
+        except Exception as e:
+            return False, f"Error joining the waitlist: {str(e)}"
+        
+        window = f"{entry['start_date']} to {entry['end_date']}"
+        if earliest or latest:
+            window += f", {earliest or 'any time'} - {latest or 'closing'}"
+        outcome = "we'll hold it for you" if self.waitlist_policy != POLICY_AUTO_BOOK else "we'll book it for you"
+        return True, (f"📝 {patient_name} ({phone}) is on the waitlist for {doctor_name} ({window}). "
+                      f"If a matching slot frees up, {outcome}.")
+    
+    @traced("ExcelDBManager.accept_waitlist_offer")
+    def accept_waitlist_offer(self, phone: str) -> Tuple[bool, str]:
+        """Book the slot currently offered to a waitlisted patient"""
+        now = datetime.now()
+        offers = [
+            entry for entry in self.waitlist.entries(statuses=("offered",), phone=phone)
+            if datetime.fromisoformat(entry["offer"]["expires"]) > now
+        ]
+        if not offers:
+            return False, f"There is no open waitlist offer for {phone}."
+        
+        entry = offers[0]
+        return self.book_appointment(
+            entry["doctor"], entry["offer"]["date"], entry["offer"]["time"],
+            entry["patient_name"], phone
+        )
+    
+    def leave_waitlist(self, phone: str, doctor_name: Optional[str] = None) -> Tuple[bool, str]:
+        """Take a patient off the waitlist (one doctor's or all)"""
+        with self._writing():
+            removed = self.waitlist.leave(phone, doctor=doctor_name)
+        if not removed:
+            return False, f"No waitlist entry found for {phone}."
+        return True, f"✅ Removed {removed} waitlist entr{'y' if removed == 1 else 'ies'} for {phone}."
+    
+    def waitlist_entries(self, doctor_name: Optional[str] = None, statuses: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Waitlist entries, oldest first (staff view)"""
+        return self.waitlist.entries(doctor=doctor_name, statuses=statuses)
+    
+    @traced("ExcelDBManager.book_series")
+    def book_series(
+        self,
+        doctor_name: str,
+        patient_name: str,
+        phone: str,
+        weekdays: Sequence[int],
+        sessions: int,
+        time: Optional[str] = None,
+        start_date: Optional[str] = None,
+        fallbacks: Optional[Sequence[str]] = None,
+        max_time_shift: int = 120,
+        max_weeks: int = 26,
+        dry_run: bool = False,
+        session_id: Optional[str] = None
+    ) -> Tuple[bool, str, List[Dict]]:
+        """
+        Book a recurring course of sessions in one atomic write
+        
+        Slots are chosen in a single pass over the doctor's sheet while the
+        write lock is held, and every session is reserved by one save: either
+        the whole series is booked or nothing is.
+        
+        Args:
+            doctor_name: Name of the doctor
+            patient_name: Patient's full name
+            phone: Patient's phone number
+            weekdays: Pattern weekdays (Monday = 0), e.g. [0, 3] for Monday and Thursday
+            sessions: Number of sessions (e.g. 12 for 2x/week over 6 weeks)
+            time: Preferred start time (e.g. '05:00 PM'); None takes each day's earliest free slot
+            start_date: First day of the course (YYYY-MM-DD, default: today)
+            fallbacks: Rules tried when a slot is taken (default: nearest_time, next_day, skip)
+            max_time_shift: Minutes a fallback may move a session from the preferred time
+            max_weeks: Weeks searched for free slots
+            dry_run: Plan from the cached snapshot without booking
+            session_id: Conversation booking; slots held by other conversations are avoided
+                and its own hold is converted into the booking
+        
+        Returns:
+            Tuple of (success: bool, message: str, sessions: list of date/time/weekday/rule dicts)
+        """
+        if doctor_name not in self.doctor_sheets:
+            return False, f"Doctor '{doctor_name}' not found in the system.", []
+        fallbacks = list(fallbacks) if fallbacks is not None else list(FALLBACK_RULES)
+        unknown = [rule for rule in fallbacks if rule not in FALLBACK_RULES]
+        if unknown:
+            return False, f"Unknown fallback rule(s): {', '.join(unknown)}. Use: {', '.join(FALLBACK_RULES)}", []
+        if not weekdays or sessions < 1:
+            return False, "A series needs at least one weekday and one session.", []
+        minute = time_to_minutes(time) if time else None
+        if time and minute is None:
+            return False, f"Invalid time format: '{time}'.", []
+        
+        now = datetime.now()
+        start = max(now.date(), datetime.strptime(start_date, '%Y-%m-%d').date()) if start_date else now.date()
+        set_attribute("series.sessions", sessions)
+        
+        try:
+            if dry_run:
+                plan = plan_series(
+                    self._without_held(
+                        self._free_slots_from_index(doctor_name, max(now, datetime.combine(start, datetime.min.time())), max_weeks),
+                        self._blocked(doctor_name, session_id, phone)
+                    ),
+                    weekdays, sessions, start, minute, fallbacks, max_time_shift, max_weeks
+                )
+                return self._series_result(plan, sessions, doctor_name, patient_name, booked=False)
             
+            with self._writing():
+                # Under the lock, so an offer made by a cancellation that just landed is respected
+                held = self._blocked(doctor_name, session_id, phone)
+                wb = openpyxl.load_workbook(self.excel_path)
+                ws = wb[doctor_name]
+                free = (
+                    self._free_slots_from_rules(doctor_name, ws, now, max_weeks)
+                    if doctor_name in self.templates() else self._free_slots_from_sheet(ws, now)
+                )
+                plan = plan_series(
+                    self._without_held(free, held),
+                    weekdays, sessions, start, minute, fallbacks, max_time_shift, max_weeks
+                )
+                if not plan["complete"]:
+                    wb.close()
+                    return self._series_result(plan, sessions, doctor_name, patient_name, booked=False)
+                
+                fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
+                for session in plan["sessions"]:
+                    row_index = session["ref"][0]
+                    if row_index is None:
+                        # Rule slot without a row yet
+                        row_index = ws.max_row + 1
+                        ws.cell(row=row_index, column=1, value=datetime.combine(session["day"], datetime.min.time()))
+                        ws.cell(row=row_index, column=2, value=session["ref"][1])
+                    ws.cell(row=row_index, column=3, value=patient_name)  # Patient_Name
+                    ws.cell(row=row_index, column=4, value=phone)  # Phone
+                    ws.cell(row=row_index, column=5, value='Reserved')  # Status
+                    ws.cell(row=row_index, column=5).fill = fill
+                
+                # One save reserves every session
+                self._save_workbook(wb)
+                for session in plan["sessions"]:
+                    self.holds.convert(doctor_name, datetime.combine(session["day"], datetime.min.time()) + timedelta(minutes=session["minute"]), session_id)
+                first = plan["sessions"][0]
+                for entry in self.waitlist.open_entries(doctor=doctor_name):
+                    if entry["phone"] == phone:
+                        self.waitlist.booked(entry["id"], first["day"].isoformat(), first["ref"][1])
+                return self._series_result(plan, sessions, doctor_name, patient_name, booked=True)
+        
         except Exception as e:
-            return False, f"Error cancelling appointment: {str(e)}"
+            return False, f"Error booking appointment series: {str(e)}", []
+    
+    def _free_slots_from_index(self, doctor_name: str, start: datetime, max_weeks: int) -> Dict[Any, Dict[int, Any]]:
+        """Free slots of one doctor within the planning horizon, from the slot index"""
+        slots = self.slot_index().slots.get(doctor_name)
+        free = {}
+        if slots is None:
+            return free
+        for day, minute, label in slots.window(start, timedelta(weeks=max_weeks + 1)):
+            free.setdefault(day, {})[minute] = (None, label)
+        return free
+    
+    @staticmethod
+    def _free_slots_from_sheet(ws, now: datetime) -> Dict[Any, Dict[int, Any]]:
+        """Free future slots of a loaded doctor sheet as {day: {minute: (row, time label)}}"""
+        free = {}
+        for idx, (cell_date, cell_time, _, _, cell_status) in enumerate(ws.iter_rows(min_row=2, max_col=5, values_only=True), start=2):
+            if cell_status != 'Available':
+                continue
+            if isinstance(cell_date, datetime):
+                day = cell_date.date()
+            else:
+                try:
+                    day = datetime.strptime(str(cell_date)[:10], '%Y-%m-%d').date()
+                except ValueError:
+                    continue
+            minute = time_to_minutes(cell_time)
+            if minute is None or datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute) < now:
+                continue
+            free.setdefault(day, {})[minute] = (idx, str(cell_time))
+        return free
+    
+    def _free_slots_from_rules(self, doctor_name: str, ws, now: datetime, max_weeks: int) -> Dict[Any, Dict[int, Any]]:
+        """
+        Free future slots of a templated doctor as {day: {minute: (row or None, time label)}}
+        
+        Rule slots have no row (None) until booked; the sheet's rows mark
+        slots taken and add the extra 'Available' ones.
+        """
+        free = self._free_slots_from_sheet(ws, now)
+        taken = set()
+        for cell_date, cell_time, _, _, cell_status in ws.iter_rows(min_row=2, max_col=5, values_only=True):
+            start = slot_start(cell_date, cell_time) if cell_status != 'Available' else None
+            if start is not None:
+                taken.add(start)
+        
+        templates = self.templates()
+        for day in days_between(now.date(), now.date() + timedelta(weeks=max_weeks + 1)):
+            for minute, label in templates.day_slots(doctor_name, day):
+                start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+                if start >= now and start not in taken:
+                    free.setdefault(day, {}).setdefault(minute, (None, label))
+        return free
     
+    @staticmethod
+    def _without_held(free: Dict[Any, Dict[int, Any]], held: Set[datetime]) -> Dict[Any, Dict[int, Any]]:
+        """Drop slots held by other conversations from a {day: {minute: ref}} map"""
+        for start in held:
+            day_slots = free.get(start.date())
+            if day_slots:
+                day_slots.pop(start.hour * 60 + start.minute, None)
+        return free
+    
+    @staticmethod
+    def _series_result(plan: Dict[str, Any], sessions: int, doctor_name: str, patient_name: str, booked: bool) -> Tuple[bool, str, List[Dict]]:
+        """Message and session list for a planned (or booked) series"""
+        placed = [
+            {
+                'date': session['day'].isoformat(),
+                'time': session['ref'][1],
+                'weekday': session['day'].strftime('%A'),
+                'rule': session['rule'],
+                'requested_date': session['requested_day'].isoformat()
+            }
+            for session in plan["sessions"]
+        ]
+        lines = [describe_session(i, session, session['ref'][1]) for i, session in enumerate(plan["sessions"], 1)]
+        skipped = ""
+        if plan["skipped"]:
+            skipped = "\n\nSkipped (no free slot): " + ", ".join(day.isoformat() for day in plan["skipped"])
+        
+        if not plan["complete"]:
+            reason = f"no free slot around {plan['unplaced'].strftime('%A')} {plan['unplaced'].isoformat()}" if plan["unplaced"] else "not enough free slots in the search window"
+            message = (f"❌ Could only place {len(placed)} of {sessions} sessions with {doctor_name} ({reason}). "
+                       f"Nothing was booked.")
+            if lines:
+                message += "\n\nSessions found:\n" + "\n".join(lines)
+            return False, message + skipped, placed
+        
+        if booked:
+            header = f"✅ Booked {len(placed)} sessions with {doctor_name} for {patient_name}:"
+        else:
+            header = f"📋 Proposed {len(placed)} sessions with {doctor_name} for {patient_name} (not booked yet):"
+        return True, header + "\n\n" + "\n".join(lines) + skipped, placed
+    
+    @traced("ExcelDBManager.search_appointments")
     def search_appointments(
         self,
         patient_name: Optional[str] = None,
         doctor_name: Optional[str] = None,
-        date: Optional[str] = None
+        date: Optional[str] = None,
+        include_history: bool = False
     ) -> List[Dict]:
         """
         Search for appointments based on criteria
@@ -260,17 +1018,32 @@ class ExcelDBManager:
             patient_name: Patient's name (optional)
             doctor_name: Doctor's name (optional)
             date: Date to search (optional)
-            
+            include_history: Also search the archive partitions (archived rows come first)
+        
         Returns:
             List of matching appointments
         """
+        key = self._flight_key("search_appointments", patient_name, doctor_name, date)
+        results = read_flight.do(key, self._search_appointments, patient_name, doctor_name, date)
+        if include_history:
+            doctor = doctor_name if doctor_name in self.doctor_sheets else None
+            results = self.archive.search(patient_name, doctor, date) + results
+        set_attribute("excel.result_count", len(results))
+        return results
+    
+    def _search_appointments(
+        self,
+        patient_name: Optional[str],
+        doctor_name: Optional[str],
+        date: Optional[str]
+    ) -> List[Dict]:
         results = []
         
         # Determine which sheets to search
         sheets_to_search = [doctor_name] if doctor_name and doctor_name in self.doctor_sheets else self.doctor_sheets
         
         for sheet_name in sheets_to_search:
-            df = pd.read_excel(self.excel_path, sheet_name=sheet_name)
+            df = self._read_sheet(sheet_name)
             
             # Filter for reserved appointments
             reserved_df = df[df['Status'] == 'Reserved'].copy()
@@ -297,10 +1070,115 @@ class ExcelDBManager:
         
         return results
     
+    @traced("ExcelDBManager.archive_past_rows")
+    def archive_past_rows(
+        self,
+        retention_days: Optional[int] = None,
+        today: Optional[datetime] = None,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Move past rows out of the doctor sheets into monthly archive partitions
+        
+        Rows dated before today that are not reservations (unused or blocked
+        slots) are moved at once; reservations stay for retention_days so
+        recent visits remain searchable and cancellable in the live workbook.
+        Rows are written to their partition before the workbook is saved
+        without them, so an interrupted run never loses a row; the next run
+        moves the same slots again and the partition keeps one row per slot.
+        
+        Args:
+            retention_days: Days past reservations are kept (default: archive_retention_days)
+            today: Reference day (default: today)
+            dry_run: Only count the rows that would move
+        
+        Returns:
+            Report with rows moved, rows per partition and per doctor, and the cutoffs
+        """
+        retention_days = self.archive_retention_days if retention_days is None else retention_days
+        cutoff = (today or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        reserved_cutoff = cutoff - timedelta(days=retention_days)
+        report = {
+            "rows": 0,
+            "partitions": {},
+            "doctors": {},
+            "cutoff": cutoff.strftime('%Y-%m-%d'),
+            "reserved_cutoff": reserved_cutoff.strftime('%Y-%m-%d'),
+            "dry_run": dry_run
+        }
+        
+        with self._writing():
+            wb = openpyxl.load_workbook(self.excel_path)
+            moving = {}  # month -> doctor -> [row values]
+            deleted = {}  # doctor -> [row index]
+            for doctor_name in self.doctor_sheets:
+                if doctor_name not in wb.sheetnames:
+                    continue
+                for idx, values in enumerate(wb[doctor_name].iter_rows(min_row=2, max_col=5, values_only=True), start=2):
+                    cell_date = values[0]
+                    if not isinstance(cell_date, datetime):
+                        try:
+                            cell_date = datetime.strptime(str(cell_date)[:10], '%Y-%m-%d')
+                        except ValueError:
+                            continue
+                    if cell_date >= (reserved_cutoff if values[4] == 'Reserved' else cutoff):
+                        continue
+                    moving.setdefault(month_of(cell_date), {}).setdefault(doctor_name, []).append((cell_date,) + tuple(values[1:]))
+                    deleted.setdefault(doctor_name, []).append(idx)
+            
+            for month, rows in moving.items():
+                report["partitions"][month] = sum(len(doctor_rows) for doctor_rows in rows.values())
+            for doctor_name, indexes in deleted.items():
+                report["doctors"][doctor_name] = len(indexes)
+            report["rows"] = sum(report["partitions"].values())
+            if dry_run or not report["rows"]:
+                wb.close()
+                return report
+            
+            for month, rows in sorted(moving.items()):
+                self.archive.append(month, rows)
+            for doctor_name, indexes in deleted.items():
+                self._drop_rows(wb[doctor_name], indexes)
+            self._save_workbook(wb)
+        
+        for month, rows in moving.items():
+            for doctor_rows in rows.values():
+                for values in doctor_rows:
+                    ARCHIVED_ROWS.inc(str(values[4]))
+        return report
+    
+    @staticmethod
+    def _drop_rows(ws, indexes: List[int]):
+        """
+        Delete rows by index in one pass
+        
+        openpyxl's delete_rows shifts every row below on each call, so
+        scattered deletions would be quadratic; instead the kept rows are
+        copied up (values and styles) and the tail is cut once.
+        """
+        dropped = set(indexes)
+        target = min(dropped)
+        columns = ws.max_column
+        for idx in range(target, ws.max_row + 1):
+            if idx in dropped:
+                continue
+            for column in range(1, columns + 1):
+                source = ws.cell(row=idx, column=column)
+                destination = ws.cell(row=target, column=column)
+                destination.value = source.value
+                destination._style = copy(source._style)
+            target += 1
+        ws.delete_rows(target, ws.max_row - target + 1)
+    
+    @traced("ExcelDBManager.get_patient_info")
     def get_patient_info(self, patient_name: str) -> Optional[Dict]:
         """Get patient information from the Patients sheet"""
+        key = self._flight_key("get_patient_info", patient_name)
+        return read_flight.do(key, self._get_patient_info, patient_name)
+    
+    def _get_patient_info(self, patient_name: str) -> Optional[Dict]:
         try:
-            df = pd.read_excel(self.excel_path, sheet_name='Patients')
+            df = self._read_sheet('Patients')
             patient_row = df[df['Full_Name'] == patient_name]
             
             if patient_row.empty:
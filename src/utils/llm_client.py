@@ -0,0 +1,594 @@
+"""
+Resilient LLM Client
+Retries with backoff, hedged requests and a circuit breaker around LLM provider HTTP calls
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Full jitter backoff, but never less than what the provider asked for"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class LLMHTTPError(Exception):
+    """Raised when the provider answers with a non-200 status"""
+    
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status_code} - {message}")
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+    
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in RETRYABLE_STATUSES
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the provider cannot serve a request (circuit open, overloaded or retries exhausted)"""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker
+    
+    closed    -> requests flow; consecutive failures are counted
+    open      -> requests fail fast until reset_timeout has elapsed
+    half_open -> a single probe request is let through; success closes, failure re-opens
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to the provider"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            
+            # Half-open: let exactly one probe through
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        """Record a successful provider call"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self):
+        """Record a failed provider call"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies"""
+    
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile (0.0-1.0) of recorded latencies, or None if empty"""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+
+class ResilientLLMClient:
+    """
+    HTTP client for LLM providers with bounded retries, request hedging and a circuit breaker
+    
+    - Retryable statuses (429/5xx) and network errors are retried with exponential
+      backoff and full jitter, honouring Retry-After, within an overall deadline.
+    - Once enough latency samples exist, a duplicate (hedged) request is sent if the
+      first one is slower than the recent p95; the first response wins.
+    - A circuit breaker fails fast while the provider is degraded.
+    - A bulkhead caps concurrent provider calls so slow responses cannot tie up
+      every worker thread; callers that cannot get a slot quickly fail fast.
+      A blocking request cannot be aborted, so a call keeps its slot until its
+      losing attempts have finished too: leftover threads never exceed the
+      attempt pool and never delay new calls that got a slot.
+    - Attempts share one keep-alive connection pool.
+    """
+    
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        deadline: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 0.95,
+        hedge_min_samples: int = 20,
+        max_concurrency: int = 8,
+        queue_timeout: float = 2.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0
+    ):
+        """Initialize the resilient client"""
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.queue_timeout = queue_timeout
+        
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.latency = LatencyTracker()
+        
+        # Bulkhead: at most max_concurrency logical calls in flight,
+        # each of which may use two attempt threads while hedging
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency * 2,
+            thread_name_prefix="llm-attempt"
+        )
+        self._pool_size = max_concurrency * 2
+        self._session = None
+        self._session_pid = None
+    
+    def _http(self) -> requests.Session:
+        """Keep-alive session owned by the current process (recreated after fork)"""
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self._pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+            self._session_pid = os.getpid()
+        return self._session
+    
+    def _release_after(self, attempts: list):
+        """Give a call's bulkhead slot back once every attempt thread it started has finished"""
+        if not attempts:
+            self._slots.release()
+            return
+        remaining = [len(attempts)]
+        lock = threading.Lock()
+        
+        def finished(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._slots.release()
+        
+        for future in attempts:
+            future.add_done_callback(finished)
+    
+    def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Dict:
+        """
+        POST a JSON payload and return the decoded JSON response
+        
+        Raises:
+            LLMHTTPError: for non-retryable provider errors (e.g. 400 bad request)
+            LLMUnavailableError: when the circuit is open, the client is saturated,
+                or retries/deadline are exhausted
+        """
+        # Fail fast without queueing while the provider is known to be down
+        if self.breaker.state == CircuitBreaker.OPEN:
+            raise LLMUnavailableError("LLM provider circuit is open")
+        
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMUnavailableError("Too many concurrent LLM requests")
+        
+        attempts = []  # Futures of every attempt thread this call starts
+        try:
+            if not self.breaker.allow_request():
+                raise LLMUnavailableError("LLM provider circuit is open")
+            return self._with_retries(
+                lambda timeout: self._hedged_post(url, payload, headers or {}, timeout, attempts)
+            )
+        finally:
+            self._release_after(attempts)
+    
+    def post_stream(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Iterator[str]:
+        """
+        POST a payload and yield the non-empty lines of a streamed response
+        
+        Retries only happen before the response starts; streams are never hedged.
+        The concurrency slot is held until the stream is exhausted or closed.
+        """
+        if self.breaker.state == CircuitBreaker.OPEN:
+            raise LLMUnavailableError("LLM provider circuit is open")
+        
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMUnavailableError("Too many concurrent LLM requests")
+        
+        try:
+            if not self.breaker.allow_request():
+                raise LLMUnavailableError("LLM provider circuit is open")
+            response = self._with_retries(
+                lambda timeout: self._open_stream(url, payload, headers or {}, timeout)
+            )
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        yield line
+            finally:
+                response.close()
+        finally:
+            self._slots.release()
+    
+    def _with_retries(self, attempt_fn):
+        """Run attempts with exponential backoff until success, a fatal error or the deadline"""
+        started = time.monotonic()
+        last_error = None
+        
+        for attempt in range(self.max_retries + 1):
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            
+            try:
+                result = attempt_fn(min(self.timeout, remaining))
+                self.breaker.record_success()
+                return result
+            except LLMHTTPError as e:
+                if not e.retryable:
+                    # The provider is healthy, the request itself is bad
+                    self.breaker.record_success()
+                    raise
+                last_error = e
+                retry_after = e.retry_after
+            except Exception as e:
+                # Network errors, timeouts and malformed responses
+                last_error = e
+                retry_after = None
+            
+            self.breaker.record_failure()
+            if attempt == self.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+                break
+            
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+            if time.monotonic() - started + delay >= self.deadline:
+                break
+            time.sleep(delay)
+        
+        raise LLMUnavailableError(f"LLM provider unavailable: {last_error!r}")
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """Delay before sending a hedged duplicate, or None if hedging is off"""
+        if not self.hedge_enabled or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+    
+    def _hedged_post(self, url: str, payload: Dict, headers: Dict, timeout: float, attempts: list) -> Dict:
+        """Send one request, plus a hedged duplicate if the first is slower than usual"""
+        futures = []
+        
+        def launch():
+            future = self._executor.submit(self._send, url, payload, headers, timeout)
+            futures.append(future)
+            attempts.append(future)
+        
+        launch()
+        hedge_delay = self._hedge_delay()
+        started = time.monotonic()
+        
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = wait(futures, timeout=hedge_delay)
+                if not done:
+                    launch()
+            
+            last_error = None
+            pending = set(futures)
+            while pending:
+                remaining = timeout - (time.monotonic() - started)
+                done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+                if not done:
+                    raise requests.Timeout(f"LLM request timed out after {timeout:.1f}s")
+                for future in done:
+                    error = future.exception()
+                    if error is None:
+                        return future.result()
+                    last_error = error
+            raise last_error
+        finally:
+            # Drop a loser that has not started; a running one ends within its timeout
+            for future in futures:
+                future.cancel()
+    
+    def _send(self, url: str, payload: Dict, headers: Dict, timeout: float) -> Dict:
+        """Perform a single HTTP attempt"""
+        started = time.monotonic()
+        response = self._http().post(url, headers=headers, json=payload, timeout=timeout)
+        
+        if response.status_code == 200:
+            self.latency.record(time.monotonic() - started)
+            return response.json()
+        
+        raise self._http_error(response)
+    
+    def _open_stream(self, url: str, payload: Dict, headers: Dict, timeout: float) -> requests.Response:
+        """Open a streamed HTTP response, raising on non-200 statuses"""
+        response = self._http().post(url, headers=headers, json=payload, timeout=timeout, stream=True)
+        if response.status_code != 200:
+            try:
+                raise self._http_error(response)
+            finally:
+                response.close()
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        return response
+    
+    @staticmethod
+    def _http_error(response) -> LLMHTTPError:
+        """Build an LLMHTTPError from a failed response (requests or httpx)"""
+        error_msg = response.text
+        try:
+            error_data = response.json()
+            if 'error' in error_data:
+                error_msg = error_data['error'].get('message', error_msg)
+        except Exception:
+            pass
+        
+        retry_after = None
+        try:
+            retry_after = float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            pass
+        
+        return LLMHTTPError(response.status_code, error_msg, retry_after)
+
+
+class AsyncResilientLLMClient:
+    """
+    asyncio counterpart of ResilientLLMClient built on httpx
+    
+    Same retry, hedging and circuit breaker policy, but an in-flight call costs
+    a coroutine instead of a thread, so one process can keep hundreds of LLM
+    calls open. A hedged loser is cancelled, which closes its connection.
+    """
+    
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        deadline: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 0.95,
+        hedge_min_samples: int = 20,
+        max_concurrency: int = 256,
+        queue_timeout: float = 2.0,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0
+    ):
+        """Initialize the async client (the HTTP pool is created on first use)"""
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.latency = LatencyTracker()
+        
+        self._slots = None
+        self._http = None
+    
+    def _client(self):
+        """Shared connection pool, bound to the running event loop"""
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency * 2)
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._http
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def _acquire_slot(self):
+        if self.breaker.state == CircuitBreaker.OPEN:
+            raise LLMUnavailableError("LLM provider circuit is open")
+        
+        self._client()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailableError("Too many concurrent LLM requests")
+        
+        if not self.breaker.allow_request():
+            self._slots.release()
+            raise LLMUnavailableError("LLM provider circuit is open")
+    
+    async def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Dict:
+        """
+        POST a JSON payload and return the decoded JSON response
+        
+        Raises the same errors as ResilientLLMClient.post_json
+        """
+        await self._acquire_slot()
+        try:
+            return await self._with_retries(
+                lambda timeout: self._hedged_post(url, payload, headers or {}, timeout)
+            )
+        finally:
+            self._slots.release()
+    
+    async def post_stream(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> AsyncIterator[str]:
+        """POST a payload and yield the non-empty lines of a streamed response"""
+        await self._acquire_slot()
+        try:
+            response = await self._with_retries(
+                lambda timeout: self._open_stream(url, payload, headers or {}, timeout)
+            )
+            try:
+                async for line in response.aiter_lines():
+                    if line:
+                        yield line
+            finally:
+                await response.aclose()
+        finally:
+            self._slots.release()
+    
+    async def _with_retries(self, attempt_fn):
+        """Run attempts with exponential backoff until success, a fatal error or the deadline"""
+        started = time.monotonic()
+        last_error = None
+        
+        for attempt in range(self.max_retries + 1):
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            
+            try:
+                result = await attempt_fn(min(self.timeout, remaining))
+                self.breaker.record_success()
+                return result
+            except LLMHTTPError as e:
+                if not e.retryable:
+                    self.breaker.record_success()
+                    raise
+                last_error = e
+                retry_after = e.retry_after
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = e
+                retry_after = None
+            
+            self.breaker.record_failure()
+            if attempt == self.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+                break
+            
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+            if time.monotonic() - started + delay >= self.deadline:
+                break
+            await asyncio.sleep(delay)
+        
+        raise LLMUnavailableError(f"LLM provider unavailable: {last_error!r}")
+    
+    async def _hedged_post(self, url: str, payload: Dict, headers: Dict, timeout: float) -> Dict:
+        """Send one request, plus a hedged duplicate if the first is slower than usual"""
+        tasks = [asyncio.ensure_future(self._send(url, payload, headers, timeout))]
+        started = time.monotonic()
+        hedge_delay = None
+        if self.hedge_enabled and len(self.latency) >= self.hedge_min_samples:
+            hedge_delay = self.latency.percentile(self.hedge_percentile)
+        
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    tasks.append(asyncio.ensure_future(self._send(url, payload, headers, timeout)))
+            
+            last_error = None
+            pending = set(tasks)
+            while pending:
+                remaining = timeout - (time.monotonic() - started)
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(remaining, 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError(f"LLM request timed out after {timeout:.1f}s")
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # Cancel the loser; cancellation closes its connection
+            for task in tasks:
+                task.cancel()
+    
+    async def _send(self, url: str, payload: Dict, headers: Dict, timeout: float) -> Dict:
+        """Perform a single HTTP attempt"""
+        started = time.monotonic()
+        response = await self._client().post(url, headers=headers, json=payload, timeout=timeout)
+        
+        if response.status_code == 200:
+            self.latency.record(time.monotonic() - started)
+            return response.json()
+        
+        raise ResilientLLMClient._http_error(response)
+    
+    async def _open_stream(self, url: str, payload: Dict, headers: Dict, timeout: float):
+        """Open a streamed HTTP response, raising on non-200 statuses"""
+        client = self._client()
+        request = client.build_request("POST", url, headers=headers, json=payload, timeout=timeout)
+        response = await client.send(request, stream=True)
+        if response.status_code != 200:
+            try:
+                await response.aread()
+                raise ResilientLLMClient._http_error(response)
+            finally:
+                await response.aclose()
+        return response
@@ -0,0 +1,248 @@
+"""
+Metrics
+Prometheus-compatible counters and latency histograms for each stage of the chat pipeline
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+
+# Seconds; covers fast Excel reads up to LLM calls near their deadline
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Every metric, in registration order, for rendering
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        """
+        Args:
+            name: Metric name (should end in _total)
+            help_text: Description shown in the exposition
+            labelnames: Label names; values are passed positionally to inc()
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _register(self)
+    
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """Add amount to the series for labelvalues"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+    
+    def value(self, *labelvalues: str) -> float:
+        """Current value of one series"""
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class _Timer:
+    """Context manager observing elapsed time into one histogram series"""
+    
+    __slots__ = ("histogram", "labelvalues", "started")
+    
+    def __init__(self, histogram: "Histogram", labelvalues: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+        return False
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+    
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        """
+        Args:
+            name: Metric name (should end in a unit, e.g. _seconds)
+            help_text: Description shown in the exposition
+            labelnames: Label names; values are passed positionally to observe()
+            buckets: Sorted upper bounds; +Inf is added automatically
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _register(self)
+    
+    def observe(self, value: float, *labelvalues: str):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+    
+    def time(self, *labelvalues: str) -> _Timer:
+        """Time a block: `with histogram.time("embedding"): ...`"""
+        return _Timer(self, labelvalues)
+    
+    def count(self, *labelvalues: str) -> int:
+        """Number of observations in one series"""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return sum(series[:-1]) if series else 0
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labelvalues, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from a callback at scrape time"""
+    
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        callback: Callable[[], Union[float, Dict[str, float]]],
+        kind: str = "gauge",
+        labelname: str = ""
+    ):
+        """
+        Args:
+            name: Metric name
+            help_text: Description shown in the exposition
+            callback: Returns a number, or {label value: number} when labelname is set
+            kind: "gauge" or "counter"
+            labelname: Label for the keys of a dict-returning callback
+        """
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.kind = kind
+        self.labelname = labelname
+        _register(self)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.callback()
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {e}")
+            return lines
+        
+        if isinstance(value, dict):
+            for label, item in sorted(value.items()):
+                lines.append(f"{self.name}{_format_labels((self.labelname,), (label,))} {_format_value(item)}")
+        else:
+            lines.append(f"{self.name} {_format_value(value)}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Content-Type of render_metrics() output
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Pipeline metrics shared by the chatbot, tools and data managers
+STAGE_SECONDS = Histogram(
+    "chatbot_stage_seconds",
+    "Latency of each chat pipeline stage",
+    ["stage"]
+)
+TOOL_SECONDS = Histogram(
+    "chatbot_tool_seconds",
+    "Latency of each tool (function) execution",
+    ["tool"]
+)
+FUNCTION_CALLS = Counter(
+    "chatbot_function_calls_total",
+    "Function calls requested by the model, by function",
+    ["function"]
+)
+CACHE_REQUESTS = Counter(
+    "chatbot_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"]
+)
+REJECTED_REQUESTS = Counter(
+    "chatbot_rejected_requests_total",
+    "Chat requests shed by admission control or rate limiting, by reason",
+    ["reason"]
+)
+ERRORS = Counter(
+    "chatbot_errors_total",
+    "Errors by stage and exception type",
+    ["stage", "type"]
+)
+
+
+def record_error(stage: str, error: BaseException):
+    """Count an error under its stage and exception class name"""
+    ERRORS.inc(stage, type(error).__name__)
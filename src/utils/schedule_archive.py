@@ -0,0 +1,258 @@
+"""
+Schedule Archive
+Past schedule rows moved out of the live workbook into one workbook per month, so hot reads only parse current rows
+
+Run standalone (e.g. nightly from cron):
+    python -m src.utils.schedule_archive --retention-days 90
+    python -m src.utils.schedule_archive --dry-run
+"""
+import argparse
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Font, PatternFill
+
+from .metrics import Counter
+from .slot_holds import slot_start
+
+
+ARCHIVED_ROWS = Counter(
+    "chatbot_archived_rows_total",
+    "Schedule rows moved from the live workbook into monthly archive partitions",
+    ["status"]
+)
+
+SCHEDULE_COLUMNS = ["Date", "Time", "Patient_Name", "Phone", "Status"]
+
+
+def month_of(day: datetime) -> str:
+    """Partition name ('2025-11') of a row's date"""
+    return day.strftime('%Y-%m')
+
+
+def slot_key(values: Tuple) -> Tuple:
+    """Identity of a schedule row within a doctor's sheet: its slot start (date and time)"""
+    start = slot_start(values[0], values[1])
+    return (start,) if start is not None else (str(values[0])[:10], str(values[1]))
+
+
+class ScheduleArchive:
+    """
+    Monthly partitions of archived schedule rows
+    
+    Each month is a workbook (<directory>/YYYY-MM.xlsx) with one sheet per
+    doctor in the live layout, so a date lookup opens a single partition.
+    Parsed partitions are cached until their file changes. Callers that
+    append must serialize across processes (ExcelDBManager does so with its
+    workbook write lock).
+    """
+    
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Folder holding the partitions (created on first write)
+        """
+        self.directory = Path(directory)
+        self._cache = {}  # month -> (file version, {doctor: DataFrame})
+        self._lock = threading.Lock()
+    
+    def path_of(self, month: str) -> Path:
+        return self.directory / f"{month}.xlsx"
+    
+    def months(self) -> List[str]:
+        """Partitions on disk, oldest first"""
+        if not self.directory.exists():
+            return []
+        return sorted(path.stem for path in self.directory.glob("[0-9][0-9][0-9][0-9]-[0-9][0-9].xlsx"))
+    
+    def append(self, month: str, rows: Dict[str, List[Tuple]]) -> int:
+        """
+        Add rows to a month's partition, one row per doctor, date and time
+        
+        A run interrupted after writing the partition but before saving the
+        live workbook moves the same slots again, possibly changed in the
+        meantime (e.g. a late status edit). A slot the partition already holds
+        is overwritten with the new values instead of being added twice.
+        
+        Args:
+            month: Partition name (YYYY-MM)
+            rows: Doctor -> row values in SCHEDULE_COLUMNS order
+        
+        Returns:
+            Number of rows added or overwritten
+        """
+        path = self.path_of(month)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            wb = openpyxl.load_workbook(path)
+        else:
+            wb = openpyxl.Workbook()
+            wb.remove(wb.active)
+        
+        fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
+        written = 0
+        for doctor, doctor_rows in rows.items():
+            if doctor in wb.sheetnames:
+                ws = wb[doctor]
+            else:
+                ws = wb.create_sheet(doctor)
+                ws.append(SCHEDULE_COLUMNS)
+                for cell in ws[1]:
+                    cell.font = Font(bold=True)
+            existing = {
+                slot_key(row): idx
+                for idx, row in enumerate(ws.iter_rows(min_row=2, max_col=len(SCHEDULE_COLUMNS), values_only=True), start=2)
+            }
+            for values in doctor_rows:
+                idx = existing.get(slot_key(values))
+                if idx is None:
+                    ws.append(list(values))
+                    idx = existing[slot_key(values)] = ws.max_row
+                elif tuple(cell.value for cell in ws[idx][:len(SCHEDULE_COLUMNS)]) == tuple(values):
+                    continue
+                else:
+                    for column, value in enumerate(values, start=1):
+                        ws.cell(row=idx, column=column, value=value)
+                ws.cell(row=idx, column=5).fill = fill if values[4] == 'Reserved' else PatternFill(fill_type=None)
+                written += 1
+        
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            wb.save(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            wb.close()
+            if temp_path.exists():
+                temp_path.unlink()
+        return written
+    
+    def read(self, month: str) -> Dict[str, pd.DataFrame]:
+        """Sheets of one partition (empty if it does not exist); shared, treat as read-only"""
+        path = self.path_of(month)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return {}
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(month)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        sheets = pd.read_excel(path, sheet_name=None)
+        with self._lock:
+            self._cache[month] = (version, sheets)
+        return sheets
+    
+    def search(
+        self,
+        patient_name: Optional[str] = None,
+        doctor_name: Optional[str] = None,
+        date: Optional[str] = None,
+        statuses: Iterable[str] = ('Reserved',)
+    ) -> List[Dict[str, Any]]:
+        """
+        Archived appointments matching the criteria, oldest first
+        
+        Args:
+            patient_name: Patient's name (optional)
+            doctor_name: Doctor's name (optional)
+            date: Date (YYYY-MM-DD); only that month's partition is opened
+            statuses: Row statuses to return
+        """
+        months = [date[:7]] if date else self.months()
+        results = []
+        for month in months:
+            for sheet_name, df in self.read(month).items():
+                if doctor_name and sheet_name != doctor_name:
+                    continue
+                matched = df[df['Status'].isin(list(statuses))].copy()
+                if patient_name:
+                    matched = matched[matched['Patient_Name'] == patient_name]
+                matched['Date'] = pd.to_datetime(matched['Date'])
+                if date:
+                    matched = matched[matched['Date'] == pd.to_datetime(date)]
+                for _, row in matched.iterrows():
+                    results.append({
+                        'doctor': sheet_name,
+                        'date': row['Date'].strftime('%Y-%m-%d'),
+                        'time': row['Time'],
+                        'patient_name': row['Patient_Name'],
+                        'phone': row['Phone'],
+                        'status': row['Status'],
+                        'archived': True
+                    })
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        """Partitions on disk and their total size"""
+        months = self.months()
+        return {
+            "partitions": len(months),
+            "oldest": months[0] if months else None,
+            "newest": months[-1] if months else None,
+            "bytes": sum(self.path_of(month).stat().st_size for month in months)
+        }
+
+
+class ArchiveScheduler:
+    """
+    Runs the archival job every interval on a daemon thread
+    
+    Each server process may run one; runs in different processes are
+    serialized by the workbook write lock and a run with nothing to move
+    leaves the files untouched.
+    """
+    
+    def __init__(self, job, interval: float):
+        """
+        Args:
+            job: Callable doing one archival run
+            interval: Seconds between runs
+        """
+        self.job = job
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="schedule-archiver", daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.job()
+            except Exception as e:
+                print(f"Error archiving schedule rows: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move past schedule rows into monthly archive partitions")
+    parser.add_argument("--workbook", help="Clinic workbook (default: EXCEL_DB_PATH)")
+    parser.add_argument("--retention-days", type=int, help="Days reserved rows stay in the live workbook (default: ARCHIVE_RETENTION_DAYS)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would move without changing any file")
+    args = parser.parse_args()
+    
+    from .config import config
+    from .excel_manager import ExcelDBManager
+    
+    manager = ExcelDBManager(args.workbook or config.EXCEL_DB_PATH, archive_retention_days=config.ARCHIVE_RETENTION_DAYS)
+    report = manager.archive_past_rows(retention_days=args.retention_days, dry_run=args.dry_run)
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"{verb} {report['rows']} row(s) older than {report['cutoff']} (reserved rows before {report['reserved_cutoff']})")
+    for month, count in sorted(report['partitions'].items()):
+        print(f"  {month}: {count}")
+
+
+if __name__ == "__main__":
+    main()
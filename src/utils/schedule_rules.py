@@ -0,0 +1,216 @@
+"""
+Schedule Rules
+Doctors' weekly hours as recurrence rules, turned into slots only for the days a query asks about
+"""
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .slot_index import time_to_minutes, parse_weekdays
+
+
+# Workbook sheets holding the templates (neither is a doctor's schedule)
+RULES_SHEET = "Schedule_Rules"
+EXCEPTIONS_SHEET = "Schedule_Exceptions"
+
+RULE_COLUMNS = ["Doctor", "Weekdays", "Start", "End", "Slot_Minutes", "Valid_From", "Valid_To"]
+EXCEPTION_COLUMNS = ["Doctor", "Date", "End_Date", "Start", "End", "Reason"]
+
+# Slot labels as the workbook writes them
+LABEL_FORMAT = "%I:%M %p"
+
+# Doctor value of an exception that applies to every doctor
+ALL_DOCTORS = {"", "all", "*"}
+
+
+def slot_label(minute: int) -> str:
+    """'09:30 AM' for 570 minutes after midnight"""
+    return (datetime(2000, 1, 1) + timedelta(minutes=minute)).strftime(LABEL_FORMAT)
+
+
+def _blank(value) -> bool:
+    """True for None, NaN, NaT (empty cells of a date column) and whitespace"""
+    if isinstance(value, str):
+        return not value.strip()
+    return value is None or (pd.api.types.is_scalar(value) and pd.isna(value))
+
+
+def _positive_int(value) -> Optional[int]:
+    """A whole number above zero (e.g. 30 or '30'), or None"""
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def _to_date(value) -> Optional[date]:
+    """Date of a cell, None if blank; raises ValueError for text that is not YYYY-MM-DD"""
+    if _blank(value):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date()
+
+
+class _Rule:
+    """One line of weekly hours, e.g. Mon-Fri 09:00-17:00 every 30 minutes"""
+    
+    __slots__ = ("weekdays", "valid_from", "valid_to", "slots")
+    
+    def __init__(self, weekdays: Set[int], start: int, end: int, step: int, valid_from: Optional[date], valid_to: Optional[date]):
+        self.weekdays = weekdays
+        self.valid_from = valid_from
+        self.valid_to = valid_to
+        # Slots must end by the closing time
+        self.slots = [(minute, slot_label(minute)) for minute in range(start, end - step + 1, step)]
+    
+    def applies(self, day: date) -> bool:
+        return (
+            day.weekday() in self.weekdays
+            and (self.valid_from is None or day >= self.valid_from)
+            and (self.valid_to is None or day <= self.valid_to)
+        )
+
+
+class ScheduleTemplates:
+    """
+    Recurrence rules and exceptions of the doctors that use them
+    
+    A templated doctor's sheet records only deviations: reservations,
+    blocked slots ('Blocked' or any status other than 'Available') and
+    one-off extra slots ('Available' rows). Free slots for a window are
+    the rule slots of each day, minus holidays and exceptions, minus the
+    deviations, plus the extra rows.
+    """
+    
+    def __init__(self, rules: Optional[pd.DataFrame], exceptions: Optional[pd.DataFrame], slot_minutes: int = 30):
+        """
+        Parse the template sheets
+        
+        Args:
+            rules: Schedule_Rules sheet (Doctor, Weekdays, Start, End, Slot_Minutes, Valid_From, Valid_To)
+            exceptions: Schedule_Exceptions sheet (Doctor, Date, End_Date, Start, End, Reason);
+                a blank or 'All' doctor closes the clinic, blank Start/End the whole day
+            slot_minutes: Slot length when a rule leaves Slot_Minutes blank
+        """
+        self.rules = {}  # doctor -> [_Rule]
+        self.exceptions = {}  # (doctor or None, day) -> [(start, end) or None for the whole day]
+        
+        for record in ([] if rules is None else rules.to_dict('records')):
+            doctor = record.get("Doctor")
+            weekdays = parse_weekdays(str(record.get("Weekdays") or ""))
+            start = time_to_minutes(record.get("Start"))
+            end = time_to_minutes(record.get("End"))
+            step = _positive_int(slot_minutes if _blank(record.get("Slot_Minutes")) else record["Slot_Minutes"])
+            if _blank(doctor) or not weekdays or start is None or end is None or step is None:
+                print(f"Skipping incomplete schedule rule: {record}")
+                continue
+            try:
+                valid_from = _to_date(record.get("Valid_From"))
+                valid_to = _to_date(record.get("Valid_To"))
+            except ValueError:
+                print(f"Skipping schedule rule with an invalid date: {record}")
+                continue
+            self.rules.setdefault(str(doctor).strip(), []).append(_Rule(weekdays, start, end, step, valid_from, valid_to))
+        
+        for record in ([] if exceptions is None else exceptions.to_dict('records')):
+            try:
+                first = _to_date(record.get("Date"))
+                last = _to_date(record.get("End_Date")) or first
+            except ValueError:
+                print(f"Skipping schedule exception with an invalid date: {record}")
+                continue
+            if first is None:
+                continue
+            doctor = record.get("Doctor")
+            doctor = None if _blank(doctor) or str(doctor).strip().lower() in ALL_DOCTORS else str(doctor).strip()
+            start = time_to_minutes(record.get("Start"))
+            end = time_to_minutes(record.get("End"))
+            if start is None and end is None:
+                window = None  # Whole day
+            else:
+                window = (start if start is not None else 0, end if end is not None else 24 * 60)
+            day = first
+            while day <= last:
+                self.exceptions.setdefault((doctor, day), []).append(window)
+                day += timedelta(days=1)
+    
+    def __contains__(self, doctor: str) -> bool:
+        return doctor in self.rules
+    
+    @property
+    def doctors(self) -> List[str]:
+        return list(self.rules)
+    
+    def day_slots(self, doctor: str, day: date) -> List[Tuple[int, str]]:
+        """Rule slots of one doctor and day after exceptions, as (minute, label) by time"""
+        closures = self.exceptions.get((None, day), []) + self.exceptions.get((doctor, day), [])
+        if None in closures:
+            return []
+        
+        slots = {}
+        for rule in self.rules.get(doctor, []):
+            if rule.applies(day):
+                slots.update(rule.slots)
+        return [
+            (minute, label) for minute, label in sorted(slots.items())
+            if not any(start <= minute < end for start, end in closures)
+        ]
+    
+    def generates(self, doctor: str, day: date, minute: int) -> bool:
+        """True if the rules offer this slot (before deviations)"""
+        return any(slot_minute == minute for slot_minute, _ in self.day_slots(doctor, day))
+    
+    def materialize(self, doctor: str, days: Iterable[date], deviations: "Deviations") -> pd.DataFrame:
+        """
+        Free slots of the given days as rows in the workbook's layout
+        
+        Args:
+            doctor: Templated doctor
+            days: Days to generate, in order
+            deviations: The doctor's parsed sheet
+        
+        Returns:
+            DataFrame with Date, Time, Patient_Name, Phone and Status ('Available') columns
+        """
+        dates = []
+        labels = []
+        for day in days:
+            for minute, label in self.day_slots(doctor, day):
+                if (day, minute) not in deviations.taken and (day, minute) not in deviations.extra:
+                    dates.append(day)
+                    labels.append(label)
+        return pd.DataFrame({
+            'Date': pd.to_datetime(pd.Series(dates, dtype='object')),
+            'Time': pd.Series(labels, dtype='object'),
+            'Patient_Name': '-',
+            'Phone': '-',
+            'Status': 'Available'
+        })
+
+
+class Deviations:
+    """A templated doctor's sheet: slots taken or blocked, and extra free rows"""
+    
+    __slots__ = ("taken", "extra", "extra_rows")
+    
+    def __init__(self, df: pd.DataFrame):
+        days = pd.to_datetime(df['Date'], errors='coerce').dt.date
+        minutes = df['Time'].map(time_to_minutes)
+        available = (df['Status'] == 'Available').to_numpy()
+        self.taken = set()
+        self.extra = set()
+        for day, minute, is_available in zip(days, minutes, available):
+            if pd.isna(day) or minute is None or pd.isna(minute):
+                continue
+            (self.extra if is_available else self.taken).add((day, int(minute)))
+        self.extra_rows = df[available]
+
+
+def days_between(first: date, last: date) -> List[date]:
+    """Every day from first to last, inclusive"""
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
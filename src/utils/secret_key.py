@@ -0,0 +1,35 @@
+"""
+Secret Key
+Session signing key shared by every worker process and restart
+"""
+import os
+import secrets
+import time
+from pathlib import Path
+
+
+def load_secret_key(config) -> str:
+    """
+    Get a signing key that is identical across workers and restarts
+    
+    Uses FLASK_SECRET_KEY when set (required when replicas run on several hosts);
+    otherwise a key is generated once and persisted to FLASK_SECRET_KEY_FILE.
+    """
+    if config.FLASK_SECRET_KEY:
+        return config.FLASK_SECRET_KEY
+    
+    key_path = Path(config.FLASK_SECRET_KEY_FILE)
+    try:
+        # O_EXCL: when several workers start together, exactly one writes the key
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    
+    for _ in range(50):
+        key = key_path.read_text().strip()
+        if key:
+            return key
+        time.sleep(0.01)  # Another worker is still writing it
+    raise RuntimeError(f"Secret key file {key_path} is empty")
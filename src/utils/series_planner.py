@@ -0,0 +1,138 @@
+"""
+Series Planner
+Lays out a recurring course of sessions (e.g. 2x/week for 6 weeks) over a doctor's free slots
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+
+# Fallback rules, tried in the given order when the requested slot is taken
+FALLBACK_RULES = ("nearest_time", "next_day", "skip")
+
+
+def _weekday_label(day: date) -> str:
+    return day.strftime('%A')
+
+
+def _occurrences(start: date, weekdays: Sequence[int], max_weeks: int) -> Iterator[Tuple[date, Optional[date]]]:
+    """Pattern days from start, each with the next pattern day (bound for next_day shifts)"""
+    week_start = start - timedelta(days=start.weekday())
+    days = []
+    for week in range(max_weeks + 1):
+        for weekday in sorted(set(weekdays)):
+            day = week_start + timedelta(weeks=week, days=weekday)
+            if day >= start:
+                days.append(day)
+    for index, day in enumerate(days):
+        yield day, days[index + 1] if index + 1 < len(days) else None
+
+
+def _pick(day_slots: Dict[int, Any], minute: Optional[int], max_shift: int, exact_only: bool) -> Optional[int]:
+    """Minute of the slot to take on one day: the requested one, or the nearest within max_shift"""
+    if not day_slots:
+        return None
+    if minute is None:
+        return min(day_slots)
+    if minute in day_slots:
+        return minute
+    if exact_only:
+        return None
+    nearest = min(day_slots, key=lambda candidate: (abs(candidate - minute), candidate))
+    return nearest if abs(nearest - minute) <= max_shift else None
+
+
+def plan_series(
+    free_slots: Dict[date, Dict[int, Any]],
+    weekdays: Sequence[int],
+    sessions: int,
+    start: date,
+    minute: Optional[int] = None,
+    fallbacks: Sequence[str] = FALLBACK_RULES,
+    max_time_shift: int = 120,
+    max_weeks: int = 26
+) -> Dict[str, Any]:
+    """
+    Choose one free slot per pattern day until the course is complete
+    
+    Args:
+        free_slots: Free slots of one doctor, {day: {minutes after midnight: slot reference}}
+        weekdays: Pattern weekdays (Monday = 0), e.g. [0, 3] for Monday and Thursday
+        sessions: Number of sessions to place
+        start: First day the series may use
+        minute: Requested start time in minutes after midnight (None: earliest free slot of the day)
+        fallbacks: Rules tried in order when the requested slot is taken:
+            nearest_time - same day, closest free time within max_time_shift minutes
+            next_day - a later day before the next pattern day, same time (or nearest)
+            skip - leave this occurrence out and extend the series by one more
+        max_time_shift: Largest time difference accepted by nearest_time and next_day
+        max_weeks: Weeks searched before giving up
+    
+    Returns:
+        {"complete": bool, "sessions": [...], "skipped": [...], "unplaced": requested day or None}
+        Each session has day, minute, ref, requested_day and rule ("exact" or a fallback).
+    """
+    planned = []
+    skipped = []
+    used_days = set()
+    
+    for day, next_pattern_day in _occurrences(start, weekdays, max_weeks):
+        if len(planned) >= sessions:
+            break
+        
+        chosen = None
+        picked = _pick(free_slots.get(day, {}), minute, max_time_shift, exact_only=True)
+        if picked is not None:
+            chosen = (day, picked, "exact")
+        else:
+            for rule in fallbacks:
+                if rule == "nearest_time":
+                    picked = _pick(free_slots.get(day, {}), minute, max_time_shift, exact_only=False)
+                    if picked is not None:
+                        chosen = (day, picked, rule)
+                elif rule == "next_day":
+                    # Later days of the same week, never reaching the next pattern day
+                    last = min(next_pattern_day, day + timedelta(days=7)) if next_pattern_day else day + timedelta(days=7)
+                    shifted = day + timedelta(days=1)
+                    while chosen is None and shifted < last:
+                        picked = _pick(free_slots.get(shifted, {}), minute, max_time_shift, exact_only=False)
+                        if picked is not None and shifted not in used_days:
+                            chosen = (shifted, picked, rule)
+                        shifted += timedelta(days=1)
+                elif rule == "skip":
+                    chosen = "skip"
+                if chosen is not None:
+                    break
+        
+        if chosen is None:
+            # No rule placed this session and skipping is not allowed
+            return {"complete": False, "sessions": planned, "skipped": skipped, "unplaced": day}
+        if chosen == "skip":
+            skipped.append(day)
+            continue
+        
+        chosen_day, chosen_minute, rule = chosen
+        used_days.add(chosen_day)
+        planned.append({
+            "day": chosen_day,
+            "minute": chosen_minute,
+            "ref": free_slots[chosen_day][chosen_minute],
+            "requested_day": day,
+            "rule": rule
+        })
+    
+    return {
+        "complete": len(planned) >= sessions,
+        "sessions": planned,
+        "skipped": skipped,
+        "unplaced": None
+    }
+
+
+def describe_session(number: int, session: Dict[str, Any], label: str) -> str:
+    """One plan line, e.g. '3. Monday 2025-11-17 at 05:00 PM (moved from Sunday 2025-11-16)'"""
+    line = f"{number}. {_weekday_label(session['day'])} {session['day'].isoformat()} at {label}"
+    if session["rule"] == "nearest_time":
+        line += " (nearest free time)"
+    elif session["rule"] == "next_day":
+        line += f" (moved from {_weekday_label(session['requested_day'])} {session['requested_day'].isoformat()})"
+    return line
@@ -0,0 +1,169 @@
+"""
+Service Registry
+Creates each heavy shared resource (workbook, vector store, LLM clients) once, on first use
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+from .config import config
+
+
+class ServiceRegistry:
+    """
+    Lazily-initialized singletons shared by the chatbot, the CrewAI tools and the apps
+    
+    A service is registered as a factory and built the first time it is
+    requested; concurrent first requests wait for a single construction.
+    """
+    
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+    
+    def register(self, name: str, factory: Callable[[], Any]):
+        """
+        Register how to build a service (replaces an existing factory)
+        
+        Args:
+            name: Service name used with get()
+            factory: Zero-argument callable returning the instance
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+    
+    def get(self, name: str) -> Any:
+        """Get a service, building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        
+        lock = self._locks.get(name)
+        if lock is None:
+            raise KeyError(f"Unknown service: {name}")
+        with lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = self._factories[name]()
+                self._instances[name] = instance
+        return instance
+    
+    def lazy(self, name: str) -> "LazyService":
+        """Proxy usable like the service itself, resolved on each attribute access"""
+        return LazyService(self, name)
+    
+    def is_created(self, name: str) -> bool:
+        """True once the service has been built (or overridden)"""
+        return name in self._instances
+    
+    def created(self) -> List[str]:
+        """Names of the services built so far"""
+        return list(self._instances)
+    
+    def warm(self, *names: str) -> Dict[str, float]:
+        """
+        Build services ahead of the first request
+        
+        Args:
+            names: Services to build (default: all registered)
+        
+        Returns:
+            Seconds spent building each service (0 if it already existed)
+        """
+        timings = {}
+        for name in names or list(self._factories):
+            started = time.perf_counter()
+            self.get(name)
+            timings[name] = round(time.perf_counter() - started, 3)
+        return timings
+    
+    def reset(self, *names: str):
+        """Drop built instances so the next get() rebuilds them (default: all)"""
+        with self._lock:
+            for name in names or list(self._instances):
+                self._instances.pop(name, None)
+    
+    @contextmanager
+    def override(self, name: str, instance: Any):
+        """
+        Use a replacement instance (e.g. a fake in tests) within a block
+        
+        Example:
+            with services.override("excel", ExcelDBManager("tests/fixture.xlsx")):
+                ...
+        """
+        with self._lock:
+            self._locks.setdefault(name, threading.Lock())
+            missing = object()
+            previous = self._instances.get(name, missing)
+            self._instances[name] = instance
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                if previous is missing:
+                    self._instances.pop(name, None)
+                else:
+                    self._instances[name] = previous
+
+
+class LazyService:
+    """Stand-in for a registry service; the first attribute access builds it"""
+    
+    __slots__ = ("_registry", "_name")
+    
+    def __init__(self, registry: ServiceRegistry, name: str):
+        self._registry = registry
+        self._name = name
+    
+    def __getattr__(self, attribute: str):
+        return getattr(self._registry.get(self._name), attribute)
+    
+    def __repr__(self) -> str:
+        state = "created" if self._registry.is_created(self._name) else "not created"
+        return f"<LazyService {self._name} ({state})>"
+
+
+def _create_excel_manager():
+    from .excel_manager import ExcelDBManager
+    from .slot_holds import create_slot_holds
+    
+    return ExcelDBManager(
+        config.EXCEL_DB_PATH,
+        holds=create_slot_holds(config),
+        slot_minutes=config.APPOINTMENT_DURATION,
+        template_horizon_days=config.SCHEDULE_HORIZON_DAYS,
+        archive_retention_days=config.ARCHIVE_RETENTION_DAYS,
+        waitlist_policy=config.WAITLIST_POLICY,
+        waitlist_offer_ttl=config.WAITLIST_OFFER_TTL,
+        waitlist_max_days=config.WAITLIST_MAX_DAYS
+    )
+
+
+def _create_vector_manager():
+    from .vector_db_manager import VectorDBManager
+    
+    return VectorDBManager(
+        qdrant_url=config.QDRANT_URL,
+        qdrant_api_key=config.QDRANT_API_KEY,
+        collection_name=config.COLLECTION_NAME,
+        ollama_base_url=config.OLLAMA_BASE_URL,
+        embedding_model=config.EMBEDDING_MODEL,
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP,
+        text_cache_dir=config.PDF_TEXT_CACHE_DIR or None
+    )
+
+
+# Process-wide registry
+services = ServiceRegistry()
+services.register("excel", _create_excel_manager)
+services.register("vector", _create_vector_manager)
+
+# Shared managers; nothing is parsed or connected until first used
+excel_manager = services.lazy("excel")
+vector_manager = services.lazy("vector")
@@ -0,0 +1,167 @@
+"""
+Single-Flight
+Coalesces identical concurrent calls so they share one in-flight computation and its result
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .metrics import CallbackMetric
+from .tracing import set_attribute
+
+
+# Every SingleFlight group, by name, for reporting
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+class _Call:
+    """One in-flight computation shared by its callers"""
+    
+    __slots__ = ("event", "result", "error")
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _AsyncCall:
+    """One in-flight coroutine, run as a task none of its callers owns"""
+    
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Duplicate call suppression
+    
+    While a call for a key is running, further calls with the same key wait
+    for it and receive the same result (or exception) instead of starting their
+    own. Nothing is cached: once the call finishes, the next one runs again.
+    Results are shared between callers and must be treated as read-only.
+    """
+    
+    def __init__(self, name: str):
+        """
+        Initialize a single-flight group
+        
+        Args:
+            name: Name reported by singleflight_stats()
+        """
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._ainflight = {}
+        self._lock = threading.Lock()
+        
+        with _groups_lock:
+            _groups[name] = self
+    
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless an identical call is in flight, then share its result"""
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        
+        set_attribute("singleflight.coalesced", not leader)
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+    
+    async def ado(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of do(); factory() creates the coroutine, once per flight
+        
+        The coroutine runs in a task that no caller owns, so a caller that is
+        cancelled (e.g. its client disconnected) stops waiting without failing
+        the others; the task is cancelled only once every caller has given up.
+        Calls are coalesced per event loop.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            self.calls += 1
+            call = self._ainflight.get(flight_key)
+            leader = call is None
+            if leader:
+                call = self._ainflight[flight_key] = _AsyncCall(loop.create_task(factory()))
+                self.executions += 1
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+        if leader:
+            call.task.add_done_callback(lambda task: self._afinished(flight_key, call))
+        
+        set_attribute("singleflight.coalesced", not leader)
+        try:
+            # Shield: a cancelled caller must not cancel the shared task
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+                if abandoned and self._ainflight.get(flight_key) is call:
+                    del self._ainflight[flight_key]
+            if abandoned:
+                call.task.cancel()
+            raise
+    
+    def _afinished(self, flight_key, call: _AsyncCall):
+        with self._lock:
+            if self._ainflight.get(flight_key) is call:
+                del self._ainflight[flight_key]
+        if not call.task.cancelled():
+            # Mark retrieved so a failure nobody awaited is not logged as never retrieved
+            call.task.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        """Get coalescing counters"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight) + len(self._ainflight)
+            }
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Get counters for every single-flight group"""
+    with _groups_lock:
+        groups = dict(_groups)
+    return {name: group.stats() for name, group in groups.items()}
+
+
+CallbackMetric(
+    "chatbot_coalesced_calls_total",
+    "Calls that shared another caller's in-flight result, by single-flight group",
+    lambda: {name: stats["coalesced"] for name, stats in singleflight_stats().items()},
+    kind="counter",
+    labelname="group"
+)
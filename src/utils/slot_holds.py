@@ -0,0 +1,450 @@
+"""
+Slot Holds
+Short-lived reservations, in memory or shared through Redis, that keep a slot for one conversation while the patient finishes booking
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from .metrics import Counter
+from .slot_index import time_to_minutes
+
+
+HOLD_EVENTS = Counter(
+    "chatbot_slot_hold_events_total",
+    "Slot hold lifecycle events (held, renewed, conflict, converted, released, expired)",
+    ["event"]
+)
+
+
+def slot_start(date: str, time_label) -> Optional[datetime]:
+    """Start of a slot from its date (YYYY-MM-DD) and time label, or None if either is invalid"""
+    minutes = time_to_minutes(time_label)
+    if minutes is None:
+        return None
+    try:
+        return datetime.strptime(str(date)[:10], '%Y-%m-%d') + timedelta(minutes=minutes)
+    except ValueError:
+        return None
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel
+    
+    Deadlines are bucketed by tick, so scheduling and cancelling are O(1) and
+    advancing only visits the buckets of the ticks that passed since the last
+    advance, that last one included (its later deadlines may be due by now).
+    Deadlines more than one rotation away stay in their bucket until a later
+    pass reaches them.
+    The wheel has no thread: callers advance it whenever they look at it.
+    """
+    
+    def __init__(self, tick: float = 1.0, size: int = 512):
+        """
+        Args:
+            tick: Seconds per bucket (expiry resolution)
+            size: Number of buckets
+        """
+        self.tick = tick
+        self.size = size
+        self._buckets = [dict() for _ in range(size)]  # key -> deadline
+        self._where = {}  # key -> bucket index
+        self._current = None  # Last tick advanced to
+    
+    def __len__(self) -> int:
+        return len(self._where)
+    
+    def _tick_of(self, moment: float) -> int:
+        return int(moment // self.tick)
+    
+    def schedule(self, key: Hashable, deadline: float):
+        """Expire key at deadline (monotonic seconds), replacing an earlier deadline"""
+        self.cancel(key)
+        # Never a tick already advanced past, whose bucket is not visited again for a rotation
+        tick = self._tick_of(deadline)
+        if self._current is not None:
+            tick = max(tick, self._current)
+        bucket = tick % self.size
+        self._buckets[bucket][key] = deadline
+        self._where[key] = bucket
+    
+    def cancel(self, key: Hashable):
+        """Forget key; a no-op if it is not scheduled"""
+        bucket = self._where.pop(key, None)
+        if bucket is not None:
+            self._buckets[bucket].pop(key, None)
+    
+    def advance(self, now: float) -> List[Hashable]:
+        """Remove and return the keys whose deadline is at or before now"""
+        current = self._tick_of(now)
+        if self._current is None:
+            # First pass visits every bucket, in case deadlines were scheduled before it
+            self._current = current - self.size + 1
+        if current < self._current:
+            return []
+        
+        # The last tick visited is visited again: its later deadlines may be due by now.
+        # After a full rotation every bucket has been due at least once
+        first = max(self._current, current - self.size + 1)
+        expired = []
+        for tick in range(first, current + 1):
+            bucket = self._buckets[tick % self.size]
+            due = [key for key, deadline in bucket.items() if deadline <= now]
+            for key in due:
+                del bucket[key]
+                del self._where[key]
+            expired.extend(due)
+        self._current = current
+        return expired
+
+
+class SlotHolds:
+    """
+    Slot holds of every conversation in this process
+    
+    A session holds at most one slot; holding another replaces it. A held
+    slot is hidden from other sessions' availability queries and cannot be
+    booked by them until the hold is converted into a booking, released or
+    expires after ttl seconds. Holds never touch the workbook and are only
+    seen by this process: several workers share them with RedisSlotHolds.
+    """
+    
+    def __init__(self, ttl: float = 300.0, tick: float = 1.0):
+        """
+        Args:
+            ttl: Seconds a hold lasts (0 disables holds)
+            tick: Expiry resolution in seconds
+        """
+        self.ttl = ttl
+        self._holds = {}  # (doctor, start) -> (session_id, expires)
+        self._by_session = {}  # session_id -> (doctor, start)
+        self._wheel = TimerWheel(tick=tick)
+        self._changes = 0  # Bumped whenever the set of held slots changes
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._holds)
+    
+    @property
+    def version(self) -> int:
+        """Changes whenever a hold starts or ends, for caching availability answers"""
+        with self._lock:
+            self._expire()
+            return self._changes
+    
+    def _expire(self):
+        """Drop holds whose time ran out (caller holds the lock)"""
+        for key in self._wheel.advance(time.monotonic()):
+            session_id, _ = self._holds.pop(key)
+            if self._by_session.get(session_id) == key:
+                del self._by_session[session_id]
+            self._changes += 1
+            HOLD_EVENTS.inc("expired")
+    
+    def _drop(self, key: Tuple[str, datetime]):
+        """Remove one hold (caller holds the lock)"""
+        session_id, _ = self._holds.pop(key)
+        self._wheel.cancel(key)
+        if self._by_session.get(session_id) == key:
+            del self._by_session[session_id]
+        self._changes += 1
+    
+    def hold(
+        self,
+        session_id: str,
+        doctor: str,
+        start: datetime,
+        ttl: Optional[float] = None
+    ) -> Tuple[bool, Optional[datetime]]:
+        """
+        Hold a slot for a session, or renew the session's hold on it
+        
+        Args:
+            session_id: Conversation holding the slot
+            doctor: Doctor sheet name
+            start: Slot start
+            ttl: Seconds the hold lasts (default: the registry's ttl)
+        
+        Returns:
+            (True, wall-clock expiry) or (False, None) if another session holds the slot
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return True, None
+        
+        key = (doctor, start)
+        with self._lock:
+            self._expire()
+            holder = self._holds.get(key)
+            if holder is not None and holder[0] != session_id:
+                HOLD_EVENTS.inc("conflict")
+                return False, None
+            
+            previous = self._by_session.get(session_id)
+            if previous is not None and previous != key:
+                self._drop(previous)
+                HOLD_EVENTS.inc("released")
+            
+            expires = time.monotonic() + ttl
+            self._holds[key] = (session_id, expires)
+            self._by_session[session_id] = key
+            self._wheel.schedule(key, expires)
+            if holder is None:
+                self._changes += 1
+            HOLD_EVENTS.inc("renewed" if holder is not None else "held")
+            return True, datetime.now() + timedelta(seconds=ttl)
+    
+    def holder(self, doctor: str, start: datetime) -> Optional[str]:
+        """Session holding a slot, or None"""
+        with self._lock:
+            self._expire()
+            holder = self._holds.get((doctor, start))
+            return holder[0] if holder else None
+    
+    def blocked(self, doctor: str, session_id: Optional[str] = None) -> Set[datetime]:
+        """Starts of a doctor's slots held by sessions other than session_id"""
+        with self._lock:
+            self._expire()
+            return {
+                start for (held_doctor, start), (holder, _) in self._holds.items()
+                if held_doctor == doctor and holder != session_id
+            }
+    
+    def held_by(self, session_id: str) -> Optional[Tuple[str, datetime]]:
+        """(doctor, start) held by a session, or None"""
+        with self._lock:
+            self._expire()
+            return self._by_session.get(session_id)
+    
+    def convert(self, doctor: str, start: datetime, session_id: Optional[str] = None):
+        """Drop the hold on a slot that was just booked, and the booking session's own hold"""
+        with self._lock:
+            self._expire()
+            key = (doctor, start)
+            if key in self._holds:
+                self._drop(key)
+                HOLD_EVENTS.inc("converted")
+            if session_id is not None and session_id in self._by_session:
+                self._drop(self._by_session[session_id])
+                HOLD_EVENTS.inc("released")
+    
+    def release(self, session_id: str) -> bool:
+        """Give up a session's hold; returns False if it had none"""
+        with self._lock:
+            self._expire()
+            key = self._by_session.get(session_id)
+            if key is None:
+                return False
+            self._drop(key)
+            HOLD_EVENTS.inc("released")
+            return True
+    
+    def stats(self) -> Dict[str, float]:
+        """Active holds and the configured ttl"""
+        with self._lock:
+            self._expire()
+            return {"active": len(self._holds), "ttl": self.ttl}
+
+
+def _text(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisSlotHolds:
+    """
+    Slot holds shared by every worker process and replica through Redis
+    
+    Each held slot is a key holding the session id and expiring with the
+    hold, so taking a hold is one SET NX and no two workers can hold the same
+    slot. A key per session points at its slot, and a sorted set of the held
+    slots scored by their expiry lists a doctor's holds and lets version()
+    notice the holds that ran out. Ends of holds use WATCH transactions
+    rather than Lua, like RedisLock, so fakeredis works in tests.
+    """
+    
+    def __init__(self, ttl: float = 300.0, url: str = "redis://localhost:6379/0", key_prefix: str = "chatbot:", client=None):
+        """
+        Args:
+            ttl: Seconds a hold lasts (0 disables holds)
+            url: Redis connection URL (ignored when client is given)
+            key_prefix: Namespace for all keys written by the registry
+            client: Existing Redis client to use instead of connecting to url
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        
+        self.client = client
+        self.ttl = ttl
+        self.key_prefix = f"{key_prefix}hold:"
+        self._index_key = f"{self.key_prefix}index"
+        self._version_key = f"{self.key_prefix}version"
+    
+    @staticmethod
+    def _member(doctor: str, start: datetime) -> str:
+        return f"{doctor}|{start.isoformat()}"
+    
+    @staticmethod
+    def _parse(member: str) -> Tuple[str, datetime]:
+        doctor, _, start = member.rpartition("|")
+        return doctor, datetime.fromisoformat(start)
+    
+    def _slot_key(self, member: str) -> str:
+        return f"{self.key_prefix}slot:{member}"
+    
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.key_prefix}session:{session_id}"
+    
+    def __len__(self) -> int:
+        self._expire()
+        return int(self.client.zcard(self._index_key))
+    
+    @property
+    def version(self) -> int:
+        """Changes whenever a hold starts or ends, in any process, for caching availability answers"""
+        self._expire()
+        return int(self.client.get(self._version_key) or 0)
+    
+    def _expire(self):
+        """Drop the holds whose time ran out from the index (their keys expire by themselves)"""
+        expired = self.client.zrangebyscore(self._index_key, "-inf", time.time())
+        if not expired:
+            return
+        removed = self.client.zrem(self._index_key, *expired)
+        if removed:
+            self.client.incr(self._version_key)
+            HOLD_EVENTS.inc("expired", amount=removed)
+    
+    def _drop(self, member: str, session_id: Optional[str] = None) -> bool:
+        """End the hold on a slot if session_id (or anyone, for None) holds it"""
+        slot_key = self._slot_key(member)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(slot_key)
+                holder = _text(pipe.get(slot_key))
+                if holder is None or (session_id is not None and holder != session_id):
+                    return False
+                session_key = self._session_key(holder)
+                pipe.watch(session_key)
+                points_here = _text(pipe.get(session_key)) == member
+                pipe.multi()
+                pipe.delete(slot_key)
+                if points_here:
+                    pipe.delete(session_key)
+                pipe.zrem(self._index_key, member)
+                pipe.incr(self._version_key)
+                pipe.execute()
+                return True
+            except Exception as e:
+                print(f"Error ending the hold on {member}: {e}")
+                return False
+    
+    def hold(
+        self,
+        session_id: str,
+        doctor: str,
+        start: datetime,
+        ttl: Optional[float] = None
+    ) -> Tuple[bool, Optional[datetime]]:
+        """
+        Hold a slot for a session, or renew the session's hold on it
+        
+        Args:
+            session_id: Conversation holding the slot
+            doctor: Doctor sheet name
+            start: Slot start
+            ttl: Seconds the hold lasts (default: the registry's ttl)
+        
+        Returns:
+            (True, wall-clock expiry) or (False, None) if another session holds the slot
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return True, None
+        
+        member = self._member(doctor, start)
+        slot_key = self._slot_key(member)
+        milliseconds = max(1, int(ttl * 1000))
+        created = bool(self.client.set(slot_key, session_id, nx=True, px=milliseconds))
+        if not created and _text(self.client.get(slot_key)) != session_id:
+            HOLD_EVENTS.inc("conflict")
+            return False, None
+        
+        previous = _text(self.client.get(self._session_key(session_id)))
+        if previous is not None and previous != member and self._drop(previous, session_id):
+            HOLD_EVENTS.inc("released")
+        
+        with self.client.pipeline() as pipe:
+            pipe.set(slot_key, session_id, px=milliseconds)
+            pipe.set(self._session_key(session_id), member, px=milliseconds)
+            pipe.zadd(self._index_key, {member: time.time() + ttl})
+            if created:
+                pipe.incr(self._version_key)
+            pipe.execute()
+        HOLD_EVENTS.inc("held" if created else "renewed")
+        return True, datetime.now() + timedelta(seconds=ttl)
+    
+    def holder(self, doctor: str, start: datetime) -> Optional[str]:
+        """Session holding a slot, or None"""
+        return _text(self.client.get(self._slot_key(self._member(doctor, start))))
+    
+    def blocked(self, doctor: str, session_id: Optional[str] = None) -> Set[datetime]:
+        """Starts of a doctor's slots held by sessions other than session_id"""
+        self._expire()
+        members = [_text(member) for member in self.client.zrange(self._index_key, 0, -1)]
+        members = [member for member in members if member.rpartition("|")[0] == doctor]
+        if not members:
+            return set()
+        holders = self.client.mget([self._slot_key(member) for member in members])
+        return {
+            self._parse(member)[1] for member, holder in zip(members, holders)
+            if holder is not None and _text(holder) != session_id
+        }
+    
+    def held_by(self, session_id: str) -> Optional[Tuple[str, datetime]]:
+        """(doctor, start) held by a session, or None"""
+        member = _text(self.client.get(self._session_key(session_id)))
+        if member is None or _text(self.client.get(self._slot_key(member))) != session_id:
+            return None
+        return self._parse(member)
+    
+    def convert(self, doctor: str, start: datetime, session_id: Optional[str] = None):
+        """Drop the hold on a slot that was just booked, and the booking session's own hold"""
+        if self._drop(self._member(doctor, start)):
+            HOLD_EVENTS.inc("converted")
+        if session_id is not None:
+            self.release(session_id)
+    
+    def release(self, session_id: str) -> bool:
+        """Give up a session's hold; returns False if it had none"""
+        member = _text(self.client.get(self._session_key(session_id)))
+        if member is None or not self._drop(member, session_id):
+            return False
+        HOLD_EVENTS.inc("released")
+        return True
+    
+    def stats(self) -> Dict[str, float]:
+        """Active holds and the configured ttl"""
+        return {"active": len(self), "ttl": self.ttl}
+
+
+def create_slot_holds(config):
+    """
+    Create the hold registry matching config.SESSION_BACKEND
+    
+    Workers that share conversations through Redis share their holds there
+    too; in-process sessions keep in-process holds.
+    
+    Args:
+        config: Application config
+    
+    Returns:
+        SlotHolds or RedisSlotHolds
+    """
+    if config.SESSION_BACKEND.lower() == "redis":
+        return RedisSlotHolds(ttl=config.SLOT_HOLD_TTL, url=config.REDIS_URL, key_prefix=config.SESSION_KEY_PREFIX)
+    return SlotHolds(ttl=config.SLOT_HOLD_TTL)
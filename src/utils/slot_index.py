@@ -0,0 +1,282 @@
+"""
+Slot Index
+Sorted per-doctor interval index of free slots, answering constraint queries without scanning sheets
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+
+MINUTES_PER_DAY = 24 * 60
+
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Shorthands accepted by parse_weekdays()
+WEEKDAY_GROUPS = {
+    "weekdays": {0, 1, 2, 3, 4},
+    "weekday": {0, 1, 2, 3, 4},
+    "weekends": {5, 6},
+    "weekend": {5, 6},
+    "any": set(range(7)),
+    "all": set(range(7))
+}
+
+TIME_FORMATS = ["%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H:%M", "%H:%M:%S"]
+
+
+def time_to_minutes(value) -> Optional[int]:
+    """
+    Minutes after midnight of a slot time
+    
+    Args:
+        value: '09:00 AM', '5 PM', '17:00', a datetime.time or a datetime
+    
+    Returns:
+        Minutes after midnight, or None if the value is not a time
+    """
+    if isinstance(value, datetime):
+        return value.hour * 60 + value.minute
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    if not isinstance(value, str):
+        return None
+    
+    text = value.strip().upper()
+    for time_format in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, time_format)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    if text.isdigit() and int(text) <= 23:
+        return int(text) * 60
+    return None
+
+
+def parse_weekdays(text: Optional[str]) -> Optional[Set[int]]:
+    """
+    Weekday mask from text such as 'mon-fri', 'weekdays', 'sat,sun' or 'tue thu'
+    
+    Returns:
+        Set of weekday numbers (Monday = 0), or None when no day is recognized
+    """
+    if not text:
+        return None
+    
+    days = set()
+    for part in re.split(r"[,\s/&]+|\band\b", text.lower()):
+        part = part.strip()
+        if not part:
+            continue
+        if part in WEEKDAY_GROUPS:
+            days |= WEEKDAY_GROUPS[part]
+            continue
+        
+        bounds = part.split('-')
+        indexes = [_weekday_index(bound) for bound in bounds]
+        if None in indexes:
+            continue
+        if len(indexes) == 1:
+            days.add(indexes[0])
+        elif len(indexes) == 2:
+            first, last = indexes
+            day = first
+            days.add(day)
+            while day != last:
+                day = (day + 1) % 7
+                days.add(day)
+    return days or None
+
+
+def _weekday_index(text: str) -> Optional[int]:
+    for index, name in enumerate(WEEKDAY_NAMES):
+        if text.startswith(name):
+            return index
+    return None
+
+
+def _epoch_minutes(moment: datetime) -> int:
+    """Minutes since 1970-01-01 (naive, local workbook time)"""
+    return int((moment - datetime(1970, 1, 1)).total_seconds() // 60)
+
+
+class _DoctorSlots:
+    """Free slots of one doctor, sorted by start"""
+    
+    __slots__ = ("starts", "labels")
+    
+    def __init__(self, starts: np.ndarray, labels: np.ndarray):
+        self.starts = starts  # int64 minutes since the epoch
+        self.labels = labels  # Time cell as written in the workbook
+    
+    def window(self, start: datetime, length: timedelta):
+        """Yield (day, minute of day, label) for slots starting in [start, start + length)"""
+        low = _epoch_minutes(start)
+        first = np.searchsorted(self.starts, low, side='left')
+        last = np.searchsorted(self.starts, low + int(length.total_seconds() // 60), side='left')
+        for position in range(first, last):
+            start_minute = int(self.starts[position])
+            yield (
+                date(1970, 1, 1) + timedelta(days=start_minute // MINUTES_PER_DAY),
+                start_minute % MINUTES_PER_DAY,
+                self.labels[position]
+            )
+
+
+class SlotIndex:
+    """
+    Free slots of every doctor as sorted start times
+    
+    Built once per workbook snapshot. A query binary-searches each doctor's
+    array for the date range, masks weekdays and the time window in one
+    vectorized pass, and ranks what is left, so its cost depends on the
+    slots inside the range rather than on the size of the workbook.
+    """
+    
+    def __init__(self, sheets: Dict[str, pd.DataFrame], doctors: List[str]):
+        """
+        Build the index
+        
+        Args:
+            sheets: Workbook snapshot (sheet name -> DataFrame)
+            doctors: Doctor sheet names to index
+        """
+        self.doctors = list(doctors)
+        self.slots = {}
+        self.size = 0
+        for doctor in self.doctors:
+            df = sheets.get(doctor)
+            if df is None:
+                continue
+            self.slots[doctor] = self._index_sheet(df)
+            self.size += len(self.slots[doctor].starts)
+    
+    @staticmethod
+    def _index_sheet(df: pd.DataFrame) -> _DoctorSlots:
+        available = df[df['Status'] == 'Available']
+        days = pd.to_datetime(available['Date'], errors='coerce')
+        
+        # Few distinct labels per sheet, so parse each once
+        labels = available['Time']
+        parsed = {label: time_to_minutes(label) for label in labels.unique()}
+        minutes = labels.map(parsed)
+        
+        valid = (days.notna() & minutes.notna()).to_numpy()
+        day_minutes = days.to_numpy()[valid].astype('datetime64[m]').astype(np.int64)
+        starts = day_minutes + minutes.to_numpy()[valid].astype(np.int64)
+        order = np.argsort(starts, kind='stable')
+        return _DoctorSlots(starts[order], labels.to_numpy()[valid][order])
+    
+    def query(
+        self,
+        doctors: Optional[Iterable[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        weekdays: Optional[Iterable[int]] = None,
+        earliest: Optional[int] = None,
+        latest: Optional[int] = None,
+        preferred_doctor: Optional[str] = None,
+        limit: int = 5,
+        max_per_day: int = 2,
+        preferred_bonus_days: float = 2.0,
+        exclude: Optional[Dict[str, Iterable[datetime]]] = None
+    ) -> List[Dict]:
+        """
+        Top-ranked free slots matching every constraint
+        
+        Slots are ranked by how soon they start; the preferred doctor's slots
+        rank as if they were preferred_bonus_days earlier. At most max_per_day
+        slots are returned per doctor and day, so the answer offers real
+        alternatives instead of consecutive half-hours.
+        
+        Args:
+            doctors: Doctors to consider (default: all)
+            start: Earliest slot start (default: no bound)
+            end: Latest slot start, exclusive (default: no bound)
+            weekdays: Allowed weekdays, Monday = 0 (default: all)
+            earliest: Earliest start, minutes after midnight
+            latest: Latest start, minutes after midnight (inclusive)
+            preferred_doctor: Doctor ranked ahead of the others
+            limit: Number of slots to return
+            max_per_day: Slots per doctor and day (0 = no cap)
+            preferred_bonus_days: Head start given to the preferred doctor
+            exclude: Slot starts to leave out, per doctor (e.g. slots held by other conversations)
+        
+        Returns:
+            List of slots with doctor, date, time and weekday
+        """
+        doctors = [doctor for doctor in (doctors or self.doctors) if doctor in self.slots]
+        low = _epoch_minutes(start) if start else None
+        high = _epoch_minutes(end) if end else None
+        weekday_mask = np.zeros(7, dtype=bool)
+        weekday_mask[list(weekdays) if weekdays is not None else slice(None)] = True
+        bonus = int(preferred_bonus_days * MINUTES_PER_DAY)
+        excluded = {
+            doctor: np.array([_epoch_minutes(start) for start in starts], dtype=np.int64)
+            for doctor, starts in (exclude or {}).items()
+        }
+        
+        candidate_starts = []
+        candidate_scores = []
+        candidate_doctors = []
+        candidate_rows = []
+        for doctor_number, doctor in enumerate(doctors):
+            slots = self.slots[doctor]
+            first = np.searchsorted(slots.starts, low, side='left') if low is not None else 0
+            last = np.searchsorted(slots.starts, high, side='left') if high is not None else len(slots.starts)
+            if first >= last:
+                continue
+            
+            starts = slots.starts[first:last]
+            # 1970-01-01 was a Thursday (weekday 3)
+            mask = weekday_mask[(starts // MINUTES_PER_DAY + 3) % 7]
+            minute_of_day = starts % MINUTES_PER_DAY
+            if earliest is not None:
+                mask &= minute_of_day >= earliest
+            if latest is not None:
+                mask &= minute_of_day <= latest
+            if doctor in excluded:
+                mask &= ~np.isin(starts, excluded[doctor])
+            rows = np.nonzero(mask)[0] + first
+            if not len(rows):
+                continue
+            
+            chosen = slots.starts[rows]
+            candidate_starts.append(chosen)
+            candidate_scores.append(chosen - bonus if doctor == preferred_doctor else chosen)
+            candidate_doctors.append(np.full(len(rows), doctor_number))
+            candidate_rows.append(rows)
+        
+        if not candidate_starts:
+            return []
+        
+        starts = np.concatenate(candidate_starts)
+        scores = np.concatenate(candidate_scores)
+        doctor_numbers = np.concatenate(candidate_doctors)
+        rows = np.concatenate(candidate_rows)
+        
+        results = []
+        per_day = {}
+        for position in np.lexsort((doctor_numbers, scores)):
+            doctor = doctors[doctor_numbers[position]]
+            day = int(starts[position] // MINUTES_PER_DAY)
+            if max_per_day:
+                taken = per_day.get((doctor, day), 0)
+                if taken >= max_per_day:
+                    continue
+                per_day[(doctor, day)] = taken + 1
+            
+            slot_day = date(1970, 1, 1) + timedelta(days=day)
+            results.append({
+                'doctor': doctor,
+                'date': slot_day.isoformat(),
+                'time': self.slots[doctor].labels[rows[position]],
+                'weekday': slot_day.strftime('%A'),
+                'status': 'Available'
+            })
+            if len(results) >= limit:
+                break
+        return results
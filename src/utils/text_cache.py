@@ -0,0 +1,76 @@
+"""
+Text Cache
+Extracted page texts of documents, stored on disk by content hash and extractor version so each file is parsed once
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Optional
+
+from .metrics import CACHE_REQUESTS
+
+
+def file_digest(file_path: Path) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractedTextCache:
+    """
+    Page texts keyed by (content hash, extractor version)
+    
+    A renamed or re-copied file still hits; an edited file or a new
+    extractor (library upgrade or changed extraction code) misses, so stale
+    text is never served. Entries are JSON files written atomically; old
+    versions are simply left behind and can be deleted at any time.
+    """
+    
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Folder holding the entries (created on first write)
+        """
+        self.directory = Path(directory)
+    
+    def _path(self, digest: str, extractor: str) -> Path:
+        slug = re.sub(r"[^A-Za-z0-9.]+", "_", extractor).strip("_")
+        return self.directory / digest[:2] / f"{digest}.{slug}.json"
+    
+    def get(self, digest: str, extractor: str) -> Optional[List[str]]:
+        """Cached page texts, or None"""
+        try:
+            with open(self._path(digest, extractor), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            CACHE_REQUESTS.inc("extracted_text", "miss")
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable text cache entry for {digest[:12]}: {e}")
+            CACHE_REQUESTS.inc("extracted_text", "miss")
+            return None
+        if entry.get("extractor") != extractor or entry.get("digest") != digest:
+            CACHE_REQUESTS.inc("extracted_text", "miss")
+            return None
+        CACHE_REQUESTS.inc("extracted_text", "hit")
+        return entry["pages"]
+    
+    def put(self, digest: str, extractor: str, pages: List[str], source: str = ""):
+        """Store page texts (empty strings for pages without text)"""
+        path = self._path(digest, extractor)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"digest": digest, "extractor": extractor, "source": source, "pages": pages}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not cache extracted text of {source or digest[:12]}: {e}")
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
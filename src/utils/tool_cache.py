@@ -0,0 +1,178 @@
+"""
+Tool Result Cache
+Shares tool results across agents and tool calls, keyed by tool name and arguments
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .config import config
+from .metrics import CACHE_REQUESTS
+from .services import services
+from .singleflight import SingleFlight
+from .tracing import set_attribute
+
+
+# Scopes: what a write invalidates
+SCHEDULE = "schedule"  # Workbook reads (slots, appointments, doctors)
+KNOWLEDGE = "knowledge"  # Vector store searches
+
+
+class ToolResultCache:
+    """
+    Argument-keyed cache of backend results shared by every tool instance
+    
+    Entries belong to a scope and are dropped when that scope is invalidated
+    (a booking or cancellation for SCHEDULE, re-indexing for KNOWLEDGE) or
+    after ttl seconds. Callers may also pass the data version they read
+    (e.g. the workbook's mtime and size) so writes made by other processes
+    miss the cache at once. Identical concurrent misses run the backend call
+    once. Exceptions are never cached. Cached values are shared and must be
+    treated as read-only.
+    """
+    
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        """
+        Initialize the cache
+        
+        Args:
+            ttl: Seconds an entry stays valid (0 disables caching)
+            max_entries: Entries kept before the least recently used is evicted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (scope, generation, expires, value)
+        self._generations = {}  # scope -> generation
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("tool_results")
+    
+    @staticmethod
+    def key(tool: str, arguments: Dict[str, Any], version: Hashable = None) -> Hashable:
+        """Cache key for a tool call; argument order does not matter"""
+        return (tool, tuple(sorted(arguments.items())), version)
+    
+    def _lookup(self, key: Hashable, scope: str):
+        """Return (found, value, generation) for a key"""
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generations.get(scope, 0)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_scope, entry_generation, expires, value = entry
+                if entry_generation == generation and expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_REQUESTS.inc("tool_results", "hit")
+                    set_attribute("tool_cache.hit", True)
+                    return True, value, generation
+                del self._entries[key]
+            self.misses += 1
+        CACHE_REQUESTS.inc("tool_results", "miss")
+        set_attribute("tool_cache.hit", False)
+        return False, None, generation
+    
+    def _store(self, key: Hashable, scope: str, generation: int, value: Any):
+        """Keep a result unless its scope was invalidated while it was computed"""
+        with self._lock:
+            if self._generations.get(scope, 0) != generation:
+                return
+            self._entries[key] = (scope, generation, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get_or_compute(
+        self,
+        tool: str,
+        arguments: Dict[str, Any],
+        fn: Callable[[], Any],
+        scope: str = SCHEDULE,
+        version: Hashable = None
+    ) -> Any:
+        """
+        Return the cached result of a tool call, computing it on a miss
+        
+        Args:
+            tool: Tool name (part of the key)
+            arguments: Call arguments (part of the key)
+            fn: Zero-argument callable producing the result
+            scope: Scope whose invalidation drops the entry
+            version: Version of the underlying data (part of the key)
+        
+        Returns:
+            The cached or freshly computed result
+        """
+        if self.ttl <= 0:
+            return fn()
+        
+        key = self.key(tool, arguments, version)
+        found, value, generation = self._lookup(key, scope)
+        if found:
+            return value
+        
+        value = self._flight.do((key, generation), fn)
+        self._store(key, scope, generation, value)
+        return value
+    
+    async def aget_or_compute(
+        self,
+        tool: str,
+        arguments: Dict[str, Any],
+        factory: Callable[[], Awaitable[Any]],
+        scope: str = SCHEDULE,
+        version: Hashable = None
+    ) -> Any:
+        """Async variant of get_or_compute(); factory() creates the coroutine on a miss"""
+        if self.ttl <= 0:
+            return await factory()
+        
+        key = self.key(tool, arguments, version)
+        found, value, generation = self._lookup(key, scope)
+        if found:
+            return value
+        
+        value = await self._flight.ado((key, generation), factory)
+        self._store(key, scope, generation, value)
+        return value
+    
+    def invalidate(self, scope: Optional[str] = None):
+        """Drop the entries of one scope (default: all) and discard results still being computed for it"""
+        with self._lock:
+            scopes = [scope] if scope else list(set(self._generations) | {SCHEDULE, KNOWLEDGE})
+            for name in scopes:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry[0] in scopes]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and invalidation counts"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "ttl": self.ttl
+            }
+
+
+def _create_tool_cache():
+    return ToolResultCache(ttl=config.TOOL_CACHE_TTL, max_entries=config.TOOL_CACHE_MAX_ENTRIES)
+
+
+services.register("tool_results", _create_tool_cache)
+
+# Process-wide cache shared by all tools
+tool_results = services.lazy("tool_results")
+
+
+def invalidate_tool_results(scope: Optional[str] = None):
+    """Invalidate a scope after a write; a no-op until the cache has been used"""
+    if services.is_created("tool_results"):
+        tool_results.invalidate(scope)
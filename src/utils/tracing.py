@@ -0,0 +1,300 @@
+"""
+Tracing
+Lightweight request spans exported as OpenTelemetry (OTLP/JSON) lines for per-conversation latency breakdowns
+"""
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .config import config
+
+
+# Span of the code currently running (per thread / asyncio task)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class _NoopSpan:
+    """Stand-in when tracing is off or the trace was not sampled"""
+    
+    trace_id = None
+    span_id = None
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+    
+    def record_exception(self, error: BaseException):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Trace:
+    """Spans of one trace, exported together when the root span ends"""
+    
+    __slots__ = ("trace_id", "spans", "lock")
+    
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    """One timed operation with attributes"""
+    
+    __slots__ = (
+        "name", "trace", "span_id", "parent_id", "attributes",
+        "start_ns", "end_ns", "status", "status_message"
+    )
+    
+    def __init__(self, name: str, trace: _Trace, parent_id: Optional[str], attributes: Optional[Dict[str, Any]]):
+        self.name = name
+        self.trace = trace
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = STATUS_OK
+        self.status_message = ""
+    
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+    
+    def set_attribute(self, key: str, value: Any):
+        """Set one attribute (str, bool, int or float)"""
+        self.attributes[key] = value
+    
+    def set_attributes(self, attributes: Dict[str, Any]):
+        """Set several attributes"""
+        self.attributes.update(attributes)
+    
+    def record_exception(self, error: BaseException):
+        """Mark the span failed with the exception's type and message"""
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+        self.attributes["exception.type"] = type(error).__name__
+    
+    def end(self):
+        self.end_ns = time.time_ns()
+        trace = self.trace
+        with trace.lock:
+            trace.spans.append(self)
+            if self.parent_id is not None:
+                return
+            spans, trace.spans = trace.spans, []
+        # Root finished: ship the whole trace (children that end later ship on their own)
+        _exporter.export(spans)
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class _FileExporter:
+    """
+    Appends finished traces to a JSON Lines file from a background thread
+    
+    Each line is an OTLP ExportTraceServiceRequest in JSON, the format read by
+    the OpenTelemetry Collector's otlpjsonfile receiver. Several processes may
+    append to the same file; each trace is written with a single write call.
+    """
+    
+    def __init__(self, max_pending: int = 10000):
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def export(self, spans):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            # Never slow a request down for tracing
+            self.dropped += 1
+    
+    def _start(self):
+        """Start the writer thread (again after a fork, where threads do not survive)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            thread = threading.Thread(target=self._run, args=(self._queue,), name="trace-exporter", daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+    
+    def _run(self, pending: queue.Queue):
+        while True:
+            spans = pending.get()
+            try:
+                self._write(spans)
+            except Exception as e:
+                print(f"Error exporting trace: {e}")
+            finally:
+                pending.task_done()
+    
+    def _write(self, spans):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attribute("service.name", config.TRACE_SERVICE_NAME),
+                    _otlp_attribute("process.pid", os.getpid())
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+        line = (json.dumps(payload, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        
+        path = config.TRACE_EXPORT_PATH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    
+    def flush(self, timeout: float = 5.0):
+        """Wait until queued traces are written (used by tests and on shutdown)"""
+        deadline = time.monotonic() + timeout
+        while self._queue is not None and self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+_exporter = _FileExporter()
+
+
+class _SpanContext:
+    """Context manager returned by span()"""
+    
+    __slots__ = ("name", "attributes", "span", "token")
+    
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]]):
+        self.name = name
+        self.attributes = attributes
+    
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is _NOOP or not config.TRACING_ENABLED:
+            self.span = _NOOP
+            self.token = None
+            return _NOOP
+        
+        if parent is None:
+            if random.random() >= config.TRACE_SAMPLE_RATE:
+                # Unsampled: children see the no-op span and record nothing
+                self.span = _NOOP
+                self.token = _current_span.set(_NOOP)
+                return _NOOP
+            trace = _Trace("%032x" % random.getrandbits(128))
+            self.span = Span(self.name, trace, None, self.attributes)
+        else:
+            self.span = Span(self.name, parent.trace, parent.span_id, self.attributes)
+        
+        self.token = _current_span.set(self.span)
+        return self.span
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.token is not None:
+            _current_span.reset(self.token)
+        if self.span is not _NOOP:
+            if exc is not None:
+                self.span.record_exception(exc)
+            self.span.end()
+        return False
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> _SpanContext:
+    """
+    Trace a block: `with span("ExcelDBManager.book_appointment", {"doctor": name}) as s:`
+    
+    The span becomes the parent of spans started inside the block, including
+    in asyncio tasks created there and in functions run through bind().
+    """
+    return _SpanContext(name, attributes)
+
+
+def traced(name: str):
+    """Decorator tracing every call of a function or coroutine function"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    """The active span, or a no-op span outside any trace"""
+    return _current_span.get() or _NOOP
+
+
+def set_attribute(key: str, value: Any):
+    """Set an attribute on the active span (no-op outside a trace)"""
+    current_span().set_attribute(key, value)
+
+
+def bind(fn: Callable) -> Callable:
+    """Carry the current trace into a thread pool: `executor.submit(bind(fn), ...)`"""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def flush_traces(timeout: float = 5.0):
+    """Wait for queued traces to be written to TRACE_EXPORT_PATH"""
+    _exporter.flush(timeout)
@@ -13,6 +13,17 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 import PyPDF2
 import uuid
 
+from .singleflight import SingleFlight
+from .metrics import STAGE_SECONDS, record_error
+from .tracing import traced, set_attribute
+from .tool_cache import invalidate_tool_results, KNOWLEDGE
+from .text_cache import ExtractedTextCache, file_digest
+
+
+# Identical concurrent embedding/search requests share one upstream call
+embed_flight = SingleFlight("embed_query")
+search_flight = SingleFlight("vector_search")
+
 
 class OllamaEmbeddings:
     """Ollama embeddings wrapper"""
@@ -22,6 +33,16 @@ class OllamaEmbeddings:
         self.base_url = base_url.rstrip('/')
         self.model = model
         self.embed_url = f"{self.base_url}/api/embeddings"
+        self._async_client = None
+        self._session = None
+        self._session_pid = None
+    
+    def _http(self) -> requests.Session:
+        """Keep-alive session owned by the current process (recreated after fork)"""
+        if self._session is None or self._session_pid != os.getpid():
+            self._session = requests.Session()
+            self._session_pid = os.getpid()
+        return self._session
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of documents"""
@@ -31,22 +52,63 @@ class OllamaEmbeddings:
             embeddings.append(embedding)
         return embeddings
     
+    @traced("OllamaEmbeddings.embed_query")
     def embed_query(self, text: str) -> List[float]:
-        """Embed a single query"""
+        """Embed a single query (concurrent identical queries share one request)"""
+        return embed_flight.do((self.embed_url, self.model, text), self._embed_query, text)
+    
+    def _embed_query(self, text: str) -> List[float]:
         try:
-            response = requests.post(
-                self.embed_url,
-                json={
-                    "model": self.model,
-                    "prompt": text
-                },
-                timeout=60
-            )
-            response.raise_for_status()
+            with STAGE_SECONDS.time("embedding"):
+                response = self._http().post(
+                    self.embed_url,
+                    json={
+                        "model": self.model,
+                        "prompt": text
+                    },
+                    timeout=60
+                )
+                response.raise_for_status()
+            return response.json()['embedding']
+        except Exception as e:
+            print(f"Error generating embedding: {e}")
+            record_error("embedding", e)
+            raise
+    
+    @traced("OllamaEmbeddings.aembed_query")
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single query without blocking the event loop"""
+        return await embed_flight.ado((self.embed_url, self.model, text), lambda: self._aembed_query(text))
+    
+    async def _aembed_query(self, text: str) -> List[float]:
+        if self._async_client is None:
+            import httpx
+            self._async_client = httpx.AsyncClient(timeout=60)
+        try:
+            with STAGE_SECONDS.time("embedding"):
+                response = await self._async_client.post(
+                    self.embed_url,
+                    json={
+                        "model": self.model,
+                        "prompt": text
+                    }
+                )
+                response.raise_for_status()
             return response.json()['embedding']
         except Exception as e:
             print(f"Error generating embedding: {e}")
+            record_error("embedding", e)
             raise
+    
+    async def aclose(self):
+        """Close the async HTTP pool"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+# Cache key of extracted PDF text; bump the suffix when extraction below changes
+PDF_EXTRACTOR = f"PyPDF2-{PyPDF2.__version__}-1"
 
 
 class VectorDBManager:
@@ -58,10 +120,23 @@ class VectorDBManager:
         qdrant_api_key: str,
         collection_name: str,
         ollama_base_url: str,
-        embedding_model: str
+        embedding_model: str,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 100,
+        text_cache_dir: Optional[str] = None
     ):
-        """Initialize Vector DB Manager"""
+        """
+        Initialize Vector DB Manager
+        
+        Args:
+            chunk_size: Characters per indexed chunk
+            chunk_overlap: Characters shared by consecutive chunks
+            text_cache_dir: Folder caching extracted PDF text by file hash (None disables the cache)
+        """
         self.collection_name = collection_name
+        self.qdrant_url = qdrant_url
+        self.qdrant_api_key = qdrant_api_key
+        self._async_qdrant_client = None
         
         # Initialize Ollama embeddings
         self.embeddings = OllamaEmbeddings(ollama_base_url, embedding_model)
@@ -75,10 +150,13 @@ class VectorDBManager:
         
         # Text splitter for chunking
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
         )
         
+        # PDFs are parsed once per content version; re-chunking reuses the text
+        self.text_cache = ExtractedTextCache(text_cache_dir) if text_cache_dir else None
+        
         # Get embedding dimension
         self.embedding_dim = len(self.embeddings.embed_query("test"))
     
@@ -106,21 +184,14 @@ class VectorDBManager:
             raise
     
     def extract_text_from_pdf(self, file_path: Path) -> str:
-        """Extract text from PDF"""
+        """Extract text from PDF (page texts come from the text cache when the file is unchanged)"""
         try:
             text = ""
-            with open(file_path, "rb") as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text.strip():
-                            text += f"\n--- Page {page_num + 1} ---\n"
-                            text += page_text
-                            text += "\n"
-                    except Exception as e:
-                        print(f"Warning: Failed to extract text from page {page_num + 1}: {e}")
-                        continue
+            for page_num, page_text in enumerate(self._pdf_pages(file_path)):
+                if page_text.strip():
+                    text += f"\n--- Page {page_num + 1} ---\n"
+                    text += page_text
+                    text += "\n"
             
             if not text.strip():
                 raise Exception("No text could be extracted from the PDF")
@@ -129,6 +200,31 @@ class VectorDBManager:
         except Exception as e:
             raise Exception(f"Failed to extract text from PDF: {e}")
     
+    def _pdf_pages(self, file_path: Path) -> List[str]:
+        """Text of every page ('' when a page has none), parsed only on a cache miss"""
+        digest = file_digest(file_path) if self.text_cache else None
+        if digest:
+            pages = self.text_cache.get(digest, PDF_EXTRACTOR)
+            if pages is not None:
+                return pages
+        
+        pages = []
+        complete = True
+        with STAGE_SECONDS.time("pdf_extract"), open(file_path, "rb") as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page_num, page in enumerate(pdf_reader.pages):
+                try:
+                    pages.append(page.extract_text() or "")
+                except Exception as e:
+                    print(f"Warning: Failed to extract text from page {page_num + 1}: {e}")
+                    pages.append("")
+                    complete = False
+        
+        # Pages that failed are retried next time rather than cached as empty
+        if digest and complete:
+            self.text_cache.put(digest, PDF_EXTRACTOR, pages, file_path.name)
+        return pages
+    
     def process_pdf_file(self, file_path: Path) -> List[Dict]:
         """Process PDF file into chunks"""
         try:
@@ -242,38 +338,92 @@ class VectorDBManager:
                 print(f"Uploaded batch {i//batch_size + 1}/{(len(points)-1)//batch_size + 1}")
             
             print(f"✅ Successfully uploaded {len(documents)} documents!")
+            invalidate_tool_results(KNOWLEDGE)
         except Exception as e:
             print(f"Error uploading documents: {e}")
             raise
     
+    @traced("VectorDBManager.search")
     def search(self, query: str, limit: int = 5, score_threshold: float = 0.3) -> List[Dict]:
-        """Search for relevant documents"""
+        """Search for relevant documents (concurrent identical searches share one result)"""
+        key = (self.qdrant_url, self.collection_name, query, limit, score_threshold)
+        results = search_flight.do(key, self._search, query, limit, score_threshold)
+        set_attribute("vector.results", len(results))
+        return results
+    
+    def _search(self, query: str, limit: int, score_threshold: float) -> List[Dict]:
         try:
             # Generate query embedding
             query_embedding = self.embeddings.embed_query(query)
             
             # Search in Qdrant
-            search_results = self.qdrant_client.search(
-                collection_name=self.collection_name,
-                query_vector=query_embedding,
-                limit=limit,
-                score_threshold=score_threshold
-            )
+            with STAGE_SECONDS.time("vector_search"):
+                search_results = self.qdrant_client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_embedding,
+                    limit=limit,
+                    score_threshold=score_threshold
+                )
             
-            # Format results
-            results = []
-            for result in search_results:
-                results.append({
-                    'text': result.payload['text'],
-                    'score': result.score,
-                    'metadata': {k: v for k, v in result.payload.items() if k != 'text'}
-                })
+            return self._format_results(search_results)
+        except Exception as e:
+            print(f"Error searching: {e}")
+            record_error("vector_search", e)
+            return []
+    
+    @traced("VectorDBManager.asearch")
+    async def asearch(self, query: str, limit: int = 5, score_threshold: float = 0.3) -> List[Dict]:
+        """Search for relevant documents without blocking the event loop"""
+        key = (self.qdrant_url, self.collection_name, query, limit, score_threshold)
+        results = await search_flight.ado(key, lambda: self._asearch(query, limit, score_threshold))
+        set_attribute("vector.results", len(results))
+        return results
+    
+    async def _asearch(self, query: str, limit: int, score_threshold: float) -> List[Dict]:
+        try:
+            query_embedding = await self.embeddings.aembed_query(query)
+            
+            if self._async_qdrant_client is None:
+                from qdrant_client import AsyncQdrantClient
+                self._async_qdrant_client = AsyncQdrantClient(
+                    url=self.qdrant_url,
+                    api_key=self.qdrant_api_key,
+                    timeout=300
+                )
             
-            return results
+            with STAGE_SECONDS.time("vector_search"):
+                search_results = await self._async_qdrant_client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_embedding,
+                    limit=limit,
+                    score_threshold=score_threshold
+                )
+            
+            return self._format_results(search_results)
         except Exception as e:
             print(f"Error searching: {e}")
+            record_error("vector_search", e)
             return []
     
+    async def aclose(self):
+        """Close async embedding and Qdrant connections"""
+        await self.embeddings.aclose()
+        if self._async_qdrant_client is not None:
+            await self._async_qdrant_client.close()
+            self._async_qdrant_client = None
+    
+    @staticmethod
+    def _format_results(search_results) -> List[Dict]:
+        """Convert Qdrant points to result dicts"""
+        results = []
+        for result in search_results:
+            results.append({
+                'text': result.payload['text'],
+                'score': result.score,
+                'metadata': {k: v for k, v in result.payload.items() if k != 'text'}
+            })
+        return results
+    
     def index_all_files(self, pdf_files: List[Path], excel_files: List[Path]):
         """Index all PDF and Excel files"""
         try:
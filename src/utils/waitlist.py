@@ -0,0 +1,307 @@
+"""
+Waitlist
+Patients waiting for a doctor's slot in a date and time window, indexed by day so a freed slot finds its waiters at once
+"""
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .metrics import Counter
+
+
+WAITLIST_EVENTS = Counter(
+    "chatbot_waitlist_events_total",
+    "Waitlist events (joined, left, offered, booked, expired)",
+    ["event"]
+)
+
+# Entry states
+WAITING = "waiting"
+OFFERED = "offered"
+BOOKED = "booked"
+LEFT = "left"
+
+# Fill policies for a freed slot
+POLICY_OFFER = "offer"  # Hold the slot for the first waiter, who books it by chatting
+POLICY_AUTO_BOOK = "auto_book"  # Book the first waiter straight away
+POLICIES = (POLICY_OFFER, POLICY_AUTO_BOOK)
+
+
+class Waitlist:
+    """
+    Waitlist entries of one workbook, kept in a JSON file next to it
+    
+    Every open entry is listed under each day of its window, per doctor, so
+    the waiters for a freed slot are found with one dictionary lookup plus a
+    check of that day's few entries, however long the list is. Windows are
+    bounded (at most max_days), which keeps the index small. Entries on a day
+    are in arrival order: first come, first served.
+    
+    An offered slot is recorded on its entry (date, time and expiry) and the
+    file is the only record of it, so every worker process honors an offer
+    and it outlives a restart. The file is re-read when another process
+    changed it. Callers that modify the list must serialize across processes
+    (ExcelDBManager does so with its workbook write lock).
+    """
+    
+    def __init__(self, path: str, max_days: int = 30):
+        """
+        Args:
+            path: JSON file holding the entries (created on first write)
+            max_days: Longest date window a patient may wait for
+        """
+        self.path = Path(path)
+        self.max_days = max_days
+        self._entries = {}  # id -> entry
+        self._by_day = {}  # (doctor, YYYY-MM-DD) -> [id, ...] in arrival order
+        self._offered = {}  # doctor -> {id, ...} of entries holding an offer
+        self._version = None
+        self._lock = threading.RLock()
+    
+    def _file_version(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _load(self):
+        """Re-read the file if it changed since the last read (caller holds the lock)"""
+        version = self._file_version()
+        if version == self._version:
+            return
+        entries = {}
+        if version is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = {entry["id"]: entry for entry in json.load(f)}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading waitlist {self.path}: {e}")
+        self._entries = entries
+        self._version = version
+        self._reindex()
+    
+    def _reindex(self):
+        self._by_day = {}
+        self._offered = {}
+        for entry in sorted(self._entries.values(), key=lambda item: item["created"]):
+            if entry["status"] in (WAITING, OFFERED):
+                self._index(entry)
+            if entry["status"] == OFFERED:
+                self._offered.setdefault(entry["doctor"], set()).add(entry["id"])
+    
+    def _index(self, entry: Dict[str, Any]):
+        day = date.fromisoformat(entry["start_date"])
+        last = date.fromisoformat(entry["end_date"])
+        while day <= last:
+            self._by_day.setdefault((entry["doctor"], day.isoformat()), []).append(entry["id"])
+            day += timedelta(days=1)
+    
+    def _unindex(self, entry: Dict[str, Any]):
+        day = date.fromisoformat(entry["start_date"])
+        last = date.fromisoformat(entry["end_date"])
+        while day <= last:
+            ids = self._by_day.get((entry["doctor"], day.isoformat()))
+            if ids and entry["id"] in ids:
+                ids.remove(entry["id"])
+                if not ids:
+                    del self._by_day[(entry["doctor"], day.isoformat())]
+            day += timedelta(days=1)
+    
+    def _save(self):
+        """Write the entries atomically (caller holds the lock)"""
+        temp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self._entries.values()), f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+        self._version = self._file_version()
+    
+    def add(
+        self,
+        doctor: str,
+        patient_name: str,
+        phone: str,
+        start_date: date,
+        end_date: date,
+        earliest: Optional[int] = None,
+        latest: Optional[int] = None,
+        weekdays: Optional[Sequence[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Put a patient on a doctor's waitlist, replacing their open entry for that doctor
+        
+        Args:
+            doctor: Doctor sheet name
+            patient_name: Patient's full name
+            phone: Patient's phone number (identifies the patient)
+            start_date: First acceptable day
+            end_date: Last acceptable day (capped at max_days after start_date)
+            earliest: Earliest acceptable start, minutes after midnight
+            latest: Latest acceptable start, minutes after midnight (inclusive)
+            weekdays: Acceptable weekdays, Monday = 0 (default: all)
+        
+        Returns:
+            The stored entry
+        """
+        end_date = min(end_date, start_date + timedelta(days=self.max_days))
+        with self._lock:
+            self._load()
+            for entry in self.open_entries(doctor=doctor):
+                if entry["phone"] == phone:
+                    self._close(self._entries[entry["id"]], LEFT)
+            
+            entry = {
+                "id": uuid.uuid4().hex[:12],
+                "doctor": doctor,
+                "patient_name": patient_name,
+                "phone": phone,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "earliest": earliest,
+                "latest": latest,
+                "weekdays": sorted(weekdays) if weekdays else None,
+                "created": datetime.now().isoformat(timespec='microseconds'),
+                "status": WAITING,
+                "offer": None,
+                "booked": None
+            }
+            self._entries[entry["id"]] = entry
+            self._index(entry)
+            self._save()
+            WAITLIST_EVENTS.inc("joined")
+            return dict(entry)
+    
+    def _close(self, entry: Dict[str, Any], status: str):
+        """Take an entry off the index (caller holds the lock and saves)"""
+        self._unindex(entry)
+        self._offered.get(entry["doctor"], set()).discard(entry["id"])
+        entry["status"] = status
+    
+    def leave(self, phone: str, doctor: Optional[str] = None) -> int:
+        """Remove a patient's open entries (for one doctor or all); returns how many"""
+        with self._lock:
+            self._load()
+            leaving = [entry for entry in self.open_entries(doctor=doctor) if entry["phone"] == phone]
+            for entry in leaving:
+                self._close(self._entries[entry["id"]], LEFT)
+            if leaving:
+                self._save()
+                WAITLIST_EVENTS.inc("left", amount=len(leaving))
+            return len(leaving)
+    
+    def matches(self, doctor: str, start: datetime, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Waiters who would take a freed slot, first come first
+        
+        Entries holding a live offer are skipped; lapsed offers count as waiting again.
+        
+        Args:
+            doctor: Doctor sheet name
+            start: Slot start
+            now: Current time (for offer expiry)
+        """
+        now = now or datetime.now()
+        minute = start.hour * 60 + start.minute
+        with self._lock:
+            self._load()
+            found = []
+            for entry_id in self._by_day.get((doctor, start.date().isoformat()), []):
+                entry = self._entries[entry_id]
+                if entry["status"] == OFFERED and datetime.fromisoformat(entry["offer"]["expires"]) > now:
+                    continue
+                if entry["weekdays"] is not None and start.weekday() not in entry["weekdays"]:
+                    continue
+                if entry["earliest"] is not None and minute < entry["earliest"]:
+                    continue
+                if entry["latest"] is not None and minute > entry["latest"]:
+                    continue
+                found.append(dict(entry))
+            return found
+    
+    def offer(self, entry_id: str, slot_date: str, slot_time: str, expires: datetime):
+        """Record that a slot is being held for an entry until expires"""
+        with self._lock:
+            self._load()
+            entry = self._entries[entry_id]
+            if entry["status"] == OFFERED:
+                WAITLIST_EVENTS.inc("expired")
+            entry["status"] = OFFERED
+            entry["offer"] = {"date": slot_date, "time": slot_time, "expires": expires.isoformat(timespec='seconds')}
+            self._offered.setdefault(entry["doctor"], set()).add(entry_id)
+            self._save()
+            WAITLIST_EVENTS.inc("offered")
+    
+    def live_offers(self, doctor: str, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Entries of a doctor whose offered slot is still held for them"""
+        now = now or datetime.now()
+        with self._lock:
+            self._load()
+            return [
+                dict(self._entries[entry_id]) for entry_id in self._offered.get(doctor, ())
+                if datetime.fromisoformat(self._entries[entry_id]["offer"]["expires"]) > now
+            ]
+    
+    def booked(self, entry_id: str, slot_date: str, slot_time: str):
+        """Close an entry whose patient got a slot"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(entry_id)
+            if entry is None or entry["status"] not in (WAITING, OFFERED):
+                return
+            self._close(entry, BOOKED)
+            entry["booked"] = {"date": slot_date, "time": slot_time}
+            self._save()
+            WAITLIST_EVENTS.inc("booked")
+    
+    def version(self):
+        """Modification time and size of the file (None before the first write)"""
+        with self._lock:
+            self._load()
+            return self._version
+    
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """One entry by id"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(entry_id)
+            return dict(entry) if entry else None
+    
+    def open_entries(self, doctor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Waiting and offered entries, oldest first"""
+        return self.entries(doctor=doctor, statuses=(WAITING, OFFERED))
+    
+    def entries(
+        self,
+        doctor: Optional[str] = None,
+        statuses: Optional[Sequence[str]] = None,
+        phone: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Entries for staff review, oldest first
+        
+        Args:
+            doctor: Only this doctor's entries
+            statuses: Only entries in these states (default: all)
+            phone: Only this patient's entries
+        """
+        with self._lock:
+            self._load()
+            return [
+                dict(entry) for entry in sorted(self._entries.values(), key=lambda item: item["created"])
+                if (doctor is None or entry["doctor"] == doctor)
+                and (statuses is None or entry["status"] in statuses)
+                and (phone is None or entry["phone"] == phone)
+            ]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Entries per state and the size of the day index"""
+        with self._lock:
+            self._load()
+            counts = {status: 0 for status in (WAITING, OFFERED, BOOKED, LEFT)}
+            for entry in self._entries.values():
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+            return {"entries": counts, "indexed_days": len(self._by_day)}
@@ -0,0 +1,22 @@
+"""
+Web package for Medical Center AI Chatbot
+"""
+from .handlers import (
+    ChatHandlers,
+    Reply,
+    reply,
+    overloaded_reply,
+    session_id_of,
+    client_ip_of,
+    staff_denial
+)
+
+__all__ = [
+    'ChatHandlers',
+    'Reply',
+    'reply',
+    'overloaded_reply',
+    'session_id_of',
+    'client_ip_of',
+    'staff_denial'
+]
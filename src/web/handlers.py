@@ -0,0 +1,298 @@
+"""
+Web Handlers
+Request handling shared by the Flask app (app.py) and the ASGI app (asgi.py)
+"""
+import asyncio
+import hmac
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Mapping, MutableMapping, Optional, Tuple
+
+from src.utils import (
+    config,
+    services,
+    singleflight_stats,
+    AdmissionRejected,
+    PRIORITY_HIGH,
+    PRIORITY_NORMAL
+)
+from src.utils.metrics import REJECTED_REQUESTS, record_error
+from src.utils.tracing import span, set_attribute
+from src.agents import medical_crew, medical_chatbot
+from src.agents.warmup import is_ready, warmup_status
+
+
+# JSON body, HTTP status and extra headers; each app turns it into its own response
+Reply = Tuple[Dict[str, Any], int, Dict[str, str]]
+
+
+def reply(body: Dict[str, Any], status: int = 200, headers: Optional[Dict[str, str]] = None) -> Reply:
+    return body, status, headers or {}
+
+
+def overloaded_reply(message: str, status: int, retry_after: int) -> Reply:
+    """Fast rejection telling the client when to retry"""
+    return reply({'error': message, 'retry_after': retry_after}, status, {'Retry-After': str(retry_after)})
+
+
+def error_reply(endpoint: str, e: Exception) -> Reply:
+    print(f"Error in {endpoint} endpoint: {e}")
+    return reply({'error': str(e)}, 500)
+
+
+def staff_denial(headers: Mapping[str, str]) -> Optional[Reply]:
+    """
+    Check the staff token of a request to a staff endpoint
+    
+    The token is sent as "Authorization: Bearer <token>" or "X-Staff-Token: <token>"
+    and compared with STAFF_API_TOKEN; without that setting staff endpoints are off.
+    
+    Returns:
+        None if the request may proceed, else the 401/403 reply
+    """
+    if not config.STAFF_API_TOKEN:
+        return reply({'error': 'Staff endpoints are disabled (STAFF_API_TOKEN is not set)'}, 403)
+    
+    token = headers.get('X-Staff-Token') or ''
+    scheme, _, credentials = (headers.get('Authorization') or '').partition(' ')
+    if not token and scheme.lower() == 'bearer':
+        token = credentials.strip()
+    if not hmac.compare_digest(token.encode('utf-8'), config.STAFF_API_TOKEN.encode('utf-8')):
+        return reply({'error': 'Unauthorized'}, 401, {'WWW-Authenticate': 'Bearer'})
+    return None
+
+
+def session_id_of(session: MutableMapping, create: bool = False) -> Optional[str]:
+    """
+    Conversation id kept in the signed session cookie
+    
+    Args:
+        session: The framework's session mapping
+        create: Mint an id for a new conversation
+    """
+    if create and 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    return session.get('session_id')
+
+
+def client_ip_of(remote_addr: Optional[str], forwarded_for: Optional[str], trusted_hops: int = 0) -> str:
+    """
+    Address of the client, for per-address rate limiting
+    
+    Args:
+        remote_addr: Address of the socket peer
+        forwarded_for: X-Forwarded-For header, if any
+        trusted_hops: Reverse proxies in front of the app; each appends the
+            address it received the request from, so the client is that many
+            entries from the right (entries further left are client-supplied)
+    """
+    if trusted_hops > 0 and forwarded_for:
+        hops = [address.strip() for address in forwarded_for.split(',') if address.strip()]
+        if hops:
+            return hops[-min(trusted_hops, len(hops))]
+    return remote_addr or 'unknown'
+
+
+class ChatHandlers:
+    """
+    Endpoint logic of the chat API, independent of the web framework
+    
+    Every method returns a Reply. app.py calls the methods directly; asgi.py
+    awaits achat() and runs the other blocking methods (session store and
+    workbook I/O) with asyncio.to_thread.
+    """
+    
+    def __init__(self, admission, rate_limiter, ip_rate_limiter):
+        """
+        Args:
+            admission: AdmissionController (Flask) or AsyncAdmissionController (ASGI)
+            rate_limiter: RateLimiter for chat messages, per session
+            ip_rate_limiter: RateLimiter for chat messages, per client address
+        """
+        self.admission = admission
+        self.rate_limiter = rate_limiter
+        self.ip_rate_limiter = ip_rate_limiter
+    
+    def _prepare_chat(self, data: Optional[Mapping], session_id: str, client_ip: str) -> Tuple[Optional[Reply], str, int]:
+        """
+        Validate a chat request and pick its admission priority
+        
+        Returns:
+            Tuple of (rejection or None, user message, priority)
+        """
+        user_message = ((data or {}).get('message') or '').strip()
+        if not user_message:
+            return reply({'error': 'Message cannot be empty'}, 400), "", PRIORITY_NORMAL
+        
+        set_attribute("session.id", session_id)
+        # The session id comes from a cookie the client can drop, so the address is limited too
+        for limiter, key in ((self.ip_rate_limiter, client_ip), (self.rate_limiter, session_id)):
+            allowed, retry_after = limiter.allow(key)
+            if not allowed:
+                REJECTED_REQUESTS.inc("rate_limited")
+                return overloaded_reply('Too many messages, please slow down.', 429, retry_after), user_message, PRIORITY_NORMAL
+        
+        # Finishing a booking is worth more than starting a new conversation
+        priority = PRIORITY_HIGH if medical_chatbot.is_completing_booking(session_id) else PRIORITY_NORMAL
+        set_attribute("admission.priority", priority)
+        return None, user_message, priority
+    
+    @staticmethod
+    def _chat_reply(response: str, session_id: str) -> Reply:
+        return reply({
+            'response': response,
+            'session_id': session_id,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    @staticmethod
+    def _chat_failure(e: Exception) -> Reply:
+        print(f"Error in chat endpoint: {e}")
+        record_error("chat_endpoint", e)
+        return reply({'error': f'An error occurred: {str(e)}'}, 500)
+    
+    @staticmethod
+    def _traced(request_span, result: Reply) -> Reply:
+        """Record the status on the request span and return its trace id in X-Trace-Id"""
+        body, status, headers = result
+        request_span.set_attribute("http.status_code", status)
+        if request_span.trace_id:
+            headers = dict(headers, **{'X-Trace-Id': request_span.trace_id})
+        return body, status, headers
+    
+    def chat(self, data: Optional[Mapping], session_id: str, client_ip: str) -> Reply:
+        """Process one chat message (traced)"""
+        with span("POST /api/chat") as request_span:
+            try:
+                rejection, user_message, priority = self._prepare_chat(data, session_id, client_ip)
+                if rejection:
+                    return self._traced(request_span, rejection)
+                try:
+                    with self.admission.admit(priority):
+                        # History is kept in the session's memory
+                        response = medical_crew.handle_query(user_message, session_id)
+                except AdmissionRejected as e:
+                    REJECTED_REQUESTS.inc(e.reason)
+                    return self._traced(request_span, overloaded_reply('The assistant is busy right now, please try again shortly.', 503, e.retry_after))
+                return self._traced(request_span, self._chat_reply(response, session_id))
+            except Exception as e:
+                return self._traced(request_span, self._chat_failure(e))
+    
+    async def achat(self, data: Optional[Mapping], session_id: str, client_ip: str) -> Reply:
+        """Async variant of chat() for the ASGI app"""
+        with span("POST /api/chat") as request_span:
+            try:
+                # Rate limits and slot holds live in this process, so this does not block the loop
+                rejection, user_message, priority = self._prepare_chat(data, session_id, client_ip)
+                if rejection:
+                    return self._traced(request_span, rejection)
+                try:
+                    async with self.admission.admit(priority):
+                        # LLM and vector calls are awaited; Excel work runs on a bounded thread pool
+                        response = await medical_crew.ahandle_query(user_message, session_id)
+                except AdmissionRejected as e:
+                    REJECTED_REQUESTS.inc(e.reason)
+                    return self._traced(request_span, overloaded_reply('The assistant is busy right now, please try again shortly.', 503, e.retry_after))
+                return self._traced(request_span, self._chat_reply(response, session_id))
+            except Exception as e:
+                return self._traced(request_span, self._chat_failure(e))
+    
+    def history(self, session_id: Optional[str]) -> Reply:
+        """Conversation history of a session"""
+        try:
+            memory = medical_chatbot.sessions.peek(session_id) if session_id else None
+            if memory is None:
+                return reply({'history': []})
+            
+            history = [
+                {
+                    'role': message['role'],
+                    'content': message['content'],
+                    'timestamp': datetime.fromtimestamp(message['timestamp']).isoformat()
+                }
+                for message in memory.get_history()
+            ]
+            return reply({'history': history, 'session_id': session_id})
+        
+        except Exception as e:
+            return error_reply("history", e)
+    
+    def clear(self, session_id: Optional[str]) -> Reply:
+        """Forget a session's conversation"""
+        try:
+            if session_id:
+                medical_chatbot.sessions.remove(session_id)
+            return reply({'message': 'Conversation cleared'})
+        
+        except Exception as e:
+            return error_reply("clear", e)
+    
+    def session_stats(self) -> Reply:
+        """Session store metrics (live sessions, size, evictions)"""
+        try:
+            return reply(medical_chatbot.sessions.stats())
+        
+        except Exception as e:
+            return error_reply("session stats", e)
+    
+    def admission_stats(self) -> Reply:
+        """Admission control and rate limiting counters"""
+        try:
+            stats = self.admission.stats()
+            stats['rate_limited'] = self.rate_limiter.limited
+            stats['rate_limited_ip'] = self.ip_rate_limiter.limited
+            return reply(stats)
+        
+        except Exception as e:
+            return error_reply("admission stats", e)
+    
+    def coalescing_stats(self) -> Reply:
+        """Single-flight counters (calls, executions, coalesced) per upstream"""
+        try:
+            return reply(singleflight_stats())
+        
+        except Exception as e:
+            return error_reply("coalescing stats", e)
+    
+    def waitlist(self, args: Mapping[str, str], headers: Mapping[str, str]) -> Reply:
+        """Staff view of the waitlist (?doctor=...&status=waiting,offered), oldest first"""
+        denial = staff_denial(headers)
+        if denial:
+            return denial
+        try:
+            excel_manager = services.get("excel")
+            doctor = args.get('doctor') or None
+            statuses = [status for status in args.get('status', '').split(',') if status] or None
+            return reply({
+                'policy': excel_manager.waitlist_policy,
+                'stats': excel_manager.waitlist.stats(),
+                'entries': excel_manager.waitlist_entries(doctor, statuses)
+            })
+        
+        except Exception as e:
+            return error_reply("waitlist", e)
+    
+    @staticmethod
+    def health() -> Reply:
+        """Readiness probe: 503 until this process has finished warming up"""
+        return reply(warmup_status(), 200 if is_ready() else 503)
+    
+    @staticmethod
+    def info() -> Reply:
+        """Medical center information"""
+        try:
+            return reply({
+                'center_name': config.CENTER_NAME,
+                'phone': config.CENTER_PHONE,
+                'pt_phone': config.PT_PHONE,
+                'pt_email': config.PT_EMAIL,
+                'location': config.CENTER_LOCATION,
+                'hours': {
+                    'weekday': config.WEEKDAY_HOURS,
+                    'saturday': config.SATURDAY_HOURS,
+                    'sunday': config.SUNDAY_HOURS
+                }
+            })
+        
+        except Exception as e:
+            return error_reply("info", e)
@@ -0,0 +1,35 @@
+"""
+Shared test setup: placeholder credentials so the lazily loaded config validates,
+and a small clinic workbook
+"""
+import os
+from datetime import datetime, timedelta
+
+import openpyxl
+import pytest
+
+for name in ("GEMINI_API_KEY", "QDRANT_URL", "QDRANT_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+
+DOCTORS = ("Dr. Sarah Martinez", "Dr. Ahmed Hassan")
+TIMES = ("09:00 AM", "10:00 AM", "11:00 AM", "12:00 PM")
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Workbook with free slots for two doctors over the next three days"""
+    path = tmp_path / "clinic.xlsx"
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for doctor in DOCTORS:
+        ws = wb.create_sheet(doctor)
+        ws.append(["Date", "Time", "Patient_Name", "Phone", "Status"])
+        for day in range(1, 4):
+            for time in TIMES:
+                ws.append([today + timedelta(days=day), time, "-", "-", "Available"])
+    patients = wb.create_sheet("Patients")
+    patients.append(["Patient_ID", "Full_Name", "Date_of_Birth", "Gender", "Phone", "Address", "Doctor"])
+    wb.save(path)
+    return path
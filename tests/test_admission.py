@@ -0,0 +1,141 @@
+"""
+Tests for admission control, rate limiting and chat priority
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.agents.medical_agents import medical_chatbot
+from src.utils import (
+    services,
+    AdmissionController,
+    AsyncAdmissionController,
+    AdmissionRejected,
+    RateLimiter,
+    PRIORITY_HIGH,
+    PRIORITY_NORMAL
+)
+from src.utils.slot_holds import SlotHolds
+from src.web import client_ip_of
+
+
+def _queue(controller, priorities):
+    """Occupy the only slot, then queue one waiter per priority; returns (release, threads)"""
+    release = threading.Event()
+    
+    def run(priority):
+        try:
+            with controller.admit(priority):
+                release.wait(2)
+        except AdmissionRejected:
+            pass
+    
+    threads = [threading.Thread(target=run, args=(PRIORITY_NORMAL,))]
+    threads[0].start()
+    while controller.in_flight == 0:
+        time.sleep(0.001)
+    for priority in priorities:
+        thread = threading.Thread(target=run, args=(priority,))
+        thread.start()
+        threads.append(thread)
+    while len(controller._waiters) < len(priorities):
+        time.sleep(0.001)
+    return release, threads
+
+
+def test_high_priority_queue_has_its_own_cap():
+    controller = AdmissionController(max_concurrent=1, max_queue=2, queue_timeout=2, max_high_queue=1)
+    release, threads = _queue(controller, [PRIORITY_NORMAL, PRIORITY_NORMAL, PRIORITY_HIGH])
+    try:
+        with pytest.raises(AdmissionRejected):
+            with controller.admit(PRIORITY_NORMAL):
+                pass
+        with pytest.raises(AdmissionRejected):
+            with controller.admit(PRIORITY_HIGH):
+                pass
+        assert controller.stats()["rejected_queue_full"] == 2
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+
+def test_high_priority_is_admitted_when_normal_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=2, max_high_queue=1)
+    release, threads = _queue(controller, [PRIORITY_NORMAL])
+    admitted = []
+    
+    def run_high():
+        with controller.admit(PRIORITY_HIGH):
+            admitted.append(True)
+    
+    high = threading.Thread(target=run_high)
+    high.start()
+    while len(controller._waiters) < 2:
+        time.sleep(0.001)
+    release.set()
+    high.join()
+    for thread in threads:
+        thread.join()
+    assert admitted == [True]
+
+
+def test_async_controller_serves_high_priority_first_and_caps_it():
+    async def scenario():
+        controller = AsyncAdmissionController(max_concurrent=1, max_queue=5, queue_timeout=2, max_high_queue=1)
+        order = []
+        
+        async def run(priority, name):
+            async with controller.admit(priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+        
+        tasks = [asyncio.create_task(run(PRIORITY_NORMAL, "first"))]
+        await asyncio.sleep(0)
+        for priority, name in [(PRIORITY_NORMAL, "n1"), (PRIORITY_HIGH, "h1")]:
+            tasks.append(asyncio.create_task(run(priority, name)))
+            await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await run(PRIORITY_HIGH, "h2")
+        await asyncio.gather(*tasks)
+        return order
+    
+    assert asyncio.run(scenario()) == ["first", "h1", "n1"]
+
+
+def test_rate_limiter_spends_and_refills_tokens():
+    limiter = RateLimiter(rate=1000.0, burst=2)
+    assert limiter.allow("a")[0] and limiter.allow("a")[0]
+    allowed, retry_after = limiter.allow("a")
+    assert not allowed and retry_after >= 1
+    assert limiter.allow("b")[0]
+    time.sleep(0.01)
+    assert limiter.allow("a")[0]
+    assert limiter.limited == 1
+
+
+def test_client_ip_trusts_only_the_configured_proxy_hops():
+    assert client_ip_of("10.0.0.1", "1.1.1.1, 2.2.2.2") == "10.0.0.1"
+    assert client_ip_of("10.0.0.1", "1.1.1.1, 2.2.2.2", trusted_hops=1) == "2.2.2.2"
+    assert client_ip_of("10.0.0.1", "1.1.1.1, 2.2.2.2", trusted_hops=2) == "1.1.1.1"
+    assert client_ip_of("10.0.0.1", "2.2.2.2", trusted_hops=3) == "2.2.2.2"
+    assert client_ip_of(None, None, trusted_hops=1) == "unknown"
+
+
+class FakeExcel:
+    def __init__(self):
+        self.holds = SlotHolds(ttl=60)
+
+
+def test_booking_priority_follows_slot_holds():
+    excel = FakeExcel()
+    with services.override("excel", excel):
+        assert not medical_chatbot.is_completing_booking("s1")
+        excel.holds.hold("s1", "Dr. Sarah Martinez", datetime(2026, 10, 20, 10))
+        assert medical_chatbot.is_completing_booking("s1")
+        assert not medical_chatbot.is_completing_booking("s2")
+        excel.holds.release("s1")
+        assert not medical_chatbot.is_completing_booking("s1")
@@ -0,0 +1,141 @@
+"""
+Tests for booking a recurring series: all-or-nothing writes, fallback rules and templated doctors
+"""
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import openpyxl
+import pytest
+
+from src.utils.excel_manager import ExcelDBManager
+
+
+DOCTOR = "Dr. Sarah Martinez"
+DAY_1 = date.today() + timedelta(days=1)
+DAY_2 = DAY_1 + timedelta(days=1)
+DAY_3 = DAY_1 + timedelta(days=2)
+
+
+@pytest.fixture
+def manager(workbook):
+    return ExcelDBManager(str(workbook), waitlist_policy="offer")
+
+
+def book_series(manager, weekdays, sessions, **kwargs):
+    return manager.book_series(DOCTOR, "Shady Abdelaziz", "555", weekdays, sessions, max_weeks=1, **kwargs)
+
+
+def booked_slots(manager, patient_name="Shady Abdelaziz"):
+    return [(appt["date"], appt["time"]) for appt in manager.search_appointments(patient_name=patient_name)]
+
+
+def take(manager, day, time):
+    assert manager.book_appointment(DOCTOR, day.isoformat(), time, "Pat One", "111")[0]
+
+
+def test_series_is_booked_in_full_or_not_at_all(manager):
+    success, message, placed = book_series(manager, [DAY_1.weekday(), DAY_2.weekday(), DAY_3.weekday()], 4, time="09:00 AM", fallbacks=[])
+    assert not success
+    assert "Nothing was booked" in message
+    assert len(placed) == 3
+    assert booked_slots(manager) == []
+    
+    success, _, placed = book_series(manager, [DAY_1.weekday(), DAY_2.weekday()], 2, time="09:00 AM", fallbacks=[])
+    assert success
+    assert [session["rule"] for session in placed] == ["exact", "exact"]
+    assert sorted(booked_slots(manager)) == [(DAY_1.isoformat(), "09:00 AM"), (DAY_2.isoformat(), "09:00 AM")]
+
+
+def test_nearest_time_moves_a_taken_session(manager):
+    take(manager, DAY_1, "09:00 AM")
+    assert not book_series(manager, [DAY_1.weekday()], 1, time="09:00 AM", fallbacks=[])[0]
+    
+    success, _, placed = book_series(manager, [DAY_1.weekday()], 1, time="09:00 AM", fallbacks=["nearest_time"])
+    assert success
+    assert (placed[0]["date"], placed[0]["time"], placed[0]["rule"]) == (DAY_1.isoformat(), "10:00 AM", "nearest_time")
+
+
+def test_next_day_moves_a_taken_session_to_a_later_day(manager):
+    take(manager, DAY_1, "09:00 AM")
+    success, _, placed = book_series(manager, [DAY_1.weekday()], 1, time="09:00 AM", fallbacks=["next_day"], max_time_shift=0)
+    assert success
+    assert (placed[0]["date"], placed[0]["time"], placed[0]["rule"]) == (DAY_2.isoformat(), "09:00 AM", "next_day")
+    assert placed[0]["requested_date"] == DAY_1.isoformat()
+
+
+def test_skip_extends_the_series(manager):
+    take(manager, DAY_1, "09:00 AM")
+    success, message, placed = book_series(
+        manager, [DAY_1.weekday(), DAY_3.weekday()], 1, time="09:00 AM", fallbacks=["skip"], max_time_shift=0
+    )
+    assert success
+    assert [(session["date"], session["rule"]) for session in placed] == [(DAY_3.isoformat(), "exact")]
+    assert f"Skipped (no free slot): {DAY_1.isoformat()}" in message
+
+
+def test_held_slots_are_avoided_and_own_hold_is_converted(manager):
+    assert manager.hold_slot(DOCTOR, DAY_1.isoformat(), "09:00 AM", "other")[0]
+    assert manager.hold_slot(DOCTOR, DAY_2.isoformat(), "09:00 AM", "mine")[0]
+    success, _, placed = book_series(
+        manager, [DAY_1.weekday(), DAY_2.weekday()], 2, time="09:00 AM", fallbacks=["nearest_time"], session_id="mine"
+    )
+    assert success
+    assert [(session["date"], session["time"]) for session in placed] == [
+        (DAY_1.isoformat(), "10:00 AM"), (DAY_2.isoformat(), "09:00 AM")
+    ]
+    assert manager.holds.held_by("mine") is None
+    assert manager.holds.held_by("other") is not None
+
+
+def test_series_closes_the_patients_waitlist_entry(manager):
+    manager.join_waitlist(DOCTOR, "Shady Abdelaziz", "555", start_date=DAY_1.isoformat(), end_date=DAY_3.isoformat())
+    assert book_series(manager, [DAY_1.weekday()], 1, time="09:00 AM")[0]
+    assert manager.waitlist_entries(statuses=("waiting", "offered")) == []
+    assert manager.waitlist_entries(statuses=("booked",))[0]["booked"] == {"date": DAY_1.isoformat(), "time": "09:00 AM"}
+
+
+def test_offer_made_while_waiting_for_the_lock_is_respected(manager):
+    take(manager, DAY_1, "09:00 AM")
+    manager.join_waitlist(DOCTOR, "Wait Two", "222", start_date=DAY_1.isoformat(), end_date=DAY_1.isoformat())
+    writing = manager._writing
+    landed = []
+    
+    @contextmanager
+    def cancellation_lands_first():
+        with writing():
+            # Another request frees the slot, which is offered to Wait Two
+            manager._writing = writing
+            landed.append(manager.cancel_appointment(DOCTOR, "Pat One", DAY_1.isoformat(), "09:00 AM")[0])
+            yield
+    
+    manager._writing = cancellation_lands_first
+    success, _, placed = book_series(manager, [DAY_1.weekday()], 1, time="09:00 AM", fallbacks=["nearest_time"])
+    assert landed == [True]
+    assert success
+    assert placed[0]["time"] == "10:00 AM"
+    assert manager.waitlist_entries(statuses=("offered",))[0]["phone"] == "222"
+
+
+@pytest.fixture
+def templated(workbook):
+    """The workbook plus a doctor whose hours are a Schedule_Rules row (09:00-11:00, hourly, every day)"""
+    wb = openpyxl.load_workbook(workbook)
+    wb.create_sheet("Dr. Rule Based").append(["Date", "Time", "Patient_Name", "Phone", "Status"])
+    rules = wb.create_sheet("Schedule_Rules")
+    rules.append(["Doctor", "Weekdays", "Start", "End", "Slot_Minutes", "Valid_From", "Valid_To"])
+    rules.append(["Dr. Rule Based", "mon-sun", "09:00", "11:00", 60, None, None])
+    wb.save(workbook)
+    return ExcelDBManager(str(workbook))
+
+
+def test_templated_doctor_series_adds_rows(templated):
+    success, _, placed = templated.book_series(
+        "Dr. Rule Based", "Shady Abdelaziz", "555", [DAY_1.weekday()], 2, time="10:00 AM", max_weeks=2
+    )
+    assert success
+    assert [session["date"] for session in placed] == [DAY_1.isoformat(), (DAY_1 + timedelta(days=7)).isoformat()]
+    
+    rows = list(openpyxl.load_workbook(templated.excel_path)["Dr. Rule Based"].iter_rows(min_row=2, values_only=True))
+    assert [(row[1], row[4]) for row in rows] == [("10:00 AM", "Reserved")] * 2
+    free = templated.get_available_slots("Dr. Rule Based", DAY_1.isoformat(), limit=10)
+    assert [slot["time"] for slot in free] == ["09:00 AM"]
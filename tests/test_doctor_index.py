@@ -0,0 +1,40 @@
+"""
+Tests for fuzzy doctor name lookup
+"""
+from src.utils.doctor_index import DoctorNameIndex, phonetic_key
+
+
+DOCTORS = ["Dr. Sarah Martinez", "Dr. Sara Lee", "Dr. Ahmed Hassan", "Dr. Abdel Rahman Khaled"]
+
+
+def test_transliterations_share_a_phonetic_key():
+    for first, second in (("ahmed", "ahmad"), ("khaled", "khalid"), ("sarah", "sara"), ("mostafa", "mustafa")):
+        assert phonetic_key(first) == phonetic_key(second)
+
+
+def test_full_and_partial_names_match():
+    index = DoctorNameIndex(DOCTORS)
+    assert index.resolve("Dr. Sarah Martinez")["doctor"] == "Dr. Sarah Martinez"
+    assert index.resolve("ahmad")["doctor"] == "Dr. Ahmed Hassan"
+    assert index.resolve("rahman")["doctor"] == "Dr. Abdel Rahman Khaled"
+    assert index.resolve("د. أحمد حسن")["doctor"] == "Dr. Ahmed Hassan"
+
+
+def test_sound_alike_names_are_ambiguous():
+    index = DoctorNameIndex(DOCTORS)
+    for query in ("sarah", "sara"):
+        lookup = index.resolve(query)
+        assert lookup["status"] == "ambiguous", query
+        assert {doctor for doctor, _ in lookup["candidates"]} == {"Dr. Sarah Martinez", "Dr. Sara Lee"}
+
+
+def test_another_word_settles_sound_alike_names():
+    index = DoctorNameIndex(DOCTORS)
+    assert index.resolve("sarah lee")["doctor"] == "Dr. Sara Lee"
+    assert index.resolve("sara martinez")["doctor"] == "Dr. Sarah Martinez"
+
+
+def test_unknown_name_is_not_found():
+    lookup = DoctorNameIndex(DOCTORS).resolve("zzyzx")
+    assert lookup["status"] == "not_found"
+    assert lookup["doctor"] is None
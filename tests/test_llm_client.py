@@ -0,0 +1,35 @@
+"""
+Tests for the resilient LLM client: hedged attempts and the bulkhead
+"""
+import threading
+
+from src.utils.llm_client import ResilientLLMClient
+
+
+def test_running_loser_keeps_the_call_slot():
+    client = ResilientLLMClient(max_concurrency=1, hedge_min_samples=1, queue_timeout=0.01)
+    client.latency.record(0.01)  # Hedge after 10 ms
+    release = threading.Event()
+    calls = []
+    
+    def send(url, payload, headers, timeout):
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)  # The first attempt stalls upstream
+            return {"from": "first"}
+        return {"from": "hedge"}
+    
+    client._send = send
+    assert client.post_json("http://llm.test/", {}) == {"from": "hedge"}
+    assert not client._slots.acquire(blocking=False)  # The stalled attempt still counts
+    
+    release.set()
+    assert client._slots.acquire(timeout=2)
+    client._slots.release()
+
+
+def test_attempts_share_one_session():
+    client = ResilientLLMClient()
+    session = client._http()
+    assert client._http() is session
+    assert session.get_adapter("https://llm.test/")._pool_maxsize == 16
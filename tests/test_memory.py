@@ -0,0 +1,85 @@
+"""
+Tests for the token-budgeted conversation memory
+"""
+from src.agents.memory import ConversationMemory
+
+
+HELD = "⏳ Slot held for you: Dr. Sarah Martinez on 2025-12-12 at 10:00 AM (until 10:05 AM)."
+BOOKED = (
+    "✅ Appointment booked successfully!\n\nDoctor: Dr. Sarah Martinez\nDate: 2025-12-12\n"
+    "Time: 10:00 AM\nPatient: John Doe\nPhone: 01067110557"
+)
+
+
+def test_phrases_without_a_name_cue_pin_no_name():
+    memory = ConversationMemory()
+    memory.add_user_message("I am looking for a therapist")
+    memory.add_user_message("This is urgent")
+    memory.add_user_message("I'm free on Monday")
+    assert "patient_name" not in memory.facts
+
+
+def test_explicit_name_cue_pins_the_name():
+    memory = ConversationMemory()
+    memory.add_user_message("my name is john doe and my phone is 01067110557")
+    assert memory.facts["patient_name"] == "John Doe"
+    assert memory.facts["phone"] == "01067110557"
+
+
+def test_message_of_name_and_phone_pins_both():
+    memory = ConversationMemory()
+    memory.add_user_message("John Doe, 01067110557")
+    assert memory.facts["patient_name"] == "John Doe"
+    
+    memory = ConversationMemory()
+    memory.add_user_message("please book it for 01067110557")
+    assert "patient_name" not in memory.facts
+
+
+def test_assistant_turns_pin_nothing():
+    memory = ConversationMemory()
+    memory.add_ai_message("I'm sorry, Dr. Sarah is free on 2025-12-12 at 10:00 AM and 2025-12-13 at 11:00 AM.")
+    assert memory.facts == {}
+    assert not memory.has_pending_booking()
+
+
+def test_availability_listing_is_not_the_pending_slot():
+    memory = ConversationMemory()
+    memory.add_tool_result("check_availability", "Available appointments for Dr. Sarah Martinez:\n\n📅 2025-12-12:\n   Times: 10:00 AM")
+    assert not memory.has_pending_booking()
+
+
+def test_held_slot_becomes_pending_then_booked():
+    memory = ConversationMemory()
+    memory.add_tool_result("hold_slot", HELD)
+    assert memory.has_pending_booking()
+    assert memory.facts["doctor"] == "Dr. Sarah Martinez"
+    
+    memory.add_tool_result("book_appointment", BOOKED)
+    assert not memory.has_pending_booking()
+    assert memory.facts["booked_slot"] == "2025-12-12 10:00 AM"
+    assert memory.facts["patient_name"] == "John Doe"
+    
+    memory.add_tool_result("cancel_appointment", "✅ Appointment cancelled successfully!")
+    assert "booked_slot" not in memory.facts
+
+
+def test_failed_results_pin_nothing():
+    memory = ConversationMemory()
+    memory.add_tool_result("hold_slot", "The slot with Dr. Sarah Martinez on 2025-12-12 at 10:00 AM is being held for another patient.")
+    memory.add_tool_result("book_appointment", "No available slot found for Dr. Sarah Martinez on 2025-12-12 at 10:00 AM")
+    assert memory.facts == {}
+
+
+def test_compaction_keeps_context_within_budget():
+    memory = ConversationMemory(max_tokens=200, summary_tokens=60)
+    memory.add_user_message("my name is John Doe")
+    for turn in range(20):
+        memory.add_user_message(f"question {turn} " + "word " * 30)
+        memory.add_ai_message(f"answer {turn} " + "word " * 30)
+    
+    context = memory.get_context()
+    assert context[0]["role"] == "system"
+    assert "Patient name: John Doe" in context[0]["content"]
+    assert context[-1]["content"].startswith("answer 19")
+    assert memory.last_context_tokens <= 200 + 100  # Newest message is never clipped
@@ -0,0 +1,46 @@
+"""
+Tests for archiving past schedule rows into monthly partitions
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.utils.excel_manager import ExcelDBManager
+from src.utils.schedule_archive import ScheduleArchive
+
+
+DOCTOR = "Dr. Sarah Martinez"
+DAY = datetime(2025, 11, 3)
+
+
+def test_append_keeps_one_row_per_slot(tmp_path):
+    archive = ScheduleArchive(str(tmp_path / "archive"))
+    rows = {DOCTOR: [(DAY, "09:00 AM", "-", "-", "Available"), (DAY, "10:00 AM", "John Doe", "123", "Reserved")]}
+    assert archive.append("2025-11", rows) == 2
+    assert archive.append("2025-11", rows) == 0
+    
+    # The same slot with new values replaces the archived row
+    changed = {DOCTOR: [(DAY, "09:00 AM", "Jane Roe", "456", "Reserved")]}
+    assert archive.append("2025-11", changed) == 1
+    sheet = archive.read("2025-11")[DOCTOR]
+    assert len(sheet) == 2
+    assert sheet[sheet["Time"] == "09:00 AM"]["Patient_Name"].tolist() == ["Jane Roe"]
+
+
+def test_rerun_after_interrupted_save_does_not_duplicate(workbook, monkeypatch):
+    manager = ExcelDBManager(str(workbook))
+    later = datetime.now() + timedelta(days=10)
+    
+    def interrupted(wb):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(manager, "_save_workbook", interrupted)
+    with pytest.raises(OSError):
+        manager.archive_past_rows(retention_days=0, today=later)
+    monkeypatch.undo()
+    
+    report = manager.archive_past_rows(retention_days=0, today=later)
+    assert report["rows"] == 24
+    archived = sum(len(sheet) for month in manager.archive.months() for sheet in manager.archive.read(month).values())
+    assert archived == 24
+    assert manager.get_available_slots(DOCTOR) == []
@@ -0,0 +1,102 @@
+"""
+Tests for schedule rules: slot generation, exceptions and invalid rule rows
+"""
+from datetime import date
+
+import pandas as pd
+
+from src.utils.schedule_rules import ScheduleTemplates, slot_label
+
+
+DOCTOR = "Dr. Sarah Martinez"
+MONDAY = date(2026, 10, 19)
+TUESDAY = date(2026, 10, 20)
+
+
+def rules(*rows):
+    return pd.DataFrame(rows, columns=["Doctor", "Weekdays", "Start", "End", "Slot_Minutes", "Valid_From", "Valid_To"])
+
+
+def exceptions(*rows):
+    return pd.DataFrame(rows, columns=["Doctor", "Date", "End_Date", "Start", "End", "Reason"])
+
+
+def test_rule_slots_end_by_closing_time():
+    templates = ScheduleTemplates(rules([DOCTOR, "mon", "09:00", "10:40", 30, None, None]), None)
+    assert [label for _, label in templates.day_slots(DOCTOR, MONDAY)] == ["09:00 AM", "09:30 AM", "10:00 AM"]
+    assert templates.day_slots(DOCTOR, TUESDAY) == []
+
+
+def test_blank_slot_minutes_uses_the_default():
+    templates = ScheduleTemplates(rules([DOCTOR, "mon", "09:00", "10:00", None, None, None]), None, slot_minutes=20)
+    assert len(templates.day_slots(DOCTOR, MONDAY)) == 3
+
+
+def test_invalid_slot_minutes_skip_the_rule(capsys):
+    templates = ScheduleTemplates(rules(
+        [DOCTOR, "mon", "09:00", "10:00", 0, None, None],
+        [DOCTOR, "tue", "09:00", "10:00", -15, None, None],
+        [DOCTOR, "wed", "09:00", "10:00", "often", None, None],
+        ["Dr. Ahmed Hassan", "mon", "09:00", "10:00", 60, None, None]
+    ), None)
+    assert DOCTOR not in templates
+    assert templates.day_slots("Dr. Ahmed Hassan", MONDAY) == [(540, "09:00 AM")]
+    assert capsys.readouterr().out.count("Skipping incomplete schedule rule") == 3
+
+
+def test_invalid_default_slot_minutes_skip_blank_rules(capsys):
+    templates = ScheduleTemplates(rules([DOCTOR, "mon", "09:00", "10:00", None, None, None]), None, slot_minutes=0)
+    assert DOCTOR not in templates
+    assert "Skipping incomplete schedule rule" in capsys.readouterr().out
+
+
+def test_exceptions_close_days_and_windows():
+    templates = ScheduleTemplates(
+        rules([DOCTOR, "mon-fri", "09:00", "11:00", 60, None, None]),
+        exceptions(
+            ["All", MONDAY.isoformat(), None, None, None, "Holiday"],
+            [DOCTOR, TUESDAY.isoformat(), None, "10:00", "11:00", "Meeting"]
+        )
+    )
+    assert templates.day_slots(DOCTOR, MONDAY) == []
+    assert templates.day_slots(DOCTOR, TUESDAY) == [(540, "09:00 AM")]
+    assert templates.generates(DOCTOR, TUESDAY, 540)
+    assert not templates.generates(DOCTOR, TUESDAY, 600)
+
+
+def test_validity_window_limits_the_rule():
+    templates = ScheduleTemplates(rules([DOCTOR, "mon,tue", "09:00", "10:00", 60, TUESDAY.isoformat(), None]), None)
+    assert templates.day_slots(DOCTOR, MONDAY) == []
+    assert templates.day_slots(DOCTOR, TUESDAY) == [(540, slot_label(540))]
+
+
+def test_invalid_dates_skip_only_their_row(capsys):
+    templates = ScheduleTemplates(
+        rules(
+            [DOCTOR, "mon", "09:00", "10:00", 60, "Dec 25", None],
+            ["Dr. Ahmed Hassan", "mon", "09:00", "10:00", 60, None, "2025-13-01"],
+            ["Dr. Ahmed Hassan", "tue", "09:00", "10:00", 60, None, None]
+        ),
+        exceptions(["All", "Christmas", None, None, None, "Holiday"])
+    )
+    assert DOCTOR not in templates
+    assert templates.day_slots("Dr. Ahmed Hassan", MONDAY) == []
+    assert templates.day_slots("Dr. Ahmed Hassan", TUESDAY) == [(540, "09:00 AM")]
+    output = capsys.readouterr().out
+    assert output.count("Skipping schedule rule with an invalid date") == 2
+    assert "Skipping schedule exception with an invalid date" in output
+
+
+def test_partly_filled_date_column_read_from_a_sheet(tmp_path):
+    path = tmp_path / "rules.xlsx"
+    sheet = rules(
+        [DOCTOR, "mon", "09:00", "10:00", 60, None, None],
+        ["Dr. Ahmed Hassan", "mon", "09:00", "10:00", 60, pd.Timestamp(TUESDAY), None]
+    )
+    sheet.to_excel(path, sheet_name="Schedule_Rules", index=False)
+    read = pd.read_excel(path, sheet_name="Schedule_Rules")
+    assert str(read["Valid_From"].dtype).startswith("datetime64")  # Empty cells come back as NaT
+    
+    templates = ScheduleTemplates(read, None)
+    assert templates.day_slots(DOCTOR, MONDAY) == [(540, "09:00 AM")]
+    assert templates.day_slots("Dr. Ahmed Hassan", MONDAY) == []
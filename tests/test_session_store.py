@@ -0,0 +1,83 @@
+"""
+Tests for the session stores: live-session counts, turn serialization and saving after eviction
+"""
+import threading
+import time
+
+import pytest
+
+from src.agents.memory import ConversationMemory
+from src.agents.session_store import RedisSessionStore, SessionStore
+
+
+def test_memory_store_counts_live_sessions():
+    store = SessionStore(ConversationMemory)
+    store.get("a")
+    store.get("b")
+    store.remove("a")
+    assert store.active_count() == 1
+    assert store.stats()["live_sessions"] == 1
+
+
+def test_redis_store_counts_without_scanning(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    store = RedisSessionStore(ConversationMemory, idle_ttl=60, client=client)
+    for session_id in ("a", "b", "c"):
+        store.save(session_id, store.get(session_id))
+    store.remove("b")
+    
+    def no_scan(*args, **kwargs):
+        raise AssertionError("keyspace scanned")
+    
+    monkeypatch.setattr(client, "scan_iter", no_scan)
+    assert store.active_count() == 2
+    assert store.stats()["live_sessions"] == 2
+
+
+def test_redis_store_drops_expired_sessions_from_the_count():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    store = RedisSessionStore(ConversationMemory, idle_ttl=60, client=client)
+    store.save("old", store.get("old"))
+    store.save("new", store.get("new"))
+    client.zadd(store._active_key, {"old": 1})  # As if its idle ttl had run out
+    assert store.active_count() == 1
+    assert client.zscore(store._active_key, "old") is None
+
+
+def test_turns_stay_serialized_across_an_eviction():
+    store = SessionStore(ConversationMemory, max_sessions=1)
+    order = []
+    first_in = threading.Event()
+    
+    def first_turn():
+        with store.turn("a") as memory:
+            first_in.set()
+            store.get("b")  # Evicts "a" while its turn runs
+            time.sleep(0.05)
+            memory.add_user_message("first")
+            store.save("a", memory)
+            order.append("first done")
+    
+    def second_turn():
+        with store.turn("a") as memory:
+            order.append("second started")
+            assert [message.content for message in memory.messages] == ["first"]
+    
+    thread = threading.Thread(target=first_turn)
+    thread.start()
+    assert first_in.wait(2)
+    second_turn()
+    thread.join()
+    assert order == ["first done", "second started"]
+
+
+def test_save_keeps_the_turns_memory_after_eviction():
+    store = SessionStore(ConversationMemory, max_sessions=1)
+    memory = store.get("a")
+    store.get("b")  # Evicts "a"
+    memory.add_user_message("hello")
+    store.save("a", memory)
+    assert store.peek("a") is memory
+    assert store.stats()["live_sessions"] == 1
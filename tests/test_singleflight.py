@@ -0,0 +1,104 @@
+"""
+Tests for single-flight call coalescing
+"""
+import asyncio
+import threading
+
+from src.utils.singleflight import SingleFlight
+
+
+def test_identical_calls_share_one_execution():
+    flight = SingleFlight("test_share")
+    
+    async def main():
+        gate = asyncio.Event()
+        
+        async def fetch():
+            await gate.wait()
+            return "answer"
+        
+        callers = [asyncio.create_task(flight.ado("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(*callers)
+    
+    assert asyncio.run(main()) == ["answer"] * 3
+    assert flight.stats()["executions"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    flight = SingleFlight("test_leader_cancel")
+    
+    async def main():
+        gate = asyncio.Event()
+        
+        async def fetch():
+            await gate.wait()
+            return "answer"
+        
+        leader = asyncio.create_task(flight.ado("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.ado("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()  # Its client disconnected
+        await asyncio.sleep(0)
+        gate.set()
+        return await follower, leader.cancelled()
+    
+    assert asyncio.run(main()) == ("answer", True)
+    assert flight.stats()["executions"] == 1
+
+
+def test_work_is_cancelled_when_every_caller_gives_up():
+    flight = SingleFlight("test_abandon")
+    
+    async def main():
+        cancelled = []
+        
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        
+        callers = [asyncio.create_task(flight.ado("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        
+        # A new call starts over instead of joining the abandoned one
+        async def fresh():
+            return "fresh"
+        
+        return cancelled, await flight.ado("key", fresh)
+    
+    assert asyncio.run(main()) == ([True], "fresh")
+
+
+def test_calls_on_different_loops_are_not_shared():
+    flight = SingleFlight("test_loops")
+    in_flight = threading.Event()
+    release = threading.Event()
+    results = []
+    
+    async def slow():
+        in_flight.set()
+        while not release.is_set():
+            await asyncio.sleep(0.001)
+        return "first loop"
+    
+    async def fast():
+        return "second loop"
+    
+    first = threading.Thread(target=lambda: results.append(asyncio.run(flight.ado("key", lambda: slow()))))
+    first.start()
+    assert in_flight.wait(2)
+    results.append(asyncio.run(asyncio.wait_for(flight.ado("key", lambda: fast()), 2)))
+    release.set()
+    first.join()
+    assert sorted(results) == ["first loop", "second loop"]
+    assert flight.stats()["executions"] == 2
@@ -0,0 +1,187 @@
+"""
+Tests for the timer wheel and slot holds
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.agents.memory import ConversationMemory
+from src.agents.session_store import SessionStore
+from src.utils import slot_holds
+from src.utils.excel_manager import ExcelDBManager
+from src.utils.slot_holds import RedisSlotHolds, SlotHolds, TimerWheel, slot_start
+
+
+SLOT = datetime(2026, 10, 20, 10, 0)
+OTHER_SLOT = datetime(2026, 10, 20, 11, 0)
+
+
+def test_wheel_expires_keys_at_their_deadline():
+    wheel = TimerWheel(tick=1.0, size=8)
+    wheel.advance(100.0)
+    wheel.schedule("a", 102.5)
+    wheel.schedule("b", 104.0)
+    assert wheel.advance(102.0) == []
+    assert wheel.advance(103.0) == ["a"]
+    assert wheel.advance(104.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_wheel_keeps_deadlines_beyond_one_rotation():
+    wheel = TimerWheel(tick=1.0, size=4)
+    wheel.advance(0.0)
+    wheel.schedule("far", 9.0)  # Shares a bucket with ticks 1 and 5
+    assert wheel.advance(5.0) == []
+    assert wheel.advance(9.0) == ["far"]
+
+
+def test_wheel_catches_up_after_a_long_gap():
+    wheel = TimerWheel(tick=1.0, size=4)
+    wheel.advance(0.0)
+    for key, deadline in (("a", 1.0), ("b", 2.0), ("c", 3.0), ("d", 50.0)):
+        wheel.schedule(key, deadline)
+    assert sorted(wheel.advance(40.0)) == ["a", "b", "c"]
+    assert len(wheel) == 1
+
+
+def test_wheel_reschedule_and_cancel():
+    wheel = TimerWheel(tick=1.0, size=8)
+    wheel.advance(0.0)
+    wheel.schedule("a", 2.0)
+    wheel.schedule("a", 5.0)
+    wheel.schedule("b", 2.0)
+    wheel.cancel("b")
+    wheel.cancel("missing")
+    assert wheel.advance(3.0) == []
+    assert wheel.advance(5.0) == ["a"]
+    wheel.schedule("late", 4.0)  # Already past: due at the next tick, not a rotation later
+    assert wheel.advance(6.0) == ["late"]
+
+
+def test_hold_hides_slot_from_other_sessions():
+    holds = SlotHolds(ttl=60)
+    held, expires = holds.hold("s1", "Dr. Sarah Martinez", SLOT)
+    assert held and expires is not None
+    assert holds.hold("s2", "Dr. Sarah Martinez", SLOT) == (False, None)
+    assert holds.blocked("Dr. Sarah Martinez", "s2") == {SLOT}
+    assert holds.blocked("Dr. Sarah Martinez", "s1") == set()
+    assert holds.holder("Dr. Sarah Martinez", SLOT) == "s1"
+
+
+def test_session_holds_one_slot_at_a_time():
+    holds = SlotHolds(ttl=60)
+    holds.hold("s1", "Dr. Sarah Martinez", SLOT)
+    holds.hold("s1", "Dr. Sarah Martinez", OTHER_SLOT)
+    assert holds.held_by("s1") == ("Dr. Sarah Martinez", OTHER_SLOT)
+    assert holds.holder("Dr. Sarah Martinez", SLOT) is None
+    assert len(holds) == 1
+
+
+def test_convert_and_release_end_holds():
+    holds = SlotHolds(ttl=60)
+    holds.hold("s1", "Dr. Sarah Martinez", SLOT)
+    holds.hold("s2", "Dr. Sarah Martinez", OTHER_SLOT)
+    version = holds.version
+    holds.convert("Dr. Sarah Martinez", SLOT, "s1")
+    assert holds.held_by("s1") is None
+    assert holds.version > version
+    assert holds.release("s2")
+    assert not holds.release("s2")
+    assert len(holds) == 0
+
+
+def test_holds_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(slot_holds.time, "monotonic", lambda: now[0])
+    holds = SlotHolds(ttl=30, tick=1.0)
+    holds.hold("s1", "Dr. Sarah Martinez", SLOT)
+    now[0] += 29
+    assert holds.held_by("s1") is not None
+    now[0] += 2
+    assert holds.held_by("s1") is None
+    assert holds.hold("s2", "Dr. Sarah Martinez", SLOT)[0]
+
+
+def test_zero_ttl_disables_holds():
+    holds = SlotHolds(ttl=0)
+    assert holds.hold("s1", "Dr. Sarah Martinez", SLOT) == (True, None)
+    assert holds.hold("s2", "Dr. Sarah Martinez", SLOT) == (True, None)
+    assert len(holds) == 0
+
+
+def test_slot_start_parses_labels():
+    assert slot_start("2026-10-20", "10:30 AM") == datetime(2026, 10, 20, 10, 30)
+    assert slot_start("2026-10-20 00:00:00", "02:00 PM") == datetime(2026, 10, 20, 14, 0)
+    assert slot_start("not a date", "10:30 AM") is None
+    assert slot_start("2026-10-20", "soon") is None
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+
+def test_redis_holds_are_shared_between_workers(redis_client):
+    worker_a = RedisSlotHolds(ttl=60, client=redis_client)
+    worker_b = RedisSlotHolds(ttl=60, client=redis_client)
+    version = worker_b.version
+    assert worker_a.hold("s1", "Dr. Sarah Martinez", SLOT)[0]
+    assert worker_b.hold("s2", "Dr. Sarah Martinez", SLOT) == (False, None)
+    assert worker_b.blocked("Dr. Sarah Martinez", "s2") == {SLOT}
+    assert worker_b.blocked("Dr. Ahmed Hassan", "s2") == set()
+    assert worker_b.holder("Dr. Sarah Martinez", SLOT) == "s1"
+    assert worker_b.version > version
+    
+    worker_b.hold("s1", "Dr. Sarah Martinez", OTHER_SLOT)  # The conversation moved to the other worker
+    assert worker_a.held_by("s1") == ("Dr. Sarah Martinez", OTHER_SLOT)
+    assert worker_a.holder("Dr. Sarah Martinez", SLOT) is None
+    assert len(worker_a) == 1
+
+
+def test_redis_holds_convert_release_and_expire(redis_client):
+    holds = RedisSlotHolds(ttl=60, client=redis_client)
+    holds.hold("s1", "Dr. Sarah Martinez", SLOT)
+    holds.convert("Dr. Sarah Martinez", SLOT, "s1")
+    assert holds.held_by("s1") is None
+    
+    holds.hold("s2", "Dr. Sarah Martinez", SLOT)
+    assert holds.release("s2")
+    assert not holds.release("s2")
+    
+    holds.hold("s3", "Dr. Sarah Martinez", OTHER_SLOT)
+    member = holds._member("Dr. Sarah Martinez", OTHER_SLOT)
+    redis_client.delete(holds._slot_key(member))  # As if its ttl had run out
+    redis_client.zadd(holds._index_key, {member: 1})
+    version = holds.version
+    assert len(holds) == 0
+    assert holds.held_by("s3") is None
+    assert holds.hold("s4", "Dr. Sarah Martinez", OTHER_SLOT)[0]
+    assert holds.version > version
+
+
+def test_held_slot_is_not_bookable_from_another_worker(workbook, redis_client):
+    worker_a = ExcelDBManager(str(workbook), holds=RedisSlotHolds(ttl=60, client=redis_client))
+    worker_b = ExcelDBManager(str(workbook), holds=RedisSlotHolds(ttl=60, client=redis_client))
+    slot = worker_a.get_available_slots("Dr. Sarah Martinez", limit=1)[0]
+    assert worker_a.hold_slot("Dr. Sarah Martinez", slot["date"], slot["time"], "s1")[0]
+    
+    assert slot not in worker_b.get_available_slots("Dr. Sarah Martinez", slot["date"], limit=10)
+    assert not worker_b.book_appointment("Dr. Sarah Martinez", slot["date"], slot["time"], "Other", "999", session_id="s2")[0]
+    assert worker_b.book_appointment("Dr. Sarah Martinez", slot["date"], slot["time"], "Pat One", "111", session_id="s1")[0]
+    assert worker_a.holds.held_by("s1") is None
+
+
+def test_removed_session_releases_its_hold():
+    holds = SlotHolds(ttl=60)
+    store = SessionStore(ConversationMemory, max_sessions=1, on_remove=holds.release)
+    store.get("s1")
+    holds.hold("s1", "Dr. Sarah Martinez", SLOT)
+    store.remove("s1")
+    assert holds.held_by("s1") is None
+    
+    store.get("s2")
+    holds.hold("s2", "Dr. Sarah Martinez", SLOT)
+    store.get("s3")  # Evicts s2, the least recently used
+    assert holds.held_by("s2") is None
@@ -0,0 +1,100 @@
+"""
+Tests for the streaming function-call parser and tool start-up during streaming
+"""
+import asyncio
+
+import pytest
+
+from src.agents.medical_agents import medical_chatbot
+from src.agents.stream_parser import StreamingFunctionCallParser
+from src.utils import services, LLMUnavailableError
+
+
+BOOK = "book_appointment: sarah 2025-12-12 10:00 AM John Doe 01067110557"
+
+
+def test_simple_call_completes_at_end_of_line():
+    parser = StreamingFunctionCallParser(medical_chatbot._extract_function_calls)
+    assert parser.feed("check_availability: sar") == []
+    calls = parser.feed("ah 2025-12-12\nget_doc")
+    parser.feed("tors")
+    assert calls == [{"function": "check_availability", "args": "sarah 2025-12-12"}]
+    assert parser.finish() == [{"function": "get_doctors", "args": ""}]
+
+
+def test_xml_call_completes_at_closing_tag():
+    parser = StreamingFunctionCallParser(medical_chatbot._extract_function_calls)
+    assert parser.feed("<search_knowledge>opening ") == []
+    calls = parser.feed("hours</search_knowledge>")
+    assert calls == [{"function": "search_knowledge", "args": "opening hours"}]
+    assert parser.feed("<get_doctors/>") == [{"function": "get_doctors", "args": ""}]
+
+
+def test_repeated_call_is_emitted_once():
+    parser = StreamingFunctionCallParser(medical_chatbot._extract_function_calls)
+    parser.feed("get_doctors\n")
+    assert parser.feed("get_doctors\n") == []
+
+
+class FakeProvider:
+    """Streams fixed chunks, optionally failing after them"""
+    
+    name = "fake"
+    
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+    
+    def stream(self, messages):
+        yield from self.chunks
+        if self.error:
+            raise self.error
+    
+    async def astream(self, messages):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """Functions the chatbot ran, in order"""
+    calls = []
+    
+    def execute(function_name, args):
+        calls.append(function_name)
+        return f"{function_name} done"
+    
+    async def aexecute(function_name, args):
+        return execute(function_name, args)
+    
+    monkeypatch.setattr(medical_chatbot, "_execute_function", execute)
+    monkeypatch.setattr(medical_chatbot, "_aexecute_function", aexecute)
+    return calls
+
+
+def _run(provider, use_async):
+    with services.override("llm_provider", provider):
+        if use_async:
+            return asyncio.run(medical_chatbot._astream_llm_step([]))
+        return medical_chatbot._stream_llm_step([])
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_failed_stream_never_runs_writes(executed, use_async):
+    provider = FakeProvider(["get_doctors\n", BOOK + "\n", "search_knowledge: hours\n"], LLMUnavailableError("down"))
+    response, calls, results = _run(provider, use_async)
+    assert calls == [] and results == []
+    medical_chatbot.tool_executor.submit(lambda: None).result()  # Let started reads finish
+    assert "book_appointment" not in executed
+    assert "search_knowledge" not in executed
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_writes_run_after_the_stream_in_order(executed, use_async):
+    provider = FakeProvider(["get_doctors\n", BOOK + "\n", "search_appointments: John Doe"])
+    response, calls, results = _run(provider, use_async)
+    assert [call["function"] for call in calls] == ["get_doctors", "book_appointment", "search_appointments"]
+    assert results == ["get_doctors done", "book_appointment done", "search_appointments done"]
+    assert executed.index("book_appointment") < executed.index("search_appointments")
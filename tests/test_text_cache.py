@@ -0,0 +1,25 @@
+"""
+Tests for the extracted text cache
+"""
+from src.utils.text_cache import ExtractedTextCache, file_digest
+
+
+def test_entries_are_keyed_by_content_and_extractor(tmp_path):
+    document = tmp_path / "leaflet.pdf"
+    document.write_bytes(b"%PDF content")
+    digest = file_digest(document)
+    cache = ExtractedTextCache(str(tmp_path / "cache"))
+    assert cache.get(digest, "pypdf-4.0") is None
+    
+    cache.put(digest, "pypdf-4.0", ["page one", ""], source="leaflet.pdf")
+    assert cache.get(digest, "pypdf-4.0") == ["page one", ""]
+    assert cache.get(digest, "pypdf-5.0") is None
+
+
+def test_unwritable_directory_only_warns(tmp_path, capsys):
+    blocker = tmp_path / "cache"
+    blocker.write_text("a file where the cache folder should be")
+    cache = ExtractedTextCache(str(blocker))
+    cache.put("ab" * 32, "pypdf-4.0", ["page one"], source="leaflet.pdf")
+    assert "Could not cache extracted text of leaflet.pdf" in capsys.readouterr().out
+    assert cache.get("ab" * 32, "pypdf-4.0") is None
@@ -0,0 +1,119 @@
+"""
+Tests for the shared tool result cache
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.tool_cache import ToolResultCache, SCHEDULE, KNOWLEDGE
+
+
+def counted(value="result"):
+    """Backend stand-in that counts its calls"""
+    calls = []
+    
+    def fn():
+        calls.append(1)
+        return value
+    
+    return fn, calls
+
+
+def test_hit_ignores_argument_order():
+    cache = ToolResultCache(ttl=60)
+    fn, calls = counted()
+    cache.get_or_compute("slots", {"doctor": "sarah", "date": "2026-10-20"}, fn)
+    assert cache.get_or_compute("slots", {"date": "2026-10-20", "doctor": "sarah"}, fn) == "result"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_version_is_part_of_the_key():
+    cache = ToolResultCache(ttl=60)
+    fn, calls = counted()
+    cache.get_or_compute("slots", {}, fn, version=(1, 100))
+    cache.get_or_compute("slots", {}, fn, version=(2, 100))
+    assert len(calls) == 2
+
+
+def test_invalidation_drops_only_its_scope():
+    cache = ToolResultCache(ttl=60)
+    schedule, schedule_calls = counted()
+    knowledge, knowledge_calls = counted()
+    cache.get_or_compute("slots", {}, schedule, scope=SCHEDULE)
+    cache.get_or_compute("search", {}, knowledge, scope=KNOWLEDGE)
+    cache.invalidate(SCHEDULE)
+    cache.get_or_compute("slots", {}, schedule, scope=SCHEDULE)
+    cache.get_or_compute("search", {}, knowledge, scope=KNOWLEDGE)
+    assert len(schedule_calls) == 2
+    assert len(knowledge_calls) == 1
+
+
+def test_result_computed_across_an_invalidation_is_not_stored():
+    cache = ToolResultCache(ttl=60)
+    
+    def stale():
+        cache.invalidate(SCHEDULE)  # A booking lands while the read is running
+        return "stale"
+    
+    assert cache.get_or_compute("slots", {}, stale) == "stale"
+    assert cache.stats()["entries"] == 0
+
+
+def test_exceptions_are_not_cached():
+    cache = ToolResultCache(ttl=60)
+    
+    def failing():
+        raise RuntimeError("workbook locked")
+    
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("slots", {}, failing)
+    assert cache.get_or_compute("slots", {}, lambda: "ok") == "ok"
+
+
+def test_lru_eviction_and_disabled_cache():
+    cache = ToolResultCache(ttl=60, max_entries=2)
+    for doctor in ("a", "b", "c"):
+        cache.get_or_compute("slots", {"doctor": doctor}, lambda: doctor)
+    assert cache.stats()["entries"] == 2
+    
+    disabled = ToolResultCache(ttl=0)
+    fn, calls = counted()
+    disabled.get_or_compute("slots", {}, fn)
+    disabled.get_or_compute("slots", {}, fn)
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_run_the_backend_once():
+    cache = ToolResultCache(ttl=60)
+    release = threading.Event()
+    calls = []
+    
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return "slots"
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("slots", {}, slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache._flight.coalesced < 4:  # Every other caller waits on the first one
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["slots"] * 5
+    assert len(calls) == 1
+
+
+def test_async_lookup_shares_entries_with_sync():
+    cache = ToolResultCache(ttl=60)
+    cache.get_or_compute("slots", {"doctor": "sarah"}, lambda: "sync")
+    
+    async def factory():
+        return "async"
+    
+    assert asyncio.run(cache.aget_or_compute("slots", {"doctor": "sarah"}, factory)) == "sync"
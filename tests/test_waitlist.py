@@ -0,0 +1,126 @@
+"""
+Tests for the waitlist: matching, offers shared between processes, and who may act on an entry
+"""
+import contextvars
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.agents import medical_agents
+from src.agents.memory import ConversationMemory
+from src.utils import config, services
+from src.utils.excel_manager import ExcelDBManager
+from src.utils.slot_holds import slot_start
+from src.utils.waitlist import Waitlist
+from src.web import staff_denial
+
+
+DOCTOR = "Dr. Sarah Martinez"
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+
+
+def test_matches_respect_window_and_arrival_order(tmp_path):
+    waitlist = Waitlist(str(tmp_path / "waitlist.json"))
+    day = date.today() + timedelta(days=1)
+    first = waitlist.add(DOCTOR, "Early Bird", "111", day, day)
+    waitlist.add(DOCTOR, "Evening Only", "222", day, day, earliest=17 * 60)
+    last = waitlist.add(DOCTOR, "Late Comer", "333", day, day)
+    
+    morning = datetime.combine(day, datetime.min.time()) + timedelta(hours=10)
+    assert [entry["id"] for entry in waitlist.matches(DOCTOR, morning)] == [first["id"], last["id"]]
+    assert waitlist.matches("Dr. Ahmed Hassan", morning) == []
+    
+    assert waitlist.leave("111") == 1
+    assert [entry["id"] for entry in waitlist.matches(DOCTOR, morning)] == [last["id"]]
+
+
+def _offer_first_slot(manager):
+    """Book the first slot, put a patient on the waitlist, then free the slot so it is offered"""
+    slot = manager.get_available_slots(DOCTOR, TOMORROW, limit=1)[0]
+    assert manager.book_appointment(DOCTOR, slot["date"], slot["time"], "Pat One", "111")[0]
+    assert manager.join_waitlist(DOCTOR, "Wait Two", "222", start_date=TOMORROW, end_date=TOMORROW)[0]
+    assert manager.cancel_appointment(DOCTOR, "Pat One", slot["date"], slot["time"])[0]
+    return slot
+
+
+def test_offer_is_honored_by_other_processes(workbook):
+    worker_a = ExcelDBManager(str(workbook), waitlist_policy="offer")
+    slot = _offer_first_slot(worker_a)
+    
+    # A second worker (or a restart) only has the waitlist file to go by
+    worker_b = ExcelDBManager(str(workbook), waitlist_policy="offer")
+    assert slot not in worker_b.get_available_slots(DOCTOR, TOMORROW, limit=10)
+    assert not worker_b.hold_slot(DOCTOR, slot["date"], slot["time"], "someone")[0]
+    assert not worker_b.book_appointment(DOCTOR, slot["date"], slot["time"], "Other", "999")[0]
+    
+    success, message = worker_b.accept_waitlist_offer("222")
+    assert success, message
+    assert worker_a.waitlist_entries(statuses=("booked",))[0]["phone"] == "222"
+
+
+def test_lapsed_offer_frees_the_slot(workbook):
+    manager = ExcelDBManager(str(workbook), waitlist_policy="offer", waitlist_offer_ttl=0)
+    slot = _offer_first_slot(manager)
+    assert manager.waitlist_entries(statuses=("offered",))
+    assert slot in manager.get_available_slots(DOCTOR, TOMORROW, limit=10)
+    assert not manager.accept_waitlist_offer("222")[0]
+    assert manager.book_appointment(DOCTOR, slot["date"], slot["time"], "Other", "999")[0]
+
+
+def test_auto_book_books_the_first_waiter(workbook):
+    manager = ExcelDBManager(str(workbook), waitlist_policy="auto_book")
+    slot = _offer_first_slot(manager)
+    booked = manager.search_appointments(patient_name="Wait Two")
+    assert [(appt["date"], appt["time"]) for appt in booked] == [(slot["date"], slot["time"])]
+    assert slot_start(slot["date"], slot["time"]) not in manager._offered_starts(DOCTOR)
+
+
+@pytest.fixture
+def chatbot(workbook):
+    """Run chatbot functions against the workbook with a fresh conversation memory"""
+    manager = ExcelDBManager(str(workbook), waitlist_policy="offer")
+    memory = ConversationMemory()
+    context = contextvars.copy_context()
+    context.run(medical_agents._current_memory.set, memory)
+    
+    def run(function_name, args):
+        return context.run(medical_agents.medical_chatbot._run_function, function_name, args)
+    
+    with services.override("excel", manager):
+        yield manager, memory, run
+
+
+def test_waitlist_actions_need_a_verified_phone(chatbot):
+    manager, memory, run = chatbot
+    manager.join_waitlist(DOCTOR, "Wait Two", "222", start_date=TOMORROW, end_date=TOMORROW)
+    
+    assert "full name and phone" in run("leave_waitlist", "222")
+    assert "couldn't find" in run("leave_waitlist", "222; patient=Someone Else")
+    assert manager.waitlist_entries(statuses=("waiting",))
+    
+    assert run("leave_waitlist", "222; patient=wait two").startswith("✅")
+    assert memory.facts["verified_phone"] == "222"
+
+
+def test_verified_phone_comes_from_this_conversation(chatbot):
+    manager, memory, run = chatbot
+    manager.join_waitlist(DOCTOR, "Wait Two", "222", start_date=TOMORROW, end_date=TOMORROW)
+    result = run("join_waitlist", "doctor=sarah; patient=Zed Q; phone=555; within=2")
+    memory.add_tool_result("join_waitlist", result)
+    assert memory.facts["verified_phone"] == "555"
+    
+    assert "privacy" in run("leave_waitlist", "222; patient=Wait Two")
+    assert run("leave_waitlist", "").startswith("✅")
+    assert manager.waitlist.entries(statuses=("waiting",), phone="222")
+    assert not manager.waitlist.entries(statuses=("waiting",), phone="555")
+
+
+def test_staff_endpoint_needs_the_token(monkeypatch):
+    monkeypatch.setattr(config, "STAFF_API_TOKEN", "")
+    assert staff_denial({})[1] == 403
+    
+    monkeypatch.setattr(config, "STAFF_API_TOKEN", "s3cret")
+    assert staff_denial({})[1] == 401
+    assert staff_denial({"Authorization": "Bearer wrong"})[1] == 401
+    assert staff_denial({"Authorization": "Bearer s3cret"}) is None
+    assert staff_denial({"X-Staff-Token": "s3cret"}) is None